@@ -6,7 +6,9 @@
 #   - Per-cell voltages are returned as ×1000 integers (millivolts) via get_cells_x1000().
 
 import bluetooth, time
+from array import array
 from micropython import const
+from common.crc import sum16, jbd_checksum
 
 # ===== BLE IRQ constants =====
 _IRQ_SCAN_RESULT                 = const(5)
@@ -31,6 +33,22 @@ CCCD_UUID   = bluetooth.UUID(0x2902)
 CMD_BASIC = bytes([0xDD,0xA5,0x03,0x00,0xFF,0xFD,0x77])  # BASIC info
 CMD_CELLS = bytes([0xDD,0xA5,0x04,0x00,0xFF,0xFC,0x77])  # per-cell mV
 
+# Per-cell voltages are decoded into one preallocated array
+MAX_CELLS = const(32)
+
+# Link state
+_LINK_IDLE       = const(0)   # waiting for link_next_ms
+_LINK_SCANNING   = const(1)
+_LINK_CONNECTING = const(2)
+_LINK_CONNECTED  = const(3)
+
+# Retry delay after a failed scan / connect, doubled up to the max
+_RETRY_MIN_MS = const(1000)
+_RETRY_MAX_MS = const(30000)
+
+# Scan results that can be connected to (ADV_IND, ADV_DIRECT_IND)
+_ADV_CONNECTABLE = (0x00, 0x01)
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Helpers
 # ──────────────────────────────────────────────────────────────────────────────
@@ -69,16 +87,38 @@ def _recognized_protections(bits):
       out.append(name)
   return out
 
-def _balance_cells_from_bitmap(bal_bytes, cells):
-  out = []
+def _balance_mask(bal_bytes):
   mask = 0
   for i in range(min(4, len(bal_bytes))):
     mask |= (bal_bytes[i] & 0xFF) << (8 * i)
+  return mask
+
+def _balance_cells_from_bitmap(mask, cells):
+  out = []
   for i in range(cells):
     if mask & (1 << i):
       out.append(i + 1)
   return out
 
+def addr_to_ints(peer_addr):
+  """(addr_type, addr) to two int32 (e.g. for the settings store), 0 0 for None"""
+  if peer_addr is None:
+    return (0, 0)
+  addr_type, addr = peer_addr
+  hi = 0x1000000 | ((addr_type & 0xFF) << 16) | (addr[0] << 8) | addr[1]
+  lo = (addr[2] << 24) | (addr[3] << 16) | (addr[4] << 8) | addr[5]
+  if lo >= 0x80000000:
+    lo -= 0x100000000
+  return (hi, lo)
+
+def addr_from_ints(hi, lo):
+  """Inverse of addr_to_ints(), None when not set"""
+  if not (hi & 0x1000000):
+    return None
+  lo &= 0xFFFFFFFF
+  addr = bytes([(hi >> 8) & 0xFF, hi & 0xFF, (lo >> 24) & 0xFF, (lo >> 16) & 0xFF, (lo >> 8) & 0xFF, lo & 0xFF])
+  return ((hi >> 16) & 0xFF, addr)
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Client
 # ──────────────────────────────────────────────────────────────────────────────
@@ -93,10 +133,20 @@ class JbdBmsClient:
       - cap_rem_ah_x100       (Ah×100)
       - cap_full_ah_x100      (Ah×100)
       - temps_c_x100[]        (°C×100)
-      - get_cells_x1000()     -> list of per-cell voltages in V×1000 (mV)
+      - get_cells_x1000()     -> per-cell voltages in V×1000 (mV)
+      - prot_bits, balance_mask (raw bitmaps, bit i = protection i / cell i+1)
 
   Unchanged:
       - soc_pct (0..100), cycle_cnt, fet flags, protections list, balancing cells.
+
+  Radio coexistence (BLE shares the 2.4 GHz radio with ESP-NOW):
+      - a known BMS address (peer_addr, from a previous connection) is
+        connected to directly, without a scan
+      - scans are short and low duty cycle (scan_window_us / scan_interval_us),
+        retried with a growing delay, and stop on the known address or name
+      - a long connection interval is requested: one poll per second only
+        needs a few connection events
+      - set_query_period() to poll faster (charging) or slower (riding)
   """
 
   def __init__(
@@ -108,6 +158,12 @@ class JbdBmsClient:
     first_kick_ms=250,
     interleave_cells=True,      # True: alternate 0x03 and 0x04; False: basic only
     buf_max_bytes=4096,
+    known_addr=None,            # (addr_type, addr) of the BMS: connect directly
+    scan_ms=3000,
+    scan_interval_us=100000,    # scan 15 ms every 100 ms: the radio stays
+    scan_window_us=15000,       # available to ESP-NOW most of the time
+    min_conn_interval_us=100000,
+    max_conn_interval_us=150000,
     debug=False,
   ):
     self.ble = ble or bluetooth.BLE()
@@ -120,7 +176,25 @@ class JbdBmsClient:
     self.first_kick_ms = first_kick_ms
     self.interleave_cells = interleave_cells
     self.buf_max_bytes = buf_max_bytes
+    self.scan_ms = scan_ms
+    self.scan_interval_us = scan_interval_us
+    self.scan_window_us = scan_window_us
+    self.min_conn_interval_us = min_conn_interval_us
+    self.max_conn_interval_us = max_conn_interval_us
     self.debug = bool(debug)
+    self._target_name = target_name.encode()
+
+    # Address of the BMS; peer_addr_changed is set when a scan found a new
+    # one (for the caller to persist)
+    self.peer_addr = known_addr
+    self.peer_addr_changed = False
+    self._link_state = _LINK_IDLE
+    self._link_next_ms = 0
+    self._link_started = False
+    self._retry_ms = _RETRY_MIN_MS
+    self._last_was_direct = False
+    self.scans = 0
+    self.connects = 0
 
     self.conn = None
     self.srange = None
@@ -138,14 +212,30 @@ class JbdBmsClient:
 
     # Cached last-known data
     self._last_basic = None        # dict with *_x100 fields + others unchanged
-    self._last_cells_x1000 = None  # list[int] of per-cell V×1000 (mV)
+    # per-cell V×1000 (mV): decoded in place, _cells_view covers the cells
+    # of the last CELLS frame
+    self._cells_x1000 = array('H', [0] * MAX_CELLS)
+    self._cells_count = 0
+    self._cells_view = None
 
   # ───────── Public API ─────────
 
-  def start(self, scan_ms=8000):
-    self._scan(scan_ms)
+  def start(self, scan_ms=None):
+    """Start connecting (from tick()): directly to the known address if
+    there is one, else with a scan"""
+    if scan_ms is not None:
+      self.scan_ms = scan_ms
+    self._link_started = True
+    self._link_state = _LINK_IDLE
+    self._link_next_ms = time.ticks_ms()
+
+  def set_query_period(self, query_period_ms):
+    """Poll period of BASIC / CELLS, takes effect from the next poll"""
+    self.query_period_ms = query_period_ms
 
   def stop(self):
+    self._link_started = False
+    self._link_state = _LINK_IDLE
     try:
       self.ble.gap_scan(None)
     except:
@@ -161,11 +251,14 @@ class JbdBmsClient:
     try:
       self._drain_frames()
 
+      t = time.ticks_ms()
+      if self._link_started and self._link_state == _LINK_IDLE and \
+          time.ticks_diff(t, self._link_next_ms) >= 0:
+        self._link_open()
+
       if (self.conn is None) or (self.h_n is None):
         return
 
-      t = time.ticks_ms()
-
       if self.next_ms and time.ticks_diff(t, self.next_ms) >= 0:
         self.next_ms = 0
         if (not self.awaiting) and (self.h_w is not None):
@@ -229,8 +322,9 @@ class JbdBmsClient:
     return (bool(d["fet_chg"]), bool(d["fet_dsg"]))
 
   def get_cells_x1000(self):
-    """Returns list[int] of per-cell voltages in V×1000 (millivolts), or None."""
-    return self._last_cells_x1000
+    """Returns per-cell voltages in V×1000 (millivolts) or None: a view of
+    the decode array, updated in place by the next CELLS frame."""
+    return self._cells_view
 
   def get_temps_c_x100(self):
     """Returns list[int] of NTC temps in °C×100, or None."""
@@ -245,19 +339,75 @@ class JbdBmsClient:
     d = self._last_basic
     return d["balance_cells"] if d else []
 
+  def get_protection_bits(self):
+    d = self._last_basic
+    return d["prot_bits"] if d else 0
+
+  def get_balance_mask(self):
+    d = self._last_basic
+    return d["balance_mask"] if d else 0
+
   def get_last_update_ms(self):
     return self.last_data_ms
 
   # ───────── Internals: BLE + scheduling + buffering + parsing ─────────
 
+  def _link_open(self):
+    # alternate direct connects to the known address with scans, so a BMS
+    # that was replaced is still found
+    if self.peer_addr is not None and not self._last_was_direct:
+      self._last_was_direct = True
+      self._connect(self.peer_addr[0], self.peer_addr[1], self.scan_ms)
+    else:
+      self._last_was_direct = False
+      self._scan(self.scan_ms)
+
+  def _link_retry(self, delay_ms=None):
+    # back to idle, next attempt after delay_ms (or the growing retry delay)
+    self._link_state = _LINK_IDLE
+    if delay_ms is None:
+      delay_ms = self._retry_ms
+      self._retry_ms = min(self._retry_ms * 2, _RETRY_MAX_MS)
+    self._link_next_ms = time.ticks_add(time.ticks_ms(), delay_ms)
+
+  def _link_drop(self):
+    # GATT setup failed: disconnect, the disconnect event schedules a retry
+    conn = self.conn
+    self._reset_state()
+    try:
+      if conn is not None:
+        self.ble.gap_disconnect(conn)
+    except:
+      pass
+    self._link_retry()
+
   def _scan(self, ms):
     if self.debug:
       print("Scanning…")
+    self._link_state = _LINK_SCANNING
+    self.scans += 1
     try:
-      self.ble.gap_scan(ms, 30000, 30000)
+      self.ble.gap_scan(ms, self.scan_interval_us, self.scan_window_us)
     except Exception as ex:
       if self.debug:
         print("gap_scan error:", ex)
+      self._link_retry()
+
+  def _connect(self, addr_type, addr, timeout_ms):
+    if self.debug:
+      print("Connecting…")
+    self._link_state = _LINK_CONNECTING
+    self.connects += 1
+    try:
+      try:
+        self.ble.gap_connect(addr_type, addr, timeout_ms, self.min_conn_interval_us, self.max_conn_interval_us)
+      except TypeError:
+        # port without the connection interval arguments
+        self.ble.gap_connect(addr_type, addr)
+    except Exception as ex:
+      if self.debug:
+        print("gap_connect error:", ex)
+      self._link_retry()
 
   def _reset_state(self, clear_buf=False):
     self.conn = None
@@ -344,19 +494,20 @@ class JbdBmsClient:
     recv = (f[-3] << 8) | f[-2]
     n = len(f)
 
-    def ok(start, end_excl):
-      if end_excl <= start:
-        return False
-      s = 0
-      for b in f[start:end_excl]:
-        s = (s + b) & 0xFFFF
-      calc = (0x10000 - s) & 0xFFFF
-      return calc == recv
-
-    for st in (0, 1, 2, 3):
-      for en in (n - 3, n - 4):
-        if ok(st, en):
-          return True
+    # Firmwares differ on the covered range: start at 0..3, end before the
+    # checksum (n-3) or one byte earlier (n-4). One pass over the common
+    # part [3, n-4), then each candidate only adds its edge bytes.
+    core = sum16(f, 3, n - 4)
+    last = f[n - 4]
+    head = 0
+    for st in (3, 2, 1, 0):
+      if st < 3:
+        head += f[st]
+      s = core + head
+      if jbd_checksum((s + last) & 0xFFFF) == recv:
+        return True
+      if n - 4 > st and jbd_checksum(s & 0xFFFF) == recv:
+        return True
     return False
 
   def _parse_basic(self, f):
@@ -395,11 +546,13 @@ class JbdBmsClient:
       temps_c_x100.append((raw * 10) - 27310)
       off += 2
 
+    balance_mask = _balance_mask(bal_bytes)
+
     y, m, day = _decode_prod_date(prod_date)
     prot_list = _recognized_protections(prot_bits)
     fet_chg   = 1 if (fet_flags & 0x01) else 0
     fet_dsg   = 1 if (fet_flags & 0x02) else 0
-    balancing = _balance_cells_from_bitmap(bal_bytes, cells)
+    balancing = _balance_cells_from_bitmap(balance_mask, cells)
 
     return {
       "voltage_v_x100": voltage_v_x100,
@@ -412,6 +565,8 @@ class JbdBmsClient:
       "cap_full_ah_x100": cap_full_ah_x100,
       "prod_date": (y, m, day),
       "prot_list": prot_list,
+      "prot_bits": prot_bits,
+      "balance_mask": balance_mask,
       "cells": cells,
       "temps_c_x100": temps_c_x100,
       "balance_cells": balancing,
@@ -419,21 +574,23 @@ class JbdBmsClient:
 
   def _parse_cells(self, f):
     """
-    Parse 0x04 CELLS frame into list of per-cell voltages in V×1000 (ints).
-    JBD provides mV per cell; return raw mV (no division).
+    Parse 0x04 CELLS frame into the per-cell voltages array, in V×1000.
+    JBD provides mV per cell; stored raw (no division). Returns the number
+    of cells, 0 on a bad frame.
     """
     if (not self._frame_ok(f)) or (f[1] != 0x04):
-      return None
-    d = f[4:-3]
-    out = []
-    i = 0
-    n = len(d)
-    while i + 1 < n:
-      mv = (d[i] << 8) | d[i + 1]   # mV
+      return 0
+    cells = self._cells_x1000
+    count = 0
+    i = 4
+    end = len(f) - 4
+    while i < end and count < MAX_CELLS:
+      mv = (f[i] << 8) | f[i + 1]   # mV
       if 0 < mv < 6000:
-        out.append(mv)            # V×1000 (raw mV)
+        cells[count] = mv           # V×1000 (raw mV)
+        count += 1
       i += 2
-    return out or None
+    return count
 
   def _write(self, payload):
     try:
@@ -458,9 +615,12 @@ class JbdBmsClient:
           self.last_data_ms = time.ticks_ms()
           changed = True
       elif cmd == 0x04 and self.interleave_cells:
-        cells_x1000 = self._parse_cells(f)
-        if cells_x1000:
-          self._last_cells_x1000 = cells_x1000
+        count = self._parse_cells(f)
+        if count:
+          if count != self._cells_count:
+            # new view only when the number of cells changes (first frame)
+            self._cells_count = count
+            self._cells_view = memoryview(self._cells_x1000)[:count]
           self.last_data_ms = time.ticks_ms()
           changed = True
     return changed
@@ -471,24 +631,40 @@ class JbdBmsClient:
     try:
       if e == _IRQ_SCAN_RESULT:
         at, addr, atype, rssi, adv = d
-        nm = None
-        i = 0; adv = bytes(adv); n = len(adv)
-        while i + 1 < n:
-          L = adv[i]
-          if L == 0: break
-          t = adv[i+1]
-          p = adv[i+2:i+1+L]
-          if t in (0x09, 0x08):
-            try: nm = p.decode("utf-8")
-            except: nm = bytes(p).decode("utf-8", "ignore")
-            break
-          i += 1 + L
-        if nm == self.target_name:
+        if self._link_state != _LINK_SCANNING or atype not in _ADV_CONNECTABLE:
+          return
+        found = self.peer_addr is not None and self.peer_addr[0] == at and self.peer_addr[1] == bytes(addr)
+        if not found:
+          # name AD types (complete / shortened), compared as bytes
+          i = 0; n = len(adv)
+          while i + 1 < n:
+            L = adv[i]
+            if L == 0: break
+            t = adv[i+1]
+            if t in (0x09, 0x08):
+              found = bytes(adv[i+2:i+1+L]) == self._target_name
+              break
+            i += 1 + L
+          if found:
+            self.peer_addr = (at, bytes(addr))
+            self.peer_addr_changed = True
+        if found:
+          # the connect is started on SCAN_DONE: the stack can't connect
+          # while still scanning
+          self._link_state = _LINK_CONNECTING
           self.ble.gap_scan(None)
-          self.ble.gap_connect(at, addr)
+
+      elif e == _IRQ_SCAN_DONE:
+        if self._link_state == _LINK_CONNECTING and self.conn is None:
+          self._connect(self.peer_addr[0], self.peer_addr[1], self.scan_ms)
+        elif self._link_state == _LINK_SCANNING:
+          # not found
+          self._link_retry()
 
       elif e == _IRQ_PERIPHERAL_CONNECT:
         self.conn, _, _ = d
+        self._link_state = _LINK_CONNECTED
+        self._retry_ms = _RETRY_MIN_MS
         self.ble.gattc_discover_services(self.conn)
 
       elif e == _IRQ_GATTC_SERVICE_RESULT:
@@ -501,8 +677,7 @@ class JbdBmsClient:
           s, e2 = self.srange
           self.ble.gattc_discover_characteristics(self.conn, s, e2)
         else:
-          self._reset_state()
-          self._scan(8000)
+          self._link_drop()
 
       elif e == _IRQ_GATTC_CHARACTERISTIC_RESULT:
         ch, _, val_h, props, uuid = d
@@ -518,8 +693,7 @@ class JbdBmsClient:
           self.ble.gattc_discover_descriptors(self.conn, self.h_n, self.h_n + 3)
           self._schedule_send(self.first_kick_ms)
         else:
-          self._reset_state()
-          self._scan(8000)
+          self._link_drop()
 
       elif e == _IRQ_GATTC_DESCRIPTOR_RESULT:
         ch, dh, duuid = d
@@ -542,8 +716,13 @@ class JbdBmsClient:
 
       elif e == _IRQ_PERIPHERAL_DISCONNECT:
         ch, _, _ = d
-        if ch == self.conn:
+        if ch == self.conn and self.conn is not None:
+          # link lost: try again soon (directly first)
           self._reset_state()
-          self._scan(8000)
+          self._last_was_direct = False
+          self._link_retry(_RETRY_MIN_MS)
+        elif self._link_state == _LINK_CONNECTING:
+          # connect attempt timed out
+          self._link_retry()
     except:
       pass
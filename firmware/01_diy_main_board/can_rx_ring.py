@@ -0,0 +1,134 @@
+# can_rx_ring.py — preallocated ring of received CAN frames (id, ticks_ms,
+# up to 8 data bytes), filled from the CAN driver RX queue and read by the
+# decoder. Nothing is allocated per frame (the driver's recv() tuple aside).
+#
+# One producer (drain(), from a micropython.schedule() callback or a task)
+# and one consumer (peek() / advance(), from a task): the producer only
+# moves head and the consumer only moves tail, so no lock is needed. A
+# scheduled callback runs between bytecodes of the task code, never the
+# other way round, so drain() skips when it preempted a drain in progress.
+
+from array import array
+
+from time import ticks_ms, ticks_diff
+
+# Frames read from the driver per drain() call
+_DRAIN_MAX = 32
+
+
+class CanRxRing:
+  """
+  Producer:
+      ring.drain(can)                 # driver RX queue -> ring
+  Consumer:
+      slot = ring.peek()              # -1 when empty
+      ring.ids[slot], ring.dlc[slot], ring.data (8 bytes at slot * 8)
+      ring.advance()                  # after decoding the slot
+  Counters: frames, overruns (ring full, frame dropped), high_water,
+  age_ms_last / age_ms_max (from drain to peek), driver_errors.
+  """
+
+  def __init__(self, size=64):
+    """
+    :param size: slots, a power of 2 (size - 1 frames are held)
+    """
+    if size & (size - 1):
+      raise ValueError("size must be a power of 2")
+    self._mask = size - 1
+    self.ids = array('L', [0] * size)
+    self.ticks = array('L', [0] * size)
+    self.dlc = bytearray(size)
+    self.data = bytearray(size * 8)
+    self._head = 0
+    self._tail = 0
+    self._draining = False
+
+    self.frames = 0
+    self.overruns = 0
+    self.high_water = 0
+    self.age_ms_last = 0
+    self.age_ms_max = 0
+    self.driver_errors = 0
+
+  def __len__(self):
+    return (self._head - self._tail) & self._mask
+
+  # ---------- producer ----------
+  def put(self, msg_id, data, now_ms):
+    """return: False when the ring is full (frame dropped)"""
+    head = self._head
+    nxt = (head + 1) & self._mask
+    if nxt == self._tail:
+      self.overruns += 1
+      return False
+    n = len(data)
+    if n > 8:
+      n = 8
+    self.ids[head] = msg_id
+    self.ticks[head] = now_ms
+    self.dlc[head] = n
+    buf = self.data
+    offset = head * 8
+    for i in range(n):
+      buf[offset + i] = data[i]
+    # publish the frame last
+    self._head = nxt
+    self.frames += 1
+    count = (nxt - self._tail) & self._mask
+    if count > self.high_water:
+      self.high_water = count
+    return True
+
+  def drain(self, can, max_frames=_DRAIN_MAX):
+    """
+    Move the frames waiting in the driver (recv() -> (id, ext, rtr, data)
+    or None) into the ring.
+    return: frames read
+    """
+    if self._draining:
+      # preempted a drain in progress: it reads the rest
+      return 0
+    self._draining = True
+    n = 0
+    try:
+      now = ticks_ms()
+      while n < max_frames:
+        try:
+          frame = can.recv()
+        except OSError:
+          break
+        except Exception:
+          self.driver_errors += 1
+          break
+        if not frame:
+          break
+        n += 1
+        data = frame[3]
+        if data:
+          self.put(frame[0], data, now)
+    finally:
+      self._draining = False
+    return n
+
+  # ---------- consumer ----------
+  def peek(self, now_ms=None):
+    """return: the oldest slot, -1 when empty"""
+    tail = self._tail
+    if tail == self._head:
+      return -1
+    if now_ms is None:
+      now_ms = ticks_ms()
+    age = ticks_diff(now_ms, self.ticks[tail])
+    self.age_ms_last = age
+    if age > self.age_ms_max:
+      self.age_ms_max = age
+    return tail
+
+  def advance(self):
+    """Release the slot returned by peek()"""
+    if self._tail != self._head:
+      self._tail = (self._tail + 1) & self._mask
+
+  def clear_stats(self):
+    self.high_water = len(self)
+    self.age_ms_max = 0
@@ -0,0 +1,199 @@
+# can_supervisor.py — CAN bus health: liveness of each VESC (receive time of
+# each status packet, in the MotorNodes columns), controller error
+# level (TX / RX error counters when the driver exposes them, consecutive
+# TX drops), bus-off recovery and bus load.
+#
+# Every node is watched; fault is set when a VESC driving a wheel sent no
+# STATUS_1 for
+# can_node_timeout_ms or the controller is bus-off, so the motors get zero
+# current at most can_node_timeout_ms + one update period after the last
+# frame. Bus-off is recovered by restarting the controller
+# (Motor.can_restart()), retried with a backoff doubling from
+# can_restart_backoff_min_ms to can_restart_backoff_max_ms until it
+# recovers.
+
+from array import array
+from time import ticks_ms, ticks_add, ticks_diff
+from motor import Motor, MotorData
+from motor_nodes import STATUS_1, NR_STATUS
+from can import CAN
+
+LEVEL_OK = 0
+LEVEL_WARNING = 1
+LEVEL_PASSIVE = 2
+LEVEL_BUS_OFF = 3
+_LEVEL_NAMES = ("ok", "warning", "passive", "bus-off")
+
+# CAN error counter thresholds (ISO 11898-1)
+_ERRORS_WARNING = 96
+_ERRORS_PASSIVE = 128
+_TX_ERRORS_BUS_OFF = 256
+# Driver state value for bus-off, when the driver has the constant
+_STATE_BUS_OFF = CAN.BUS_OFF if hasattr(CAN, "BUS_OFF") else None
+# Consecutive TX drops of a motor taken as bus-off with no VESC heard (for
+# drivers exposing neither state nor counters): ~0.2 s of the control loop
+_TX_FAIL_RUN_BUS_OFF = 32
+
+# Other status packets (temperatures, voltage, SoC) are stale after this
+# many node timeouts; reported only, the control does not depend on them
+_STALE_TIMEOUTS = 4
+
+_LOAD_WINDOW_MS = 1000
+# Extended data frame with 8 bytes: 128 bits + stuff bits, on average
+_FRAME_BITS = 140
+
+
+class CanSupervisor:
+  """
+  Every ~50 ms:
+      fault = supervisor.update()   # True: safe state (zero current)
+  State: level (LEVEL_*), rx_errors / tx_errors (-1 when not exposed),
+  alive_mask (bit per node slot), stale_masks (per slot, bit per status),
+  bus_load_permille. Counters: bus_off_count, restarts, node_timeouts
+  (per slot), faults.
+  """
+
+  def __init__(self, motors, cfg):
+    """
+    :param motors: the Motor of each VESC whose loss is a fault (the other
+      MotorData nodes are only watched)
+    """
+    self._motors = motors
+    n = MotorData.nodes.size
+    self._required_mask = 0
+    for motor in motors:
+      self._required_mask |= 1 << motor.data.slot
+    self._node_timeout_ms = int(cfg.can_node_timeout_ms)
+    self._backoff_min_ms = int(cfg.can_restart_backoff_min_ms)
+    self._backoff_max_ms = int(cfg.can_restart_backoff_max_ms)
+    self._print_ms = int(cfg.can_telemetry_print_ms)
+    self._baudrate = max(1, int(motors[0].data.cfg.can_baudrate))
+
+    now = ticks_ms()
+    self._backoff_ms = self._backoff_min_ms
+    self._restart_ms = now
+    self._load_ms = now
+    self._load_frames = self._frames()
+    self._print_next_ms = ticks_add(now, self._print_ms)
+
+    self.fault = True
+    self.level = LEVEL_OK
+    self.rx_errors = -1
+    self.tx_errors = -1
+    self.alive_mask = 0
+    self.stale_masks = bytearray(n)
+    self.bus_load_permille = 0
+
+    self.bus_off_count = 0
+    self.restarts = 0
+    self.node_timeouts = array('H', [0] * n)
+    self.faults = 0
+
+  def update(self, now_ms=None):
+    """return: fault"""
+    if now_ms is None:
+      now_ms = ticks_ms()
+    alive_mask = self._update_nodes(now_ms)
+    level = self._error_level(alive_mask)
+
+    if level == LEVEL_BUS_OFF:
+      if self.level != LEVEL_BUS_OFF:
+        self.bus_off_count += 1
+      if ticks_diff(now_ms, self._restart_ms) >= 0:
+        self._restart(now_ms)
+    elif (alive_mask & self._required_mask) == self._required_mask and level < LEVEL_PASSIVE:
+      # healthy again: next bus-off starts from the shortest backoff
+      self._backoff_ms = self._backoff_min_ms
+
+    fault = level == LEVEL_BUS_OFF or (alive_mask & self._required_mask) != self._required_mask
+    changed = fault != self.fault or level != self.level or alive_mask != self.alive_mask
+    if fault and not self.fault:
+      self.faults += 1
+    self.fault = fault
+    self.level = level
+    self.alive_mask = alive_mask
+
+    self._update_load(now_ms)
+    if changed:
+      print("CAN:", self.telemetry_text())
+    elif self._print_ms > 0 and ticks_diff(now_ms, self._print_next_ms) >= 0:
+      self._print_next_ms = ticks_add(now_ms, self._print_ms)
+      print("CAN:", self.telemetry_text())
+    return fault
+
+  def _update_nodes(self, now_ms):
+    alive_mask = 0
+    stale_ms = self._node_timeout_ms * _STALE_TIMEOUTS
+    nodes = MotorData.nodes
+    last = nodes.rx_last_ms
+    for slot in range(nodes.count):
+      seen = nodes.rx_seen_mask[slot]
+      base = slot * NR_STATUS
+      if seen & (1 << STATUS_1) and ticks_diff(now_ms, last[base + STATUS_1]) < self._node_timeout_ms:
+        alive_mask |= 1 << slot
+      elif self.alive_mask & (1 << slot):
+        self.node_timeouts[slot] += 1
+      stale = 0
+      for status in range(NR_STATUS):
+        if seen & (1 << status) and ticks_diff(now_ms, last[base + status]) >= stale_ms:
+          stale |= 1 << status
+      self.stale_masks[slot] = stale
+    return alive_mask
+
+  def _error_level(self, alive_mask):
+    state, rx_err, tx_err = self._motors[0].motor_get_can_state()
+    self.rx_errors = rx_err if rx_err is not None else -1
+    self.tx_errors = tx_err if tx_err is not None else -1
+
+    if _STATE_BUS_OFF is not None and state == _STATE_BUS_OFF:
+      return LEVEL_BUS_OFF
+    if self.tx_errors >= _TX_ERRORS_BUS_OFF:
+      return LEVEL_BUS_OFF
+    if alive_mask == 0:
+      for motor in self._motors:
+        if motor.tx_fail_run >= _TX_FAIL_RUN_BUS_OFF:
+          return LEVEL_BUS_OFF
+    errors = max(self.rx_errors, self.tx_errors)
+    if errors >= _ERRORS_PASSIVE:
+      return LEVEL_PASSIVE
+    if errors >= _ERRORS_WARNING:
+      return LEVEL_WARNING
+    return LEVEL_OK
+
+  def _restart(self, now_ms):
+    if Motor.can_restart():
+      self.restarts += 1
+    for motor in self._motors:
+      motor.tx_fail_run = 0
+    self._restart_ms = ticks_add(now_ms, self._backoff_ms)
+    self._backoff_ms = min(self._backoff_ms * 2, self._backoff_max_ms)
+
+  def _update_load(self, now_ms):
+    dt = ticks_diff(now_ms, self._load_ms)
+    if dt < _LOAD_WINDOW_MS:
+      return
+    frames = self._frames()
+    bits = (frames - self._load_frames) * _FRAME_BITS
+    self.bus_load_permille = bits * 1000000 // (self._baudrate * dt)
+    self._load_frames = frames
+    self._load_ms = now_ms
+
+  def _frames(self):
+    # frames received (the RX ring counts them all) and sent
+    frames = Motor._rx.frames if Motor._rx is not None else 0
+    for motor in self._motors:
+      frames += motor.tx_ok
+    return frames
+
+  def telemetry(self):
+    """return: (level, rx_errors, tx_errors, bus_load_permille, alive_mask,
+    bus_off_count, restarts, node_timeouts total, faults)"""
+    return (self.level, self.rx_errors, self.tx_errors, self.bus_load_permille, self.alive_mask,
+            self.bus_off_count, self.restarts, sum(self.node_timeouts), self.faults)
+
+  def telemetry_text(self):
+    return "{} fault={} alive={:b} stale={} err rx={} tx={} load={}.{}% bus_off={} restarts={} timeouts={} faults={}".format(
+      _LEVEL_NAMES[self.level], int(self.fault), self.alive_mask,
+      [hex(m) for m in self.stale_masks[:MotorData.nodes.count]], self.rx_errors, self.tx_errors,
+      self.bus_load_permille // 10, self.bus_load_permille % 10,
+      self.bus_off_count, self.restarts, list(self.node_timeouts[:MotorData.nodes.count]), self.faults)
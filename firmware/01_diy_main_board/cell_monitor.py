@@ -0,0 +1,150 @@
+# cell_monitor.py — BMS cell health: min/max/delta and the weakest cell
+# from the JBD per-cell voltages, running extremes since power on, and
+# protection event counters. Fixed size state, no allocations per update.
+#
+# The display gets a compact binary frame (common/bms_cells_frame.py) once
+# when something crossed a threshold, plus a slow keepalive. The display
+# decodes every queued message, so the frame is not lost to the main
+# message sent after it.
+
+import time
+from array import array
+from common import bms_cells_frame
+
+# JBD protection bits 0..11 (see bms_jbd._recognized_protections)
+NR_PROTECTIONS = 12
+
+_KEEPALIVE_MS = 30000
+# Imbalance warning clears this much below the threshold
+_IMBALANCE_HYSTERESIS_MV = 20
+
+
+class CellMonitor:
+  """
+  Per BMS reading (1 s):
+      cells.update(bms)
+      frame = cells.frame()       # bytearray to send, or None
+  """
+
+  def __init__(self, imbalance_warning_mv=100, change_mv=10):
+    """
+    :param int imbalance_warning_mv: max - min cell voltage for the warning
+    :param int change_mv: min / max / delta change that triggers a frame
+    """
+    self._imbalance_warning_mv = imbalance_warning_mv
+    self._change_mv = change_mv
+
+    self.cell_count = 0
+    self.min_mv = 0
+    self.max_mv = 0
+    self.delta_mv = 0
+    self.weakest_cell = 0          # 1 based, 0 when unknown
+    self.min_mv_seen = 0
+    self.max_mv_seen = 0
+    self.delta_max_mv = 0
+    self.protection_bits = 0
+    self.balance_mask = 0
+    self.protection_events = array('H', [0] * NR_PROTECTIONS)
+    self.protection_events_total = 0
+    self.imbalance_is_active = False
+
+    self._frame = bytearray(bms_cells_frame.FRAME_LEN)
+    self._sent_min_mv = 0
+    self._sent_max_mv = 0
+    self._sent_delta_mv = 0
+    self._sent_weakest_cell = 0
+    self._sent_flags = 0
+    self._sent_protection_bits = 0
+    self._changed = False
+    self._sent_ms = time.ticks_ms()
+
+  def _flags(self):
+    flags = 0
+    if self.imbalance_is_active:
+      flags |= bms_cells_frame.FLAG_IMBALANCE
+    if self.balance_mask:
+      flags |= bms_cells_frame.FLAG_BALANCING
+    if self.protection_bits:
+      flags |= bms_cells_frame.FLAG_PROTECTION
+    return flags
+
+  def update(self, bms):
+    # Protection events: count each bit going active
+    bits = bms.get_protection_bits()
+    rising = bits & ~self.protection_bits
+    if rising:
+      for i in range(NR_PROTECTIONS):
+        if rising & (1 << i):
+          self.protection_events[i] += 1
+          self.protection_events_total += 1
+    self.protection_bits = bits
+    self.balance_mask = bms.get_balance_mask()
+
+    cells = bms.get_cells_x1000()
+    if cells is not None and len(cells):
+      count = len(cells)
+      min_mv = 0xFFFF
+      max_mv = 0
+      weakest = 0
+      for i in range(count):
+        mv = cells[i]
+        if mv < min_mv:
+          min_mv = mv
+          weakest = i
+        if mv > max_mv:
+          max_mv = mv
+
+      self.cell_count = count
+      self.min_mv = min_mv
+      self.max_mv = max_mv
+      self.delta_mv = max_mv - min_mv
+      self.weakest_cell = weakest + 1
+      if self.min_mv_seen == 0 or min_mv < self.min_mv_seen:
+        self.min_mv_seen = min_mv
+      if max_mv > self.max_mv_seen:
+        self.max_mv_seen = max_mv
+      if self.delta_mv > self.delta_max_mv:
+        self.delta_max_mv = self.delta_mv
+
+      if self.delta_mv >= self._imbalance_warning_mv:
+        self.imbalance_is_active = True
+      elif self.delta_mv < self._imbalance_warning_mv - _IMBALANCE_HYSTERESIS_MV:
+        self.imbalance_is_active = False
+
+    # Threshold crossings since the last frame sent
+    change = self._change_mv
+    if abs(self.min_mv - self._sent_min_mv) >= change or \
+        abs(self.max_mv - self._sent_max_mv) >= change or \
+        abs(self.delta_mv - self._sent_delta_mv) >= change or \
+        self.weakest_cell != self._sent_weakest_cell or \
+        self._flags() != self._sent_flags or \
+        self.protection_bits != self._sent_protection_bits:
+      self._sent_min_mv = self.min_mv
+      self._sent_max_mv = self.max_mv
+      self._sent_delta_mv = self.delta_mv
+      self._sent_weakest_cell = self.weakest_cell
+      self._sent_flags = self._flags()
+      self._sent_protection_bits = self.protection_bits
+      self._changed = True
+
+  def frame(self, now_ms=None):
+    """return: the frame to send now (preallocated, reused), or None"""
+    if now_ms is None:
+      now_ms = time.ticks_ms()
+    if self._changed:
+      self._changed = False
+    elif self.cell_count == 0 or time.ticks_diff(now_ms, self._sent_ms) < _KEEPALIVE_MS:
+      return None
+    self._sent_ms = now_ms
+
+    return bms_cells_frame.pack_into(
+      self._frame,
+      self._sent_flags,
+      self.cell_count,
+      self._sent_weakest_cell,
+      self._sent_min_mv,
+      self._sent_max_mv,
+      self.delta_max_mv,
+      self._sent_protection_bits,
+      self.balance_mask,
+      self.protection_events_total)
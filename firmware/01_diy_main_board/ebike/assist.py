@@ -0,0 +1,223 @@
+from array import array
+
+# Pure Python (no board/canio imports) so it also runs on the host, see
+# tools/replay_torque_capture.py
+
+# ticks (supervisor.ticks_ms) wrap at 2**29
+_TICKS_MASK = (1 << 29) - 1
+
+# Ring buffer size for torque/cadence samples (power of 2)
+SAMPLES_SIZE = 64
+_SAMPLES_MASK = SAMPLES_SIZE - 1
+
+# Torque target uses the average of the last few samples only
+_TORQUE_FILTER_SAMPLES = 4
+
+# Number of entries in each assist level table, over the torque range
+_TABLE_SIZE = 64
+
+# Human power: P[W] = kg * 9.81 * crank[m] * cadence * 2*pi/60
+# P_x10 = torque_x10 * cadence * crank_mm * 0.0010273, done as
+# (torque_x10 * cadence * k) >> 10 with k = crank_mm * 0.0010273 * 1024
+_POWER_SHIFT = 10
+
+
+def ticks_diff(end, start):
+  return (end - start) & _TICKS_MASK
+
+
+def torque_raw_to_x10(torque_raw):
+  """Bafang torque sensor raw value to kgs x10"""
+  return ((torque_raw - 750) * 10) // 61
+
+
+class PedalSamples(object):
+  """Preallocated ring buffers with the torque sensor samples"""
+
+  def __init__(self, cadence_timeout_ms=1000):
+    self.torque_x10 = array('h', [0] * SAMPLES_SIZE)
+    self.cadence = array('B', [0] * SAMPLES_SIZE)
+    self.index = 0
+    self.count = 0
+    self.torque_sum_x10 = 0
+    self.cadence_sum = 0
+    self.last_ms = 0
+    self._cadence_timeout_ms = cadence_timeout_ms
+    self._cadence_previous = 0
+    self._cadence_previous_ms = 0
+
+  def push(self, torque_raw, cadence, now_ms):
+    """Store one torque sensor frame (raw torque and cadence)"""
+    torque_x10 = torque_raw_to_x10(torque_raw)
+    if torque_x10 < 0:
+      torque_x10 = 0
+
+    # Sensor sends cadence 0 between pedal pulses: keep the previous
+    # cadence until the timeout
+    if cadence > 0:
+      self._cadence_previous = cadence
+      self._cadence_previous_ms = now_ms
+    elif ticks_diff(now_ms, self._cadence_previous_ms) < self._cadence_timeout_ms:
+      cadence = self._cadence_previous
+    else:
+      self._cadence_previous = 0
+
+    i = self.index
+    # running sums: drop the oldest sample, add the new one
+    self.torque_sum_x10 += torque_x10 - self.torque_x10[i]
+    self.cadence_sum += cadence - self.cadence[i]
+    self.torque_x10[i] = torque_x10
+    self.cadence[i] = cadence
+    self.index = (i + 1) & _SAMPLES_MASK
+    if self.count < SAMPLES_SIZE:
+      self.count += 1
+    self.last_ms = now_ms
+
+  def clear(self):
+    for i in range(SAMPLES_SIZE):
+      self.torque_x10[i] = 0
+      self.cadence[i] = 0
+    self.count = 0
+    self.torque_sum_x10 = 0
+    self.cadence_sum = 0
+    self._cadence_previous = 0
+
+  def torque_recent_x10(self):
+    n = min(self.count, _TORQUE_FILTER_SAMPLES)
+    if n == 0:
+      return 0
+    total = 0
+    i = self.index
+    for _ in range(n):
+      i = (i - 1) & _SAMPLES_MASK
+      total += self.torque_x10[i]
+    return total // n
+
+  def cadence_recent(self):
+    if self.count == 0:
+      return 0
+    return self.cadence[(self.index - 1) & _SAMPLES_MASK]
+
+
+def build_level_tables(level_factors_x100, torque_min_x10, torque_max_x10, current_max_ma):
+  """
+  One table per assist level, _TABLE_SIZE entries each, mapping the torque
+  range [torque_min_x10, torque_max_x10] to motor current (mA), already
+  multiplied by the level factor and clamped to current_max_ma.
+  """
+  tables = []
+  for factor_x100 in level_factors_x100:
+    table = array('i', [0] * (_TABLE_SIZE + 1))
+    for i in range(_TABLE_SIZE + 1):
+      current_ma = (current_max_ma * i * factor_x100) // (_TABLE_SIZE * 100)
+      table[i] = min(current_ma, current_max_ma)
+    tables.append(table)
+  return tables
+
+
+class AssistEngine(object):
+  """
+  Torque sensor assist. tick() is called at a fixed period from the control
+  task and returns the motor current target (mA), independently of when the
+  torque sensor frames arrived.
+  """
+
+  def __init__(
+      self,
+      samples,
+      level_factors,
+      torque_min_x10,
+      torque_max_x10,
+      current_max_a,
+      current_min_start_a,
+      ramp_up_time,
+      ramp_down_time,
+      crank_length_mm,
+      period_ms=20,
+      sensor_timeout_ms=250):
+    """
+    :param PedalSamples samples: torque sensor samples
+    :param level_factors: assist factor per assist level (float)
+    :param int torque_min_x10: torque (kgs x10) needed to start assist
+    :param int torque_max_x10: torque (kgs x10) for max assist
+    :param float current_max_a: max motor current
+    :param float current_min_start_a: lower targets are set to 0
+    :param float ramp_up_time: seconds for each 1A when increasing
+    :param float ramp_down_time: seconds for each 1A when decreasing
+    :param int crank_length_mm: crank length, for human power
+    :param int period_ms: tick() period
+    :param int sensor_timeout_ms: no assist if no torque frames for this time
+    """
+    self._samples = samples
+    self._torque_min_x10 = torque_min_x10
+    self._torque_span_x10 = max(1, torque_max_x10 - torque_min_x10)
+    self.current_max_ma = int(current_max_a * 1000)
+    self._current_min_start_ma = int(current_min_start_a * 1000)
+    self._ramp_up_step_ma = max(1, int(period_ms / (ramp_up_time * 1000.0) * 1000))
+    self._ramp_down_step_ma = max(1, int(period_ms / (ramp_down_time * 1000.0) * 1000))
+    self._power_k = int(crank_length_mm * 0.0010273 * (1 << _POWER_SHIFT))
+    self._sensor_timeout_ms = sensor_timeout_ms
+    self._tables = build_level_tables(
+      [int(f * 100) for f in level_factors],
+      torque_min_x10,
+      torque_max_x10,
+      self.current_max_ma)
+
+    self.torque_x10 = 0
+    self.cadence = 0
+    self.human_power_x10 = 0
+    self.current_target_ma = 0
+
+  def _torque_to_current_ma(self, torque_x10, assist_level):
+    if torque_x10 < self._torque_min_x10:
+      return 0
+    tables = self._tables
+    table = tables[assist_level] if assist_level < len(tables) else tables[-1]
+    index = ((torque_x10 - self._torque_min_x10) * _TABLE_SIZE) // self._torque_span_x10
+    if index > _TABLE_SIZE:
+      index = _TABLE_SIZE
+    return table[index]
+
+  def tick(self, now_ms, assist_level, extra_target_ma=0, brakes_are_active=False):
+    """
+    :param int now_ms: ticks in ms
+    :param int assist_level: index on the level factors
+    :param int extra_target_ma: other current request (throttle); max wins
+    :param bool brakes_are_active: forces the target to 0
+    return: motor current target (mA)
+    """
+    samples = self._samples
+    if samples.count and ticks_diff(now_ms, samples.last_ms) > self._sensor_timeout_ms:
+      samples.clear()
+
+    self.torque_x10 = samples.torque_recent_x10()
+    self.cadence = samples.cadence_recent()
+
+    # Human power from the averages of the whole ring buffer
+    if samples.count:
+      torque_avg_x10 = samples.torque_sum_x10 // samples.count
+      cadence_avg = samples.cadence_sum // samples.count
+      self.human_power_x10 = (torque_avg_x10 * cadence_avg * self._power_k) >> _POWER_SHIFT
+    else:
+      self.human_power_x10 = 0
+
+    target_ma = self._torque_to_current_ma(self.torque_x10, assist_level)
+    if extra_target_ma > target_ma:
+      target_ma = extra_target_ma
+    if target_ma > self.current_max_ma:
+      target_ma = self.current_max_ma
+    if target_ma < self._current_min_start_ma:
+      target_ma = 0
+
+    if brakes_are_active:
+      self.current_target_ma = 0
+      return 0
+
+    # ramp towards the target, faster when going down
+    current_ma = self.current_target_ma
+    if target_ma > current_ma:
+      current_ma = min(target_ma, current_ma + self._ramp_up_step_ma)
+    elif target_ma < current_ma:
+      current_ma = max(target_ma, current_ma - self._ramp_down_step_ma)
+    self.current_target_ma = current_ma
+    return current_ma
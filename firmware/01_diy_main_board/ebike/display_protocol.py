@@ -0,0 +1,37 @@
+# display_protocol.py — display UART packets: the RX framer
+# (on common/framed_uart.py). Pure Python (no busio) so it also runs on the
+# host, see tools/bench_framed_uart.py
+
+from common.crc import crc16_modbus
+from common.framed_uart import FrameReceiver
+
+# this offset means the data bytes will never be lower than this value. And this value is then only used on the start bytes (may be on the CRC)
+DATA_PACK_OFFSET = 3
+
+# TX packet versions (this board to the display), told apart by the len byte.
+# Data bytes, each value + DATA_PACK_OFFSET, 16 bit ones little endian:
+#   version 1, len 15: battery voltage x100 (2), battery current x5 (1),
+#     motor power (2), VESC temperature x10 (2), motor temperature x10 (2),
+#     VESC fault code (1), brakes are active (1)
+#   version 2, len 17: version 1 + wheel speed km/h x10 (2)
+# Version 1 is the default: displays reading version 2 must accept len 17.
+TX_PROTOCOL_V1 = 1
+TX_PROTOCOL_V2 = 2
+
+
+class DisplayFramer(FrameReceiver):
+  """Display packets: start bytes 0, 1, 2 + len byte + data bytes + CRC 2 bytes,
+  where len counts the start bytes, len byte and data bytes (not the CRC)"""
+  START = b"\x00\x01\x02"
+  HEADER_LEN = 4
+
+  def frame_length(self, buf, i):
+    n = buf[i + 3]
+    return n + 2 if n > 4 else 0
+
+  def frame_ok(self, buf, i, total):
+    n = total - 2
+    return crc16_modbus(buf, i, i + n) == (buf[i + n] | (buf[i + n + 1] << 8))
+
+  def payload_span(self, buf, i, total):
+    return 4, total - 6
@@ -1,14 +1,13 @@
 import board
-import time
 import supervisor
-import array
-from common.utils import map_range
 import asyncio
 from . import ebike_data
 from . import throttle
 from . import brake
 from . import wheel_speed_sensor
 from . import torque_sensor
+from .assist import AssistEngine
+from common.thermal import ThermalDerating
 from . import motor_temperature_sensor
 from . import vesc
 from . import display
@@ -32,6 +31,19 @@ throttle_enable = False # should throttle be used?
 
 cranck_lenght_mm = 170
 
+wheel_circumference_mm = 2200 # 27.5 inch wheel
+wheel_speed_sensor_magnets = 1 # magnets (pulses) per wheel revolution
+
+# display UART packet version, see display_protocol.py: 2 adds the wheel speed,
+# only for a display that reads it
+display_protocol_version = 1
+
+# motor current derating: full current up to min temperature, linear down to 0 at max temperature
+vesc_min_temperature_x10 = 850
+vesc_max_temperature_x10 = 1000
+min_temperature_x10 = 1000 # motor
+max_temperature_x10 = 1200 # motor
+
 # debug options
 enable_print_ebike_data_to_terminal = False
 enable_debug_log_cvs = False
@@ -70,7 +82,9 @@ brake = brake.Brake(
   board.IO10) # brake sensor pin
 
 wheel_speed_sensor = wheel_speed_sensor.WheelSpeedSensor(
-  board.IO46) # wheel speed sensor pin
+  board.IO46, # wheel speed sensor pin
+  wheel_circumference_mm,
+  wheel_speed_sensor_magnets)
 
 torque_sensor = torque_sensor.TorqueSensor(
   board.IO4, # CAN tx pin
@@ -86,6 +100,27 @@ motor_temperature_sensor = motor_temperature_sensor.MotorTemperatureSensor(
 
 esp32 = esp32.ESP32()
 
+# control period of task_read_sensors_control_motor()
+motor_control_period_ms = 20
+
+assist = AssistEngine(
+  torque_sensor.samples,
+  assist_level_factor_table,
+  torque_sensor_weight_min_to_start_x10,
+  torque_sensor_weight_max_x10,
+  motor_max_current_limit,
+  motor_min_current_start,
+  ramp_up_time,
+  ramp_down_time,
+  cranck_lenght_mm,
+  period_ms = motor_control_period_ms)
+
+thermal_derating = ThermalDerating(
+  vesc_min_temperature_x10,
+  vesc_max_temperature_x10,
+  min_temperature_x10,
+  max_temperature_x10)
+
 ebike = ebike_data.EBike()
 vesc = vesc.Vesc(
   board.IO13, # UART TX pin tebike_app_datahat connect to VESC
@@ -95,7 +130,8 @@ vesc = vesc.Vesc(
 display = display.Display(
   board.IO12, # UART TX pin that connect to display UART RX pin
   board.IO11, # UART RX pin that connect to display UART TX pin
-  ebike)
+  ebike,
+  display_protocol_version)
 
 def check_brakes():
   """Check the brakes and if they are active, set the motor current to 0
@@ -124,25 +160,6 @@ def print_ebike_data_to_terminal():
   # print(f" {ebike.motor_current:2.1f} | {ebike.battery_current:2.1f} | {ebike.battery_voltage:2.1f} | {int(ebike.motor_power)}")
   print(f"{(esp32.temperature_x10 / 10.0):3.1f} | {(ebike.vesc_temperature_x10 / 10.0):3.1f} | {(motor_temperature_sensor.value_x10  / 10.0):3.1f}")
   
-def utils_step_towards(current_value, target_value, step):
-  """ Move current_value towards the target_value, by increasing / decreasing by step
-  """
-  value = current_value
-
-  if current_value < target_value:
-    if (current_value + step) < target_value:
-      value += step
-    else:
-      value = target_value
-  
-  elif current_value > target_value:
-    if (current_value - step) > target_value:
-      value -= step
-    else:
-      value = target_value
-
-  return value
-
 async def task_log_data():
   while True:
     # log data to local file system CSV file
@@ -190,7 +207,7 @@ async def task_vesc_heartbeat():
     # VESC heart beat must be sent more frequently than 1 second, otherwise the motor will stop
     vesc.send_heart_beat()
     
-    # ask for VESC latest data
+    # ask for VESC latest data, the reply is processed on task_vesc_process_data()
     vesc.refresh_data()
 
     # let's calculate here this:
@@ -203,131 +220,58 @@ async def task_vesc_heartbeat():
     # idle 500ms
     await asyncio.sleep(0.5)
 
+async def task_thermal():
+  while True:
+    # NTC sampling is slow and temperatures change slowly: 1 second is enough
+    ebike.motor_temperature_sensor_x10 = motor_temperature_sensor.sample()
+    thermal_derating.update(ebike.vesc_temperature_x10, ebike.motor_temperature_sensor_x10)
+    ebike.thermal_derating_permille = thermal_derating.permille
 
-# to keep time for a timeout count
-pedal_human_power__time = 0
-pedal_human_power__torque_weight_array_x10 = array.array('I', (0 for _ in range(255)))
-pedal_human_power__cadence_array = array.array('I', (0 for _ in range(255)))
-pedal_human_power__average_counter = 0
-pedal_human_power__temp_x10 = 0
-
-def calculate_human_pedal_power(torque_weight, cadence, cranck_lenght_mm):
-  global pedal_human_power__time
-  global pedal_human_power__torque_weight_array_x10
-  global pedal_human_power__cadence_array
-  global pedal_human_power__average_counter
-  global pedal_human_power__temp_x10
-
-    # store values for later average 
-  pedal_human_power__torque_weight_array_x10[pedal_human_power__average_counter] = torque_weight
-  pedal_human_power__cadence_array[pedal_human_power__average_counter] = cadence
-  pedal_human_power__average_counter += 1
-
-  # ever 1 second, calculate the pedal_human_power
-  now = time.monotonic()
-  if now > (pedal_human_power__time + 1.0):
-    pedal_human_power__time = now
-
-    counter = pedal_human_power__average_counter
-    sum_torque_weight_x10 = 0
-    sum_cadence = 0
-    while counter > 1:
-      counter -= 1
-      sum_torque_weight_x10 += pedal_human_power__torque_weight_array_x10[pedal_human_power__average_counter]
-      sum_cadence += pedal_human_power__cadence_array[pedal_human_power__average_counter]
-
-    if pedal_human_power__average_counter > 0:
-      torque_weight_average_x10 = (sum_torque_weight_x10 / pedal_human_power__average_counter)
-      cadence_average = (sum_cadence / pedal_human_power__average_counter)
-
-      # Force (Nm) = weight Kg * 9.81 * arm cranks lenght
-      force = torque_weight_average_x10 * 9.81 * (cranck_lenght_mm / 100.0)
+    # idle 1 second
+    await asyncio.sleep(1.0)
 
-      # pedal_human_power = torque * cadence * ((2 * pi) / 60) 
-      # ((2 * pi) / 60) = 0.10467
-      pedal_human_power__temp_x10 = int(force * cadence_average * 1.0467)
+async def task_vesc_process_data():
+  while True:
+    # process the VESC replies received so far, never waits for data
+    vesc.poll()
 
-    # need to reset this
-    pedal_human_power__average_counter = 0
+    # idle 10ms
+    await asyncio.sleep(0.01)
 
-  return pedal_human_power__temp_x10
 
-motor_current_target__torque_sensor = 0
 def motor_control():
-  ##########################################################################################
-  # Torque sensor input processing
-
-  # read the values from torque sensor
-  torque_weight_x10, cadence = torque_sensor.value
-  if torque_weight_x10 is not None:
-    # store values for later usage if needed
-    ebike.torque_weight_x10 = torque_weight_x10
-    ebike.cadence = cadence
-    # ebike.human_pedal_power = calculate_human_pedal_power(ebike.torque_weight_x10, ebike.cadence, cranck_lenght_mm)
-    
-    # map torque value to motor current
-    motor_current_target__torque_sensor = map_range(
-      torque_weight_x10,
-      torque_sensor_weight_min_to_start_x10, # min input
-      torque_sensor_weight_max_x10, # max input
-      0, # min output
-      motor_max_current_limit) # max output
-
-    # apply the assist level
-    assist_level_factor = assist_level_factor_table[ebike.assist_level]
-    motor_current_target__torque_sensor *= assist_level_factor
-  ##########################################################################################
-
-  ##########################################################################################
-  # Throttle
+  # move the torque sensor frames received since last cycle to the ring buffers
+  torque_sensor.poll()
+
+  # process the wheel speed sensor pulses since last cycle
+  ebike.wheel_speed_x10 = wheel_speed_sensor.poll()
 
   # map throttle value to motor current
-  motor_current_target__throttle = 0
+  motor_current_target_ma__throttle = 0
   if throttle_enable == True:
-    # map torque value to motor current
-    motor_current_target__throttle = map_range(
-      throttle.value,
-      0, # min input
-      1000, # max input
-      0, # min output
-      motor_max_current_limit) # max output
-  ##########################################################################################
-
-  # use the max value from either torque sensor or throttle
-  motor_current_target = max(motor_current_target__torque_sensor, motor_current_target__throttle)
-
-  # save motor temperature sensor for later usage
-  ebike.motor_temperature_sensor_x10 = motor_temperature_sensor.value_x10
-
-  # impose a min motor current value, as to much lower value will make the motor vibrate and not run (??)
-  if motor_current_target < motor_min_current_start:
-    motor_current_target = 0
-
-  # apply ramp up / down factor: faster when ramp down
-  if motor_current_target > ebike.motor_current_target:
-    ramp_time = ramp_up_time
-  else:
-    ramp_time = ramp_down_time
-    
-  time_now = time.monotonic_ns()
-  ramp_step = (time_now - ebike.ramp_last_time) / (ramp_time * 1000000000)
-  ebike.ramp_last_time = time_now
-  ebike.motor_current_target = utils_step_towards(ebike.motor_current_target, motor_current_target, ramp_step)
+    throttle_value = max(0, min(1000, int(throttle.value)))
+    motor_current_target_ma__throttle = (throttle_value * assist.current_max_ma) // 1000
 
-  # let's limit the value
-  if ebike.motor_current_target > motor_max_current_limit:
-    ebike.motor_current_target = motor_max_current_limit
+  # torque sensor assist, with ramp up / down, at the fixed control period
+  motor_current_target_ma = assist.tick(
+    supervisor.ticks_ms(),
+    ebike.assist_level,
+    motor_current_target_ma__throttle,
+    ebike.brakes_are_active)
 
-  if ebike.motor_current_target < 0.0:
-    ebike.motor_current_target = 0
+  # reduce the current when the VESC or motor are hot (factor updated by task_thermal)
+  motor_current_target_ma = thermal_derating.scale_ma(motor_current_target_ma)
 
-  # if brakes are active, reset motor_current_target
-  if ebike.brakes_are_active == True:
-    ebike.motor_current_target = 0
+  # store values for later usage if needed
+  ebike.torque_weight_x10 = assist.torque_x10
+  ebike.cadence = assist.cadence
+  ebike.pedal_human_power = assist.human_power_x10
+
+  ebike.motor_current_target = motor_current_target_ma / 1000.0
 
   # let's update the motor current, only if the target value changed
-  if ebike.motor_current_target != ebike.previous_motor_current_target:
-    ebike.previous_motor_current_target = ebike.motor_current_target
+  if motor_current_target_ma != ebike.previous_motor_current_target:
+    ebike.previous_motor_current_target = motor_current_target_ma
     vesc.set_motor_current_amps(ebike.motor_current_target)
 
 async def task_read_sensors_control_motor():
@@ -338,14 +282,16 @@ async def task_read_sensors_control_motor():
     # motor control
     motor_control()
 
-    # idle 20ms
-    await asyncio.sleep(0.02)
+    # fixed period: the motor current target does not depend on CAN frames timing
+    await asyncio.sleep(motor_control_period_ms / 1000.0)
 
 async def main():
 
   print("starting")
 
   vesc_heartbeat_task = asyncio.create_task(task_vesc_heartbeat())
+  vesc_process_data_task = asyncio.create_task(task_vesc_process_data())
+  thermal_task = asyncio.create_task(task_thermal())
   read_sensors_control_motor_task = asyncio.create_task(task_read_sensors_control_motor())
   display_process_data_task = asyncio.create_task(task_display_process_data())
   display_send_data_task = asyncio.create_task(task_display_send_data())
@@ -354,6 +300,8 @@ async def main():
   if enable_debug_log_cvs == False:
     await asyncio.gather(
       vesc_heartbeat_task,
+      vesc_process_data_task,
+      thermal_task,
       read_sensors_control_motor_task,
       display_process_data_task,
       display_send_data_task)
@@ -361,6 +309,8 @@ async def main():
     log_data_task = asyncio.create_task(task_log_data())
     await asyncio.gather(
       vesc_heartbeat_task,
+      vesc_process_data_task,
+      thermal_task,
       read_sensors_control_motor_task,
       display_process_data_task,
       display_send_data_task,
@@ -1,21 +1,40 @@
-import adafruit_thermistor
+import analogio
+from common.thermal import build_ntc_table, adc_to_temperature_x10
 
 class MotorTemperatureSensor(object):
-  def __init__(self, motor_temperature_sensor_pin):
+  def __init__(self, motor_temperature_sensor_pin, oversampling = 8):
+    """Motor temperature sensor (NTC)
+    :param ~microcontroller.Pin motor_temperature_sensor_pin: ADC pin
+    :param int oversampling: ADC reads averaged on each sample()
+    """
+    self._adc = analogio.AnalogIn(motor_temperature_sensor_pin)
+    self._oversampling = oversampling
 
     resistor = 1000
     resistance = 1000
     nominal_temp = 10
     b_coefficient = 3800
 
-    self._thermistor = adafruit_thermistor.Thermistor(
-      motor_temperature_sensor_pin,
+    # the Steinhart/B-coefficient math is done once here, for the whole ADC range
+    self._table = build_ntc_table(
       resistor,
       resistance,
       nominal_temp,
       b_coefficient,
       high_side = True)
 
+    self._value_x10 = 0
+
+  def sample(self):
+    """Read the ADC and update the cached temperature. Call at a low rate."""
+    adc = self._adc
+    total = 0
+    for _ in range(self._oversampling):
+      total += adc.value
+    self._value_x10 = adc_to_temperature_x10(self._table, total // self._oversampling)
+    return self._value_x10
+
   @property
   def value_x10(self):
-    return int(self._thermistor.temperature * 10)
+    """Last sampled temperature x10, no ADC read"""
+    return self._value_x10
@@ -1,6 +1,6 @@
 import canio
-import time
-import struct
+import supervisor
+from .assist import PedalSamples
 
 class TorqueSensor(object):
 
@@ -12,107 +12,46 @@ class TorqueSensor(object):
     """
 
     self._can_bus = canio.CAN(can_tx_pin, can_rx_pin, baudrate = 250000)
-    self._cadence_timeout = cadence_timeout
-    self._cadence_previous_time = 0
-    self._cadence_previous = 0
-    self._cadence = 0
-    self._torque_weight = 0
+    # keep one listener open: frames queue up between poll() calls
+    self._listener = self._can_bus.listen(timeout=0)
+    self.samples = PedalSamples(int(cadence_timeout * 1000))
+    self.frames_count = 0
+
+  def poll(self, max_frames = 16):
+    """Move the received torque sensor frames to the samples ring buffer
+    :param int max_frames: max frames to process on this call
+    return: number of frames processed
+    """
+    listener = self._listener
+    samples = self.samples
+    count = 0
+    while count < max_frames and listener.in_waiting():
+      msg = listener.receive()
+      data = msg.data
+      # 2 bytes torque (little endian), 1 byte cadence
+      samples.push(data[0] | (data[1] << 8), data[2], supervisor.ticks_ms())
+      count += 1
+
+    self.frames_count += count
+    return count
 
   @property
   def value_raw(self):
     """Torque sensor raw values
     return: torque, cadence and progressive_byte
     """
-    with self._can_bus.listen(timeout=1.0) as listener:
-      if listener.in_waiting():
-        msg = listener.receive()
-
-        # unpack values from the byte array
-        torque = struct.unpack_from('<H', msg.data, 0) # 2 bytes: torque value
-        cadence = struct.unpack_from('<B', msg.data, 2) # 1 byte: cadence value
-        progressive_byte = msg.data[3] # last byte should be a value that increases on each package
+    listener = self._listener
+    if listener.in_waiting():
+      data = listener.receive().data
+      # last byte should be a value that increases on each package
+      return data[0] | (data[1] << 8), data[2], data[3]
+    else:
+      return None, None, None
 
-        return torque[0], cadence[0], progressive_byte
-      else:
-        return None, None, None
-      
   @property
   def value(self):
-    """Torque sensor weight value and cadence
-    return: torque weight and cadence
+    """Torque sensor weight value and cadence, from the latest samples
+    return: torque weight x10 and cadence
     """
-    with self._can_bus.listen(timeout=1.0) as listener:
-      
-      msg = bytearray()
-      cadence = None
-      torque = None
-      now = time.monotonic()
-      counter = 0
-
-      while True:
-        if listener.in_waiting():
-          msg = listener.receive()
-
-          cadence = msg.data[2]
-          if cadence > 0:
-            # we got a new cadence value
-            self._cadence_previous_time = now
-            self._cadence_previous = cadence
-
-            torque_x10 = (msg.data[1] * 256) + msg.data[0]
-            torque_x10 = int((torque_x10 - 750) / 6.1) # convert to kgs
-
-            # ignore previous messages, just clean them
-            while listener.in_waiting():
-              listener.receive()
-
-            return torque_x10, cadence
-          
-          else:
-            # cadence is 0
-                      
-            counter += 1
-            # check if previous 5 messages are always 0, if so, stop here
-            if counter > 5:
-              # check for cadence timeout
-              timeout = True if now > (self._cadence_previous_time + self._cadence_timeout) else False
-              if timeout:
-                self._cadence_previous = 0
-                self._cadence_previous_time = now
-              else:
-                # keep cadence with previous value
-                cadence = self._cadence_previous
-
-              torque_x10 = (msg.data[1] * 256) + msg.data[0]
-              torque_x10 = int((torque_x10 - 750) / 6.1) # convert to kgs
-              
-              # ignore previous messages, just clean them
-              while listener.in_waiting():
-                listener.receive()
-
-              return torque_x10, cadence
-                          
-        else:
-        # check for cadence timeout
-          timeout = True if now > (self._cadence_previous_time + self._cadence_timeout) else False
-          if cadence == 0:
-            # we got cadence = 0
-            if timeout:
-              self._cadence_previous = 0
-              self._cadence_previous_time = now
-            else:
-              # keep cadence with previous value
-              cadence = self._cadence_previous
-
-            torque_x10 = (msg.data[1] * 256) + msg.data[0]
-            torque_x10 = int((torque_x10 - 750) / 6.1) # convert to kgs
-
-          else:
-            # we got no new values from torque sensor
-            if timeout:
-              self._cadence_previous = 0
-              self._cadence_previous_time = now
-            else:
-              cadence = self._cadence_previous
-
-          return torque_x10, cadence
+    samples = self.samples
+    return samples.torque_recent_x10(), samples.cadence_recent()
@@ -0,0 +1,79 @@
+# vesc_protocol.py — VESC UART packets: preallocated TX packets and the
+# RX framer (on common/framed_uart.py). Pure Python (no busio) so it also runs
+# on the host, see tools/vesc_stand_in.py
+
+import struct
+from common.crc import crc16_ccitt
+from common.framed_uart import FrameReceiver
+
+COMM_GET_VALUES = 4
+COMM_SET_CURRENT = 6
+COMM_SET_CURRENT_BRAKE = 7
+COMM_SET_RPM = 8
+COMM_ALIVE = 30
+
+# VESC PACKET_MAX_PL_LEN
+PACKET_MAX_PL_LEN = 512
+
+_START = 2
+_END = 3
+
+
+class TxPacket(object):
+  """Preallocated TX packet for one command with a fixed payload size"""
+
+  def __init__(self, command, payload_len=1):
+    """
+    :param int command: COMM_* id
+    :param int payload_len: payload size, including the command byte
+    """
+    self._payload_len = payload_len
+    self.buf = bytearray(payload_len + 5)
+    self.buf[0] = _START
+    self.buf[1] = payload_len
+    self.buf[2] = command
+    self.buf[-1] = _END
+    self._value = 0
+    self.update_crc()
+
+  def update_crc(self):
+    n = self._payload_len
+    crc = crc16_ccitt(self.buf, 2, 2 + n)
+    self.buf[2 + n] = crc >> 8
+    self.buf[3 + n] = crc & 0xFF
+
+  def set_int32(self, value):
+    """Set the int32 argument following the command byte; the packet and its
+    CRC are left as they are when the value did not change"""
+    value = int(value)
+    if value == self._value:
+      return
+    self._value = value
+    struct.pack_into('>l', self.buf, 3, value)
+    self.update_crc()
+
+
+class RxFramer(FrameReceiver):
+  """
+  Incremental framer for VESC short packets (start byte 0x02, 1 byte length,
+  payload, CRC-16, end byte 0x03). Long packets (start byte 0x03) are only
+  used for payloads over 255 bytes, which this client never requests.
+  """
+  START = b"\x02"
+  HEADER_LEN = 2
+
+  def __init__(self, size=1024):
+    super().__init__(size)
+
+  def frame_length(self, buf, i):
+    n = buf[i + 1]
+    return n + 5 if n else 0
+
+  def frame_ok(self, buf, i, total):
+    end = i + total
+    if buf[end - 1] != _END:
+      return False
+    return crc16_ccitt(buf, i + 2, end - 3) == ((buf[end - 3] << 8) | buf[end - 2])
+
+  def payload_span(self, buf, i, total):
+    return 2, total - 5
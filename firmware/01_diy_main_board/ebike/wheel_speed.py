@@ -0,0 +1,98 @@
+from array import array
+
+# Pure Python (no board imports): wheel speed from timestamped sensor pulses.
+# Fed by WheelSpeedSensor on the board, or by synthetic pulse trains on the host.
+
+# supervisor.ticks_ms() wraps at 2**29
+_TICKS_MASK = (1 << 29) - 1
+
+# Pulse timestamps ring buffer size (power of 2)
+_PULSES_SIZE = 8
+_PULSES_MASK = _PULSES_SIZE - 1
+
+
+def _ticks_diff(end, start):
+  return (end - start) & _TICKS_MASK
+
+
+class WheelSpeed(object):
+  """
+  add_pulse() with each pulse timestamp (ms), update() periodically; the
+  result is kept in speed_x10 (km/h x10), so reading it is O(1).
+  """
+
+  def __init__(self, wheel_circumference_mm=2100, magnets=1, timeout_ms=3000, max_speed_kmh=99):
+    """
+    :param int wheel_circumference_mm: wheel perimeter
+    :param int magnets: magnets (pulses) per wheel revolution
+    :param int timeout_ms: speed goes to 0 with no pulses for this time
+    :param int max_speed_kmh: pulses faster than this are taken as switch bounce
+    """
+    magnets = max(1, magnets)
+    # speed_x10 = _k // period_ms, km/h x10 = mm/ms * 36
+    self._k = (wheel_circumference_mm * 36) // magnets
+    self._timeout_ms = timeout_ms
+    self._min_period_ms = max(1, self._k // (max_speed_kmh * 10))
+
+    self._pulses = array('L', [0] * _PULSES_SIZE)
+    self._index = 0
+    self._count = 0
+    self._period_ms = 0
+
+    self.pulses_total = 0
+    self.pulses_rejected = 0
+    self.speed_x10 = 0
+
+  def add_pulse(self, timestamp_ms):
+    if self._count:
+      last = self._pulses[(self._index - 1) & _PULSES_MASK]
+      if _ticks_diff(timestamp_ms, last) < self._min_period_ms:
+        self.pulses_rejected += 1
+        return
+
+    self._pulses[self._index] = timestamp_ms
+    self._index = (self._index + 1) & _PULSES_MASK
+    if self._count < _PULSES_SIZE:
+      self._count += 1
+    self.pulses_total += 1
+
+    # median of the last 3 periods (needs 4 pulses), else the last period
+    if self._count >= 2:
+      i = self._index
+      t0 = self._pulses[(i - 1) & _PULSES_MASK]
+      t1 = self._pulses[(i - 2) & _PULSES_MASK]
+      a = _ticks_diff(t0, t1)
+      if self._count >= 4:
+        t2 = self._pulses[(i - 3) & _PULSES_MASK]
+        t3 = self._pulses[(i - 4) & _PULSES_MASK]
+        b = _ticks_diff(t1, t2)
+        c = _ticks_diff(t2, t3)
+        if a > b:
+          a, b = b, a
+        if b > c:
+          b = c
+        a = a if a > b else b
+      self._period_ms = a
+
+  def update(self, now_ms):
+    """Refresh speed_x10 for the current time"""
+    if self._count < 2:
+      self.speed_x10 = 0
+      return self.speed_x10
+
+    last = self._pulses[(self._index - 1) & _PULSES_MASK]
+    elapsed_ms = _ticks_diff(now_ms, last)
+    if elapsed_ms >= self._timeout_ms:
+      # stopped: start over, the next first pulse has no period
+      self._count = 0
+      self._period_ms = 0
+      self.speed_x10 = 0
+      return 0
+
+    # while slowing down, no pulse yet after a full period: the speed is at
+    # most what the elapsed time since the last pulse gives
+    period_ms = self._period_ms
+    if elapsed_ms > period_ms:
+      period_ms = elapsed_ms
+    self.speed_x10 = self._k // period_ms
+    return self.speed_x10
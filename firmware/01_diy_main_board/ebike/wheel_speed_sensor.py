@@ -1,16 +1,42 @@
-import digitalio
+import keypad
+import supervisor
+from .wheel_speed import WheelSpeed
 
 class WheelSpeedSensor(object):
   """Wheel speed sensor"""
-  def __init__(self, pin):
+  def __init__(self, pin, wheel_circumference_mm = 2100, magnets = 1, timeout_ms = 3000):
     """Wheel speed sensor
     :param ~microcontroller.Pin pin: IO pin used to read wheel speed sensor
+    :param int wheel_circumference_mm: wheel perimeter
+    :param int magnets: magnets (pulses) per wheel revolution
+    :param int timeout_ms: speed goes to 0 with no pulses for this time
     """
-    # configure IO input
-    self._wheel_speed = digitalio.DigitalInOut(pin)
-    self._wheel_speed.pull = digitalio.Pull.UP
-    self._wheel_speed.direction = digitalio.Direction.INPUT
+    # keypad scans the pin in the background every 1ms and queues the edges
+    # with their timestamp, so no pulse is lost between poll() calls
+    self._keys = keypad.Keys(
+      (pin,),
+      value_when_pressed = False,
+      pull = True,
+      interval = 0.001,
+      max_events = 16)
+    self._event = keypad.Event()
+    self._wheel_speed = WheelSpeed(wheel_circumference_mm, magnets, timeout_ms)
+
+  def poll(self):
+    """Process the queued pulses and refresh the speed. Call periodically."""
+    events = self._keys.events
+    event = self._event
+    while events.get_into(event):
+      if event.pressed:
+        self._wheel_speed.add_pulse(event.timestamp)
+
+    if events.overflowed:
+      events.overflowed = False
+
+    return self._wheel_speed.update(supervisor.ticks_ms())
 
   @property
-  def value(self):
-    return not self._wheel_speed.value
+  def speed_x10(self):
+    """Last wheel speed in km/h x10, as of the last poll()"""
+    return self._wheel_speed.speed_x10
+
@@ -1,19 +1,27 @@
 import time
 import gc
 import uasyncio as asyncio
+from array import array
 
 import common.config_runtime as cfg
 
 from machine import WDT
 from vars import Vars
 from motor import MotorData, Motor
+from can_supervisor import CanSupervisor
+from motor_limits import MotorLimits
+from traction_control import TractionControl
+from trip_computer import TripComputer
+from soc_estimator import SocEstimator
+from common.thermal import ThermalDerating
 from brake import Brake
 from throttle import Throttle
-from common.utils import map_range
 from common.espnow import espnow_init, ESPNowComms
-from common.espnow_commands import COMMAND_ID_DISPLAY_1, COMMAND_ID_LIGHTS_1
+from common.espnow_commands import COMMAND_ID_DISPLAY_1, COMMAND_ID_DISPLAY_TRIP_1, COMMAND_ID_LIGHTS_1
 from common.lights_bits import REAR_BRAKE_BIT
+from common import motor_nodes_frame
 from mode import Mode
+from common.settings_store import SettingsStore, EspNvsBackend, MemoryBackend, KEYS, carry_over_i32
 
 TEMPERATURE_NOT_AVAILABLE_X10 = -2550
 
@@ -68,38 +76,85 @@ def decode_display_message(msg):
     return parts
   return None
 
-def encode_display_message(vars, rear_motor_data, front_motor_data=None):
+def encode_display_message(vars, nodes):
   brakes_are_active = 1 if vars.brakes_are_active else 0
   regen_braking_is_active = 1 if vars.regen_braking_is_active else 0
   battery_is_charging = 1 if vars.battery_is_charging else 0
   cruise_control_is_active = 1 if vars.cruise_control.state == 2 else 0
+  traction_control_is_active = 1 if vars.traction_control_is_active else 0
 
   if not cfg.has_jbd_bms:
     battery_is_charging = 0
 
-  motor_datas_local = [rear_motor_data]
-  if front_motor_data is not None:
-    motor_datas_local.append(front_motor_data)
-
-  battery_current_x10 = sum(int(m.battery_current_x10) for m in motor_datas_local)
-  motor_current_x10 = sum(int(m.motor_current_x10) for m in motor_datas_local)
-  front_vesc_temperature_x10 = int(front_motor_data.vesc_temperature_x10) if front_motor_data is not None else TEMPERATURE_NOT_AVAILABLE_X10
-  front_motor_temperature_x10 = int(front_motor_data.motor_temperature_x10) if front_motor_data is not None else TEMPERATURE_NOT_AVAILABLE_X10
+  # Columns of every VESC node (slot 0 is the rear motor): currents are
+  # summed, the front temperatures are the hottest of the other motors
+  battery_current_x10 = 0
+  motor_current_x10 = 0
+  front_vesc_temperature_x10 = TEMPERATURE_NOT_AVAILABLE_X10
+  front_motor_temperature_x10 = TEMPERATURE_NOT_AVAILABLE_X10
+  for slot in range(nodes.count):
+    battery_current_x10 += nodes.battery_current_x10[slot]
+    motor_current_x10 += nodes.motor_current_x10[slot]
+    if slot > 0 and node_drives_wheel[slot]:
+      front_vesc_temperature_x10 = max(front_vesc_temperature_x10, nodes.vesc_temperature_x10[slot])
+      front_motor_temperature_x10 = max(front_motor_temperature_x10, nodes.motor_temperature_x10[slot])
+
+  # JBD BMS current, positive while charging: the charger current only goes
+  # through the BMS (charging screen power, Ah, Wh and time to full)
+  bms_battery_current_x10 = 0
+  if cfg.has_jbd_bms and vars.bms_battery_current_x100 is not None:
+    bms_battery_current_x10 = (vars.bms_battery_current_x100 + 5) // 10
+
+  if soc_estimator.enabled:
+    battery_soc_x1000 = soc_estimator.soc_x1000
+  else:
+    battery_soc_x1000 = nodes.battery_soc_x1000[0]
 
   flags = ((brakes_are_active & 1) << 0) | \
           ((regen_braking_is_active & 1) << 1) | \
           ((battery_is_charging & 1) << 2) | \
           ((vars.mode & 7) << 3) | \
-          ((cruise_control_is_active & 1) << 6)
+          ((cruise_control_is_active & 1) << 6) | \
+          ((traction_control_is_active & 1) << 7)
 
   return (
-    f"{COMMAND_ID_DISPLAY_1} {int(rear_motor_data.battery_voltage_x10)} "
-    f"{battery_current_x10} {int(rear_motor_data.battery_soc_x1000)} "
-    f"{motor_current_x10} {int(rear_motor_data.wheel_speed * 10)} {int(flags)} "
-    f"{int(rear_motor_data.vesc_temperature_x10)} {front_vesc_temperature_x10} "
-    f"{int(rear_motor_data.motor_temperature_x10)} {front_motor_temperature_x10}"
+    f"{COMMAND_ID_DISPLAY_1} {nodes.battery_voltage_x10[0]} "
+    f"{battery_current_x10} {int(battery_soc_x1000)} "
+    f"{motor_current_x10} {rear_motor_data.wheel_speed_x10} {int(flags)} "
+    f"{nodes.vesc_temperature_x10[0]} {front_vesc_temperature_x10} "
+    f"{nodes.motor_temperature_x10[0]} {front_motor_temperature_x10} "
+    f"{bms_battery_current_x10}"
   ).encode("ascii")
 
+def encode_display_trip_message(trip, soc):
+  return (
+    f"{COMMAND_ID_DISPLAY_TRIP_1} {trip.odometer_m} {trip.trip_m} "
+    f"{trip.wh_consumed_x10} {trip.wh_regen_x10} {trip.wh_per_km_x10} "
+    f"{trip.avg_speed_x10} {soc.range_m if soc.enabled else -1}"
+  ).encode("ascii")
+
+def encode_display_cells_message(frame):
+  # already packed by CellMonitor (binary, see common/bms_cells_frame.py)
+  return frame
+
+def encode_display_nodes_message(nodes):
+  # per node telemetry (binary, see common/motor_nodes_frame.py)
+  alive_mask = can_supervisor.alive_mask
+  for slot in range(nodes.count):
+    flags = motor_nodes_frame.FLAG_ALIVE if alive_mask & (1 << slot) else 0
+    if node_drives_wheel[slot]:
+      flags |= motor_nodes_frame.FLAG_DRIVES_WHEEL
+    _node_flags[slot] = flags
+  # traction control counts per motor, the frame per node
+  for i, _motor_data in enumerate(motor_data):
+    if traction_control.active_mask & (1 << i):
+      _node_flags[_motor_data.slot] |= motor_nodes_frame.FLAG_TRACTION_LIMITED
+    _node_slip_events[_motor_data.slot] = traction_control.slip_events[i]
+  return motor_nodes_frame.pack_into(
+    _nodes_frame, nodes.count, nodes.can_ids, _node_flags,
+    nodes.vesc_temperature_x10, nodes.motor_temperature_x10,
+    nodes.motor_current_x10, nodes.battery_current_x10, _node_slip_events)
+
 def encode_lights_message(mask, state):
   return (
     f"{COMMAND_ID_LIGHTS_1} {int(mask)} {int(state)}"
@@ -112,44 +167,82 @@ display_comms = ESPNowComms(
   encoder=encode_display_message,
 )
 
+display_trip_comms = ESPNowComms(
+  esp,
+  bytes(cfg.mac_address_display),
+  encoder=encode_display_trip_message,
+)
+
+display_cells_comms = ESPNowComms(
+  esp,
+  bytes(cfg.mac_address_display),
+  encoder=encode_display_cells_message,
+)
+
+display_nodes_comms = ESPNowComms(
+  esp,
+  bytes(cfg.mac_address_display),
+  encoder=encode_display_nodes_message,
+)
+
 lights_tx_comms = ESPNowComms(
   esp,
   bytes(cfg.mac_address_lights),
   encoder=encode_lights_message)
 
-motor_cfgs = [cfg.rear_motor_cfg]
+# VESC nodes, one MotorData slot each: rear motor first, front motor, then
+# motor_3_cfg, motor_4_cfg, ... Nodes that drive no wheel (accessories) are
+# decoded and supervised only.
+node_cfgs = [cfg.rear_motor_cfg]
 if cfg.front_motor_cfg is not None:
-  motor_cfgs.append(cfg.front_motor_cfg)
-
-motor_data = [MotorData(c) for c in motor_cfgs]
+  node_cfgs.append(cfg.front_motor_cfg)
+_n = 3
+while hasattr(cfg, f"motor_{_n}_cfg"):
+  node_cfgs.append(getattr(cfg, f"motor_{_n}_cfg"))
+  _n += 1
+
+node_data = [MotorData(c) for c in node_cfgs]
+node_drives_wheel = bytearray(1 if c.drives_wheel else 0 for c in node_cfgs)
+motor_nodes = MotorData.nodes
+
+motor_cfgs = [c for c in node_cfgs if c.drives_wheel]
+motor_data = [d for d in node_data if d.cfg.drives_wheel]
 motors = [Motor(d) for d in motor_data]
+motor_limits = [MotorLimits(c) for c in motor_cfgs]
+traction_control = TractionControl(motor_cfgs, cfg)
+thermal_deratings = [ThermalDerating.from_motor_cfg(c) for c in motor_cfgs]
+can_supervisor = CanSupervisor(motors, cfg)
 
 rear_motor_data = motor_data[0]
 rear_motor = motors[0]
-front_motor_data = motor_data[1] if len(motor_data) > 1 else None
-front_motor = motors[1] if len(motors) > 1 else None
+
+_nodes_frame = bytearray(motor_nodes_frame.frame_len(motor_nodes.count))
+_node_flags = bytearray(motor_nodes.count)
+_node_slip_events = array('H', [0] * motor_nodes.count)
 
 # Init targets from configuration
 for _motor_data in motor_data:
-  _motor_data.motor_target_current_limit_max = _motor_data.cfg.motor_max_current_limit_max
-  _motor_data.motor_target_current_limit_min = _motor_data.cfg.motor_max_current_limit_min
-  _motor_data.battery_target_current_limit_max = _motor_data.cfg.battery_max_current_limit_max
-  _motor_data.battery_target_current_limit_min = _motor_data.cfg.battery_max_current_limit_min
+  _motor_data.motor_target_current_limit_max_ma = int(_motor_data.cfg.motor_max_current_limit_max * 1000)
+  _motor_data.motor_target_current_limit_min_ma = int(_motor_data.cfg.motor_max_current_limit_min * 1000)
+  _motor_data.battery_target_current_limit_max_ma = int(_motor_data.cfg.battery_max_current_limit_max * 1000)
+  _motor_data.battery_target_current_limit_min_ma = int(_motor_data.cfg.battery_max_current_limit_min * 1000)
 
 # Optional BMS support (BLE) — BLE activation is deferred to bms.start()
 if cfg.has_jbd_bms:
   import bluetooth
-  from bms_jbd import JbdBmsClient
+  from bms_jbd import JbdBmsClient, addr_to_ints, addr_from_ints
+  from cell_monitor import CellMonitor
 
   # Create a single BLE instance; don't call active(True) here.
   ble = bluetooth.BLE()
   bms = JbdBmsClient(
     ble=ble,
     target_name=cfg.jbd_bms_bluetooth_name,
-    query_period_ms=1000,
+    query_period_ms=cfg.bms_query_period_ms,
     interleave_cells=True,
     debug=True,
   )
+  cell_monitor = CellMonitor(imbalance_warning_mv=cfg.cell_imbalance_warning_mv)
 
   async def bms_task(bms: JbdBmsClient):
     """
@@ -157,13 +250,31 @@ if cfg.has_jbd_bms:
     - drain BLE notifications
     - schedule 0x03/0x04 polls
     - keep reconnect logic responsive
+    - poll slower while riding (radio time for ESP-NOW), faster when charging
     NOTE: we start BLE only after ESP-NOW is up and we've paused briefly.
     """
+    # Connect directly to the BMS found last time, no scan
+    bms.peer_addr = addr_from_ints(settings.get("bms_addr_hi"), settings.get("bms_addr_lo"))
+
     # Give Wi-Fi/ESP-NOW a moment to settle before starting BLE (coex-friendly)
     await asyncio.sleep_ms(300)
-    bms.start(scan_ms=8000)  # start() will activate BLE with small retries
+    bms.start()  # start() will activate BLE with small retries
     while True:
       bms.tick()
+
+      if bms.peer_addr_changed:
+        bms.peer_addr_changed = False
+        addr_hi, addr_lo = addr_to_ints(bms.peer_addr)
+        settings.set("bms_addr_hi", addr_hi)
+        settings.set("bms_addr_lo", addr_lo)
+
+      if vars.battery_is_charging:
+        bms.set_query_period(cfg.bms_query_period_charging_ms)
+      elif rear_motor.data.wheel_speed_x10 > 0:
+        bms.set_query_period(cfg.bms_query_period_riding_ms)
+      else:
+        bms.set_query_period(cfg.bms_query_period_ms)
+
       await asyncio.sleep_ms(50)  # ~20 Hz tick
 
   async def bms_read_task(bms: JbdBmsClient):
@@ -173,6 +284,12 @@ if cfg.has_jbd_bms:
     while True:
       if bms.is_connected() and bms.is_fresh(3000):
         vars.bms_battery_current_x100 = bms.get_current_a_x100()
+
+        # Cell health, sent to the display only on changes
+        cell_monitor.update(bms)
+        frame = cell_monitor.frame()
+        if frame is not None:
+          display_cells_comms.send_data(frame)
       await asyncio.sleep_ms(1000)  # read cadence
 
 # Throttles
@@ -180,6 +297,7 @@ throttle_1 = Throttle(
   cfg.throttle_1_pin,
   min_val=cfg.throttle_1_adc_min,   # min ADC (with margin)
   max_val=cfg.throttle_1_adc_max,   # max ADC (with margin)
+  response_curves=cfg.throttle_response_curves,
 )
 
 throttle_2_pin = getattr(cfg, 'throttle_2_pin', None)
@@ -190,29 +308,94 @@ else:
     throttle_2_pin,
     min_val=cfg.throttle_2_adc_min,
     max_val=cfg.throttle_2_adc_max,
+    response_curves=cfg.throttle_response_curves,
   )
 
 throttle_1_disabled = False
 throttle_2_disabled = throttle_2 is None
 
-mode = Mode(brake_sensor, (throttle_1, throttle_2), vars, save_to_nvs=cfg.save_mode_to_nvs)
+# Persistent settings: kept in RAM, committed to NVS by task_settings
+settings_backend = None
+if cfg.save_mode_to_nvs:
+  try:
+    settings_backend = EspNvsBackend("diy_main_board")
+  except Exception as ex:
+    print("NVS not available:", ex)
+if settings_backend is None:
+  settings_backend = MemoryBackend()
+settings = SettingsStore(
+  settings_backend,
+  keys=KEYS + ("bms_addr_hi", "bms_addr_lo"),
+  quiet_ms=cfg.settings_commit_quiet_ms)
+
+# Older versions kept the mode as its own NVS i32 "mode" key
+carry_over_i32(settings, settings_backend, ("mode",))
+
+mode = Mode(brake_sensor, (throttle_1, throttle_2), vars, settings=settings)
+
+# Odometer / trip energy, integrated from the CAN telemetry. The trip runs
+# from one charge to the next (reset in task_various); without the BMS
+# there is no charge detection, so it runs from power on
+trip_computer = TripComputer(cfg.rear_motor_cfg, settings)
+if not cfg.has_jbd_bms:
+  trip_computer.reset_trip()
+
+# Battery SoC and range (VESC STATUS_7 SoC is used when not configured)
+soc_estimator = SocEstimator(cfg, bms if cfg.has_jbd_bms else None)
+
+_wheel_speed_previous_motor_speed_erpm = 0
+
+def motors_decode_rx():
+  """Decode the VESC frames received so far (both motors) and update the
+  rear wheel speed, so the control loop uses the latest telemetry"""
+  global _wheel_speed_previous_motor_speed_erpm
+  Motor.update_motor_data()
+
+  # Calculate rear motor wheel speed
+  if rear_motor.data.speed_erpm != _wheel_speed_previous_motor_speed_erpm:
+    _wheel_speed_previous_motor_speed_erpm = rear_motor.data.speed_erpm
+
+    # 2*pi ≈ 6.28318
+    perimeter = 6.28318 * rear_motor.data.cfg.wheel_radius  # meters
+    motor_rpm = rear_motor.data.speed_erpm / max(1, rear_motor.data.cfg.poles_pair)
+    rear_motor.data.wheel_speed = (perimeter * motor_rpm * 60.0) / 1000.0  # km/h
+
+    # Small floor near zero to suppress standstill jitter while still showing 1 km/h.
+    # No negative values
+    if rear_motor.data.wheel_speed < 1.0:
+      rear_motor.data.wheel_speed = 0.0
+    rear_motor.data.wheel_speed_x10 = int(rear_motor.data.wheel_speed * 10)
 
 async def task_motors_refresh_data():
-  # Refresh latest VESC data (call once; it fills both via CAN)
+  # The control loop decodes every 20 ms; this keeps the trip computer
+  # going (and decoding) should it stall
   while True:
-    if front_motor is None:
-      rear_motor.update_motor_data(rear_motor, None)
-    else:
-      rear_motor.update_motor_data(rear_motor, front_motor)
+    motors_decode_rx()
+    trip_computer.update(node_data)
     gc.collect()
     await asyncio.sleep(0.05)
 
+async def task_can_supervisor():
+  # VESC liveness and bus-off recovery; task_control_motor() commands zero
+  # current while vars.can_fault is set
+  while True:
+    vars.can_fault = can_supervisor.update()
+    await asyncio.sleep(0.05)
+
 async def task_display_send_data():
+  cycles = 0
   while True:
-    if front_motor_data is None:
-      display_comms.send_data(vars, rear_motor_data)
-    else:
-      display_comms.send_data(vars, rear_motor_data, front_motor_data)
+    # Trip summary and per node telemetry at a low rate (every 2 s, 1 s).
+    # The display decodes every queued message (get_all_data), so these are
+    # not lost to the main message sent right after
+    cycles += 1
+    if cycles % 4 == 0:
+      display_nodes_comms.send_data(motor_nodes)
+    if cycles >= 8:
+      cycles = 0
+      display_trip_comms.send_data(trip_computer, soc_estimator)
+
+    display_comms.send_data(vars, motor_nodes)
     
     gc.collect()
     await asyncio.sleep(0.25)
@@ -304,36 +487,43 @@ def _stop_motors():
 async def task_control_motor(wdt):
   global throttle_1_disabled, throttle_2_disabled
 
+  # Config values read every cycle: keep them local instead of doing a
+  # module dict lookup on cfg each 20 ms.
+  throttle_1_adc_over_max_error = cfg.throttle_1_adc_over_max_error
+  throttle_2_adc_over_max_error = cfg.throttle_2_adc_over_max_error
+
+  # CAN fault: kept until the VESCs are back and the throttle is released
+  can_safe_state = True
+
   while True:
-    motor_erpm_max_speed_limits = [
-      _motor_data.cfg.motor_erpm_max_speed_limit[vars.mode]
-      for _motor_data in motor_data
-    ]
+    # Latest VESC telemetry (wheel speed, motor currents)
+    motors_decode_rx()
 
-    # Throttle: take max of available throttles
-    throttle_1_raw, throttle_1_value = throttle_1.value
+    # Throttle: sample each ADC once per cycle (Mode reuses this sample)
+    # and take max of available throttles
+    throttle_1_value = throttle_1.sample(vars.mode)
+    throttle_1_raw = throttle_1.raw
     if throttle_1_disabled:
       throttle_1_value = 0
-    throttle_value = throttle_1_value
 
     throttle_2_raw = None
     throttle_2_value = None
     if throttle_2 is not None:
-      throttle_2_raw, throttle_2_value = throttle_2.value
+      throttle_2_value = throttle_2.sample(vars.mode)
+      throttle_2_raw = throttle_2.raw
       if throttle_2_disabled:
         throttle_2_value = 0
-      throttle_value = max(throttle_value, throttle_2_value)
 
     # Over-max safety (ADC glitch protection):
     # disable the affected throttle first; only stop with exception if both fail.
-    throttle_1_over_max = throttle_1_raw > cfg.throttle_1_adc_over_max_error
+    throttle_1_over_max = throttle_1_raw > throttle_1_adc_over_max_error
     if throttle_1_over_max:
       throttle_1_disabled = True
       throttle_1_value = 0
 
     throttle_2_over_max = False
     if throttle_2_raw is not None:
-      throttle_2_over_max = throttle_2_raw > cfg.throttle_2_adc_over_max_error
+      throttle_2_over_max = throttle_2_raw > throttle_2_adc_over_max_error
       if throttle_2_over_max:
         throttle_2_disabled = True
         throttle_2_value = 0
@@ -347,9 +537,7 @@ async def task_control_motor(wdt):
         f'throttle 1={throttle_1_raw}, throttle 2={throttle_2_raw}'
       )
 
-    requested_motor_target_speed = map_range(
-      throttle_value, 0.0, 1000.0, 0.0, motor_erpm_max_speed_limits[0], clamp=True
-    )
+    requested_motor_target_speed = motor_limits[0].target_erpm(throttle_value, vars.mode)
 
     # Cruise control
     cruise_control_is_active = cruise_control(
@@ -359,31 +547,40 @@ async def task_control_motor(wdt):
     )
 
     # Target speed
-    for _motor_data, motor_erpm_max_speed_limit in zip(motor_data, motor_erpm_max_speed_limits):
+    for _motor_data, _motor_limits in zip(motor_data, motor_limits):
+      motor_erpm_max_speed_limit = _motor_limits.erpm_max(vars.mode)
       if cruise_control_is_active:
         _motor_data.motor_target_speed = vars.cruise_control.target_motor_speed
       else:
-        _motor_data.motor_target_speed = map_range(
-          throttle_value, 0.0, 1000.0, 0.0, motor_erpm_max_speed_limit, clamp=True
-        )
+        _motor_data.motor_target_speed = _motor_limits.target_erpm(throttle_value, vars.mode)
 
       # Small dead-zone
-      if _motor_data.motor_target_speed < 500.0:
-        _motor_data.motor_target_speed = 0.0
+      if _motor_data.motor_target_speed < 500:
+        _motor_data.motor_target_speed = 0
 
       # Enforce max
       if _motor_data.motor_target_speed > motor_erpm_max_speed_limit:
         _motor_data.motor_target_speed = motor_erpm_max_speed_limit
 
+    # Traction control: scale down the limits of a slipping wheel
+    if traction_control.enabled:
+      traction_control.update(motor_data)
+      vars.traction_control_is_active = traction_control.active_mask != 0
+
     # Set motor/battery current limits
-    for motor in motors:
-      motor.set_motor_current_limits(
-        motor.data.motor_target_current_limit_min,
-        motor.data.motor_target_current_limit_max)
+    for i, motor in enumerate(motors):
+      if traction_control.active_mask & (1 << i):
+        motor.set_motor_current_limits_ma(
+          traction_control.scale_ma(i, motor.data.motor_target_current_limit_min_ma),
+          traction_control.scale_ma(i, motor.data.motor_target_current_limit_max_ma))
+      else:
+        motor.set_motor_current_limits_ma(
+          motor.data.motor_target_current_limit_min_ma,
+          motor.data.motor_target_current_limit_max_ma)
 
-      motor.set_battery_current_limits(
-        motor.data.battery_target_current_limit_min,
-        motor.data.battery_target_current_limit_max)
+      motor.set_battery_current_limits_ma(
+        motor.data.battery_target_current_limit_min_ma,
+        motor.data.battery_target_current_limit_max_ma)
 
     # Brakes
     vars.brakes_are_active = True if brake_sensor.value else False
@@ -392,8 +589,13 @@ async def task_control_motor(wdt):
     motor_current = sum(motor.data.motor_current_x10 for motor in motors) // 10
     vars.regen_braking_is_active = True if motor_current < -10 else False
 
+    if vars.can_fault:
+      can_safe_state = True
+    elif can_safe_state and throttle_value == 0:
+      can_safe_state = False
+
     # Command motor(s)
-    if vars.motors_enable_state is False:
+    if vars.motors_enable_state is False or can_safe_state:
       vars.cruise_control.target_motor_speed = 0.0
       vars.cruise_control.manual_cancel_ready = False
       vars.cruise_control.state = 1
@@ -424,40 +626,17 @@ async def task_control_motor(wdt):
 async def task_control_motor_limit_current():
   while True:
     # Always use rear wheel speed
-    wheel_speed = rear_motor.data.wheel_speed
+    wheel_speed_x10 = rear_motor.data.wheel_speed_x10
 
-    for _motor_data in motor_data:
-      _motor_data.motor_target_current_limit_max = map_range(
-        wheel_speed,
-        5.0,
-        _motor_data.cfg.motor_current_limit_max_min_speed,
-        _motor_data.cfg.motor_current_limit_max_max,
-        _motor_data.cfg.motor_current_limit_max_min,
-        clamp=True)
+    for _motor_data, _motor_limits, _thermal in zip(motor_data, motor_limits, thermal_deratings):
+      _motor_limits.update(_motor_data, wheel_speed_x10)
 
-      _motor_data.motor_target_current_limit_min = map_range(
-        wheel_speed,
-        5.0,
-        _motor_data.cfg.motor_current_limit_min_max_speed,
-        _motor_data.cfg.motor_current_limit_min_max,
-        _motor_data.cfg.motor_current_limit_min_min,
-        clamp=True)
-
-      _motor_data.battery_target_current_limit_max = map_range(
-        wheel_speed,
-        5.0,
-        _motor_data.cfg.battery_current_limit_max_min_speed,
-        _motor_data.cfg.battery_current_limit_max_max,
-        _motor_data.cfg.battery_current_limit_max_min,
-        clamp=True)
-
-      _motor_data.battery_target_current_limit_min = map_range(
-        wheel_speed,
-        5.0,
-        _motor_data.cfg.battery_current_limit_min_max_speed,
-        _motor_data.cfg.battery_current_limit_min_max,
-        _motor_data.cfg.battery_current_limit_min_min,
-        clamp=True)
+      # Thermal derating from the VESC reported temperatures (regen is kept)
+      _motor_data.thermal_derating_permille = _thermal.update(
+        _motor_data.vesc_temperature_x10,
+        _motor_data.motor_temperature_x10)
+      _motor_data.motor_target_current_limit_max_ma = _thermal.scale_ma(_motor_data.motor_target_current_limit_max_ma)
+      _motor_data.battery_target_current_limit_max_ma = _thermal.scale_ma(_motor_data.battery_target_current_limit_max_ma)
 
     gc.collect()
     await asyncio.sleep(0.1)
@@ -478,25 +657,11 @@ def _led_blink():
   _led.write()
 
 async def task_various():
-  wheel_speed_previous_motor_speed_erpm = 0
   charge_seen_ms = False
+  charging_previous = vars.battery_is_charging
   global mode
 
   while True:
-    # Calculate rear motor wheel speed
-    if rear_motor.data.speed_erpm != wheel_speed_previous_motor_speed_erpm:
-      wheel_speed_previous_motor_speed_erpm = rear_motor.data.speed_erpm
-
-      # 2*pi ≈ 6.28318
-      perimeter = 6.28318 * rear_motor.data.cfg.wheel_radius  # meters
-      motor_rpm = rear_motor.data.speed_erpm / max(1, rear_motor.data.cfg.poles_pair)
-      rear_motor.data.wheel_speed = (perimeter * motor_rpm * 60.0) / 1000.0  # km/h
-
-      # Small floor near zero to suppress standstill jitter while still showing 1 km/h.
-      # No negative values
-      if rear_motor.data.wheel_speed < 1.0:
-        rear_motor.data.wheel_speed = 0.0
-
     # Auto-detect charging
     # Note: BMS battery current is positive when charging
     if cfg.has_jbd_bms:
@@ -512,14 +677,42 @@ async def task_various():
         vars.battery_is_charging = False
         charge_seen_ms = None
 
+      # A new trip from each charge
+      if vars.battery_is_charging and not charging_previous:
+        trip_computer.reset_trip()
+      charging_previous = vars.battery_is_charging
+
     # Run Mode tick
     mode.tick()
 
+    # Slip onsets seen by the control loop since the last call
+    traction_control.log()
+
     _led_blink()
 
     gc.collect()
     await asyncio.sleep(0.1)
 
+async def task_battery_soc():
+  while True:
+    soc_estimator.update(node_data, trip_computer, charging=vars.battery_is_charging)
+    await asyncio.sleep(1)
+
+async def task_settings():
+  motors_enable_state_previous = vars.motors_enable_state
+  while True:
+    # Commit pending changes once they are quiet for a while, or right away
+    # when the display turns the motors off (it may power off next).
+    # The NVS write and commit are blocking: the other tasks wait for them
+    # (a few ms, longer when NVS erases a page), hence the batching.
+    if motors_enable_state_previous and not vars.motors_enable_state:
+      settings.flush()
+    else:
+      settings.tick()
+    motors_enable_state_previous = vars.motors_enable_state
+
+    await asyncio.sleep(0.5)
+
 async def main():
   # Watchdog task_control_motor() feeds it continuously.
   wdt = WDT(timeout=30000)
@@ -529,10 +722,13 @@ async def main():
     asyncio.create_task(task_motors_refresh_data()),
     asyncio.create_task(task_control_motor_limit_current()),
     asyncio.create_task(task_control_motor(wdt)),
+    asyncio.create_task(task_can_supervisor()),
     asyncio.create_task(task_display_send_data()),
     asyncio.create_task(task_lights_send_data()),
     asyncio.create_task(task_display_receive_process_data()),
     asyncio.create_task(task_various()),
+    asyncio.create_task(task_settings()),
+    asyncio.create_task(task_battery_soc()),
   ]
 
   # Add BMS tasks only if enabled in config
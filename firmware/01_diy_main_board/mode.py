@@ -1,15 +1,14 @@
-try:
-  import esp32
-except ImportError:
-  esp32 = None
-
-
 class Mode:
   NR_MODES = 2
   THROTTLE_ZERO_MAX = 50
   THROTTLE_FULL_MIN = 800
   
-  def __init__(self, brake, throttles, vars, save_to_nvs=True):
+  def __init__(self, brake, throttles, vars, settings=None):
+    """
+    :param settings: common.settings_store.SettingsStore, or None to not
+      keep the mode across power cycles. Mode changes only update the RAM
+      copy; the store commits them later, off the control path.
+    """
     self._brake = brake
     if isinstance(throttles, (tuple, list)):
       self._throttles = throttles
@@ -17,42 +16,30 @@ class Mode:
       self._throttles = (throttles,)
     self._vars = vars
     self._state = 0
-    self._nvs = None
-    self._nvs_key = "mode"
-    self._save_to_nvs = save_to_nvs
-    if esp32 is not None and self._save_to_nvs:
-      try:
-        self._nvs = esp32.NVS("diy_main_board")
-      except Exception:
-        self._nvs = None
+    self._settings = settings
     self._load_mode()
 
   def _load_mode(self):
-    if self._nvs is None:
-      return
-    try:
-      mode = self._nvs.get_i32(self._nvs_key)
-    except Exception:
+    # dirty before any commit: a value carried over from an older version
+    if self._settings is None or not (self._settings.loaded or self._settings.dirty):
       return
+    mode = self._settings.get("mode")
     if 0 <= mode < self.NR_MODES:
       self._vars.mode = mode
 
   def _save_mode(self):
-    if self._nvs is None:
-      return
-    try:
-      self._nvs.set_i32(self._nvs_key, int(self._vars.mode))
-      self._nvs.commit()
-    except Exception:
-      pass
+    if self._settings is not None:
+      self._settings.set("mode", self._vars.mode)
 
   def _throttle_value_max(self):
+    # Uses the sample cached by the motor control task this cycle (linear,
+    # before the response curve) instead of reading the ADC again.
     throttle_value = 0
     for throttle in self._throttles:
       if throttle is None:
         continue
-      _, value = throttle.value
-      throttle_value = max(throttle_value, value)
+      if throttle.linear > throttle_value:
+        throttle_value = throttle.linear
     return throttle_value
 
   def tick(self):
@@ -4,10 +4,25 @@
 #   CAN(tx=<gpio>, rx=<gpio>, baudrate=<int>, mode=<int>)
 #   can.recv() -> None or (msg_id:int, is_ext:bool, rtr:bool, data:bytes/bytearray)
 #   can.send(buf:bytes/bytearray, msg_id:int, extframe:bool=True/False, timeout:int=0)
+#   optional RX callback: can.irq_recv(callback) or can.rxcallback(fifo, callback)
+#   optional recovery: can.restart() (bus-off), else can.deinit() and a new CAN()
+#
+# RX: frames go from the driver queue into a preallocated ring
+# (can_rx_ring.py), drained from a micropython.schedule() callback when the
+# driver has an RX callback and on every update_motor_data() call, which
+# then decodes them into the MotorNodes columns (motor_nodes.py) of all the
+# nodes, looking the slot up by CAN id.
 
 import time
 import struct
 from can import CAN
+from can_rx_ring import CanRxRing
+from motor_nodes import MotorNodes
+
+try:
+  import micropython
+except ImportError:
+  micropython = None
 
 # Common errno values seen across ports/usermods (for resilient TX)
 _EAGAIN    = 11
@@ -17,15 +32,26 @@ _ENOTCONN  = 107
 _ECONNRST  = 104
 _ETXFAIL   = 0x0107
 
+# RX ring slots: 63 frames, ~150 ms of two VESCs sending 4 status frames
+# each at 50 Hz (~75 ms with four)
+_RX_RING_SIZE = 64
+
+# VESC nodes on the bus (MotorData.nodes columns)
+_MAX_NODES = 8
+
 
 class Motor(object):
   """
   Minimal wrapper around a shared CAN instance, with:
       - fire-and-forget TX (never raises)
-      - non-blocking RX drain + VESC packet decoding
-      - simple TX health counters
+      - RX ring filled as frames arrive + VESC packet decoding
+      - simple TX health counters, RX counters on Motor._rx
   """
   _can = None                 # shared CAN instance (singleton)
+  _rx = None                  # shared CanRxRing
+  _rx_irq = False             # driver RX callback installed
+  _rx_schedule_fails = 0      # RX callbacks dropped (schedule queue full)
+  _can_cfg = None             # motor cfg the CAN instance was created from
   _tx_4 = bytearray(4)
   _tx_8 = bytearray(8)
 
@@ -35,25 +61,59 @@ class Motor(object):
     # TX health / observability
     self.tx_ok = 0
     self.tx_drop = 0
+    self.tx_fail_run = 0       # consecutive drops, 0 after a send succeeds
     self.last_tx_error = None  # tuple(code, repr)
 
     # Configure CAN once (singleton). Assume cfg fields exist and are valid.
     if Motor._can is None:
-      tx_pin = int(self.data.cfg.can_tx_pin)
-      rx_pin = int(self.data.cfg.can_rx_pin)
-      baud   = int(self.data.cfg.can_baudrate)
-      mode   = int(self.data.cfg.can_mode)  # 0 == NORMAL in this driver
-
-      Motor._can = CAN(
-        tx=tx_pin,
-        rx=rx_pin,
-        baudrate=baud,
-        mode=mode
-      )
-      mode_name = "NORMAL" if mode == 0 else str(mode)
-      print("CAN configured:",
-                  "rx_pin =", rx_pin, "tx_pin =", tx_pin,
-                  "baudrate =", baud, "mode =", mode_name)
+      Motor._can_open(self.data.cfg)
+      Motor._rx = CanRxRing(_RX_RING_SIZE)
+      Motor._rx_irq_install()
+
+  @staticmethod
+  def _can_open(cfg):
+    tx_pin = int(cfg.can_tx_pin)
+    rx_pin = int(cfg.can_rx_pin)
+    baud   = int(cfg.can_baudrate)
+    mode   = int(cfg.can_mode)  # 0 == NORMAL in this driver
+
+    Motor._can = CAN(
+      tx=tx_pin,
+      rx=rx_pin,
+      baudrate=baud,
+      mode=mode
+    )
+    Motor._can_cfg = cfg
+    mode_name = "NORMAL" if mode == 0 else str(mode)
+    print("CAN configured:",
+                "rx_pin =", rx_pin, "tx_pin =", tx_pin,
+                "baudrate =", baud, "mode =", mode_name)
+
+  @staticmethod
+  def can_restart():
+    """
+    Restart the CAN controller (bus-off recovery). Uses the driver restart()
+    when there is one, else deinit() and a new CAN instance. The RX ring
+    and its counters are kept.
+    return: True when restarted
+    """
+    can = Motor._can
+    if can is None:
+      return False
+    try:
+      if hasattr(can, "restart"):
+        can.restart()
+        return True
+      if hasattr(can, "deinit"):
+        can.deinit()
+      Motor._can = None
+      Motor._rx_irq = False
+      Motor._can_open(Motor._can_cfg)
+      Motor._rx_irq_install()
+      return True
+    except Exception as e:
+      print("CAN restart failed:", repr(e))
+      return False
 
   # ------------------ INTERNAL: TX (never raise) ------------------
 
@@ -65,6 +125,7 @@ class Motor(object):
     if Motor._can is None:
       self.last_tx_error = ("NO_CAN", "CAN not initialized")
       self.tx_drop += 1
+      self.tx_fail_run += 1
       return False
 
     # VESC-style composing: low 8b = node id, next 8b = command
@@ -74,6 +135,7 @@ class Motor(object):
       # Non-blocking send; extframe=True for VESC extended IDs pattern
       Motor._can.send(buf, msg_id, extframe=True, timeout=0)
       self.tx_ok += 1
+      self.tx_fail_run = 0
       time.sleep_ms(3)  # small yield to avoid starving REPL/USB/CAN IRQs
       return True
 
@@ -81,6 +143,7 @@ class Motor(object):
       code = e.args[0] if e.args else None
       self.last_tx_error = (code, repr(e))
       self.tx_drop += 1
+      self.tx_fail_run += 1
       # Known transient/bus-state errors: just drop
       if code in (_EAGAIN, _EBUSY, _ETIMEDOUT, _ENOTCONN, _ECONNRST, _ETXFAIL, None):
         return False
@@ -89,85 +152,79 @@ class Motor(object):
     except Exception as e:
       self.last_tx_error = ("EXC", repr(e))
       self.tx_drop += 1
+      self.tx_fail_run += 1
       return False
 
-  # ------------------ INTERNAL: RX (non-blocking) ------------------
+  # ------------------ INTERNAL: RX ------------------
 
   @staticmethod
-  def _recv_nonblock():
+  def _rx_irq_install():
+    """Drain the driver RX queue as frames arrive, when the driver has an
+    RX callback; otherwise update_motor_data() polls it"""
     can = Motor._can
-    if not can:
-      return None
-    try:
-      # Non-blocking in this driver: returns None if no frame available
-      return can.recv()
-    except OSError:
-      # Includes ETIMEDOUT when no frame within internal wait window
-      return None
-    except Exception:
-      return None
-
-  # ------------------ PUBLIC: RX drain & VESC decode ------------------
-  def update_motor_data(self, motor_1, motor_2=None, budget_ms=10):
-    """
-    Drain frames for ~budget_ms without blocking.
-    Decodes a subset of VESC CAN status packets into MotorData.
-    """
-    if Motor._can is None:
+    if micropython is None:
       return
-
-    end_at = time.ticks_add(time.ticks_ms(), budget_ms)
-    while time.ticks_diff(end_at, time.ticks_ms()) > 0:
-      tup = self._recv_nonblock()
-      if not tup:
-        time.sleep_us(300)  # tiny yield when bus idle
-        continue
-
-      try:
-        message_id_full, is_ext, rtr, data = tup
-      except Exception:
-        continue
-      if not data:
-        continue
-
-      # Extract command and node id from extended VESC id
-      message_id = (message_id_full >> 8) & 0xFF
-      can_id     = message_id_full & 0xFF
-
-      if can_id == motor_1.data.cfg.can_id:
-        motor_data = motor_1.data
-      elif (motor_2 is not None) and (can_id == motor_2.data.cfg.can_id):
-        motor_data = motor_2.data
+    try:
+      if hasattr(can, "irq_recv"):
+        can.irq_recv(Motor._rx_irq_handler)
+      elif hasattr(can, "rxcallback"):
+        can.rxcallback(0, Motor._rx_irq_handler)
       else:
-        continue
-
-      dlc = len(data)
-
-      try:
-        # CAN_PACKET_STATUS_1 (cmd 9)
-        if message_id == 9 and dlc >= 6:
-          motor_data.speed_erpm          = struct.unpack_from(">l", data, 0)[0]
-          motor_data.motor_current_x10   = struct.unpack_from(">h", data, 4)[0]
-
-        # CAN_PACKET_STATUS_4 (cmd 16)
-        elif message_id == 16 and dlc >= 6:
-          motor_data.vesc_temperature_x10  = struct.unpack_from(">h", data, 0)[0]
-          motor_data.motor_temperature_x10 = struct.unpack_from(">h", data, 2)[0]
-          motor_data.battery_current_x10   = struct.unpack_from(">h", data, 4)[0]
+        return
+      Motor._rx_irq = True
+      print("CAN RX callback installed")
+    except Exception as e:
+      print("CAN RX callback not available:", repr(e))
 
-        # CAN_PACKET_STATUS_5 (cmd 27)
-        elif message_id == 27 and dlc >= 6:
-          motor_data.battery_voltage_x10 = struct.unpack_from(">h", data, 4)[0]
+  @staticmethod
+  def _rx_irq_handler(_can=None, _reason=None):
+    # May run as a hard IRQ: no allocation here, the drain is deferred
+    try:
+      micropython.schedule(Motor._rx_scheduled, None)
+    except RuntimeError:
+      # schedule queue full: the next update_motor_data() drains
+      Motor._rx_schedule_fails += 1
 
-        # CAN_PACKET_STATUS_7 (cmd 99)
-        elif message_id == 99 and dlc >= 2:
-          motor_data.battery_soc_x1000 = struct.unpack_from(">h", data, 0)[0]
+  @staticmethod
+  def _rx_scheduled(_arg):
+    Motor._rx.drain(Motor._can)
 
-        # (extend with more decoders as needed)
+  # ------------------ PUBLIC: RX decode ------------------
+  @staticmethod
+  def update_motor_data():
+    """
+    Decode the frames received since the last call (read from the driver
+    queue here as well, in case there is no RX callback) into the MotorData
+    of every node. Decodes a subset of VESC CAN status packets; the time is
+    the number of frames, there is no polling wait.
+    """
+    rx = Motor._rx
+    nodes = MotorData.nodes
+    if rx is None or nodes is None:
+      return
+    rx.drain(Motor._can)
+
+    ids = rx.ids
+    dlc = rx.dlc
+    data = rx.data
+    ticks = rx.ticks
+    now = time.ticks_ms()
+    while True:
+      slot = rx.peek(now)
+      if slot < 0:
+        break
+      # Extended VESC id: node id in the low 8 bits, command above
+      message_id_full = ids[slot]
+      nodes.decode(message_id_full & 0xFF, (message_id_full >> 8) & 0xFF, data, slot * 8, dlc[slot], ticks[slot])
+      rx.advance()
 
-      except Exception:
-        # Decode error (length/type), ignore and continue
-        pass
+  @staticmethod
+  def rx_counters():
+    """return: (frames, overruns, high_water, age_ms_max, schedule_fails)"""
+    rx = Motor._rx
+    if rx is None:
+      return (0, 0, 0, 0, 0)
+    return (rx.frames, rx.overruns, rx.high_water, rx.age_ms_max, Motor._rx_schedule_fails)
 
   # ------------------ PUBLIC: Commands (fire-and-forget) ------------------
 
@@ -190,16 +247,20 @@ class Motor(object):
 
   def set_motor_current_limits(self, min, max):
     """Set motor current limits in Amps."""
-    min_mA = int(min * 1000)
-    max_mA = int(max * 1000)
+    self.set_motor_current_limits_ma(int(min * 1000), int(max * 1000))
+
+  def set_battery_current_limits(self, min, max):
+    """Set battery current limits in Amps."""
+    self.set_battery_current_limits_ma(int(min * 1000), int(max * 1000))
+
+  def set_motor_current_limits_ma(self, min_mA, max_mA):
+    """Set motor current limits in mA (integer, no float math)."""
     struct.pack_into(">l", Motor._tx_8, 0, min_mA)
     struct.pack_into(">l", Motor._tx_8, 4, max_mA)
     self._pack_and_send(Motor._tx_8, 21)  # CAN_PACKET_SET_CURRENT_LIMITS = 21
 
-  def set_battery_current_limits(self, min, max):
-    """Set battery current limits in Amps."""
-    min_mA = int(min * 1000)
-    max_mA = int(max * 1000)
+  def set_battery_current_limits_ma(self, min_mA, max_mA):
+    """Set battery current limits in mA (integer, no float math)."""
     struct.pack_into(">l", Motor._tx_8, 0, min_mA)
     struct.pack_into(">l", Motor._tx_8, 4, max_mA)
     self._pack_and_send(Motor._tx_8, 23)  # CAN_PACKET_SET_BATTERY_CURRENT_LIMITS = 23
@@ -220,6 +281,9 @@ class Motor(object):
     if hasattr(can, "state"):
       try:
         state = can.state
+        if callable(state):
+          # pyb.CAN style: state() -> STOPPED 0 .. BUS_OFF 4
+          state = state()
       except Exception:
         state = None
 
@@ -248,24 +312,48 @@ class Motor(object):
     return (state, rx_err, tx_err)
 
 
+def _column(name):
+  # MotorData field kept in its slot of the MotorNodes column
+  def get(self):
+    return getattr(self.nodes, name)[self.slot]
+
+  def put(self, value):
+    getattr(self.nodes, name)[self.slot] = value
+
+  return property(get, put)
+
+
 class MotorData:
+  """
+  Targets and limits of a motor, and the telemetry decoded from its VESC
+  (kept in the MotorNodes columns, slot order = creation order)
+  """
+  nodes = None                # shared MotorNodes
+
+  speed_erpm = _column("speed_erpm")
+  motor_current_x10 = _column("motor_current_x10")
+  vesc_temperature_x10 = _column("vesc_temperature_x10")
+  motor_temperature_x10 = _column("motor_temperature_x10")
+  battery_current_x10 = _column("battery_current_x10")
+  battery_voltage_x10 = _column("battery_voltage_x10")
+  battery_soc_x1000 = _column("battery_soc_x1000")
+
   def __init__(self, cfg):
     self.cfg = cfg
-    # Targets/config
-    self.motor_target_current_limit_max = 0
-    self.motor_target_current_limit_min = 0
-    self.battery_target_current_limit_max = 0
-    self.battery_target_current_limit_min = 0
+    if MotorData.nodes is None:
+      MotorData.nodes = MotorNodes(_MAX_NODES)
+    self.slot = MotorData.nodes.add(cfg.can_id)
+    # Targets/config (currents in mA, see motor_limits.py)
+    self.motor_target_current_limit_max_ma = 0
+    self.motor_target_current_limit_min_ma = 0
+    self.battery_target_current_limit_max_ma = 0
+    self.battery_target_current_limit_min_ma = 0
     self.motor_min_current_start = 0
     self.motor_target_speed = 0.0
+    self.thermal_derating_permille = 1000
 
-    # Live telemetry (decoded from VESC CAN packets)
-    self.speed_erpm = 0
+    # Live telemetry: decoded from VESC CAN packets into the columns (the
+    # properties above), wheel speed from the ERPM
     self.wheel_speed = 0
-    self.vesc_temperature_x10 = 0
-    self.motor_temperature_x10 = 0
-    self.motor_current_x10 = 0
-    self.battery_current_x10 = 0
-    self.battery_voltage_x10 = 0
-    self.battery_soc_x1000 = 0
+    self.wheel_speed_x10 = 0
     self.vesc_fault_code = 0
@@ -0,0 +1,115 @@
+# motor_limits.py — precomputed speed dependent current limits and throttle
+# to ERPM mapping, built once per motor from MotorCfg.
+#
+# All lookups are integer only (no float division, no allocations):
+#   - wheel speed in km/h x10
+#   - currents in mA
+#   - throttle in 0..1000
+
+from array import array
+
+# Fixed-point shift for segment slopes, slopes and products rounded to
+# nearest: within 1 mA of the exact line over a 40 km/h segment. The product
+# (dx * slope) is bounded by dy << _SLOPE_SHIFT, so with segments of up to
+# 250 A (in mA) it stays a MicroPython small int.
+_SLOPE_SHIFT = 12
+_SLOPE_HALF = 1 << (_SLOPE_SHIFT - 1)
+
+# Speed (km/h) where the legacy two-point ramps start
+_RAMP_START_SPEED = 5.0
+
+
+class LimitCurve:
+  """Piecewise-linear curve over wheel speed, clamped at both ends."""
+
+  def __init__(self, points):
+    """
+    :param points: sequence of (speed_kmh, amps), speed strictly ascending,
+      resolved to 0.1 km/h
+    """
+    if not points:
+      raise ValueError("curve needs at least one point")
+    self._xs = array('i', [int(round(speed * 10)) for speed, _ in points])
+    self._ys = array('i', [int(round(amps * 1000)) for _, amps in points])
+    n = len(self._xs)
+    self._n = n
+    self._slopes = array('i', [0] * max(1, n - 1))
+    for i in range(n - 1):
+      dx = self._xs[i + 1] - self._xs[i]
+      if dx <= 0:
+        raise ValueError("curve speeds must be strictly ascending")
+      dy = self._ys[i + 1] - self._ys[i]
+      self._slopes[i] = ((dy << (_SLOPE_SHIFT + 1)) + dx) // (2 * dx)
+
+  def value_ma(self, speed_x10):
+    xs = self._xs
+    ys = self._ys
+    if speed_x10 <= xs[0]:
+      return ys[0]
+    last = self._n - 1
+    if speed_x10 >= xs[last]:
+      return ys[last]
+    i = 1
+    while speed_x10 > xs[i]:
+      i += 1
+    return ys[i - 1] + (((speed_x10 - xs[i - 1]) * self._slopes[i - 1] + _SLOPE_HALF) >> _SLOPE_SHIFT)
+
+
+def _two_point(start_value, end_speed, end_value):
+  # Same shape the old map_range(wheel_speed, 5.0, end_speed, ...) ramp had
+  if end_speed <= _RAMP_START_SPEED:
+    return ((_RAMP_START_SPEED, end_value),)
+  return ((_RAMP_START_SPEED, start_value), (end_speed, end_value))
+
+
+class MotorLimits:
+  """
+  Per-motor limit curves. update() fills the MotorData targets in one call:
+      - motor_target_current_limit_min/max_ma
+      - battery_target_current_limit_min/max_ma
+
+  A MotorCfg may define multi-point curves as lists of (speed_kmh, amps):
+      motor_current_limit_max_curve, motor_current_limit_min_curve,
+      battery_current_limit_max_curve, battery_current_limit_min_curve
+  Otherwise the two-point ramp from the *_max/*_min/*_speed fields is used.
+  """
+
+  def __init__(self, motor_cfg):
+    c = motor_cfg
+    self.motor_max = LimitCurve(c.motor_current_limit_max_curve or _two_point(
+      c.motor_current_limit_max_max,
+      c.motor_current_limit_max_min_speed,
+      c.motor_current_limit_max_min))
+    self.motor_min = LimitCurve(c.motor_current_limit_min_curve or _two_point(
+      c.motor_current_limit_min_max,
+      c.motor_current_limit_min_max_speed,
+      c.motor_current_limit_min_min))
+    self.battery_max = LimitCurve(c.battery_current_limit_max_curve or _two_point(
+      c.battery_current_limit_max_max,
+      c.battery_current_limit_max_min_speed,
+      c.battery_current_limit_max_min))
+    self.battery_min = LimitCurve(c.battery_current_limit_min_curve or _two_point(
+      c.battery_current_limit_min_max,
+      c.battery_current_limit_min_max_speed,
+      c.battery_current_limit_min_min))
+
+    self._erpm_max = array('i', [int(v) for v in c.motor_erpm_max_speed_limit])
+
+  def update(self, motor_data, speed_x10):
+    """Write the four current limits (mA) for this wheel speed into motor_data."""
+    motor_data.motor_target_current_limit_max_ma = self.motor_max.value_ma(speed_x10)
+    motor_data.motor_target_current_limit_min_ma = self.motor_min.value_ma(speed_x10)
+    motor_data.battery_target_current_limit_max_ma = self.battery_max.value_ma(speed_x10)
+    motor_data.battery_target_current_limit_min_ma = self.battery_min.value_ma(speed_x10)
+
+  def erpm_max(self, mode):
+    return self._erpm_max[mode]
+
+  def target_erpm(self, throttle_value, mode):
+    """Throttle 0..1000 to target ERPM for the given mode (clamped)."""
+    if throttle_value <= 0:
+      return 0
+    erpm_max = self._erpm_max[mode]
+    if throttle_value >= 1000:
+      return erpm_max
+    return (throttle_value * erpm_max) // 1000
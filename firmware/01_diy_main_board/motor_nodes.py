@@ -0,0 +1,98 @@
+# motor_nodes.py — telemetry of the VESC nodes on the CAN bus, in parallel
+# array columns indexed by slot (one slot per node, in the order they are
+# added: rear motor first). A 256 entry table maps the CAN id of a frame to
+# its slot, so decoding costs the same however many nodes there are.
+#
+# MotorData reads its fields from its slot (see motor.py); loops over all
+# the nodes can use the columns directly.
+
+import struct
+from array import array
+
+# rx_last_ms index per VESC status packet (slot * NR_STATUS + index)
+STATUS_1 = 0    # cmd 9: ERPM, motor current
+STATUS_4 = 1    # cmd 16: temperatures, battery current
+STATUS_5 = 2    # cmd 27: battery voltage
+STATUS_7 = 3    # cmd 99: SoC
+NR_STATUS = 4
+
+NO_SLOT = 0xFF
+
+
+class MotorNodes:
+  """
+      slot = nodes.add(can_id)
+      nodes.decode(can_id, command, data, offset, dlc, rx_ms)
+      nodes.speed_erpm[slot], nodes.battery_current_x10[slot], ...
+      nodes.rx_last_ms[slot * NR_STATUS + STATUS_1]
+  """
+
+  def __init__(self, size=8):
+    self.size = size
+    self.count = 0
+    self.slot_of_can_id = bytearray(b'\xff' * 256)
+    self.can_ids = bytearray(size)
+
+    self.speed_erpm = array('l', [0] * size)
+    self.motor_current_x10 = array('h', [0] * size)
+    self.vesc_temperature_x10 = array('h', [0] * size)
+    self.motor_temperature_x10 = array('h', [0] * size)
+    self.battery_current_x10 = array('h', [0] * size)
+    self.battery_voltage_x10 = array('h', [0] * size)
+    self.battery_soc_x1000 = array('h', [0] * size)
+
+    # Receive time of the last frame of each status packet, valid for the
+    # bits set in rx_seen_mask (see can_supervisor.py)
+    self.rx_last_ms = array('L', [0] * (size * NR_STATUS))
+    self.rx_seen_mask = bytearray(size)
+
+  def add(self, can_id):
+    """return: the slot of the new node"""
+    can_id = int(can_id) & 0xFF
+    if self.slot_of_can_id[can_id] != NO_SLOT:
+      raise ValueError("CAN id {} used twice".format(can_id))
+    if self.count >= self.size:
+      raise ValueError("more than {} CAN nodes".format(self.size))
+    slot = self.count
+    self.count += 1
+    self.can_ids[slot] = can_id
+    self.slot_of_can_id[can_id] = slot
+    return slot
+
+  def decode(self, can_id, message_id, data, offset, dlc, rx_ms):
+    """Decode a VESC status packet into the slot of can_id (frames of other
+    nodes are ignored)"""
+    slot = self.slot_of_can_id[can_id]
+    if slot == NO_SLOT:
+      return
+
+    # CAN_PACKET_STATUS_1 (cmd 9)
+    if message_id == 9 and dlc >= 6:
+      self.speed_erpm[slot]        = struct.unpack_from(">l", data, offset)[0]
+      self.motor_current_x10[slot] = struct.unpack_from(">h", data, offset + 4)[0]
+      status = STATUS_1
+
+    # CAN_PACKET_STATUS_4 (cmd 16)
+    elif message_id == 16 and dlc >= 6:
+      self.vesc_temperature_x10[slot]  = struct.unpack_from(">h", data, offset)[0]
+      self.motor_temperature_x10[slot] = struct.unpack_from(">h", data, offset + 2)[0]
+      self.battery_current_x10[slot]   = struct.unpack_from(">h", data, offset + 4)[0]
+      status = STATUS_4
+
+    # CAN_PACKET_STATUS_5 (cmd 27)
+    elif message_id == 27 and dlc >= 6:
+      self.battery_voltage_x10[slot] = struct.unpack_from(">h", data, offset + 4)[0]
+      status = STATUS_5
+
+    # CAN_PACKET_STATUS_7 (cmd 99)
+    elif message_id == 99 and dlc >= 2:
+      self.battery_soc_x1000[slot] = struct.unpack_from(">h", data, offset)[0]
+      status = STATUS_7
+
+    # (extend with more decoders as needed)
+    else:
+      return
+
+    # Liveness, per status packet
+    self.rx_last_ms[slot * NR_STATUS + status] = rx_ms
+    self.rx_seen_mask[slot] |= 1 << status
@@ -0,0 +1,208 @@
+# soc_estimator.py — battery state of charge and remaining range.
+#
+# Coulomb counting on the net charge integrated by the trip computer (CAN
+# battery current), corrected towards the open circuit voltage (OCV) SoC:
+# strongly after the battery rested, weakly under load with the voltage sag
+# compensated by an internal resistance estimated from current steps. When
+# the JBD BMS is connected its capacity replaces the configured one and its
+# SoC is blended in too; its lowest cell voltage is used for the OCV lookup.
+#
+# Runs once per second, integer math only.
+
+from time import ticks_ms, ticks_diff
+
+# Li-ion NMC cell OCV: (cell mV, SoC permille)
+OCV_CURVE_NMC = (
+  (3000, 0),
+  (3300, 50),
+  (3450, 100),
+  (3550, 200),
+  (3620, 300),
+  (3680, 400),
+  (3750, 500),
+  (3830, 600),
+  (3920, 700),
+  (4000, 800),
+  (4080, 900),
+  (4200, 1000),
+)
+
+# Battery at rest: |current| up to 0.5 A for 60 s
+_REST_CURRENT_X10 = 5
+_REST_MS = 60000
+# Correction gains (shift) towards the OCV SoC at rest / under load, and
+# towards the BMS SoC
+_GAIN_REST_SHIFT = 4
+_GAIN_LOAD_SHIFT = 11
+_GAIN_BMS_SHIFT = 4
+# Internal resistance: current step needed for a sample, accepted range, filter
+_R_STEP_MIN_X10 = 50
+_R_MIN_MOHM = 5
+_R_MAX_MOHM = 2000
+_R_FILTER_SHIFT = 3
+# Published SoC moves at most this much per update (permille)
+_PUBLISH_STEP_MAX = 5
+# Internal SoC is permille in Q8, so that the small corrections under load
+# are not lost to integer rounding
+_Q = 8
+
+
+def ocv_soc_x1000(curve, cell_mv):
+  """Linear interpolation on a (cell mV, SoC permille) curve"""
+  if cell_mv <= curve[0][0]:
+    return curve[0][1]
+  for i in range(1, len(curve)):
+    mv1, soc1 = curve[i]
+    if cell_mv < mv1:
+      mv0, soc0 = curve[i - 1]
+      return soc0 + ((soc1 - soc0) * (cell_mv - mv0)) // (mv1 - mv0)
+  return curve[-1][1]
+
+
+def _towards(value, target, shift):
+  # value moved by (target - value) >> shift, rounding towards value (a
+  # plain >> of a negative difference would keep pulling down by 1)
+  if target >= value:
+    return value + ((target - value) >> shift)
+  return value - ((value - target) >> shift)
+
+
+class SocEstimator:
+  """
+  Per second:
+      soc.update(motor_datas, trip_computer, charging=vars.battery_is_charging)
+
+  Published:
+      soc_x1000                   stable SoC, -1 until the first estimate
+      range_m                     remaining range at the trip Wh/km
+      internal_resistance_mohm    pack estimate
+  """
+
+  def __init__(self, cfg, bms=None):
+    self.enabled = cfg.battery_cells_series > 0
+    self._cells = max(1, int(cfg.battery_cells_series))
+    self._capacity_mah_cfg = int(cfg.battery_capacity_ah * 1000)
+    self._curve = cfg.battery_cell_ocv_curve
+    if self._curve is None:
+      self._curve = OCV_CURVE_NMC
+    else:
+      # config is in percent
+      self._curve = tuple((int(mv), int(p * 10)) for mv, p in self._curve)
+    self._default_wh_per_km_x10 = int(cfg.range_wh_per_km_default * 10)
+    self._bms = bms
+
+    self.internal_resistance_mohm = int(cfg.battery_internal_resistance_mohm)
+    self.capacity_mah = self._capacity_mah_cfg
+    self.soc_x1000 = -1
+    self.range_m = 0
+
+    self._soc_q8 = -1
+    self._net_mah_prev = 0
+    self._coulomb_rem = 0
+    self._rest_ms = 0
+    self._v_prev_x10 = 0
+    self._i_prev_x10 = 0
+    self._last_ms = None
+
+  def _bms_data(self):
+    # (remaining_mah, full_mah, min_cell_mv) from a fresh BMS reading, or None
+    bms = self._bms
+    if bms is None or not bms.is_connected() or not bms.is_fresh(3000):
+      return None
+    caps = bms.get_capacities_ah_x100()
+    if caps is None or caps[1] <= 0:
+      return None
+    cells = bms.get_cells_x1000()
+    min_cell_mv = min(cells) if cells else 0
+    return (caps[0] * 10, caps[1] * 10, min_cell_mv)
+
+  def update(self, motor_datas, trip_computer, charging=False, now_ms=None):
+    if not self.enabled:
+      return
+    if now_ms is None:
+      now_ms = ticks_ms()
+    dt = 0 if self._last_ms is None else ticks_diff(now_ms, self._last_ms)
+    self._last_ms = now_ms
+
+    voltage_x10 = motor_datas[0].battery_voltage_x10
+    if voltage_x10 <= 0:
+      return
+    current_x10 = 0
+    for motor_data in motor_datas:
+      current_x10 += motor_data.battery_current_x10
+    net_mah = trip_computer.mah_consumed - trip_computer.mah_regen
+
+    bms = self._bms_data()
+    if bms is not None:
+      self.capacity_mah = bms[1]
+
+    # Internal resistance from a current step between two updates
+    di = current_x10 - self._i_prev_x10
+    if self._v_prev_x10 and (di >= _R_STEP_MIN_X10 or di <= -_R_STEP_MIN_X10):
+      # 0.1 V / 0.1 A = ohm
+      r = ((self._v_prev_x10 - voltage_x10) * 1000) // di
+      if _R_MIN_MOHM <= r <= _R_MAX_MOHM:
+        self.internal_resistance_mohm = _towards(self.internal_resistance_mohm, r, _R_FILTER_SHIFT)
+    self._v_prev_x10 = voltage_x10
+    self._i_prev_x10 = current_x10
+
+    # OCV SoC: voltage sag compensated (0.1 A * mohm = 0.1 mV)
+    ocv_x10 = voltage_x10 + (current_x10 * self.internal_resistance_mohm) // 1000
+    # (when charging, the charger current doesn't go through the VESC and
+    # the voltage is raised: no OCV correction, only the BMS)
+    if not charging and -_REST_CURRENT_X10 <= current_x10 <= _REST_CURRENT_X10:
+      self._rest_ms += dt
+    else:
+      self._rest_ms = 0
+    at_rest = self._rest_ms >= _REST_MS
+    if at_rest and bms is not None and bms[2]:
+      # the weakest cell limits the usable charge
+      cell_mv = bms[2]
+    else:
+      cell_mv = (ocv_x10 * 100) // self._cells
+    ocv_soc = ocv_soc_x1000(self._curve, cell_mv)
+
+    if self._soc_q8 < 0:
+      # first estimate: BMS, else OCV (the board starts with the battery at rest)
+      if bms is not None:
+        soc = (bms[0] * 1000) // bms[1]
+      else:
+        soc = ocv_soc
+      self._soc_q8 = soc << _Q
+      self._net_mah_prev = net_mah
+      self.soc_x1000 = soc
+    else:
+      # Coulomb counting
+      soc_q8 = self._soc_q8
+      if self.capacity_mah > 0:
+        rem = self._coulomb_rem + ((net_mah - self._net_mah_prev) * 1000 << _Q)
+        steps = rem // self.capacity_mah
+        self._coulomb_rem = rem - steps * self.capacity_mah
+        soc_q8 -= steps
+      self._net_mah_prev = net_mah
+
+      # Corrections
+      if not charging:
+        shift = _GAIN_REST_SHIFT if at_rest or self.capacity_mah <= 0 else _GAIN_LOAD_SHIFT
+        soc_q8 = _towards(soc_q8, ocv_soc << _Q, shift)
+      if bms is not None:
+        soc_q8 = _towards(soc_q8, ((bms[0] * 1000) // bms[1]) << _Q, _GAIN_BMS_SHIFT)
+      self._soc_q8 = max(0, min(1000 << _Q, soc_q8))
+
+      # Published value: rate limited
+      step = (self._soc_q8 >> _Q) - self.soc_x1000
+      if step > _PUBLISH_STEP_MAX:
+        step = _PUBLISH_STEP_MAX
+      elif step < -_PUBLISH_STEP_MAX:
+        step = -_PUBLISH_STEP_MAX
+      self.soc_x1000 += step
+
+    # Remaining range at the trip consumption (default until it is known)
+    if self.capacity_mah > 0:
+      wh_per_km_x10 = trip_computer.wh_per_km_x10
+      if wh_per_km_x10 <= 0 or trip_computer.trip_m < 1000:
+        wh_per_km_x10 = self._default_wh_per_km_x10
+      remaining_mah = (self.capacity_mah * self.soc_x1000) // 1000
+      # mAh * 0.1 V = 0.1 mWh
+      remaining_wh_x10 = (remaining_mah * ocv_x10) // 1000
+      self.range_m = (remaining_wh_x10 * 1000) // max(1, wh_per_km_x10)
@@ -1,20 +1,100 @@
 from machine import ADC, Pin
-from common.utils import map_range
+from array import array
+
+# Response curve lookup table size (index 0..255 over the throttle travel)
+TABLE_SIZE = 256
+
+def build_response_table(points=None):
+  """
+  Build a 256-entry integer table mapping throttle travel to output 0..1000.
+
+  :param points: sequence of (input_percent, output_percent) pairs, input
+    strictly ascending from 0 to 100. None means a linear response.
+  """
+  if not points:
+    points = ((0, 0), (100, 100))
+  xs = [int(x * 10) for x, _ in points]
+  ys = [int(y * 10) for _, y in points]
+  table = array('H', [0] * TABLE_SIZE)
+  seg = 1
+  for i in range(TABLE_SIZE):
+    x = (i * 1000) // (TABLE_SIZE - 1)
+    if x <= xs[0]:
+      y = ys[0]
+    elif x >= xs[-1]:
+      y = ys[-1]
+    else:
+      while x > xs[seg]:
+        seg += 1
+      x0 = xs[seg - 1]
+      y0 = ys[seg - 1]
+      y = y0 + ((x - x0) * (ys[seg] - y0)) // (xs[seg] - x0)
+    table[i] = max(0, min(1000, y))
+  return table
 
 class Throttle:
   """Throttle input via ADC"""
-  def __init__(self, adc_pin, min_val=32767, max_val=65535):
+  def __init__(self, adc_pin, min_val=32767, max_val=65535, response_curves=None):
     """
     :param int adc_pin: GPIO number for throttle ADC
     :param int min_val: minimum ADC value (slightly above rest)
     :param int max_val: maximum ADC value (slightly below full)
+    :param response_curves: optional list, one entry per mode, of
+      (input_percent, output_percent) points; None entries are linear
     """
     self._adc = ADC(Pin(adc_pin))
     self._min = min_val
     self._max = max_val
-    self._adc_previous_value = 0
+    span = max(1, max_val - min_val)
+    # Fixed-point (16 bit) scales from clamped ADC counts, rounded to nearest
+    # like the lookups in sample()
+    self._index_scale = (((TABLE_SIZE - 1) << 17) + span) // (2 * span)
+    self._linear_scale = ((1000 << 17) + span) // (2 * span)
+
+    linear = build_response_table()
+    self._tables = []
+    if response_curves:
+      for points in response_curves:
+        self._tables.append(build_response_table(points) if points else linear)
+    else:
+      self._tables.append(linear)
+
+    # Last sample, shared by everyone reading the throttle this cycle
+    self.raw = 0
+    self.linear = 0   # 0..1000, no response curve (used by Mode gestures)
+    self.value = 0    # 0..1000, after the response curve of the active mode
+    self.adc_reads = 0
+
+  def _read_median3(self):
+    read = self._adc.read_u16
+    a = read()
+    b = read()
+    c = read()
+    self.adc_reads += 3
+    if a > b:
+      a, b = b, a
+    if b > c:
+      b = c
+    return a if a > b else b
+
+  def sample(self, mode=0):
+    """Read the ADC once for this control cycle and update raw/linear/value."""
+    raw = self._read_median3()
+    self.raw = raw
+
+    if raw <= self._min:
+      linear = 0
+      index = 0
+    elif raw >= self._max:
+      linear = 1000
+      index = TABLE_SIZE - 1
+    else:
+      pos = raw - self._min
+      linear = (pos * self._linear_scale + 0x8000) >> 16
+      index = (pos * self._index_scale + 0x8000) >> 16
 
-  @property
-  def value(self):
-    raw = self._adc.read_u16()
-    return raw, int(map_range(raw, self._min, self._max, 0, 1000, clamp=True))
+    tables = self._tables
+    table = tables[mode] if mode < len(tables) else tables[0]
+    self.linear = linear
+    self.value = table[index]
+    return self.value
@@ -0,0 +1,167 @@
+# traction_control.py — wheel slip detection for multi-motor builds.
+#
+# Compares the wheel surface speed of each motor (from VESC STATUS_1 ERPM)
+# against the other wheels, plus each wheel's acceleration, and scales down
+# the current limits of a wheel that spins up (or locks) faster than the
+# vehicle can physically accelerate. Integer math only, no allocations.
+
+import time
+from array import array
+
+# Current limit scale is Q8: 256 == 100 %
+_SCALE_ONE = 256
+# Scale taken off per cycle while slipping, and given back per cycle after
+_SCALE_CUT_STEP = 64
+_SCALE_RECOVER_STEP = 8
+
+
+def _mm_s_per_erpm_q8(motor_cfg):
+  # wheel surface speed (mm/s) = erpm / poles_pair * 2*pi*r / 60 * 1000
+  poles = max(1, motor_cfg.poles_pair)
+  return int(6283.18 * motor_cfg.wheel_radius * 256 / (60 * poles))
+
+
+class TractionControl:
+  """
+  Per cycle:
+      tc.update(motor_datas)        # after new ERPM data
+      tc.scale_ma(i, limit_ma)      # apply to the limits sent to motor i
+
+  Telemetry:
+      slip_events[i]   count of slip onsets per motor
+      active_mask      bit i set while motor i is being limited
+      tc.log()         print the slip onsets since the last call (not from
+                       the control loop: printing takes longer than a cycle)
+  """
+
+  def __init__(self, motor_cfgs, cfg):
+    n = len(motor_cfgs)
+    self._n = n
+    self.enabled = bool(cfg.traction_control_enabled) and n > 1
+    self._k_q8 = array('i', [_mm_s_per_erpm_q8(c) for c in motor_cfgs])
+    self._slip_percent = int(cfg.traction_slip_percent)
+    self._slip_min_mm_s = int(cfg.traction_slip_min_mm_s)
+    self._max_accel_mm_s2 = int(cfg.traction_max_accel_mm_s2)
+    self._scale_min = (int(cfg.traction_limit_min_percent) * _SCALE_ONE) // 100
+
+    self._speed = array('i', [0] * n)          # mm/s
+    self._speed_prev = array('i', [0] * n)
+    self._accel = array('i', [0] * n)          # mm/s^2
+    self._erpm_prev = array('i', [0] * n)
+    self._scale = array('i', [_SCALE_ONE] * n)
+    self._last_ms = time.ticks_ms()
+
+    self.slip_events = array('H', [0] * n)
+    self.active_mask = 0
+
+    # Wheel state at the last slip onset of each motor, for log()
+    self._onset_spin = array('i', [0] * n)     # mm/s, + spin, - lock
+    self._onset_accel = array('i', [0] * n)    # mm/s^2
+    self._onset_speed = array('i', [0] * n)    # mm/s, reference wheel
+    self._log_mask = 0
+
+  def update(self, motor_datas):
+    if not self.enabled:
+      return
+
+    n = self._n
+    speed = self._speed
+    accel = self._accel
+
+    # ERPM only changes when new CAN frames were decoded, so the derivative
+    # is taken over the time since the last change, not per control cycle.
+    changed = False
+    for i in range(n):
+      erpm = motor_datas[i].speed_erpm
+      if erpm != self._erpm_prev[i]:
+        changed = True
+        break
+
+    if changed:
+      now = time.ticks_ms()
+      dt = time.ticks_diff(now, self._last_ms)
+      if dt < 1:
+        dt = 1
+      self._last_ms = now
+      for i in range(n):
+        erpm = motor_datas[i].speed_erpm
+        self._erpm_prev[i] = erpm
+        v = (erpm * self._k_q8[i]) >> 8
+        self._speed_prev[i] = speed[i]
+        speed[i] = v
+        accel[i] = ((v - self._speed_prev[i]) * 1000) // dt
+
+    # Reference: slowest wheel for drive slip, fastest for brake lock
+    v_min = speed[0]
+    v_max = speed[0]
+    for i in range(1, n):
+      v = speed[i]
+      if v < v_min:
+        v_min = v
+      if v > v_max:
+        v_max = v
+
+    mask = 0
+    for i in range(n):
+      v = speed[i]
+      a = accel[i]
+      spin = v - v_min
+      lock = v_max - v
+      spin_threshold = (v_min * self._slip_percent) // 100
+      if spin_threshold < self._slip_min_mm_s:
+        spin_threshold = self._slip_min_mm_s
+      lock_threshold = (v_max * self._slip_percent) // 100
+      if lock_threshold < self._slip_min_mm_s:
+        lock_threshold = self._slip_min_mm_s
+
+      # The acceleration spike starts a slip event; once limited, the wheel
+      # stays limited until its speed is back close to the other wheel.
+      scale = self._scale[i]
+      limited = scale < _SCALE_ONE
+      slipping = (spin > spin_threshold and (limited or a > self._max_accel_mm_s2)) or \
+                 (lock > lock_threshold and (limited or a < -self._max_accel_mm_s2))
+
+      if slipping:
+        if scale == _SCALE_ONE:
+          self.slip_events[i] += 1
+          if spin > spin_threshold:
+            self._onset_spin[i] = spin
+            self._onset_speed[i] = v_min
+          else:
+            self._onset_spin[i] = -lock
+            self._onset_speed[i] = v_max
+          self._onset_accel[i] = a
+          self._log_mask |= 1 << i
+        scale -= _SCALE_CUT_STEP
+        if scale < self._scale_min:
+          scale = self._scale_min
+      elif scale < _SCALE_ONE:
+        scale += _SCALE_RECOVER_STEP
+        if scale > _SCALE_ONE:
+          scale = _SCALE_ONE
+      self._scale[i] = scale
+      if scale < _SCALE_ONE:
+        mask |= 1 << i
+
+    self.active_mask = mask
+
+  def scale_ma(self, index, limit_ma):
+    """Scale a current limit (mA, either sign) for motor index."""
+    return (limit_ma * self._scale[index]) >> 8
+
+  def log(self):
+    """Print the slip onsets since the last call, one line each."""
+    mask = self._log_mask
+    if mask == 0:
+      return
+    self._log_mask = 0
+    for i in range(self._n):
+      if mask & (1 << i):
+        print("traction: motor {} {} {} mm/s at {} mm/s, accel {} mm/s2, events {}".format(
+          i, "spin" if self._onset_spin[i] > 0 else "lock", abs(self._onset_spin[i]),
+          self._onset_speed[i], self._onset_accel[i], self.slip_events[i]))
+
+  def reset(self):
+    for i in range(self._n):
+      self._scale[i] = _SCALE_ONE
+    self.active_mask = 0
@@ -0,0 +1,178 @@
+# trip_computer.py — odometer, trip distance, energy (Ah / Wh, consumed and
+# regen) and average speed, integrated from the VESC CAN telemetry already
+# decoded into MotorData.
+#
+# Runs right after the CAN drain in task_motors_refresh_data. Integer math
+# only: each integral keeps its remainder between calls, so nothing drifts
+# and nothing is allocated. Odometer, trip distance and trip Wh go to the
+# settings store (committed in the background, see common/settings_store.py).
+# The trip (distance, Wh, Wh/km) runs from one charge to the next:
+# escooter/main.py calls reset_trip() when charging starts.
+
+from time import ticks_ms, ticks_diff
+
+# Integration units: speed mm/s * ms = um; battery current x10 * ms = 0.1 A ms;
+# battery current x10 * battery voltage x10 * ms = 0.01 W ms
+_UM_PER_M = 1000000
+_CURRENT_MS_PER_MAH = 36000          # 0.1 A * ms in one mAh
+_POWER_MS_PER_WH_X10 = 36000000      # 0.01 W * ms in 0.1 Wh
+
+# Longer gaps (task stalled) count as this much: the data is stale anyway
+_MAX_DT_MS = 500
+# Below ~1 km/h the wheel is considered stopped (same floor as the wheel speed)
+_MOVING_MIN_MM_S = 280
+
+
+def _mm_s_per_erpm_q12(motor_cfg):
+  # wheel surface speed (mm/s) = erpm / poles_pair * 2*pi*r / 60 * 1000
+  # (Q12: the Q8 factor of traction_control is ~0.3 % off, too much for an
+  # odometer)
+  poles = max(1, motor_cfg.poles_pair)
+  return int(6283.18 * motor_cfg.wheel_radius * 4096 / (60 * poles) + 0.5)
+
+
+class TripComputer:
+  """
+  Per cycle:
+      trip.update(motor_datas)      # motor_datas[0] is the rear motor
+
+  Totals (persisted when a settings store is given):
+      odometer_m, trip_m, wh_consumed_x10, wh_regen_x10
+  Since power on:
+      mah_consumed, mah_regen, distance_m, moving_s
+  """
+
+  def __init__(self, motor_cfg, settings=None):
+    """
+    :param motor_cfg: rear MotorCfg (poles_pair, wheel_radius)
+    :param settings: common.settings_store.SettingsStore or None
+    """
+    self._k_q12 = _mm_s_per_erpm_q12(motor_cfg)
+    self._settings = settings
+
+    self.odometer_m = 0
+    self.trip_m = 0
+    self.wh_consumed_x10 = 0
+    self.wh_regen_x10 = 0
+    if settings is not None:
+      self.odometer_m = settings.get("odometer_m")
+      self.trip_m = settings.get("trip_m")
+      self.wh_consumed_x10 = settings.get("wh_consumed_x10")
+      self.wh_regen_x10 = settings.get("wh_regen_x10")
+
+    self.mah_consumed = 0
+    self.mah_regen = 0
+    self.distance_m = 0
+    self.moving_s = 0
+    self.speed_mm_s = 0
+
+    # integral remainders
+    self._distance_rem = 0
+    self._moving_rem = 0
+    self._charge_in_rem = 0
+    self._charge_out_rem = 0
+    self._energy_in_rem = 0
+    self._energy_out_rem = 0
+    self._last_ms = None
+
+  def update(self, motor_datas, now_ms=None):
+    if now_ms is None:
+      now_ms = ticks_ms()
+    if self._last_ms is None:
+      self._last_ms = now_ms
+      return
+    dt = ticks_diff(now_ms, self._last_ms)
+    if dt <= 0:
+      return
+    self._last_ms = now_ms
+    if dt > _MAX_DT_MS:
+      dt = _MAX_DT_MS
+
+    # Distance from the rear wheel
+    rear = motor_datas[0]
+    erpm = rear.speed_erpm
+    if erpm < 0:
+      erpm = -erpm
+    speed = (erpm * self._k_q12) >> 12
+    self.speed_mm_s = speed
+    if speed >= _MOVING_MIN_MM_S:
+      rem = self._moving_rem + dt
+      if rem >= 1000:
+        self.moving_s += rem // 1000
+        rem %= 1000
+      self._moving_rem = rem
+
+      rem = self._distance_rem + speed * dt
+      if rem >= _UM_PER_M:
+        m = rem // _UM_PER_M
+        rem -= m * _UM_PER_M
+        self.distance_m += m
+        self.odometer_m += m
+        self.trip_m += m
+        if self._settings is not None:
+          self._settings.set("odometer_m", self.odometer_m)
+          self._settings.set("trip_m", self.trip_m)
+      self._distance_rem = rem
+
+    # Charge and energy from the summed battery current (negative: regen)
+    current_x10 = 0
+    for motor_data in motor_datas:
+      current_x10 += motor_data.battery_current_x10
+    if current_x10 == 0:
+      return
+    voltage_x10 = rear.battery_voltage_x10
+
+    if current_x10 > 0:
+      rem = self._charge_in_rem + current_x10 * dt
+      if rem >= _CURRENT_MS_PER_MAH:
+        self.mah_consumed += rem // _CURRENT_MS_PER_MAH
+        rem %= _CURRENT_MS_PER_MAH
+      self._charge_in_rem = rem
+
+      rem = self._energy_in_rem + current_x10 * voltage_x10 * dt
+      if rem >= _POWER_MS_PER_WH_X10:
+        self.wh_consumed_x10 += rem // _POWER_MS_PER_WH_X10
+        rem %= _POWER_MS_PER_WH_X10
+        if self._settings is not None:
+          self._settings.set("wh_consumed_x10", self.wh_consumed_x10)
+      self._energy_in_rem = rem
+    else:
+      current_x10 = -current_x10
+      rem = self._charge_out_rem + current_x10 * dt
+      if rem >= _CURRENT_MS_PER_MAH:
+        self.mah_regen += rem // _CURRENT_MS_PER_MAH
+        rem %= _CURRENT_MS_PER_MAH
+      self._charge_out_rem = rem
+
+      rem = self._energy_out_rem + current_x10 * voltage_x10 * dt
+      if rem >= _POWER_MS_PER_WH_X10:
+        self.wh_regen_x10 += rem // _POWER_MS_PER_WH_X10
+        rem %= _POWER_MS_PER_WH_X10
+        if self._settings is not None:
+          self._settings.set("wh_regen_x10", self.wh_regen_x10)
+      self._energy_out_rem = rem
+
+  def reset_trip(self):
+    """Start a new trip; the odometer and the since power on values stay"""
+    self.trip_m = 0
+    self.wh_consumed_x10 = 0
+    self.wh_regen_x10 = 0
+    if self._settings is not None:
+      self._settings.set("trip_m", 0)
+      self._settings.set("wh_consumed_x10", 0)
+      self._settings.set("wh_regen_x10", 0)
+
+  @property
+  def wh_per_km_x10(self):
+    """Net trip consumption (consumed - regen), 0 for the first 100 m"""
+    if self.trip_m < 100:
+      return 0
+    return ((self.wh_consumed_x10 - self.wh_regen_x10) * 1000) // self.trip_m
+
+  @property
+  def avg_speed_x10(self):
+    """Average moving speed since power on, km/h x10"""
+    if self.moving_s == 0:
+      return 0
+    # m/s * 3.6 km/h, x10
+    return (self.distance_m * 36) // self.moving_s
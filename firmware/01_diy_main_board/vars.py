@@ -66,4 +66,6 @@ class Vars(object):
     self.bms_battery_current_x100 = None
     self.battery_is_charging = False
     self.mode = 0
+    self.traction_control_is_active = False
+    self.can_fault = True
     
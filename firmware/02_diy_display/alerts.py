@@ -0,0 +1,239 @@
+# alerts.py — main screen alert engine: one fixed slot per alert type, in
+# priority order (overheat > BMS protection > cell imbalance > mode change >
+# info). The active and pending sets are bitmasks, so raising an alert that
+# is already queued is a no-op and a tick costs the same however many alerts
+# are active.
+#
+# Conditions (overheat, BMS) are shown while they last, taking turns with
+# the others; events (mode change, info) are shown once.
+
+from time import ticks_ms, ticks_diff
+
+# Slots, highest priority first
+ALERT_VESC_REAR = 0
+ALERT_VESC_FRONT = 1
+ALERT_MOTOR_REAR = 2
+ALERT_MOTOR_FRONT = 3
+ALERT_BMS_PROTECTION = 4
+ALERT_CELL_IMBALANCE = 5
+ALERT_MODE = 6
+ALERT_INFO = 7
+NR_ALERTS = 8
+
+# Overheat slots show a progress bar, the others text
+_BAR_MASK = (1 << ALERT_VESC_REAR) | (1 << ALERT_VESC_FRONT) | (1 << ALERT_MOTOR_REAR) | (1 << ALERT_MOTOR_FRONT)
+_BAR_LABELS = ("vr", "vf", "mr", "mf")
+# Condition slots (the others are events)
+_CONDITION_MASK = (1 << (ALERT_CELL_IMBALANCE + 1)) - 1
+
+# Overheat bar clears this much below the temperature where it shows
+_TEMP_HYSTERESIS_X10 = 20
+
+
+class _TempThreshold:
+  """Percent of a temperature between min and max, with hysteresis on the
+  min; the scale is computed once from the config"""
+
+  def __init__(self, min_x10, max_x10):
+    self.enabled = max_x10 > min_x10
+    self.min_x10 = min_x10
+    self.off_x10 = min_x10 - _TEMP_HYSTERESIS_X10
+    # percent = (temp - min) * scale >> 8
+    self.scale_q8 = ((100 << 8) // (max_x10 - min_x10)) if self.enabled else 0
+    self.is_on = False
+
+  def percent(self, temp_x10):
+    if not self.enabled:
+      return 0
+    if temp_x10 > self.min_x10:
+      self.is_on = True
+    elif temp_x10 < self.off_x10:
+      self.is_on = False
+    if not self.is_on:
+      return 0
+    if temp_x10 <= self.min_x10:
+      # in the hysteresis band
+      return 1
+    percent = ((temp_x10 - self.min_x10) * self.scale_q8) >> 8
+    return max(1, min(100, percent))
+
+
+class AlertEngine:
+  """
+  Per render:
+      if alerts.update(vars):       # True when what to show changed
+        alerts.current              # slot, -1 for none
+        alerts.current_is_bar
+        alerts.current_text / current_label / current_percent
+  Between changes, while a bar shows, alerts.current_percent follows the
+  temperature (alerts.percent_changed).
+  """
+
+  def __init__(self, cfg, durations_ms=None):
+    """
+    :param cfg: config_runtime (rear_motor_cfg / front_motor_cfg temperatures)
+    :param durations_ms: display time per slot, NR_ALERTS values
+      (default: the alert_*_display_ms settings)
+    """
+    rear = cfg.rear_motor_cfg
+    front = cfg.front_motor_cfg
+    self._temps = [
+      _TempThreshold(rear.vesc_min_temperature_x10, rear.vesc_max_temperature_x10),
+      _TempThreshold(front.vesc_min_temperature_x10, front.vesc_max_temperature_x10) if front is not None else _TempThreshold(0, 0),
+      _TempThreshold(rear.min_temperature_x10, rear.max_temperature_x10),
+      _TempThreshold(front.min_temperature_x10, front.max_temperature_x10) if front is not None else _TempThreshold(0, 0),
+    ]
+    if durations_ms is None:
+      overheat = cfg.alert_overheat_display_ms
+      bms = cfg.alert_bms_display_ms
+      durations_ms = [overheat] * 4 + [bms] * 2 + [
+        cfg.alert_mode_display_ms,
+        cfg.alert_info_display_ms,
+      ]
+    self._durations_ms = list(durations_ms)
+
+    self._texts = [''] * NR_ALERTS
+    self._percents = [0] * NR_ALERTS
+    self._active = 0      # conditions that hold now
+    self._pending = 0     # waiting to be shown
+    self._mode_last_seen = None
+    self._cell_delta_mv = -1
+
+    self.current = -1
+    self.current_is_bar = False
+    self.current_text = ''
+    self.current_label = ''
+    self.current_percent = 0
+    self.percent_changed = False
+    self._start_ms = 0
+    self._restart = False
+
+  # ---------- inputs ----------
+  def set_condition(self, slot, is_active, text=None, percent=0):
+    """A condition alert: queued when it starts, cleared when it ends"""
+    bit = 1 << slot
+    if text is not None:
+      self._texts[slot] = text
+    self._percents[slot] = percent
+    if is_active:
+      if not self._active & bit:
+        self._active |= bit
+        self._pending |= bit
+    elif self._active & bit:
+      self._active &= ~bit
+      self._pending &= ~bit
+
+  def raise_event(self, slot, text):
+    """A one-shot alert (mode change, info): shown once for its duration;
+    raised again while on screen, it shows the new text for a full duration"""
+    self._texts[slot] = text
+    if slot == self.current:
+      self._restart = True
+    else:
+      self._pending |= 1 << slot
+
+  def raise_info(self, text):
+    self.raise_event(ALERT_INFO, text)
+
+  def _update_temp(self, slot, temp_x10):
+    percent = self._temps[slot].percent(temp_x10)
+    self.set_condition(slot, percent > 0, None, percent)
+
+  def _update_from_vars(self, vars):
+    self._update_temp(ALERT_VESC_REAR, vars.rear_vesc_temperature_x10)
+    self._update_temp(ALERT_VESC_FRONT, vars.front_vesc_temperature_x10)
+    self._update_temp(ALERT_MOTOR_REAR, vars.rear_motor_temperature_x10)
+    self._update_temp(ALERT_MOTOR_FRONT, vars.front_motor_temperature_x10)
+
+    self.set_condition(ALERT_BMS_PROTECTION, vars.bms_protection_is_active, "bms")
+
+    # max - min cell voltage; text only rebuilt when the value changes
+    if vars.bms_cell_imbalance_is_active:
+      delta_mv = vars.bms_cell_max_mv - vars.bms_cell_min_mv
+      if delta_mv != self._cell_delta_mv:
+        self._cell_delta_mv = delta_mv
+        self._texts[ALERT_CELL_IMBALANCE] = f"c{delta_mv}mV"
+      self.set_condition(ALERT_CELL_IMBALANCE, True)
+    else:
+      self._cell_delta_mv = -1
+      self.set_condition(ALERT_CELL_IMBALANCE, False)
+
+    # mode change (not the first value seen)
+    if self._mode_last_seen is None:
+      self._mode_last_seen = vars.mode
+    elif vars.mode != self._mode_last_seen:
+      self._mode_last_seen = vars.mode
+      self.raise_event(ALERT_MODE, f"mode {int(vars.mode)}")
+
+  # ---------- per render ----------
+  def update(self, vars, now_ms=None):
+    """return: True when the alert to show changed (slot or text)"""
+    if now_ms is None:
+      now_ms = ticks_ms()
+    if vars is not None:
+      self._update_from_vars(vars)
+    return self.tick(now_ms)
+
+  def tick(self, now_ms):
+    changed = False
+    self.percent_changed = False
+    current = self.current
+
+    if current >= 0:
+      bit = 1 << current
+      if self._restart:
+        self._restart = False
+        self._start_ms = now_ms
+      expired = ticks_diff(now_ms, self._start_ms) >= self._durations_ms[current]
+      if _CONDITION_MASK & bit and not self._active & bit:
+        # condition ended
+        current = -1
+      elif expired:
+        if not self._pending:
+          # next round of the other conditions that still hold
+          self._pending = self._active & ~bit
+        if self._active & bit and not self._pending:
+          # nothing else to show: keep it
+          self._start_ms = now_ms
+        else:
+          current = -1
+      if current < 0:
+        self.current = -1
+        changed = True
+
+    if current < 0:
+      if not self._pending:
+        # next round of the conditions that still hold
+        self._pending = self._active
+      pending = self._pending
+      if pending:
+        # highest priority: lowest set bit
+        slot = 0
+        while not pending & (1 << slot):
+          slot += 1
+        self._pending &= ~(1 << slot)
+        self._show(slot, now_ms)
+        changed = True
+    else:
+      # text or bar of the alert on screen
+      if self.current_is_bar:
+        percent = self._percents[current]
+        if percent != self.current_percent:
+          self.current_percent = percent
+          self.percent_changed = True
+      elif self._texts[current] != self.current_text:
+        self.current_text = self._texts[current]
+        changed = True
+    return changed
+
+  def _show(self, slot, now_ms):
+    self.current = slot
+    self._start_ms = now_ms
+    self._restart = False
+    self.current_is_bar = bool(_BAR_MASK & (1 << slot))
+    if self.current_is_bar:
+      self.current_label = _BAR_LABELS[slot]
+      self.current_percent = self._percents[slot]
+      self.current_text = ''
+    else:
+      self.current_text = self._texts[slot]
@@ -0,0 +1,158 @@
+# charge_estimator.py — charging screen figures: charge power, Ah and Wh
+# added since the charger was plugged in, and the time to full.
+#
+# Ah and Wh are integrated at every update (integer sums with a carry, like
+# the main board SoC estimator). Samples taken every _SAMPLE_MS give the
+# time to full:
+# - constant current (CC): the SoC rise over a small ring of timestamped
+#   samples, extrapolated to 100 %
+# - constant voltage (CV), detected when the current tapers below
+#   _TAPER_PERCENT of the CC current: the current decays about
+#   exponentially, I(t) = I0 * exp(-t / tau), so tau comes from the current
+#   at the taper start and now, and the time left is tau * ln(I / I_end),
+#   I_end the current where the main board stops reporting charging.
+# While an estimate can not be made (too little SoC or current change for
+# the 0.1 % / 0.1 A resolution) the previous one is kept.
+
+import math
+from array import array
+from time import ticks_ms, ticks_add, ticks_diff
+
+_SAMPLE_MS = 5000
+_RING = 12                    # 60 s of samples
+_TAPER_PERCENT = 95
+_TAPER_SAMPLES = 2            # consecutive samples under the taper level
+# CV: current drop since the taper start needed for tau
+_CV_MIN_DROP_X10 = 3
+# Longer gaps (screen not rendered, messages lost) are not integrated
+_MAX_DT_MS = 5000
+
+# 0.1 A * ms per 0.01 Ah, W * ms per 0.1 Wh
+_AH_X100_UNITS = 360000
+_WH_X10_UNITS = 360000
+
+
+class ChargeEstimator:
+  """
+  While charging, per render:
+      charge.update(voltage_x10, current_x10, soc_x1000)
+      charge.power_w, charge.ah_x100, charge.wh_x10
+      charge.time_to_full_min       # -1 while unknown
+      charge.is_tapering            # CV phase
+  """
+
+  def __init__(self, end_current_x10=5):
+    """
+    :param end_current_x10: charge current where the charge is complete
+    """
+    self._end_current_x10 = max(1, end_current_x10)
+    self._t = array('i', [0] * _RING)
+    self._current_x10 = array('h', [0] * _RING)
+    self._soc_x1000 = array('h', [0] * _RING)
+    self.reset()
+
+  def reset(self, now_ms=None):
+    if now_ms is None:
+      now_ms = ticks_ms()
+    self._head = 0
+    self._count = 0
+    self._last_ms = now_ms
+    self._next_sample_ms = now_ms
+    self._charge_rem = 0
+    self._energy_rem = 0
+    self._cc_current_x10 = 0
+    self._taper_count = 0
+    self._cv_start_ms = 0
+    self._cv_start_current_x10 = 0
+
+    self.power_w = 0
+    self.current_x10 = 0
+    self.ah_x100 = 0
+    self.wh_x10 = 0
+    self.is_tapering = False
+    self.time_to_full_min = -1
+
+  def update(self, voltage_x10, current_x10, soc_x1000, now_ms=None):
+    """return: True when a sample was taken (time to full updated)"""
+    if now_ms is None:
+      now_ms = ticks_ms()
+    if current_x10 < 0:
+      current_x10 = 0
+    self.current_x10 = current_x10
+    self.power_w = (voltage_x10 * current_x10) // 100
+
+    dt = ticks_diff(now_ms, self._last_ms)
+    self._last_ms = now_ms
+    if 0 < dt <= _MAX_DT_MS:
+      self._charge_rem += current_x10 * dt
+      steps = self._charge_rem // _AH_X100_UNITS
+      if steps:
+        self.ah_x100 += steps
+        self._charge_rem -= steps * _AH_X100_UNITS
+      self._energy_rem += self.power_w * dt
+      steps = self._energy_rem // _WH_X10_UNITS
+      if steps:
+        self.wh_x10 += steps
+        self._energy_rem -= steps * _WH_X10_UNITS
+
+    if ticks_diff(now_ms, self._next_sample_ms) < 0:
+      return False
+    self._next_sample_ms = ticks_add(now_ms, _SAMPLE_MS)
+    self._sample(now_ms, current_x10, soc_x1000)
+    return True
+
+  def _sample(self, now_ms, current_x10, soc_x1000):
+    i = self._head
+    self._t[i] = now_ms
+    self._current_x10[i] = current_x10
+    self._soc_x1000[i] = soc_x1000
+    self._head = (i + 1) % _RING
+    if self._count < _RING:
+      self._count += 1
+
+    # CC / CV
+    if not self.is_tapering:
+      if current_x10 > self._cc_current_x10:
+        self._cc_current_x10 = current_x10
+      if current_x10 * 100 < self._cc_current_x10 * _TAPER_PERCENT:
+        self._taper_count += 1
+        if self._taper_count >= _TAPER_SAMPLES:
+          self.is_tapering = True
+          self._cv_start_ms = now_ms
+          self._cv_start_current_x10 = current_x10
+      else:
+        self._taper_count = 0
+
+    if self.is_tapering:
+      ms = self._cv_time_to_full_ms(now_ms, current_x10)
+    else:
+      ms = self._cc_time_to_full_ms(soc_x1000)
+    if ms >= 0:
+      # rounded up: 0 only when full
+      self.time_to_full_min = (ms + 59999) // 60000
+
+  def _cv_time_to_full_ms(self, now_ms, current_x10):
+    """return: ms, -1 when unknown"""
+    if current_x10 <= self._end_current_x10:
+      return 0
+    if self._cv_start_current_x10 - current_x10 < _CV_MIN_DROP_X10:
+      return -1
+    dt = ticks_diff(now_ms, self._cv_start_ms)
+    tau_ms = dt / math.log(self._cv_start_current_x10 / current_x10)
+    return int(tau_ms * math.log(current_x10 / self._end_current_x10))
+
+  def _cc_time_to_full_ms(self, soc_x1000):
+    """return: ms, -1 when unknown"""
+    if self._count < 2:
+      return -1
+    old = (self._head - self._count) % _RING
+    new = (self._head - 1) % _RING
+    dt = ticks_diff(self._t[new], self._t[old])
+    if dt <= 0:
+      return -1
+    dsoc = self._soc_x1000[new] - self._soc_x1000[old]
+    if dsoc <= 0:
+      return -1
+    if soc_x1000 >= 1000:
+      return 0
+    return (1000 - soc_x1000) * dt // dsoc
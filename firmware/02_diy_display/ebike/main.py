@@ -26,12 +26,18 @@ print("Starting Display")
 
 # MAC Address value needed for the wireless communication
 import common.config_runtime as cfg
+from common.settings_store import SettingsStore, NvmBackend, record_len
 my_mac_address = cfg.mac_address_display
 mac_address_motor_board = cfg.mac_address_motor_board
 ########################################
 
 vars = Vars.Vars()
 
+# Persistent settings in Non-Volatile Memory: one record rotating over 8
+# slots after the first 16 bytes, written only once changes are quiet or on
+# power off
+settings = SettingsStore(NvmBackend(microcontroller.nvm, 16, 8 * record_len()))
+
 wifi.radio.enabled = True
 wifi.radio.mac_address = bytearray(my_mac_address)
 wifi.radio.start_ap(ssid="NO_SSID", channel=1)
@@ -130,7 +136,8 @@ def turn_off():
   global buttons
   
   # Store assist_level in Non-Volatile Memory
-  microcontroller.nvm[0] = vars.assist_level
+  settings.set("assist_level", vars.assist_level)
+  settings.flush()
 
   # new values when turn off the system
   vars.motor_enable_state = False
@@ -168,6 +175,7 @@ def increase_assist_level():
   
   if vars.assist_level < 20:
     vars.assist_level += 1
+  settings.set("assist_level", vars.assist_level)
   
   refresh_display = True
 
@@ -177,6 +185,7 @@ def decrease_assist_level():
   
   if vars.assist_level > 0:
     vars.assist_level -= 1
+  settings.set("assist_level", vars.assist_level)
   
   refresh_display = True
 
@@ -311,8 +320,12 @@ text_group.append(motor_power_area)
 text_group.append(warning_area)
 display.root_group = text_group
 
-# Load assist_level from Non-Volatile Memory
-vars.assist_level = microcontroller.nvm[0]
+# Load assist_level from Non-Volatile Memory (byte 0 is where older
+# versions kept it, used until a settings record is written)
+if settings.loaded:
+  vars.assist_level = settings.get("assist_level")
+else:
+  vars.assist_level = microcontroller.nvm[0]
 if vars.assist_level > 20:
   vars.assist_level = 20
 if vars.assist_level < 0:
@@ -378,6 +391,9 @@ while True:
     for index in range(nr_buttons):
       buttons[index].tick()
 
+  # Commit settings changes once quiet (assist level while riding)
+  settings.tick()
+
   # Let's feed the watchdog to avoid a system reset
   watchdog.feed() # avoid system reset because watchdog timeout
 
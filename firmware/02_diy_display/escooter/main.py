@@ -35,6 +35,7 @@ from common.utils import map_range
 from common.lights_bits import FRONT_LOW_BIT, REAR_TAIL_BIT, REAR_BRAKE_BIT, IO_BITS_MASK
 import vars as Vars
 from common.espnow_commands import COMMAND_ID_DISPLAY_1, COMMAND_ID_POWER_SWITCH_1
+from motor_board_link import decode_motor_board_message, apply_motor_board_message
 from screen_manager import ScreenManager, ScreenID
 from common.thisbutton import thisButton
 from common.espnow import espnow_init, ESPNowComms
@@ -162,12 +163,6 @@ def encode_display_message():
   motor_enable_state = 1 if vars.motor_enable_state else 0
   return f"{COMMAND_ID_DISPLAY_1} {motor_enable_state} {vars.buttons_state}".encode("ascii")
 
-def decode_display_message(msg):
-  parts = [int(s) for s in msg.decode("ascii").split()]
-  if len(parts) == 11 and parts[0] == COMMAND_ID_DISPLAY_1:
-    return parts
-  return None
-
 def encode_lights_message():
   pins_state = int(vars.lights_board_pins_state)
   mask = IO_BITS_MASK & ~REAR_BRAKE_BIT
@@ -188,7 +183,7 @@ def init_espnow_stack():
   motor_rx_comms = ESPNowComms(
     esp,
     bytes(cfg.mac_address_motor_board),
-    decoder=decode_display_message)
+    decoder=decode_motor_board_message)
 
   motor_tx_comms = ESPNowComms(
     esp,
@@ -305,10 +300,34 @@ async def ui_task(fb, lcd, vars):
   # Main screen takes about 80ms to update
   period_ms = 100
   next_wake = time.ticks_ms()
+  block_us_max = 0
+  block_log_ms = next_wake
   
   while True:
+    # Draw into the back buffer
+    start_us = time.ticks_us()
     screen_manager.update(vars)
-    screen_manager.render(vars)
+    screen_manager.render(vars, show=False)
+    block_us = time.ticks_diff(time.ticks_us(), start_us)
+    await asyncio.sleep_ms(0)
+
+    # Flush the changed pages, yielding between them so ESP-NOW RX and the
+    # buttons run; drawing the next frame doesn't touch the front buffer
+    dirty = fb.flush_begin()
+    for page in range(fb.pages):
+      if dirty & (1 << page):
+        start_us = time.ticks_us()
+        fb.flush_page(page)
+        block_us = max(block_us, time.ticks_diff(time.ticks_us(), start_us))
+        await asyncio.sleep_ms(0)
+
+    # Longest section without a yield
+    if block_us > block_us_max:
+      block_us_max = block_us
+    if cfg.boot_timing_debug and time.ticks_diff(time.ticks_ms(), block_log_ms) >= 10000:
+      block_log_ms = time.ticks_ms()
+      print("[ui] longest blocking section {} us".format(block_us_max))
+      block_us_max = 0
   
     # Control loop time
     next_wake = time.ticks_add(next_wake, period_ms)
@@ -462,6 +481,9 @@ async def main_task(vars):
     wdt.feed()
 
 async def motor_rx_task(vars):
+  def apply_message(msg):
+    apply_motor_board_message(vars, msg)
+
   period_ms = 50
   next_wake = time.ticks_ms()
   
@@ -475,23 +497,9 @@ async def motor_rx_task(vars):
         await asyncio.sleep_ms(0)
       continue
 
-    msg = motor_rx_comms.get_data()
-    if msg is not None and len(msg) == 11 and msg[0] == COMMAND_ID_DISPLAY_1:
-      vars.battery_voltage_x10   = msg[1]
-      vars.battery_current_x10   = msg[2]
-      vars.battery_soc_x1000     = msg[3]
-      vars.motor_current_x10     = msg[4]
-      vars.wheel_speed_x10       = msg[5]
-      flags = msg[6]
-      vars.brakes_are_active       = bool(flags & (1 << 0))
-      vars.regen_braking_is_active = bool(flags & (1 << 1))
-      vars.battery_is_charging     = bool(flags & (1 << 2))
-      vars.mode = (flags >> 3) & 0x07
-      vars.cruise_control_is_active = bool(flags & (1 << 6))
-      vars.rear_vesc_temperature_x10 = msg[7]
-      vars.front_vesc_temperature_x10 = msg[8]
-      vars.rear_motor_temperature_x10 = msg[9]
-      vars.front_motor_temperature_x10 = msg[10]
+    # every queued message: the trip, cells and nodes frames come in
+    # between the main ones
+    motor_rx_comms.get_all_data(apply_message)
     
     next_wake = time.ticks_add(next_wake, period_ms)
     remaining = time.ticks_diff(next_wake, time.ticks_ms())
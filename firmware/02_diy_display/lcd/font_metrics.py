@@ -0,0 +1,72 @@
+# font_metrics.py — width tables for font_to_py fonts, so measuring a string
+# is a sum over an array instead of a font.get_ch() call per character.
+# Built once per font on first use (one get_ch() per character of the font).
+
+from array import array
+
+_tables = {}
+_ink = {}
+
+
+def widths(font):
+  """
+  return: (min_ch, table): table is array('B') of the advance widths, at
+  [ord(ch) - min_ch]; the last entry is the width of the default glyph,
+  drawn for characters out of range
+  """
+  entry = _tables.get(font)
+  if entry is None:
+    lo = font.min_ch()
+    n = font.max_ch() - lo + 1
+    table = array('B', bytes(n + 1))
+    for i in range(n):
+      table[i] = font.get_ch(chr(lo + i))[2]
+    table[n] = font.get_ch(chr(lo + n))[2]
+    entry = (lo, table)
+    _tables[font] = entry
+  return entry
+
+
+def text_width(font, s):
+  """Advance width of s in pixels"""
+  lo, table = widths(font)
+  n = len(table) - 1
+  w = 0
+  for ch in s:
+    i = ord(ch) - lo
+    w += table[i] if 0 <= i < n else table[n]
+  return w
+
+
+def ink_width(font, ch):
+  """Width up to the last inked column of a glyph (Writer._truelen),
+  scanned once per character"""
+  lo, table = widths(font)
+  n = len(table) - 1
+  i = ord(ch) - lo
+  if not 0 <= i < n:
+    i = n
+  ink = _ink.get(font)
+  if ink is None:
+    # 0xFF: not scanned yet
+    ink = array('B', b'\xff' * (n + 1))
+    _ink[font] = ink
+  if ink[i] == 0xFF:
+    ink[i] = _scan_ink(font, ch)
+  return ink[i]
+
+
+def _scan_ink(font, ch):
+  glyph, ht, wd = font.get_ch(ch)
+  gbytes = (wd + 7) // 8
+  reverse = font.reverse()
+  mc = 0
+  for row in range(ht):
+    for col in range(wd - 1, mc, -1):
+      b = glyph[row * gbytes + (col >> 3)]
+      if b & ((1 << (col & 7)) if reverse else (0x80 >> (col & 7))):
+        mc = col
+        break
+    if mc + 1 == wd:
+      break
+  return mc + 1
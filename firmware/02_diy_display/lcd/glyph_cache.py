@@ -0,0 +1,49 @@
+# glyph_cache.py — font_to_py glyphs (horizontally mapped) converted once to
+# MONO_VLSB, the ST7565 framebuffer format, so text is blitted between
+# buffers of the same format. Glyphs are converted on first use and kept per
+# font: a widget only ever draws a few different characters.
+
+import framebuf
+
+_fonts = {}
+
+
+def to_vlsb(glyph, width, height, reverse=False):
+  """Horizontally mapped glyph bitmap (MONO_HLSB, or MONO_HMSB when
+  reverse) to a new MONO_VLSB bytearray"""
+  row_bytes = (width + 7) // 8
+  buf = bytearray(width * ((height + 7) // 8))
+  for y in range(height):
+    page = (y >> 3) * width
+    bit = 1 << (y & 7)
+    row = y * row_bytes
+    for x in range(width):
+      b = glyph[row + (x >> 3)]
+      if reverse:
+        b &= 1 << (x & 7)
+      else:
+        b &= 0x80 >> (x & 7)
+      if b:
+        buf[page + x] |= bit
+  return buf
+
+
+def get_glyph(font, ch):
+  """return: (MONO_VLSB FrameBuffer or None for an empty glyph, height, width)"""
+  glyphs = _fonts.get(font)
+  if glyphs is None:
+    if not font.hmap():
+      raise ValueError("Font must be horizontally mapped.")
+    glyphs = {}
+    _fonts[font] = glyphs
+
+  glyph = glyphs.get(ch)
+  if glyph is None:
+    bitmap, height, width = font.get_ch(ch)
+    fb = None
+    if bitmap is not None and width > 0 and height > 0:
+      buf = to_vlsb(bitmap, width, height, font.reverse())
+      fb = framebuf.FrameBuffer(buf, width, height, framebuf.MONO_VLSB)
+    glyph = (fb, height, width)
+    glyphs[ch] = glyph
+  return glyph
@@ -40,6 +40,23 @@ class ST7565(framebuf.FrameBuffer):
     self.buf = bytearray(self.width * self.pages)
     super().__init__(self.buf, self.width, self.height, framebuf.MONO_VLSB)
 
+    # Double buffer: drawing goes to buf (back), flush_begin() copies the
+    # pages that changed to the front buffer and flush_page() sends them from
+    # there, so the next frame can be drawn while a flush is in progress.
+    # Per page memoryviews: no allocation per flush.
+    self._front = bytearray(len(self.buf))
+    self._back_pages = []
+    self._front_pages = []
+    back = memoryview(self.buf)
+    front = memoryview(self._front)
+    for page in range(self.pages):
+      start = page * self.width
+      self._back_pages.append(back[start:start + self.width])
+      self._front_pages.append(front[start:start + self.width])
+    self._front_is_valid = False   # panel RAM unknown: send every page
+    self._page_cmd = bytearray(3)  # page address, column high, column low
+    self._cmd = bytearray(1)
+
     # State (mirrors CP defaults)
     self._contrast = max(0, min(int(initial_contrast), 63))
     self._bias = BIAS_7 if use_bias_1_7 else BIAS_9
@@ -49,6 +66,7 @@ class ST7565(framebuf.FrameBuffer):
     self._start_line = 0
     self._adc_reverse = bool(use_adc_reverse)   # A1
     self._com_normal  = bool(use_com_normal)    # C0
+    self.set_colstart(self._colstart)
 
     # Init HW matching the CP sequence you posted
     self._hw_init()
@@ -59,8 +77,9 @@ class ST7565(framebuf.FrameBuffer):
     self.rst(1); time.sleep_ms(20)
 
   def cmd(self, c):
+    self._cmd[0] = c & 0xFF
     self.cs(0); self.dc(0)
-    self.spi.write(bytearray([c & 0xFF]))
+    self.spi.write(self._cmd)
     self.cs(1)
 
   def data(self, b):
@@ -69,6 +88,7 @@ class ST7565(framebuf.FrameBuffer):
     self.cs(1)
 
   def _hw_init(self):
+    self._front_is_valid = False
     self.reset()
     self.cmd(0xAE)                                   # display OFF
     self.cmd(self._bias)                             # A3 (1/7) or A2 (1/9)
@@ -153,6 +173,9 @@ class ST7565(framebuf.FrameBuffer):
 
   def set_colstart(self, colstart: int):
     self._colstart = colstart & 0x7F
+    self._page_cmd[1] = 0x10 | ((self._colstart >> 4) & 0x0F)  # high column (with offset)
+    self._page_cmd[2] = self._colstart & 0x0F                    # low column  (with offset)
+    self._front_is_valid = False
 
   def set_orientation(self, *, adc_reverse=None, com_reverse=None):
     """
@@ -165,20 +188,45 @@ class ST7565(framebuf.FrameBuffer):
       # com_reverse=True -> use C8, i.e., normal=False
       self.set_com_scan(not bool(com_reverse))
 
+  def flush_begin(self):
+    """
+    Copy the pages that changed since the last flush to the front buffer.
+    return: bitmask of the pages to send with flush_page()
+    """
+    dirty = 0
+    for page in range(self.pages):
+      back = self._back_pages[page]
+      front = self._front_pages[page]
+      if not self._front_is_valid or back != front:
+        front[:] = back
+        dirty |= 1 << page
+    self._front_is_valid = True
+    return dirty
+
+  def flush_page(self, page):
+    """Send one page (128 bytes) of the front buffer, column offset applied"""
+    cmd = self._page_cmd
+    cmd[0] = 0xB0 | page   # page address
+    self.cs(0)
+    self.dc(0)
+    self.spi.write(cmd)
+    self.dc(1)
+    self.spi.write(self._front_pages[page])
+    self.cs(1)
+
+  def invalidate(self):
+    """Send every page on the next flush (panel RAM was changed elsewhere)"""
+    self._front_is_valid = False
+
   def show(self):
     """
-    Flush the framebuffer to the LCD applying the column offset (colstart).
+    Flush the framebuffer to the LCD applying the column offset (colstart):
+    only the pages that changed, all in one go.
     """
-    off = self._colstart & 0x7F
-    hi = 0x10 | ((off >> 4) & 0x0F)
-    lo = 0x00 | (off & 0x0F)
+    dirty = self.flush_begin()
     for page in range(self.pages):
-      self.cmd(0xB0 | page)  # page address
-      self.cmd(hi)           # high column (with offset)
-      self.cmd(lo)           # low column  (with offset)
-      start = page * self.width
-      end = start + self.width
-      self.data(self.buf[start:end])
+      if dirty & (1 << page):
+        self.flush_page(page)
 
 
 # -------- Wrapper with PWM backlight (same public API you used) -------------
@@ -8,6 +8,7 @@
 
 import framebuf
 from uctypes import bytearray_at, addressof
+from lcd.font_metrics import widths, ink_width
 
 __version__ = (0, 5, 3)
 
@@ -48,6 +49,7 @@ class Writer:
     if self.devid not in Writer.state:
       Writer.state[self.devid] = DisplayState()
     self.font = font
+    self._min_ch, self._widths = widths(font)
     if font.height() >= device.height or font.max_width() >= device.width:
       raise ValueError("Font too large for screen")
     if font.hmap():
@@ -144,14 +146,19 @@ class Writer:
       return 0
     sc = self._getstate().text_col
     wd = self.screenwidth
+    lo = self._min_ch
+    table = self._widths
+    n = len(table) - 1
     l = 0
-    for char in string[:-1]:
-      _, _, char_width = self.font.get_ch(char)
-      l += char_width
+    last = len(string) - 1
+    for k in range(last):
+      i = ord(string[k]) - lo
+      l += table[i] if 0 <= i < n else table[n]
       if oh and l + sc > wd:
         return True
-    char = string[-1]
-    _, _, char_width = self.font.get_ch(char)
+    char = string[last]
+    i = ord(char) - lo
+    char_width = table[i] if 0 <= i < n else table[n]
     if oh and l + sc + char_width > wd:
       l += self._truelen(char)
     else:
@@ -159,24 +166,7 @@ class Writer:
     return l + sc > wd if oh else l
 
   def _truelen(self, char):
-    glyph, ht, wd = self.font.get_ch(char)
-    div, mod = divmod(wd, 8)
-    gbytes = div + 1 if mod else div
-    mc = 0
-    data = glyph[(wd - 1) // 8]
-    for row in range(ht):
-      for col in range(wd - 1, -1, -1):
-        gbyte, gbit = divmod(col, 8)
-        if gbit == 0:
-          data = glyph[row * gbytes + gbyte]
-        if col <= mc:
-          break
-        if data & (1 << (7 - gbit)):
-          mc = col
-          break
-      if mc + 1 == wd:
-        break
-    return mc + 1
+    return ink_width(self.font, char)
 
   def _get_char(self, char, recurse):
     if not recurse:
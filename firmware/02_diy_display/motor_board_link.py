@@ -0,0 +1,73 @@
+# motor_board_link.py — the messages the main board sends to the display
+# over ESP-NOW, decoded and applied to Vars:
+# - DISPLAY_1 (ASCII, 4 Hz): battery, speed, flags, temperatures, BMS current
+# - DISPLAY_TRIP_1 (ASCII, every 2 s): odometer, trip, Wh, range
+# - BMS cells frame (binary, common/bms_cells_frame.py, on changes)
+# - VESC nodes frame (binary, common/motor_nodes_frame.py, 1 Hz)
+#
+# Several kinds arrive within one receive period, so escooter/main.py hands
+# every queued message here (ESPNowComms.get_all_data), not just the latest.
+
+from common.espnow_commands import COMMAND_ID_DISPLAY_1, COMMAND_ID_DISPLAY_TRIP_1
+from common import bms_cells_frame
+from common import motor_nodes_frame
+
+
+def decode_motor_board_message(msg):
+  # binary BMS cells and VESC nodes frames, the others are ASCII
+  if bms_cells_frame.is_cells_frame(msg):
+    return bms_cells_frame.unpack(msg)
+  if motor_nodes_frame.is_nodes_frame(msg):
+    return motor_nodes_frame.unpack(msg)
+  parts = [int(s) for s in msg.decode("ascii").split()]
+  if len(parts) == 12 and parts[0] == COMMAND_ID_DISPLAY_1:
+    return parts
+  if len(parts) == 8 and parts[0] == COMMAND_ID_DISPLAY_TRIP_1:
+    return parts
+  return None
+
+
+def apply_motor_board_message(vars, msg):
+  if len(msg) == 12 and msg[0] == COMMAND_ID_DISPLAY_1:
+    vars.battery_voltage_x10   = msg[1]
+    vars.battery_current_x10   = msg[2]
+    vars.battery_soc_x1000     = msg[3]
+    vars.motor_current_x10     = msg[4]
+    vars.wheel_speed_x10       = msg[5]
+    flags = msg[6]
+    vars.brakes_are_active       = bool(flags & (1 << 0))
+    vars.regen_braking_is_active = bool(flags & (1 << 1))
+    vars.battery_is_charging     = bool(flags & (1 << 2))
+    vars.mode = (flags >> 3) & 0x07
+    vars.cruise_control_is_active = bool(flags & (1 << 6))
+    vars.traction_control_is_active = bool(flags & (1 << 7))
+    vars.rear_vesc_temperature_x10 = msg[7]
+    vars.front_vesc_temperature_x10 = msg[8]
+    vars.rear_motor_temperature_x10 = msg[9]
+    vars.front_motor_temperature_x10 = msg[10]
+    vars.bms_battery_current_x10 = msg[11]
+  elif len(msg) == 8 and msg[0] == COMMAND_ID_DISPLAY_TRIP_1:
+    vars.odometer_m = msg[1]
+    vars.trip_m = msg[2]
+    vars.trip_wh_consumed_x10 = msg[3]
+    vars.trip_wh_regen_x10 = msg[4]
+    vars.trip_wh_per_km_x10 = msg[5]
+    vars.trip_avg_speed_x10 = msg[6]
+    vars.battery_range_m = msg[7]
+  elif msg[0] == bms_cells_frame.FRAME_ID:
+    flags = msg[1]
+    vars.bms_cell_imbalance_is_active = bool(flags & bms_cells_frame.FLAG_IMBALANCE)
+    vars.bms_cells_balancing = bool(flags & bms_cells_frame.FLAG_BALANCING)
+    vars.bms_protection_is_active = bool(flags & bms_cells_frame.FLAG_PROTECTION)
+    vars.bms_cell_count = msg[2]
+    vars.bms_weakest_cell = msg[3]
+    vars.bms_cell_min_mv = msg[4]
+    vars.bms_cell_max_mv = msg[5]
+    vars.bms_cell_delta_max_mv = msg[6]
+    vars.bms_protection_bits = msg[7]
+    vars.bms_protection_events = msg[9]
+  elif msg[0] == motor_nodes_frame.FRAME_ID:
+    # (can_id, flags, vesc_temperature_x10, motor_temperature_x10,
+    # motor_current_x10, battery_current_x10, slip_events) per VESC node,
+    # rear first
+    vars.motor_nodes = msg[1]
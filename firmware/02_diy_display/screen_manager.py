@@ -75,12 +75,15 @@ class ScreenManager:
     
 
   # ---- Core operations ----
-  def render(self, vars):
+  def render(self, vars, show=True):
+    """Draw the current screen; show=False leaves the flush to the caller
+    (ui_task flushes page by page)"""
     self._current.render(vars)
-    try:
-      self.fb.show()
-    except Exception:
-      pass
+    if show:
+      try:
+        self.fb.show()
+      except Exception:
+        pass
 
   def force(self, screen_id):
     """Switch to a screen by numeric ID (no strings!)."""
@@ -1,27 +1,63 @@
+import time
+import common.config_runtime as cfg
 from .base import BaseScreen
 from widgets.widget_text_box import WidgetTextBox
 from widgets.widget_battery_soc import BatterySOCWidget
+from charge_estimator import ChargeEstimator
 from fonts import robotobold18 as font1
 from fonts import robotobold14 as font2
 
+# Ah and Wh added take turns in the bottom middle field
+_AH_WH_SWAP_MS = 3000
+
+
+def _duration_text(minutes):
+  if minutes < 0:
+    return ''
+  if minutes == 0:
+    return 'full'
+  if minutes < 60:
+    return f"{minutes}m"
+  hours = min(minutes // 60, 99)
+  return f"{hours}h{minutes % 60:02}m"
+
+
 class ChargingScreen(BaseScreen):
   NAME = "Charging"
 
   def __init__(self, fb):
     super().__init__(fb)
+    # charge complete where the main board stops reporting charging
+    self._charge = ChargeEstimator(getattr(cfg, 'charge_current_threshold_a_x100', 50) // 10)
 
-  def on_enter(self):
-    self.clear()
-    
-    # Title
-    self._title = WidgetTextBox(
+  def _text_box(self, font, align, x1, y1, x2, y2):
+    widget = WidgetTextBox(
       self.fb, self.fb.width, self.fb.width,
-      font=font1,
-      align_inside="center"
+      font=font,
+      align_inside=align
     )
-    self._title.set_box(x1=0, y1=0, x2=self.fb.width - 1, y2=20)
-    self._title.update('Charging')
-    
+    widget.set_box(x1=x1, y1=y1, x2=x2, y2=y2)
+    widget.update('')
+    return widget
+
+  def on_enter(self):
+    self.clear()
+    now = time.ticks_ms()
+    self._charge.reset(now)
+
+    # Values drawn, so texts are only formatted and drawn on a change
+    self._power_w_previous = None
+    self._time_to_full_previous = None
+    self._voltage_x10_previous = None
+    self._soc_percent_previous = None
+    self._ah_wh_value_previous = None
+    self._show_wh = False
+    self._ah_wh_swap_ms = time.ticks_add(now, _AH_WH_SWAP_MS)
+
+    # Top: charge power and time to full
+    self._power = self._text_box(font1, "left", 0, 0, 60, 20)
+    self._time_to_full = self._text_box(font1, "right", 64, 0, self.fb.width - 1, 20)
+
     # Battery SOC widget
     batt_scale = 2
     batt_x = 18
@@ -31,29 +67,50 @@ class ChargingScreen(BaseScreen):
     self._battery_soc_widget.set_blink_timing(600, 300)
     self._battery_soc_widget.set_charging(True)
     self._battery_soc_widget.update(0)
-    
-    # Battery voltage
-    self._battery_voltage = WidgetTextBox(
-      self.fb, self.fb.width, self.fb.width,
-      font=font2,
-      align_inside="left"
-    )
-    self._battery_voltage.set_box(x1=26, y1=self.fb.height - 12, x2=26+37, y2=self.fb.height - 1)
-    self._battery_voltage.update('')
-
-    # Battery SOC  
-    self._battery_soc = WidgetTextBox(
-      self.fb, self.fb.width, self.fb.width,
-      font=font2,
-      align_inside="right"
-    )
-    self._battery_soc.set_box(x1=26+43, y1=self.fb.height - 12, x2=26+42+32, y2=self.fb.height - 1)
-    self._battery_soc.update('')
 
+    # Bottom: battery voltage, Ah / Wh added, SOC
+    y1 = self.fb.height - 12
+    y2 = self.fb.height - 1
+    self._battery_voltage = self._text_box(font2, "left", 0, y1, 36, y2)
+    self._ah_wh = self._text_box(font2, "center", 38, y1, 88, y2)
+    self._battery_soc = self._text_box(font2, "right", 90, y1, self.fb.width - 1, y2)
 
   def render(self, vars):
-
+    now = time.ticks_ms()
     battery_soc_x1000 = max(vars.battery_soc_x1000, 0)
-    self._battery_soc_widget.update(battery_soc_x1000//10)
-    self._battery_soc.update(f"{battery_soc_x1000 / 10:.0f} %")
-    self._battery_voltage.update(f"{vars.battery_voltage_x10 / 10:.1f} v")
+    # the charger current only goes through the BMS, positive while charging
+    charge = self._charge
+    charge.update(vars.battery_voltage_x10, vars.bms_battery_current_x10, battery_soc_x1000, now)
+
+    # blinks, so updated every frame (draws only on a change)
+    self._battery_soc_widget.update(battery_soc_x1000 // 10)
+
+    soc_percent = (battery_soc_x1000 + 5) // 10
+    if soc_percent != self._soc_percent_previous:
+      self._soc_percent_previous = soc_percent
+      self._battery_soc.update(f"{soc_percent} %")
+
+    if vars.battery_voltage_x10 != self._voltage_x10_previous:
+      self._voltage_x10_previous = vars.battery_voltage_x10
+      self._battery_voltage.update(f"{vars.battery_voltage_x10 / 10:.1f}v")
+
+    if charge.power_w != self._power_w_previous:
+      self._power_w_previous = charge.power_w
+      self._power.update(f"{charge.power_w}W")
+
+    if charge.time_to_full_min != self._time_to_full_previous:
+      self._time_to_full_previous = charge.time_to_full_min
+      self._time_to_full.update(_duration_text(charge.time_to_full_min))
+
+    if time.ticks_diff(now, self._ah_wh_swap_ms) >= 0:
+      self._ah_wh_swap_ms = time.ticks_add(now, _AH_WH_SWAP_MS)
+      self._show_wh = not self._show_wh
+      self._ah_wh_value_previous = None
+    # Ah with one decimal; the value compared is the one drawn
+    value = charge.wh_x10 // 10 if self._show_wh else charge.ah_x100 // 10
+    if value != self._ah_wh_value_previous:
+      self._ah_wh_value_previous = value
+      if self._show_wh:
+        self._ah_wh.update(f"{value}Wh")
+      else:
+        self._ah_wh.update(f"{value // 10}.{value % 10}Ah")
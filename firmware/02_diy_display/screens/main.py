@@ -5,7 +5,9 @@ from .base import BaseScreen
 from widgets.widget_battery_soc import BatterySOCWidget
 from widgets.widget_motor_power import MotorPowerWidget
 from widgets.widget_progress_bar import ProgressBarWidget
+from widgets.widget_sparkline import SparklineWidget
 from widgets.widget_text_box import WidgetTextBox
+from alerts import AlertEngine
 from fonts import robotobold12 as font_small, robotobold18 as font
 try:
   from native_fonts import robotobold50 as font_big
@@ -24,20 +26,10 @@ class MainScreen(BaseScreen):
     self._one_second = 0
     self._brakes_are_active_previous = ''
     self._lights_state_previous = ''
-    self._warning_queue = []
-    self._warning_current = None
-    self._warning_start_ms = 0
-    self._warning_text_previous = ''
-    self._warning_showing_progress_bar = False
-    self._warning_bar_kind = None
-    self._temp_bar_percents = {
-      "vr": 0,
-      "vf": 0,
-      "mr": 0,
-      "mf": 0,
-    }
+    self._alerts = None
     self._one_second = time.ticks_add(time.ticks_ms(), 1000)
-    self._mode_last_seen = None
+    self._sparkline_widget = None
+    self._sparkline_next_ms = 0
 
   def on_enter(self):
     on_enter_start_ms = time.ticks_ms()
@@ -51,18 +43,8 @@ class MainScreen(BaseScreen):
     self._wheel_speed_x10_previous = None
     self._brakes_are_active_previous = None
     self._lights_state_previous = None
-    self._warning_queue = []
-    self._warning_current = None
-    self._warning_start_ms = 0
-    self._warning_text_previous = ''
-    self._warning_showing_progress_bar = False
-    self._warning_bar_kind = None
-    self._temp_bar_percents = {
-      "vr": 0,
-      "vf": 0,
-      "mr": 0,
-      "mf": 0,
-    }
+    # Alerts start over (the first mode value seen is not a change)
+    self._alerts = AlertEngine(cfg)
     self._one_second = 0
 
     # Motor power widget
@@ -131,8 +113,6 @@ class MainScreen(BaseScreen):
     self._progress_bar_widget.draw_contour()
     self._progress_bar_widget.update(0)
     self._progress_bar_widget.set_visible(False, clear=True)
-    
-    self._mode_last_seen = None
 
     # Clock
     if cfg.enable_rtc_time:
@@ -144,6 +124,20 @@ class MainScreen(BaseScreen):
       self._clock_widget.set_box(x1=self.fb.width - 49, y1=self.fb.height - 17, x2=self.fb.width - 6, y2=self.fb.height - 2)
       self._clock_widget.update('')
 
+    # Power / speed history, between the battery and the clock (optional).
+    # Kept across screen changes: only redrawn on enter.
+    if cfg.main_screen_sparkline:
+      if self._sparkline_widget is None:
+        max_value = 100 if cfg.main_screen_sparkline == "power" else cfg.main_screen_sparkline_speed_max
+        self._sparkline_widget = SparklineWidget(
+          self.fb,
+          x=51, y=self.fb.height - 15,
+          width=26, height=14,
+          min_value=0, max_value=max_value,
+        )
+      self._sparkline_widget.redraw()
+      self._sparkline_next_ms = time.ticks_ms()
+
     if cfg.boot_timing_debug:
       elapsed_ms = time.ticks_diff(time.ticks_ms(), on_enter_start_ms)
       print("[boot screen +{:>4} ms] MainScreen.on_enter".format(elapsed_ms))
@@ -201,178 +195,30 @@ class MainScreen(BaseScreen):
           self._time_string_previous = vars.time_string
           self._clock_widget.update(vars.time_string)
 
-    # Progress bar (temperature percent)
-    self._update_temp_percents(vars)
-    if self._warning_showing_progress_bar:
-      percent = self._bar_percent(self._warning_bar_kind)
-      if percent <= 0:
-        self._warning_current = None
-        self._warning_showing_progress_bar = False
-        self._warning_bar_kind = None
-        self._progress_bar_widget.set_visible(False, clear=True)
+    # History graph: one column per sample
+    if self._sparkline_widget is not None and time.ticks_diff(now, self._sparkline_next_ms) >= 0:
+      self._sparkline_next_ms = time.ticks_add(now, cfg.main_screen_sparkline_sample_ms)
+      if cfg.main_screen_sparkline == "power":
+        self._sparkline_widget.push(vars.motor_power_percent)
       else:
-        self._progress_bar_widget.update(percent)
-
-    # Track mode value (enqueue on change)
-    if self._mode_last_seen is None:
-      self._mode_last_seen = vars.mode
-    elif vars.mode != self._mode_last_seen:
-      self._mode_last_seen = vars.mode
-      self._enqueue_warning(self._mode_text_from_vars())
-      
-    # Warning queue display (5s each)
-    self._tick_warning_queue()
-
-  def _mode_text_from_vars(self):
-    if self._mode_last_seen is None:
-      return ''
-    return f"mode {int(self._mode_last_seen)}"
-
-  def _enqueue_warning(self, text):
-    if text is None or text == '':
-      return
-    if not self._queue_has("text", text):
-      self._warning_queue.append(("text", text))
-
-  def _enqueue_progress_bar(self, kind):
-    self._warning_queue.append(("bar", kind))
-
-  def _enqueue_temp_bars(self):
-    if self._temp_bar_percents["vr"] > 0:
-      self._enqueue_progress_bar_unique("vr")
-    if self._temp_bar_percents["vf"] > 0:
-      self._enqueue_progress_bar_unique("vf")
-    if self._temp_bar_percents["mr"] > 0:
-      self._enqueue_progress_bar_unique("mr")
-    if self._temp_bar_percents["mf"] > 0:
-      self._enqueue_progress_bar_unique("mf")
-
-  def _queue_has(self, kind, payload):
-    for item in self._warning_queue:
-      if item[0] == kind and item[1] == payload:
-        return True
-    if self._warning_current is not None:
-      return self._warning_current[0] == kind and self._warning_current[1] == payload
-    return False
-
-  def _enqueue_progress_bar_unique(self, kind):
-    if not self._queue_has("bar", kind):
-      self._enqueue_progress_bar(kind)
-
-  def _remove_queue_items(self, kind, payload):
-    if not self._warning_queue:
-      return
-    self._warning_queue = [
-      item for item in self._warning_queue
-      if not (item[0] == kind and item[1] == payload)
-    ]
-
-  def _bar_percent(self, kind):
-    return self._temp_bar_percents.get(kind, 0)
-
-  def _bar_label(self, kind):
-    labels = {
-      "vr": "vr",
-      "vf": "vf",
-      "mr": "mr",
-      "mf": "mf",
-    }
-    return labels.get(kind, "")
-
-  def _temp_percent(self, temp_x10, min_x10, max_x10):
-    if max_x10 <= min_x10:
-      return 0
-    if temp_x10 <= min_x10:
-      return 0
-    if temp_x10 >= max_x10:
-      return 100
-    return int((temp_x10 - min_x10) * 100 / (max_x10 - min_x10))
-
-  def _update_temp_percents(self, vars):
-    self._temp_bar_percents["vr"] = self._temp_percent(
-      vars.rear_vesc_temperature_x10,
-      cfg.rear_motor_cfg.vesc_min_temperature_x10,
-      cfg.rear_motor_cfg.vesc_max_temperature_x10,
-    )
-    self._temp_bar_percents["mr"] = self._temp_percent(
-      vars.rear_motor_temperature_x10,
-      cfg.rear_motor_cfg.min_temperature_x10,
-      cfg.rear_motor_cfg.max_temperature_x10,
-    )
-
-    if cfg.front_motor_cfg is not None:
-      self._temp_bar_percents["vf"] = self._temp_percent(
-        vars.front_vesc_temperature_x10,
-        cfg.front_motor_cfg.vesc_min_temperature_x10,
-        cfg.front_motor_cfg.vesc_max_temperature_x10,
-      )
-      self._temp_bar_percents["mf"] = self._temp_percent(
-        vars.front_motor_temperature_x10,
-        cfg.front_motor_cfg.min_temperature_x10,
-        cfg.front_motor_cfg.max_temperature_x10,
-      )
+        self._sparkline_widget.push(abs(vars.wheel_speed_x10) // 10)
+
+    # Alerts (overheat bars, BMS, mode change): one at a time in the
+    # warning area
+    if self._alerts.update(vars, now):
+      self._show_alert()
+    elif self._alerts.percent_changed:
+      self._progress_bar_widget.update(self._alerts.current_percent)
+
+  def _show_alert(self):
+    alerts = self._alerts
+    if alerts.current_is_bar and alerts.current >= 0:
+      self._warning_widget.set_visible(False, clear=True)
+      self._progress_bar_widget.set_visible(True, clear=True)
+      self._progress_bar_widget.set_label_text(alerts.current_label)
+      self._progress_bar_widget.draw_contour()
+      self._progress_bar_widget.update(alerts.current_percent)
     else:
-      self._temp_bar_percents["vf"] = 0
-      self._temp_bar_percents["mf"] = 0
-
-    for kind in ("vr", "vf", "mr", "mf"):
-      if self._temp_bar_percents[kind] <= 0:
-        self._remove_queue_items("bar", kind)
-
-    if self._warning_bar_kind is not None and self._bar_percent(self._warning_bar_kind) <= 0:
-      self._warning_current = None
-      self._warning_showing_progress_bar = False
-      self._warning_bar_kind = None
       self._progress_bar_widget.set_visible(False, clear=True)
-
-  def _tick_warning_queue(self):
-    now = time.ticks_ms()
-    if self._warning_current is None:
-      if not self._warning_queue:
-        self._enqueue_temp_bars()
-      while self._warning_queue:
-        kind, payload = self._warning_queue.pop(0)
-        if kind == "bar":
-          percent = self._bar_percent(payload)
-          if percent <= 0:
-            continue
-          self._warning_current = ("bar", payload)
-          self._warning_start_ms = now
-          self._warning_showing_progress_bar = True
-          self._warning_bar_kind = payload
-          self._warning_widget.set_visible(False, clear=True)
-          self._progress_bar_widget.set_visible(True, clear=True)
-          self._progress_bar_widget.set_label_text(self._bar_label(payload))
-          self._progress_bar_widget.draw_contour()
-          self._progress_bar_widget.update(percent)
-          break
-        else:
-          self._warning_current = ("text", payload)
-          self._warning_start_ms = now
-          if payload != self._warning_text_previous:
-            self._warning_text_previous = payload
-          self._warning_showing_progress_bar = False
-          self._warning_bar_kind = None
-          self._progress_bar_widget.set_visible(False, clear=True)
-          self._warning_widget.set_visible(True, clear=True)
-          self._warning_widget.update(payload)
-          break
-    else:
-      if time.ticks_diff(now, self._warning_start_ms) > 2000:
-        kind, payload = self._warning_current
-        if kind == "bar":
-          if self._bar_percent(payload) > 0:
-            if self._warning_queue:
-              self._enqueue_progress_bar(payload)
-            else:
-              # Keep showing if nothing else is queued
-              self._warning_start_ms = now
-              return
-          else:
-            self._progress_bar_widget.set_visible(False, clear=True)
-            self._warning_showing_progress_bar = False
-            self._warning_bar_kind = None
-        self._warning_current = None
-        if self._warning_text_previous != '':
-          self._warning_text_previous = ''
-          self._warning_widget.update('')
+      self._warning_widget.set_visible(True, clear=True)
+      self._warning_widget.update(alerts.current_text if alerts.current >= 0 else '')
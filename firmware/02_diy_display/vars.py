@@ -23,6 +23,7 @@ class Vars:
     self.brakes_are_active = False
     self.regen_braking_is_active = False
     self.cruise_control_is_active = False
+    self.traction_control_is_active = False
     self.torque_weight = 0
     self.cadence = 0
     self.mode = 0
@@ -33,6 +34,24 @@ class Vars:
     self.front_vesc_temperature_x10 = 0
     self.rear_motor_temperature_x10 = 0
     self.front_motor_temperature_x10 = 0
+    self.odometer_m = 0
+    self.trip_m = 0
+    self.trip_wh_consumed_x10 = 0
+    self.trip_wh_regen_x10 = 0
+    self.trip_wh_per_km_x10 = 0
+    self.trip_avg_speed_x10 = 0
+    self.battery_range_m = -1 # -1 means value is invalid
+    self.bms_cell_count = 0
+    self.bms_weakest_cell = 0
+    self.bms_cell_min_mv = 0
+    self.bms_cell_max_mv = 0
+    self.bms_cell_delta_max_mv = 0
+    self.bms_cell_imbalance_is_active = False
+    self.bms_cells_balancing = False
+    self.bms_protection_is_active = False
+    self.bms_protection_bits = 0
+    self.bms_protection_events = 0
+    self.motor_nodes = ()
     self.turn_off_relay = False
     self.motor_enable_state = False
     self.lights_state = False
@@ -0,0 +1,122 @@
+# widgets/widget_sparkline.py
+# Small history graph (power or speed) drawn one column per sample.
+# - Samples are kept in an array('h') ring, one per column
+# - A new sample scrolls the widget's own MONO_VLSB buffer one column left,
+#   draws the new column and blits the buffer to the display, so the cost of
+#   a sample does not depend on how many are stored
+
+from array import array
+import framebuf
+
+BLACK = 1
+WHITE = 0
+
+
+class SparklineWidget:
+  def __init__(self, fb, x=0, y=0, width=32, height=16,
+               min_value=0, max_value=100, fg=BLACK, bg=WHITE):
+    self.fb = fb
+    self.x = int(x)
+    self.y = int(y)
+    self.w = int(width)
+    self.h = int(height)
+    self.fg = fg
+    self.bg = bg
+    self.visible = True
+
+    # Ring of the last w samples: _head is the next slot to write
+    self._samples = array('h', bytes(2 * self.w))
+    self._head = 0
+    self.count = 0
+    self._last_y = None
+
+    # Own buffer: MicroPython's FrameBuffer.scroll() moves the whole buffer
+    self._buf = bytearray(self.w * ((self.h + 7) // 8))
+    self._clip = framebuf.FrameBuffer(self._buf, self.w, self.h, framebuf.MONO_VLSB)
+    self.set_range(min_value, max_value)
+
+  def set_range(self, min_value, max_value):
+    """Values drawn from bottom (min) to top (max); redraws the stored samples"""
+    self.min_value = int(min_value)
+    self.max_value = int(max_value)
+    span = self.max_value - self.min_value
+    if span <= 0:
+      span = 1
+    # y offset from the bottom = (value - min) * scale >> 16
+    self._scale_q16 = ((self.h - 1) << 16) // span
+    self.redraw()
+
+  def _value_to_y(self, value):
+    value -= self.min_value
+    if value <= 0:
+      return self.h - 1
+    dy = (value * self._scale_q16) >> 16
+    if dy >= self.h - 1:
+      return 0
+    return self.h - 1 - dy
+
+  def _draw_column(self, x, y):
+    clip = self._clip
+    clip.vline(x, 0, self.h, self.bg)
+    last_y = self._last_y
+    if last_y is None:
+      clip.pixel(x, y, self.fg)
+    elif last_y < y:
+      # join the previous sample so steep changes stay readable
+      clip.vline(x, last_y + 1, y - last_y, self.fg)
+    elif last_y > y:
+      clip.vline(x, y, last_y - y, self.fg)
+    else:
+      clip.pixel(x, y, self.fg)
+    self._last_y = y
+
+  def push(self, value):
+    """Add a sample and draw it at the right edge"""
+    value = int(value)
+    if value > 32767:
+      value = 32767
+    elif value < -32768:
+      value = -32768
+    self._samples[self._head] = value
+    self._head += 1
+    if self._head == self.w:
+      self._head = 0
+    if self.count < self.w:
+      self.count += 1
+
+    self._clip.scroll(-1, 0)
+    self._draw_column(self.w - 1, self._value_to_y(value))
+    if self.visible:
+      self.fb.blit(self._clip, self.x, self.y)
+
+  def samples(self):
+    """The stored samples, oldest first (new list: for tools and debug)"""
+    n = self.count
+    start = self._head - n
+    return [self._samples[(start + i) % self.w] for i in range(n)]
+
+  def clear(self):
+    self._head = 0
+    self.count = 0
+    self.redraw()
+
+  def redraw(self):
+    """Draw all the stored samples (range change, after being hidden)"""
+    self._clip.fill(self.bg)
+    self._last_y = None
+    x = self.w - self.count
+    start = self._head - self.count
+    for i in range(self.count):
+      self._draw_column(x + i, self._value_to_y(self._samples[(start + i) % self.w]))
+    if self.visible:
+      self.fb.blit(self._clip, self.x, self.y)
+
+  def set_visible(self, visible: bool, clear: bool = True):
+    visible = bool(visible)
+    if visible == self.visible:
+      return
+    self.visible = visible
+    if visible:
+      self.fb.blit(self._clip, self.x, self.y)
+    elif clear:
+      self.fb.fill_rect(self.x, self.y, self.w, self.h, self.bg)
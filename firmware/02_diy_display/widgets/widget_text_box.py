@@ -1,13 +1,14 @@
 # widget_text_box.py  — Low-RAM version (glyph-by-glyph into the box)
 import framebuf
-from lcd.writer import Writer
+from lcd.glyph_cache import get_glyph
+from lcd.font_metrics import widths
 
-# FB that "reports" big dims so Writer accepts fonts if we ever need it
-class _FBWithWH(framebuf.FrameBuffer):
-  def __init__(self, buf, w, h, fmt, reported_w=None, reported_h=None):
-    super().__init__(buf, w, h, fmt)
-    self.width  = reported_w if reported_w is not None else w
-    self.height = reported_h if reported_h is not None else h
+from time import ticks_us, ticks_diff
+
+try:
+  from gc import mem_alloc
+except ImportError:
+  mem_alloc = None
 
 class WidgetTextBox:
   """
@@ -21,6 +22,12 @@ class WidgetTextBox:
       - Debug outline optional.
 
   Low-RAM: renders per-glyph straight into the box buffer, no full-text buffer.
+  The box buffer is MONO_VLSB like the display, allocated once and reused
+  (grown only if the box grows); glyphs come converted to MONO_VLSB from
+  lcd/glyph_cache.py, so an update allocates no bitmaps.
+
+  Counters: updates, update_us_last / update_us_max, alloc_bytes_last /
+  alloc_bytes_max (heap growth during an update, MicroPython only).
   """
 
   def __init__(self, fb, disp_w, disp_h, *, font,
@@ -61,14 +68,24 @@ class WidgetTextBox:
     self._text_pos = None         # absolute TEXT position (screen coords)
     self._text_pos_anchor = "topleft"
 
-    # Learn framebuf format from a Writer on the real framebuffer
-    wr = Writer(self.fb, self.font, verbose=False)
-    wr.set_clip(row_clip=True, col_clip=True, wrap=False)
-    wr.set_vclip(True)
-    self._map = wr.map
+    if not font.hmap():
+      raise ValueError("Font must be horizontally mapped.")
+    self._min_ch, self._widths = widths(font)
 
     self._prev_box = None
 
+    # Clip buffer, sized on the first draw
+    self._clip_buf = None
+    self._clip_fb = None
+    self._clip_w = 0
+    self._clip_h = 0
+
+    self.updates = 0
+    self.update_us_last = 0
+    self.update_us_max = 0
+    self.alloc_bytes_last = 0
+    self.alloc_bytes_max = 0
+
   # ---------- visibility API ----------
   def set_visible(self, visible: bool, clear: bool = True):
     """
@@ -116,12 +133,13 @@ class WidgetTextBox:
     return str(obj)
 
   def _text_size(self, s):
-    if not s:
-      return 0, self.font.height()
+    lo = self._min_ch
+    table = self._widths
+    n = len(table) - 1
     w = 0
     for ch in s:
-      _, _, cw = self.font.get_ch(ch)
-      w += cw
+      i = ord(ch) - lo
+      w += table[i] if 0 <= i < n else table[n]
     return w, self.font.height()
 
   def _box_from_coords(self, x1, y1, x2, y2):
@@ -156,6 +174,17 @@ class WidgetTextBox:
     if w and h:
       self.fb.fill_rect(x, y, w, h, self.bg)
 
+  def _clip(self, w, h):
+    # MONO_VLSB buffer for a w x h box, reused while the box size is the same
+    if w != self._clip_w or h != self._clip_h:
+      n = w * ((h + 7) // 8)
+      if self._clip_buf is None or len(self._clip_buf) < n:
+        self._clip_buf = bytearray(n)
+      self._clip_fb = framebuf.FrameBuffer(self._clip_buf, w, h, framebuf.MONO_VLSB)
+      self._clip_w = w
+      self._clip_h = h
+    return self._clip_fb
+
   def _box_outline(self, rect):
     x,y,w,h = rect
     if w and h:
@@ -218,6 +247,20 @@ class WidgetTextBox:
       # Don't draw while hidden (keeps RAM usage minimal)
       return
 
+    start_us = ticks_us()
+    alloc_start = mem_alloc() if mem_alloc is not None else 0
+    self._draw(s)
+    alloc = (mem_alloc() - alloc_start) if mem_alloc is not None else 0
+    us = ticks_diff(ticks_us(), start_us)
+    self.updates += 1
+    self.update_us_last = us
+    if us > self.update_us_max:
+      self.update_us_max = us
+    self.alloc_bytes_last = alloc
+    if alloc > self.alloc_bytes_max:
+      self.alloc_bytes_max = alloc
+
+  def _draw(self, s):
     # 1) Box (visible clip)
     if self._box_coords:
       bx, by, bw, bh = self._box_from_coords(*self._box_coords)
@@ -232,11 +275,8 @@ class WidgetTextBox:
       self._clear(self._prev_box)
     self._clear((bx, by, bw, bh))
 
-    # 3) Make the CLIP buffer (only buffer we allocate)
-    bytes_row_clip = (bw + 7) // 8
-    buf_clip = bytearray(bytes_row_clip * bh)
-    # Report bigger dims so we could use Writer on it if needed (not required here)
-    clipfb = _FBWithWH(buf_clip, bw, bh, self._map, self.font.max_width()+1, self.font.height()+1)
+    # 3) The CLIP buffer (only buffer we allocate, once)
+    clipfb = self._clip(bw, bh)
     clipfb.fill(self.bg)
 
     # 4) Compute base placement of the *text top-left* inside the clip buffer
@@ -269,9 +309,9 @@ class WidgetTextBox:
     # 5) Render GLYPH-BY-GLYPH into the clip buffer (low RAM)
     advance_x = 0
     for ch in s:
-      glyph, gh, gw = self.font.get_ch(ch)
+      gf, gh, gw = get_glyph(self.font, ch)
       # skip empty glyphs safely
-      if gw <= 0 or gh <= 0 or glyph is None:
+      if gf is None:
         continue
 
       # Destination for this glyph inside the clip buffer
@@ -283,23 +323,14 @@ class WidgetTextBox:
         advance_x += gw
         continue
 
-      # Prepare a FrameBuffer over the glyph bitmap (mono)
-      # (bytearray() makes a mutable copy; cost ~ceil(gw/8)*gh bytes per glyph)
-      try:
-        gbuf = bytearray(glyph)
-      except MemoryError:
-        # if we still hit RAM limits, skip this glyph gracefully
-        advance_x += gw
-        continue
-      gf = framebuf.FrameBuffer(gbuf, gw, gh, self._map)
-
       # Blit glyph into the clip buffer; negative gx/gy are fine (it clips)
       clipfb.blit(gf, gx, gy)
 
       advance_x += gw  # move to next glyph position
 
     if self.invert:
-      for i in range(len(buf_clip)):
+      buf_clip = self._clip_buf
+      for i in range(bw * ((bh + 7) // 8)):
         buf_clip[i] ^= 0xFF
 
     # 6) Blit the clipped buffer to the screen
@@ -0,0 +1,38 @@
+# bms_cells_frame.py — compact binary BMS cell telemetry, main board to
+# display over ESP-NOW. The other messages are ASCII and start with a digit,
+# so the display tells this one apart by its first byte.
+#
+# Layout (little endian, 18 bytes):
+#   id, flags, cell_count, weakest_cell (1 based),
+#   min_mv, max_mv, delta_max_mv (highest delta since power on),
+#   protection_bits, balance_mask (u32), protection_events (total)
+
+import struct
+
+FRAME_ID = 0xC1
+
+FLAG_IMBALANCE = 0x01
+FLAG_BALANCING = 0x02
+FLAG_PROTECTION = 0x04
+
+_FORMAT = "<BBBBHHHHIH"
+FRAME_LEN = struct.calcsize(_FORMAT)
+
+
+def is_cells_frame(msg):
+  return len(msg) == FRAME_LEN and msg[0] == FRAME_ID
+
+
+def pack_into(buf, flags, cell_count, weakest_cell, min_mv, max_mv, delta_max_mv,
+              protection_bits, balance_mask, protection_events):
+  struct.pack_into(
+    _FORMAT, buf, 0,
+    FRAME_ID, flags, cell_count, weakest_cell,
+    min_mv, max_mv, delta_max_mv,
+    protection_bits, balance_mask, protection_events & 0xFFFF)
+  return buf
+
+
+def unpack(msg):
+  """return: the frame fields as a tuple, [0] is FRAME_ID"""
+  return struct.unpack_from(_FORMAT, msg, 0)
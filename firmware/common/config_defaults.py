@@ -0,0 +1,31 @@
+# Defaults shared by common/config_runtime.py and tools/freeze_config.py.
+
+# Optional settings a config_*.py may leave out (mostly used by
+# 03_diy_lights_board, the display boot logging, alerts and main screen).
+OPTIONAL_DEFAULTS = {
+  "tail_always_enabled": False,
+  "brake_tail_blink_enable": False,
+  "brake_tail_on_ms": 400,
+  "brake_tail_off_ms": 100,
+  "boot_timing_debug": False,
+  "auto_lights_schedule_enabled": False,
+  "auto_lights_schedule_enabled_at_boot_only": False,
+  "auto_lights_on_hour": 19,
+  "auto_lights_on_minute": 0,
+  "auto_lights_off_hour": 7,
+  "auto_lights_off_minute": 0,
+  # display alerts: time each one stays on screen
+  "alert_overheat_display_ms": 2000,
+  "alert_bms_display_ms": 2000,
+  "alert_mode_display_ms": 2000,
+  "alert_info_display_ms": 2000,
+  # display main screen history graph: "" (off), "power" (motor power %)
+  # or "speed" (km/h, 0 to main_screen_sparkline_speed_max)
+  "main_screen_sparkline": "",
+  "main_screen_sparkline_sample_ms": 1000,
+  "main_screen_sparkline_speed_max": 40,
+}
+
+# Name of the frozen snapshot module written by tools/freeze_config.py.
+# It must not match the config_*.py pattern used for root discovery.
+FROZEN_CONFIG_MODULE = "frozen_config"
@@ -10,12 +10,63 @@ class Cfg(object):
     self.jbd_bms_bluetooth_name = ''
     self.charge_current_threshold_a_x100 = 0
     self.charge_detect_hold_ms = 0
+    # JBD BMS poll period: BLE shares the radio with ESP-NOW, so poll slower
+    # while riding and faster while charging
+    self.bms_query_period_ms = 1000
+    self.bms_query_period_charging_ms = 500
+    self.bms_query_period_riding_ms = 2000
+    # JBD BMS cell imbalance warning on the display: max - min cell voltage
+    self.cell_imbalance_warning_mv = 100
     self.save_mode_to_nvs = False
+    # Settings (mode, ...) are committed to NVS only after no changes for
+    # this time, or when the motors are disabled
+    self.settings_commit_quiet_ms = 5000
+    # Battery SoC / range estimator (see 01_diy_main_board/soc_estimator.py).
+    # Disabled when battery_cells_series is 0: the VESC STATUS_7 SoC is used.
+    # battery_capacity_ah is replaced by the JBD BMS full capacity when
+    # connected; battery_cell_ocv_curve is [(cell_mv, soc_percent), ...] or
+    # None for a Li-ion NMC curve; battery_internal_resistance_mohm is the
+    # starting value of the pack resistance estimate.
+    self.battery_cells_series = 0
+    self.battery_capacity_ah = 0.0
+    self.battery_cell_ocv_curve = None
+    self.battery_internal_resistance_mohm = 100
+    self.range_wh_per_km_default = 15.0
+    # Optional per-mode throttle response curves: list indexed by mode of
+    # [(input_percent, output_percent), ...] or None for linear.
+    self.throttle_response_curves = None
+    # Traction control (dual motor only, see 01_diy_main_board/traction_control.py):
+    # a wheel is slipping when it is faster (or slower, braking) than the
+    # other wheel by more than traction_slip_percent (at least
+    # traction_slip_min_mm_s) while accelerating harder than
+    # traction_max_accel_mm_s2. Its current limits are then cut down to
+    # traction_limit_min_percent and ramped back after.
+    self.traction_control_enabled = False
+    self.traction_slip_percent = 20
+    self.traction_slip_min_mm_s = 1000
+    self.traction_max_accel_mm_s2 = 15000
+    self.traction_limit_min_percent = 30
+    # CAN bus supervisor (see 01_diy_main_board/can_supervisor.py): a VESC
+    # is lost when no STATUS_1 came for can_node_timeout_ms, then the motors
+    # get zero current until it is back and the throttle released. After
+    # bus-off the controller is restarted, retried with a backoff doubling
+    # from can_restart_backoff_min_ms up to can_restart_backoff_max_ms.
+    # Bus load and error counters are printed every can_telemetry_print_ms
+    # (0: only on a state change).
+    self.can_node_timeout_ms = 300
+    self.can_restart_backoff_min_ms = 100
+    self.can_restart_backoff_max_ms = 5000
+    self.can_telemetry_print_ms = 10000
 
 
 class MotorCfg(object):
+  # rear_motor_cfg, front_motor_cfg (or None), then optional motor_3_cfg,
+  # motor_4_cfg, ... for more VESC nodes on the CAN bus
   def __init__(self, can_id):
     self.can_id = can_id
+    # False for a VESC that drives no wheel (accessory): its telemetry is
+    # decoded and sent to the display, it is never commanded
+    self.drives_wheel = True
     self.can_tx_pin = None
     self.can_rx_pin = None
     self.can_baudrate = None
@@ -34,6 +85,12 @@ class MotorCfg(object):
     self.battery_current_limit_min_max_speed = 0
     self.battery_current_limit_min_max = 0
     self.battery_current_limit_min_min = 0
+    # Optional multi-point curves [(speed_kmh, amps), ...]; when None the
+    # two-point ramps above are used (see 01_diy_main_board/motor_limits.py)
+    self.motor_current_limit_max_curve = None
+    self.motor_current_limit_min_curve = None
+    self.battery_current_limit_max_curve = None
+    self.battery_current_limit_min_curve = None
     self.motor_erpm_max_speed_limit = 0
     self.motor_max_current_limit_max = 0
     self.motor_min_current_start = 0
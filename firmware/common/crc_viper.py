@@ -0,0 +1,37 @@
+# crc_viper.py — native (viper) versions of the common/crc.py loops. Only
+# imported by common/crc.py, which falls back to plain Python when this
+# module can't be compiled (no micropython module or no native emitter).
+
+import micropython
+
+
+@micropython.viper
+def crc16_ccitt_viper(data, start: int, end: int, crc: int, table) -> int:
+  buf = ptr8(data)
+  tbl = ptr16(table)
+  i = start
+  while i < end:
+    crc = ((crc << 8) & 0xFFFF) ^ tbl[((crc >> 8) ^ buf[i]) & 0xFF]
+    i += 1
+  return crc
+
+
+@micropython.viper
+def crc16_modbus_viper(data, start: int, end: int, crc: int, table) -> int:
+  buf = ptr8(data)
+  tbl = ptr16(table)
+  i = start
+  while i < end:
+    crc = (crc >> 8) ^ tbl[(buf[i] ^ crc) & 0xFF]
+    i += 1
+  return crc
+
+
+@micropython.viper
+def sum16_viper(data, start: int, end: int, s: int) -> int:
+  buf = ptr8(data)
+  i = start
+  while i < end:
+    s += buf[i]
+    i += 1
+  return s & 0xFFFF
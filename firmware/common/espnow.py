@@ -83,6 +83,38 @@ class ESPNowComms:
 
     return decoded
 
+  def get_all_data(self, handler, max_msgs=16):
+    """
+    Decode every queued message, oldest first, and call handler(decoded)
+    for each one the decoder accepts. For peers that send several message
+    kinds: get_data() keeps only the latest one.
+    return: number of messages handled
+    """
+    handled = 0
+    for _ in range(max_msgs):
+      try:
+        host, msg = self._esp.recv(0)
+      except OSError:
+        break
+      except Exception as ex:
+        print("ESP-NOW recv error:", ex)
+        break
+      if not msg:
+        break
+      if self._decoder is None:
+        continue
+
+      try:
+        decoded = self._decoder(msg)
+      except Exception as ex:
+        print("ESP-NOW decode error:", ex)
+        continue
+
+      if decoded is not None:
+        handler(decoded)
+        handled += 1
+    return handled
+
   def send_data(self, *args):
     payload = self._encoder(*args)
     try:
@@ -1,4 +1,5 @@
 COMMAND_ID_DISPLAY_1 = 0
+COMMAND_ID_DISPLAY_TRIP_1 = 1
 COMMAND_ID_LIGHTS_1 = 0
 COMMAND_ID_MOTOR_1 = 0
 COMMAND_ID_POWER_SWITCH_1 = 0
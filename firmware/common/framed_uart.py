@@ -0,0 +1,141 @@
+# framed_uart.py — receive side of framed UART links (VESC, display).
+#
+# feed() appends whatever the UART returned into one preallocated buffer;
+# next_frame() scans for the start marker, validates the frame and returns a
+# memoryview of its payload straight from that buffer (no copies). Partial
+# frames stay buffered; garbage and broken frames are skipped until the next
+# start marker, so a frame starting inside a broken one is still found.
+#
+# A protocol subclasses FrameReceiver and defines:
+#   START          start marker (bytes)
+#   HEADER_LEN     bytes from the start marker needed to know the frame length
+#   frame_length(buf, i)      total frame length, 0 if the header is invalid
+#   frame_ok(buf, i, total)   checksum / end marker check
+#   payload_span(buf, i, total) -> (offset, length) of the payload
+
+try:
+  bytearray(1).find(b"\x00", 0, 1)
+  _HAS_FIND = True
+except (AttributeError, TypeError):
+  _HAS_FIND = False
+
+
+class FrameReceiver(object):
+  START = b""
+  HEADER_LEN = 1
+
+  def __init__(self, size=512):
+    """
+    :param int size: buffer size, at least twice the largest frame
+    """
+    self._buf = bytearray(size)
+    self._mv = memoryview(self._buf)
+    self._head = 0
+    self._tail = 0
+    self.frames = 0
+    self.crc_errors = 0
+    self.resyncs = 0
+    self.overflows = 0
+
+  # protocol hooks
+  def frame_length(self, buf, i):
+    raise NotImplementedError
+
+  def frame_ok(self, buf, i, total):
+    raise NotImplementedError
+
+  def payload_span(self, buf, i, total):
+    raise NotImplementedError
+
+  @property
+  def pending(self):
+    """Bytes buffered and not yet consumed"""
+    return self._tail - self._head
+
+  def feed(self, data):
+    """Append received bytes (bytes, bytearray or memoryview). Payload
+    memoryviews returned before are not valid after this call."""
+    n = len(data)
+    size = len(self._buf)
+    if n > size:
+      data = memoryview(data)[n - size:]
+      n = size
+
+    if self._tail + n > size:
+      # compact only when there is no room at the end
+      pending = self._tail - self._head
+      if pending + n > size:
+        # can't hold it all: drop the oldest bytes, the scan resyncs after
+        self.overflows += 1
+        self._head += pending + n - size
+        pending = size - n
+      if self._head:
+        self._mv[0:pending] = self._mv[self._head:self._tail]
+      self._head = 0
+      self._tail = pending
+
+    self._mv[self._tail:self._tail + n] = data
+    self._tail += n
+
+  def clear(self):
+    self._head = 0
+    self._tail = 0
+
+  def _find_start(self, start, end):
+    marker = self.START
+    if _HAS_FIND:
+      return self._buf.find(marker, start, end)
+    buf = self._buf
+    first = marker[0]
+    last = end - len(marker)
+    i = start
+    while i <= last:
+      if buf[i] == first and buf[i:i + len(marker)] == marker:
+        return i
+      i += 1
+    return -1
+
+  def next_frame(self):
+    """return: memoryview of the next frame payload (valid until the next
+    feed()), or None when no complete frame is buffered"""
+    buf = self._buf
+    marker_len = len(self.START)
+    while True:
+      head = self._head
+      tail = self._tail
+      if tail - head < marker_len:
+        return None
+
+      i = self._find_start(head, tail)
+      if i < 0:
+        # keep what could be the beginning of a start marker
+        keep = tail - (marker_len - 1)
+        if keep > head:
+          self.resyncs += 1
+          self._head = keep
+        return None
+      if i != head:
+        self.resyncs += 1
+        self._head = head = i
+
+      if tail - head < self.HEADER_LEN:
+        return None
+
+      total = self.frame_length(buf, head)
+      if total <= 0 or total > len(buf):
+        self.resyncs += 1
+        self._head = head + 1
+        continue
+
+      if tail - head < total:
+        return None
+
+      if not self.frame_ok(buf, head, total):
+        self.crc_errors += 1
+        self._head = head + 1
+        continue
+
+      offset, length = self.payload_span(buf, head, total)
+      self._head = head + total
+      self.frames += 1
+      return self._mv[head + offset:head + offset + length]
@@ -0,0 +1,55 @@
+# motor_nodes_frame.py — compact binary per VESC node telemetry, main board
+# to display over ESP-NOW, for any number of nodes (rear motor first, see
+# 01_diy_main_board/motor_nodes.py). Told apart from the ASCII messages by
+# its first byte, like common/bms_cells_frame.py.
+#
+# Layout (little endian, 2 + 12 bytes per node):
+#   id, node_count,
+#   per node: can_id, flags, vesc_temperature_x10, motor_temperature_x10,
+#             motor_current_x10, battery_current_x10, slip_events
+# slip_events: traction control slip onsets since boot (0 for the nodes
+# not driving a wheel)
+
+import struct
+
+FRAME_ID = 0xC2
+
+FLAG_ALIVE = 0x01
+FLAG_DRIVES_WHEEL = 0x02
+FLAG_TRACTION_LIMITED = 0x04
+
+_HEADER = "<BB"
+_NODE = "<BBhhhhH"
+_HEADER_LEN = struct.calcsize(_HEADER)
+NODE_LEN = struct.calcsize(_NODE)
+MAX_NODES = 8
+
+
+def frame_len(node_count):
+  return _HEADER_LEN + node_count * NODE_LEN
+
+
+def is_nodes_frame(msg):
+  return len(msg) >= _HEADER_LEN and msg[0] == FRAME_ID and \
+    msg[1] <= MAX_NODES and len(msg) == frame_len(msg[1])
+
+
+def pack_into(buf, node_count, can_ids, flags, vesc_temperature_x10, motor_temperature_x10,
+              motor_current_x10, battery_current_x10, slip_events):
+  """Columns indexed by node; buf is frame_len(node_count) bytes"""
+  struct.pack_into(_HEADER, buf, 0, FRAME_ID, node_count)
+  offset = _HEADER_LEN
+  for i in range(node_count):
+    struct.pack_into(
+      _NODE, buf, offset,
+      can_ids[i], flags[i], vesc_temperature_x10[i], motor_temperature_x10[i],
+      motor_current_x10[i], battery_current_x10[i], slip_events[i])
+    offset += NODE_LEN
+  return buf
+
+
+def unpack(msg):
+  """return: (FRAME_ID, nodes), nodes a tuple of the per node field tuples"""
+  count = msg[1]
+  return (FRAME_ID, tuple(
+    struct.unpack_from(_NODE, msg, _HEADER_LEN + i * NODE_LEN) for i in range(count)))
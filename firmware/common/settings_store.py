@@ -0,0 +1,259 @@
+# settings_store.py — persistent settings (mode, assist level, odometer, Wh
+# counters) kept in RAM and written as one record, coalescing changes.
+#
+#   store = SettingsStore(backend)
+#   store.set("mode", 1)        # RAM only, marks the record dirty
+#   store.tick()                # from a background task: commits once the
+#                               # values were quiet for quiet_ms, or at the
+#                               # latest max_delay_ms after the first change
+#   store.flush()               # shutdown path: commit now if dirty
+#
+# Record: magic, sequence (u16), one int32 per key, sum16 checksum. Backends
+# with raw storage (CircuitPython microcontroller.nvm) rotate the record over
+# several slots and load the valid one with the newest sequence; ESP32 NVS
+# does its own wear levelling, so it keeps a single blob.
+
+import struct
+from common.crc import sum16
+
+try:
+  from time import ticks_ms, ticks_diff
+except ImportError:
+  # CircuitPython (ebike display): supervisor.ticks_ms() wraps at 2**29
+  from supervisor import ticks_ms
+
+  def ticks_diff(end, start):
+    diff = (end - start) & ((1 << 29) - 1)
+    return diff - (1 << 29) if diff & (1 << 28) else diff
+
+KEYS = (
+  "mode",
+  "assist_level",
+  "odometer_m",
+  "trip_m",
+  "wh_consumed_x10",
+  "wh_regen_x10",
+)
+
+_MAGIC = 0x5A
+_HEADER = "<BH"
+_HEADER_LEN = 3
+_CHECKSUM_LEN = 2
+
+
+def record_len(nr_keys=len(KEYS)):
+  return _HEADER_LEN + 4 * nr_keys + _CHECKSUM_LEN
+
+
+class MemoryBackend(object):
+  """RAM only: used when saving is disabled, and as fake NVS on the host
+  (counts writes and commits)."""
+
+  def __init__(self, slots=1):
+    self.slots = slots
+    self._data = [None] * slots
+    self.writes = 0
+    self.commits = 0
+
+  def read(self, slot):
+    return self._data[slot]
+
+  def write(self, slot, data):
+    self._data[slot] = bytes(data)
+    self.writes += 1
+
+  def commit(self):
+    self.commits += 1
+
+
+class EspNvsBackend(object):
+  """MicroPython esp32.NVS blob (NVS is wear levelled already: one slot)"""
+
+  slots = 1
+
+  def __init__(self, namespace, key="settings"):
+    import esp32
+    self._nvs = esp32.NVS(namespace)
+    self._key = key
+    self._buf = bytearray(64)
+    self.commits = 0
+
+  def read(self, slot):
+    try:
+      n = self._nvs.get_blob(self._key, self._buf)
+    except OSError:
+      return None
+    return self._buf[:n]
+
+  def write(self, slot, data):
+    self._nvs.set_blob(self._key, data)
+
+  def commit(self):
+    self._nvs.commit()
+    self.commits += 1
+
+  def get_i32(self, key):
+    """An int32 key of the same namespace, as older versions saved single
+    values (None when missing)"""
+    try:
+      return self._nvs.get_i32(key)
+    except OSError:
+      return None
+
+
+def carry_over_i32(store, backend, keys):
+  """Older versions kept some values as their own NVS int32 keys: copy them
+  into a store that has no record yet. set() marks the store dirty, so the
+  next commit writes the record and the old keys are not read again."""
+  if store.loaded or not hasattr(backend, "get_i32"):
+    return
+  for key in keys:
+    value = backend.get_i32(key)
+    if value is not None:
+      store.set(key, value)
+
+
+class NvmBackend(object):
+  """CircuitPython microcontroller.nvm (raw bytes): the record rotates over
+  the slots that fit in [offset, offset + size)"""
+
+  def __init__(self, nvm, offset, size, nr_keys=len(KEYS)):
+    self._nvm = nvm
+    self._offset = offset
+    self._record_len = record_len(nr_keys)
+    self.slots = max(1, size // self._record_len)
+    self.commits = 0
+
+  def read(self, slot):
+    start = self._offset + slot * self._record_len
+    return self._nvm[start:start + self._record_len]
+
+  def write(self, slot, data):
+    start = self._offset + slot * self._record_len
+    self._nvm[start:start + self._record_len] = data
+
+  def commit(self):
+    # nvm writes are immediate
+    self.commits += 1
+
+
+class SettingsStore(object):
+
+  def __init__(self, backend, keys=KEYS, quiet_ms=5000, max_delay_ms=60000):
+    """
+    :param backend: MemoryBackend, EspNvsBackend or NvmBackend
+    :param keys: names of the int32 values in the record
+    :param int quiet_ms: commit only after no changes for this time
+    :param int max_delay_ms: commit anyway when values keep changing (trip
+      counters while riding) this long after the first unsaved change
+    """
+    self._backend = backend
+    self._keys = keys
+    self._index = {}
+    for i, key in enumerate(keys):
+      self._index[key] = i
+    self._values = [0] * len(keys)
+    self._record = bytearray(record_len(len(keys)))
+    self._quiet_ms = quiet_ms
+    self._max_delay_ms = max_delay_ms
+    self._seq = 0
+    self._slot = 0
+    self._dirty = False
+    self._changed_ms = 0
+    self._dirty_ms = 0
+    self.loaded = False
+    self.commits = 0
+    self._load()
+
+  def _parse(self, data):
+    # a shorter record, written before keys were added at the end, is valid too
+    if data is None or len(data) < record_len(0) or len(data) > len(self._record) or \
+        (len(data) - record_len(0)) % 4 or data[0] != _MAGIC:
+      return None
+    n = len(data)
+    if sum16(data, 0, n - _CHECKSUM_LEN) != struct.unpack_from("<H", data, n - _CHECKSUM_LEN)[0]:
+      return None
+    return struct.unpack_from(_HEADER, data, 0)[1]
+
+  def _load(self):
+    best_slot = -1
+    best_seq = 0
+    for slot in range(self._backend.slots):
+      try:
+        seq = self._parse(self._backend.read(slot))
+      except Exception:
+        seq = None
+      if seq is None:
+        continue
+      # sequence wraps at 16 bits: newer when (seq - best) mod 2**16 is small
+      if best_slot < 0 or ((seq - best_seq) & 0xFFFF) < 0x8000:
+        best_slot = slot
+        best_seq = seq
+    if best_slot < 0:
+      return
+
+    data = self._backend.read(best_slot)
+    for i in range((len(data) - record_len(0)) // 4):
+      self._values[i] = struct.unpack_from("<i", data, _HEADER_LEN + 4 * i)[0]
+    self._seq = best_seq
+    self._slot = best_slot
+    self.loaded = True
+
+  def get(self, key, default=0):
+    i = self._index.get(key)
+    return default if i is None else self._values[i]
+
+  def set(self, key, value):
+    i = self._index[key]
+    value = int(value)
+    if self._values[i] != value:
+      self._values[i] = value
+      now = ticks_ms()
+      if not self._dirty:
+        self._dirty = True
+        self._dirty_ms = now
+      self._changed_ms = now
+
+  def add(self, key, delta):
+    if delta:
+      self.set(key, self._values[self._index[key]] + delta)
+
+  @property
+  def dirty(self):
+    return self._dirty
+
+  def tick(self):
+    """Commit when dirty and the values were quiet for quiet_ms (or dirty
+    for max_delay_ms). return: True if a commit was done"""
+    if not self._dirty:
+      return False
+    now = ticks_ms()
+    if ticks_diff(now, self._changed_ms) >= self._quiet_ms or \
+        ticks_diff(now, self._dirty_ms) >= self._max_delay_ms:
+      return self.flush()
+    return False
+
+  def flush(self):
+    """Commit now if there are unsaved changes (shutdown path)"""
+    if not self._dirty:
+      return False
+
+    self._seq = (self._seq + 1) & 0xFFFF
+    if self.loaded or self.commits:
+      self._slot = (self._slot + 1) % self._backend.slots
+    record = self._record
+    struct.pack_into(_HEADER, record, 0, _MAGIC, self._seq)
+    for i, value in enumerate(self._values):
+      struct.pack_into("<i", record, _HEADER_LEN + 4 * i, value)
+    n = len(record)
+    struct.pack_into("<H", record, n - _CHECKSUM_LEN, sum16(record, 0, n - _CHECKSUM_LEN))
+
+    try:
+      self._backend.write(self._slot, record)
+      self._backend.commit()
+    except Exception as ex:
+      print("settings store: commit failed:", ex)
+      return False
+    self._dirty = False
+    self.commits += 1
+    return True
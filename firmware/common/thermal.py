@@ -0,0 +1,107 @@
+# thermal.py — NTC conversion through a precomputed lookup table and
+# temperature based current derating. No hardware imports: shared by the
+# ebike (CircuitPython) and escooter (MicroPython) main boards.
+
+import math
+from array import array
+
+# ADC points in the NTC table: index i is ADC value i << _TABLE_SHIFT (16 bit ADC)
+_TABLE_SHIFT = 8
+_TABLE_SIZE = (65536 >> _TABLE_SHIFT) + 1
+
+# Conversion range, temperatures outside are clamped
+_MIN_TEMPERATURE_X10 = -400
+_MAX_TEMPERATURE_X10 = 2000
+
+# Derating factor is in permille
+DERATING_NONE = 1000
+
+
+def _ntc_temperature_x10(adc, series_resistor, nominal_resistance, nominal_temperature, b_coefficient, high_side):
+  # same as adafruit_thermistor (10 bit reading)
+  reading = adc / 64.0
+  if reading <= 0 or reading >= 1023:
+    return None
+  if high_side:
+    resistance = (1023 * series_resistor) / reading - series_resistor
+  else:
+    resistance = series_resistor / (1023 / reading - 1)
+  if resistance <= 0:
+    return None
+  steinhart = math.log(resistance / nominal_resistance) / b_coefficient
+  steinhart += 1.0 / (nominal_temperature + 273.15)
+  return int((1.0 / steinhart - 273.15) * 10)
+
+
+def build_ntc_table(series_resistor, nominal_resistance, nominal_temperature, b_coefficient, high_side=False):
+  """ADC (16 bit) to temperature x10 table, built once at boot (the only
+  place with float/log math)."""
+  table = array('h', [0] * _TABLE_SIZE)
+  for i in range(_TABLE_SIZE):
+    t = _ntc_temperature_x10(
+      min(65535, i << _TABLE_SHIFT),
+      series_resistor,
+      nominal_resistance,
+      nominal_temperature,
+      b_coefficient,
+      high_side)
+    if t is None:
+      # open/short circuit end of the range: hottest or coldest, depending on
+      # which side the NTC is
+      t = _MIN_TEMPERATURE_X10 if (i == 0) == high_side else _MAX_TEMPERATURE_X10
+    table[i] = max(_MIN_TEMPERATURE_X10, min(_MAX_TEMPERATURE_X10, t))
+  return table
+
+
+def adc_to_temperature_x10(table, adc):
+  """Linear interpolation on a build_ntc_table() table"""
+  i = adc >> _TABLE_SHIFT
+  if i >= _TABLE_SIZE - 1:
+    return table[_TABLE_SIZE - 1]
+  t0 = table[i]
+  frac = adc - (i << _TABLE_SHIFT)
+  return t0 + (((table[i + 1] - t0) * frac) >> _TABLE_SHIFT)
+
+
+def derating_permille(temperature_x10, start_x10, end_x10):
+  """1000 up to start_x10, linear down to 0 at end_x10. No derating when
+  the range is not configured (end_x10 <= start_x10)."""
+  if end_x10 <= start_x10 or temperature_x10 <= start_x10:
+    return DERATING_NONE
+  if temperature_x10 >= end_x10:
+    return 0
+  return ((end_x10 - temperature_x10) * DERATING_NONE) // (end_x10 - start_x10)
+
+
+class ThermalDerating(object):
+  """
+  Current derating from controller (VESC) and motor temperatures, using the
+  MotorCfg vesc_min/max_temperature_x10 and min/max_temperature_x10 ranges.
+  """
+
+  def __init__(self, vesc_min_temperature_x10, vesc_max_temperature_x10, motor_min_temperature_x10, motor_max_temperature_x10):
+    self._vesc_start = vesc_min_temperature_x10
+    self._vesc_end = vesc_max_temperature_x10
+    self._motor_start = motor_min_temperature_x10
+    self._motor_end = motor_max_temperature_x10
+    self.permille = DERATING_NONE
+
+  @classmethod
+  def from_motor_cfg(cls, motor_cfg):
+    return cls(
+      motor_cfg.vesc_min_temperature_x10,
+      motor_cfg.vesc_max_temperature_x10,
+      motor_cfg.min_temperature_x10,
+      motor_cfg.max_temperature_x10)
+
+  def update(self, vesc_temperature_x10, motor_temperature_x10):
+    """Refresh and return the derating factor (permille)"""
+    vesc = derating_permille(vesc_temperature_x10, self._vesc_start, self._vesc_end)
+    motor = derating_permille(motor_temperature_x10, self._motor_start, self._motor_end)
+    self.permille = vesc if vesc < motor else motor
+    return self.permille
+
+  def scale_ma(self, current_ma):
+    if self.permille >= DERATING_NONE:
+      return current_ma
+    return (current_ma * self.permille) // DERATING_NONE
@@ -53,10 +53,19 @@ cfg.throttle_2_adc_over_max_error = 54500
 cfg.has_jbd_bms = True
 cfg.jbd_bms_bluetooth_name = 'BMS-FiidoQ1S'
 
+# Battery SoC / range estimator: 20S pack, capacity from the BMS
+cfg.battery_cells_series = 20
+
 # Charging detection
 cfg.charge_current_threshold_a_x100 = 50
 cfg.charge_detect_hold_ms = 1000
 
+# Traction control: cut the current of a wheel that spins up (or locks)
+# compared to the other wheel. Thresholds default to the Cfg() values.
+# Off until validated on this scooter (tools/sim_traction_control.py
+# covers the logic only).
+cfg.traction_control_enabled = False
+
 # Motors
 front_motor_cfg.poles_pair = 15
 rear_motor_cfg.poles_pair = 15
@@ -74,6 +83,8 @@ front_motor_cfg.motor_erpm_max_speed_limit = [
   13263   # ≈55 km/h
 ]
 
+# Thermal derating: full motor and battery current up to the min temperature,
+# linear down to 0 A at the max temperature (VESC and motor, regen unchanged)
 rear_motor_cfg.vesc_min_temperature_x10 = 850
 rear_motor_cfg.vesc_max_temperature_x10 = 1000
 rear_motor_cfg.min_temperature_x10 = 700
@@ -99,6 +110,9 @@ front_motor_cfg.battery_max_current_limit_min = -7.0
 rear_motor_cfg.battery_max_current_limit_min = -7.0
 
 # Speed-dependent current limiting
+# Each limit ramps linearly from 5 km/h to its *_speed value. For a
+# multi-point curve set e.g. rear_motor_cfg.motor_current_limit_max_curve =
+# [(5.0, 75.0), (15.0, 60.0), (30.0, 40.0)] as (km/h, A) pairs instead.
 front_motor_cfg.motor_current_limit_max_max = 30.0
 front_motor_cfg.motor_current_limit_max_min = 40.0
 front_motor_cfg.motor_current_limit_max_min_speed = 25.0
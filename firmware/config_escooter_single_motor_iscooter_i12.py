@@ -56,6 +56,8 @@ rear_motor_cfg.motor_erpm_max_speed_limit = [
   10130   # ≈40 km/h
 ]
 
+# Thermal derating: full motor and battery current up to the min temperature,
+# linear down to 0 A at the max temperature (VESC and motor, regen unchanged)
 rear_motor_cfg.vesc_min_temperature_x10 = 750
 rear_motor_cfg.vesc_max_temperature_x10 = 1000
 rear_motor_cfg.min_temperature_x10 = 650
@@ -69,6 +71,9 @@ rear_motor_cfg.battery_max_current_limit_max = 25.0
 rear_motor_cfg.battery_max_current_limit_min = -8.0
 
 # Speed-dependent current limiting
+# Each limit ramps linearly from 5 km/h to its *_speed value. For a
+# multi-point curve set e.g. rear_motor_cfg.motor_current_limit_max_curve =
+# [(5.0, 75.0), (15.0, 60.0), (30.0, 40.0)] as (km/h, A) pairs instead.
 rear_motor_cfg.motor_current_limit_max_max = 75.0
 rear_motor_cfg.motor_current_limit_max_min = 45.0
 rear_motor_cfg.motor_current_limit_max_min_speed = 15.0
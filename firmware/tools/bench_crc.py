@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# bench_crc.py — host tool (CPython) for common/crc.py: golden vector checks
+# and per-frame cost against the previous per-call implementations (table
+# list rebuilt on each call, JBD checksum summed over 8 sliced ranges).
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/bench_crc.py            # golden vectors only
+#   python3 tools/bench_crc.py --bench    # plus timings
+#
+# Exit code is 1 when a golden vector fails.
+
+import argparse
+import os
+import sys
+import timeit
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if FIRMWARE_DIR not in sys.path:
+  sys.path.insert(0, FIRMWARE_DIR)
+
+from common.crc import (  # noqa: E402
+  CRC16_CCITT_TABLE,
+  CRC16_MODBUS_TABLE,
+  crc16_ccitt,
+  crc16_modbus,
+  sum16,
+  jbd_checksum,
+)
+
+CHECK = b"123456789"
+
+GOLDEN = (
+  # (name, function, data, expected) — CRC catalogue "check" values
+  ("crc16_ccitt (XMODEM) check", crc16_ccitt, CHECK, 0x31C3),
+  ("crc16_modbus check", crc16_modbus, CHECK, 0x4B37),
+  ("crc16_ccitt empty", crc16_ccitt, b"", 0x0000),
+  ("crc16_modbus empty", crc16_modbus, b"", 0xFFFF),
+  # VESC COMM_GET_VALUES request: 02 01 04 40 84 03
+  ("crc16_ccitt VESC GET_VALUES", crc16_ccitt, b"\x04", 0x4084),
+  # JBD read BASIC request: DD A5 03 00 FF FD 77, checksum over 03 00
+  ("jbd CMD_BASIC", lambda d: jbd_checksum(sum16(d)), b"\x03\x00", 0xFFFD),
+  ("jbd CMD_CELLS", lambda d: jbd_checksum(sum16(d)), b"\x04\x00", 0xFFFC),
+)
+
+
+def _old_crc16_ccitt(data):
+  table = list(CRC16_CCITT_TABLE)  # the old code built this list on each call
+  crc = 0
+  for byte in data:
+    crc = (crc << 8) ^ table[(crc >> 8) ^ byte]
+    crc &= 0xFFFF
+  return crc
+
+
+def _old_crc16_modbus(data):
+  table = list(CRC16_MODBUS_TABLE)
+  crc = 0xFFFF
+  for byte in data:
+    xor = (byte ^ crc) & 0xff
+    crc >>= 8
+    crc ^= table[xor]
+    crc &= 0xFFFF
+  return crc
+
+
+def _old_jbd_frame_ok(f):
+  recv = (f[-3] << 8) | f[-2]
+  n = len(f)
+
+  def ok(start, end_excl):
+    if end_excl <= start:
+      return False
+    s = 0
+    for b in f[start:end_excl]:
+      s = (s + b) & 0xFFFF
+    return ((0x10000 - s) & 0xFFFF) == recv
+
+  for st in (0, 1, 2, 3):
+    for en in (n - 3, n - 4):
+      if ok(st, en):
+        return True
+  return False
+
+
+def _new_jbd_frame_ok(f):
+  # same as bms_jbd.JbdBmsClient._frame_ok
+  recv = (f[-3] << 8) | f[-2]
+  n = len(f)
+  core = sum16(f, 3, n - 4)
+  last = f[n - 4]
+  head = 0
+  for st in (3, 2, 1, 0):
+    if st < 3:
+      head += f[st]
+    s = core + head
+    if jbd_checksum((s + last) & 0xFFFF) == recv:
+      return True
+    if n - 4 > st and jbd_checksum(s & 0xFFFF) == recv:
+      return True
+  return False
+
+
+def golden():
+  ok = True
+  for name, fn, data, expected in GOLDEN:
+    got = fn(data)
+    status = "ok" if got == expected else "FAIL"
+    ok = ok and got == expected
+    print("{:32} 0x{:04X} (expected 0x{:04X}) {}".format(name, got, expected, status))
+
+  # incremental API: same result in pieces
+  for name, fn in (("crc16_ccitt", crc16_ccitt), ("crc16_modbus", crc16_modbus)):
+    crc = fn(CHECK, 0, 4)
+    crc = fn(CHECK, 4, len(CHECK), crc)
+    good = crc == fn(CHECK)
+    ok = ok and good
+    print("{:32} {}".format(name + " incremental", "ok" if good else "FAIL"))
+  return ok
+
+
+def bench():
+  vesc_values = bytes(range(74))  # COMM_GET_VALUES reply payload size
+  display = bytes(range(17))
+  jbd = bytearray([0xDD, 0x03, 0x00, 0x1B] + list(range(27)) + [0, 0, 0x77])
+  c = jbd_checksum(sum16(jbd, 2, len(jbd) - 3))
+  jbd[-3] = c >> 8
+  jbd[-2] = c & 0xFF
+  jbd = bytes(jbd)
+
+  cases = (
+    ("VESC values frame (74 B)", lambda: _old_crc16_ccitt(vesc_values), lambda: crc16_ccitt(vesc_values)),
+    ("display frame (17 B)", lambda: _old_crc16_modbus(display), lambda: crc16_modbus(display)),
+    ("JBD basic frame ok (34 B)", lambda: _old_jbd_frame_ok(jbd), lambda: _new_jbd_frame_ok(jbd)),
+  )
+  number = 20000
+  for name, old, new in cases:
+    t_old = min(timeit.repeat(old, number=number, repeat=3)) / number * 1e6
+    t_new = min(timeit.repeat(new, number=number, repeat=3)) / number * 1e6
+    print("{:28} old {:7.2f} us  new {:7.2f} us  x{:.1f}".format(name, t_old, t_new, t_old / t_new))
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Golden vectors and benchmark for common/crc.py")
+  parser.add_argument("--bench", action="store_true")
+  args = parser.parse_args(argv)
+  ok = golden()
+  if args.bench:
+    bench()
+  return 0 if ok else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# bench_font_metrics.py — host tool (CPython) for 02_diy_display/lcd/font_metrics.py:
+# checks the width tables and ink widths of every font against font.get_ch()
+# and a plain pixel scan, then times measuring typical
+# dashboard strings with a get_ch() call per character (the previous
+# WidgetTextBox._text_size / Writer.stringlen) and with the width table.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/bench_font_metrics.py [--number 20000]
+#
+# Exit code is 1 when a width differs. Also counts the characters where the
+# previous Writer._truelen differed (it tested bits of a stale byte after the
+# first row).
+
+import argparse
+import os
+import sys
+import timeit
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DISPLAY_DIR = os.path.join(FIRMWARE_DIR, "02_diy_display")
+for _path in (FIRMWARE_DIR, DISPLAY_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+from lcd import font_metrics  # noqa: E402
+from fonts import (  # noqa: E402
+  freesansbold50,
+  robotobold12,
+  robotobold14,
+  robotobold16,
+  robotobold18,
+  robotobold50,
+  robotomedium14,
+  robotomedium50,
+)
+
+FONTS = (
+  freesansbold50,
+  robotobold12,
+  robotobold14,
+  robotobold16,
+  robotobold18,
+  robotobold50,
+  robotomedium14,
+  robotomedium50,
+)
+
+# (font, strings) as drawn by the main, charging and boot screens
+DASHBOARD = (
+  (robotobold50, ["0", "5", "12", "25", "31", "99"]),
+  (robotobold18, ["12:07", "23:59", "85%", "1h20m"]),
+  (robotobold12, ["L", "B", "mo", "c120mV", "vr 70", "bms", "12.5 km"]),
+)
+
+
+def _get_ch_width(font, s):
+  # previous WidgetTextBox._text_size
+  w = 0
+  for ch in s:
+    _, _, cw = font.get_ch(ch)
+    w += cw
+  return w
+
+
+def _legacy_truelen(font, char):
+  # previous Writer._truelen
+  glyph, ht, wd = font.get_ch(char)
+  div, mod = divmod(wd, 8)
+  gbytes = div + 1 if mod else div
+  mc = 0
+  data = glyph[(wd - 1) // 8]
+  for row in range(ht):
+    for col in range(wd - 1, -1, -1):
+      gbyte, gbit = divmod(col, 8)
+      if gbit == 0:
+        data = glyph[row * gbytes + gbyte]
+      if col <= mc:
+        break
+      if data & (1 << (7 - gbit)):
+        mc = col
+        break
+    if mc + 1 == wd:
+      break
+  return mc + 1
+
+
+def _ink_reference(font, char):
+  glyph, ht, wd = font.get_ch(char)
+  gbytes = (wd + 7) // 8
+  last = 0
+  for row in range(ht):
+    for col in range(wd):
+      if glyph[row * gbytes + col // 8] & (0x80 >> (col % 8)):
+        last = max(last, col)
+  return last + 1
+
+
+def check():
+  ok = True
+  for font in FONTS:
+    chars = [chr(c) for c in range(font.min_ch(), font.max_ch() + 1)]
+    # out of range: the default glyph
+    chars += ["\x01", chr(font.max_ch() + 1), "°"]
+    bad = 0
+    legacy = 0
+    for ch in chars:
+      if font_metrics.text_width(font, ch) != font.get_ch(ch)[2]:
+        bad += 1
+      ink = font_metrics.ink_width(font, ch)
+      if ink != _ink_reference(font, ch):
+        bad += 1
+      if ink != _legacy_truelen(font, ch):
+        legacy += 1
+    print("{:16} {:3} chars {:>8}   (previous _truelen off on {})".format(
+      font.__name__.split(".")[-1], len(chars), "ok" if not bad else "{} FAIL".format(bad), legacy))
+    ok = ok and not bad
+  return ok
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Font width tables: check and timings")
+  parser.add_argument("--number", type=int, default=20000)
+  args = parser.parse_args(argv)
+
+  ok = check()
+  print()
+  print("{:12} {:>14} {:>14}".format("string", "get_ch us", "table us"))
+  for font, strings in DASHBOARD:
+    for s in strings:
+      t_old = timeit.timeit(lambda: _get_ch_width(font, s), number=args.number)
+      t_new = timeit.timeit(lambda: font_metrics.text_width(font, s), number=args.number)
+      print("{:12} {:14.2f} {:14.2f}".format(s, t_old * 1e6 / args.number, t_new * 1e6 / args.number))
+  return 0 if ok else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# bench_framed_uart.py — host tool (CPython) for common/framed_uart.py with
+# the VESC and display framers of the ebike main board.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/bench_framed_uart.py --fuzz [--seed 1] [--rounds 200]
+#       valid frames mixed with garbage, corrupted frames and random chunk
+#       sizes: every valid frame must come out, in order
+#   python3 tools/bench_framed_uart.py --bench
+#       parsing throughput (frames/s, kB/s) on a clean stream, fed in UART
+#       sized chunks; CPython numbers, only useful to compare changes
+#
+# Exit code is 1 when the fuzz check fails.
+
+import argparse
+import os
+import random
+import sys
+import time
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_BOARD_DIR = os.path.join(FIRMWARE_DIR, "01_diy_main_board")
+for _path in (FIRMWARE_DIR, MAIN_BOARD_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+from common.crc import crc16_ccitt, crc16_modbus  # noqa: E402
+from ebike.vesc_protocol import RxFramer  # noqa: E402
+from ebike.display_protocol import DisplayFramer  # noqa: E402
+
+
+def vesc_frame(payload):
+  crc = crc16_ccitt(payload)
+  return bytes([2, len(payload)]) + payload + bytes([crc >> 8, crc & 0xFF, 3])
+
+
+def display_frame(payload):
+  head = bytes([0, 1, 2, len(payload) + 4]) + payload
+  crc = crc16_modbus(head, 0, len(head))
+  return head + bytes([crc & 0xFF, crc >> 8])
+
+
+PROTOCOLS = (
+  ("vesc", RxFramer, vesc_frame, 1, 80),
+  ("display", DisplayFramer, display_frame, 1, 24),
+)
+
+
+def _run(framer, stream, rnd, max_chunk):
+  out = []
+  i = 0
+  while i < len(stream):
+    n = rnd.randrange(1, max_chunk + 1)
+    framer.feed(stream[i:i + n])
+    i += n
+    while True:
+      payload = framer.next_frame()
+      if payload is None:
+        break
+      out.append(bytes(payload))
+  return out
+
+
+def fuzz(seed, rounds):
+  rnd = random.Random(seed)
+  failures = 0
+  for name, framer_class, make_frame, min_len, max_len in PROTOCOLS:
+    extras = 0
+    for _ in range(rounds):
+      expected = []
+      stream = bytearray()
+      for _ in range(rnd.randrange(1, 30)):
+        kind = rnd.random()
+        if kind < 0.2:
+          # garbage, may contain partial start markers
+          stream += bytes(rnd.choice((0, 1, 2, 3, rnd.randrange(256))) for _ in range(rnd.randrange(1, 20)))
+        elif kind < 0.3:
+          # corrupted frame (one byte changed), must be rejected
+          frame = bytearray(make_frame(bytes(rnd.randrange(256) for _ in range(rnd.randrange(min_len, max_len)))))
+          frame[rnd.randrange(len(frame))] ^= 1 << rnd.randrange(8)
+          stream += frame
+        elif kind < 0.35:
+          # truncated frame: a new frame starts inside it
+          frame = make_frame(bytes(rnd.randrange(256) for _ in range(rnd.randrange(min_len, max_len))))
+          stream += frame[:rnd.randrange(1, len(frame))]
+        else:
+          payload = bytes(rnd.randrange(256) for _ in range(rnd.randrange(min_len, max_len)))
+          expected.append(payload)
+          stream += make_frame(payload)
+      # enough idle bytes to complete any bogus length read from garbage
+      stream += bytes(300)
+
+      got = _run(framer_class(1024), bytes(stream), rnd, 64)
+      # every valid frame in order; extra frames only from CRC collisions
+      it = iter(got)
+      if not all(any(g == e for g in it) for e in expected):
+        failures += 1
+      extras += len(got) - len(expected)
+    print("{}: {} rounds, {} failures, {} extra frames".format(name, rounds, failures, extras))
+  return failures == 0
+
+
+def bench():
+  rnd = random.Random(1)
+  for name, framer_class, make_frame, min_len, max_len in PROTOCOLS:
+    payloads = [bytes(rnd.randrange(256) for _ in range(max_len - 1)) for _ in range(64)]
+    stream = b"".join(make_frame(p) for p in payloads) * 50
+    framer = framer_class(1024)
+    t0 = time.perf_counter()
+    got = _run(framer, stream, rnd, 64)
+    dt = time.perf_counter() - t0
+    print("{}: {} frames, {:.0f} frames/s, {:.0f} kB/s".format(
+      name, len(got), len(got) / dt, len(stream) / dt / 1000))
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Fuzz and benchmark the framed UART receivers")
+  parser.add_argument("--fuzz", action="store_true")
+  parser.add_argument("--bench", action="store_true")
+  parser.add_argument("--seed", type=int, default=1)
+  parser.add_argument("--rounds", type=int, default=200)
+  args = parser.parse_args(argv)
+
+  ok = True
+  if args.fuzz or not args.bench:
+    ok = fuzz(args.seed, args.rounds)
+  if args.bench:
+    bench()
+  return 0 if ok else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
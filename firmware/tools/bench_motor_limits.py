@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# bench_motor_limits.py — host tool (CPython) for
+# 01_diy_main_board/motor_limits.py: checks the integer (fixed-point slope)
+# curves of MotorLimits against the float map_range() ramps they replace,
+# over the whole wheel speed range, for every motor of the escooter configs
+# and a multi-point curve, and times one update() against the four
+# map_range() calls of the old task_control_motor_limit_current.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/bench_motor_limits.py            # checks only
+#   python3 tools/bench_motor_limits.py --bench    # plus timings
+#
+# Exit code is 1 when a check fails.
+
+import argparse
+import os
+import sys
+import timeit
+import types
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(FIRMWARE_DIR, "tools")
+MAIN_BOARD_DIR = os.path.join(FIRMWARE_DIR, "01_diy_main_board")
+for _path in (FIRMWARE_DIR, TOOLS_DIR, MAIN_BOARD_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+from freeze_config import _load_config  # noqa: E402
+from common.utils import map_range  # noqa: E402
+from motor_limits import LimitCurve, MotorLimits  # noqa: E402
+
+CONFIGS = (
+  "config_escooter_dual_motor_iscooter_i12.py",
+  "config_escooter_single_motor_iscooter_i12.py",
+)
+
+# wheel speed km/h x10, reverse to well past the ERPM limits
+SPEED_X10_RANGE = range(-100, 1201)
+# fixed-point slopes and integer mA against the float ramp
+MAX_ERROR_MA = 1
+
+# (name, curve field, start value, end speed field, end value)
+_RAMPS = (
+  ("motor max", "motor_max", "motor_current_limit_max_max",
+   "motor_current_limit_max_min_speed", "motor_current_limit_max_min"),
+  ("motor min", "motor_min", "motor_current_limit_min_max",
+   "motor_current_limit_min_max_speed", "motor_current_limit_min_min"),
+  ("battery max", "battery_max", "battery_current_limit_max_max",
+   "battery_current_limit_max_min_speed", "battery_current_limit_max_min"),
+  ("battery min", "battery_min", "battery_current_limit_min_max",
+   "battery_current_limit_min_max_speed", "battery_current_limit_min_min"),
+)
+
+
+def _motor_cfgs():
+  out = []
+  for path in CONFIGS:
+    name, module = _load_config(os.path.join(FIRMWARE_DIR, path))
+    for field in ("rear_motor_cfg", "front_motor_cfg"):
+      motor_cfg = getattr(module, field, None)
+      if motor_cfg is not None:
+        out.append(("{} {}".format(name, field), motor_cfg))
+  return out
+
+
+def _ramp_ma(speed_x10, start, end_speed, end):
+  # the old task_control_motor_limit_current, in mA
+  if end_speed <= 5.0:
+    return end * 1000
+  return map_range(speed_x10 / 10, 5.0, end_speed, start, end, clamp=True) * 1000
+
+
+def _points_ma(speed_x10, points):
+  speed = speed_x10 / 10
+  if speed <= points[0][0]:
+    return points[0][1] * 1000
+  for (x0, y0), (x1, y1) in zip(points, points[1:]):
+    if speed <= x1:
+      return map_range(speed, x0, x1, y0, y1) * 1000
+  return points[-1][1] * 1000
+
+
+def _max_error(curve, reference):
+  worst = 0
+  at = None
+  for speed_x10 in SPEED_X10_RANGE:
+    error = abs(curve.value_ma(speed_x10) - reference(speed_x10))
+    if error > worst:
+      worst = error
+      at = speed_x10
+  return worst, at
+
+
+def check_config_ramps():
+  ok = True
+  for name, motor_cfg in _motor_cfgs():
+    limits = MotorLimits(motor_cfg)
+    for label, attr, start, end_speed, end in _RAMPS:
+      args = (getattr(motor_cfg, start), getattr(motor_cfg, end_speed), getattr(motor_cfg, end))
+      worst, at = _max_error(getattr(limits, attr), lambda s: _ramp_ma(s, *args))
+      good = worst <= MAX_ERROR_MA
+      ok = ok and good
+      print("{:58} {:5.2f} mA {}".format(
+        name + " " + label, worst, "ok" if good else "FAIL at x10 {}".format(at)))
+  return ok
+
+
+def check_multi_point():
+  # falling, flat and rising segments, a long one (0.1 km/h speed steps)
+  points = ((3.0, 100.0), (12.3, 62.5), (20.0, 62.5), (31.7, -17.3), (71.7, 130.0))
+  worst, at = _max_error(LimitCurve(points), lambda s: _points_ma(s, points))
+  good = worst <= MAX_ERROR_MA
+  print("{:58} {:5.2f} mA {}".format(
+    "multi-point curve", worst, "ok" if good else "FAIL at x10 {}".format(at)))
+  return good
+
+
+def check_target_erpm():
+  ok = True
+  for name, motor_cfg in _motor_cfgs():
+    limits = MotorLimits(motor_cfg)
+    for mode, erpm_max in enumerate(motor_cfg.motor_erpm_max_speed_limit):
+      worst = max(
+        abs(limits.target_erpm(t, mode) - map_range(t, 0.0, 1000.0, 0.0, erpm_max, clamp=True))
+        for t in range(-50, 1051))
+      good = worst <= 1
+      ok = ok and good
+      print("{:58} {:5.2f}    {}".format(
+        "{} mode {} ERPM".format(name, mode), worst, "ok" if good else "FAIL"))
+  return ok
+
+
+def bench():
+  _, motor_cfg = _motor_cfgs()[0]
+  limits = MotorLimits(motor_cfg)
+  c = motor_cfg
+  motor_data = types.SimpleNamespace()
+  speeds = [s / 10 for s in range(0, 400, 7)]
+  speeds_x10 = [int(s * 10) for s in speeds]
+
+  def old():
+    for wheel_speed in speeds:
+      motor_data.motor_target_current_limit_max = map_range(
+        wheel_speed, 5.0, c.motor_current_limit_max_min_speed,
+        c.motor_current_limit_max_max, c.motor_current_limit_max_min, clamp=True)
+      motor_data.motor_target_current_limit_min = map_range(
+        wheel_speed, 5.0, c.motor_current_limit_min_max_speed,
+        c.motor_current_limit_min_max, c.motor_current_limit_min_min, clamp=True)
+      motor_data.battery_target_current_limit_max = map_range(
+        wheel_speed, 5.0, c.battery_current_limit_max_min_speed,
+        c.battery_current_limit_max_max, c.battery_current_limit_max_min, clamp=True)
+      motor_data.battery_target_current_limit_min = map_range(
+        wheel_speed, 5.0, c.battery_current_limit_min_max_speed,
+        c.battery_current_limit_min_max, c.battery_current_limit_min_min, clamp=True)
+
+  def new():
+    for speed_x10 in speeds_x10:
+      limits.update(motor_data, speed_x10)
+
+  number = 2000
+  t_old = min(timeit.repeat(old, number=number, repeat=3)) / number / len(speeds) * 1e6
+  t_new = min(timeit.repeat(new, number=number, repeat=3)) / number / len(speeds) * 1e6
+  print("{:28} old {:7.2f} us  new {:7.2f} us  x{:.1f}".format(
+    "4 limits, one motor", t_old, t_new, t_old / t_new))
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="MotorLimits against map_range: checks and benchmark")
+  parser.add_argument("--bench", action="store_true")
+  args = parser.parse_args(argv)
+  ok = check_config_ramps()
+  ok = check_multi_point() and ok
+  ok = check_target_erpm() and ok
+  if args.bench:
+    bench()
+  return 0 if ok else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# bench_sparkline.py — host tool (CPython) for 02_diy_display/widgets/widget_sparkline.py:
+# pushes a power-like signal into sparklines of several widths, checks that
+# the incrementally scrolled graph has the same pixels as a full redraw of
+# the stored samples (but the oldest column, joined to a sample that is
+# gone), and compares the cost of a sample with redrawing the whole graph.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/bench_sparkline.py [--samples 300]
+#
+# Uses tools/framebuf.py (pure Python), where scroll() and blit() are loops
+# over every pixel instead of C, so the times are only relative. The
+# framebuf calls per sample (interpreted code on the device) are counted:
+# a push makes the same few calls while the history fills up and when it is
+# full, a redraw one or two per column. Exit code is 1 when the pixels
+# differ or a push makes more calls once the history is full.
+
+import argparse
+import os
+import sys
+import time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIRMWARE_DIR = os.path.dirname(TOOLS_DIR)
+DISPLAY_DIR = os.path.join(FIRMWARE_DIR, "02_diy_display")
+for _path in (FIRMWARE_DIR, DISPLAY_DIR, TOOLS_DIR):
+  if _path in sys.path:
+    sys.path.remove(_path)
+  sys.path.insert(0, _path)
+
+import framebuf  # noqa: E402  (tools/framebuf.py)
+from widgets.widget_sparkline import SparklineWidget  # noqa: E402
+
+WIDTH = 128
+HEIGHT = 64
+
+# (width, height): the main screen one, then wider ones
+SIZES = ((26, 14), (64, 14), (128, 14), (128, 32))
+
+
+def _signal(i):
+  # climb with throttling: ramps, a plateau and noise, 0..100
+  v = (i * 7) % 120
+  if v > 100:
+    v = 100 - (v - 100) * 3
+  return max(0, min(100, v + ((i * 37) % 11) - 5))
+
+
+_calls = [0]
+
+
+def _counting(method):
+  def counted(self, *args):
+    _calls[0] += 1
+    return method(self, *args)
+  return counted
+
+
+# the drawing calls of the widget (on its own buffer and on the display)
+for _name in ("pixel", "fill", "fill_rect", "vline", "hline", "scroll", "blit"):
+  setattr(framebuf.FrameBuffer, _name, _counting(getattr(framebuf.FrameBuffer, _name)))
+
+
+def _fb():
+  buf = bytearray(WIDTH * HEIGHT // 8)
+  return buf, framebuf.FrameBuffer(buf, WIDTH, HEIGHT, framebuf.MONO_VLSB)
+
+
+def _run(width, height, samples):
+  """return: (same pixels, (us, calls) per push while filling, when full, per full redraw)"""
+  buf, fb = _fb()
+  widget = SparklineWidget(fb, 0, 0, width, height)
+  filling = []
+  full = []
+  for i in range(samples):
+    calls = _calls[0]
+    start = time.perf_counter()
+    widget.push(_signal(i))
+    us = (time.perf_counter() - start) * 1e6
+    (full if widget.count == width else filling).append((us, _calls[0] - calls))
+
+  # reference: a new widget drawing the same samples at once
+  ref_buf, ref_fb = _fb()
+  reference = SparklineWidget(ref_fb, 0, 0, width, height)
+  for v in widget.samples():
+    reference._samples[reference._head] = v
+    reference._head = (reference._head + 1) % width
+    reference.count = min(width, reference.count + 1)
+  calls = _calls[0]
+  start = time.perf_counter()
+  reference.redraw()
+  redraw = ((time.perf_counter() - start) * 1e6, _calls[0] - calls)
+
+  same = all(fb.pixel(x, y) == ref_fb.pixel(x, y) for x in range(1, width) for y in range(height))
+  return same, _mean(filling), _mean(full), redraw
+
+
+def _mean(values):
+  if not values:
+    return (0.0, 0.0)
+  return (sum(v[0] for v in values) / len(values), max(v[1] for v in values))
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="SparklineWidget time per sample")
+  parser.add_argument("--samples", type=int, default=300)
+  args = parser.parse_args(argv)
+
+  ok = True
+  print("{:>9} {:>20} {:>20} {:>20}  {}".format(
+    "size", "filling us / calls", "full us / calls", "redraw us / calls", "pixels"))
+  for width, height in SIZES:
+    same, filling, full, redraw = _run(width, height, max(args.samples, width + 1))
+    ok = ok and same and full[1] <= filling[1]
+    print("{:>9} {:>20} {:>20} {:>20}  {}".format(
+      "{}x{}".format(width, height),
+      *["{:.0f} / {}".format(us, calls) for us, calls in (filling, full, redraw)],
+      "same" if same else "DIFFER"))
+  print("ok" if ok else "FAIL")
+  return 0 if ok else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
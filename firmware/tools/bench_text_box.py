@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# bench_text_box.py — host tool (CPython) for 02_diy_display/widgets/widget_text_box.py:
+# draws typical main screen strings (speed, clock, lights, brakes, warnings)
+# through WidgetTextBox and through the previous implementation (new HLSB
+# clip buffer and a bytearray copy per glyph on every update, blitted across
+# formats), checks that both give the same pixels and compares the bitmap
+# bytes allocated and the time per update.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/bench_text_box.py [--rounds 20]
+#
+# Uses tools/framebuf.py (pure Python), so times are only relative. Bitmap
+# allocations are counted on bytearray() in the widget code (CPython's heap
+# counts every int and frame). Exit code is 1 when the frames differ or an
+# update after the first one allocates a bitmap.
+
+import argparse
+import os
+import sys
+import time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIRMWARE_DIR = os.path.dirname(TOOLS_DIR)
+DISPLAY_DIR = os.path.join(FIRMWARE_DIR, "02_diy_display")
+for _path in (FIRMWARE_DIR, DISPLAY_DIR, TOOLS_DIR):
+  if _path in sys.path:
+    sys.path.remove(_path)
+  sys.path.insert(0, _path)
+
+import fake_time  # noqa: E402  (tools/fake_time.py)
+fake_time.install()
+import framebuf  # noqa: E402  (tools/framebuf.py)
+from lcd import glyph_cache  # noqa: E402
+from widgets import widget_text_box  # noqa: E402
+from widgets.widget_text_box import WidgetTextBox  # noqa: E402
+from fonts import robotobold12, robotobold18, robotobold50  # noqa: E402
+
+_builtin_bytearray = bytearray
+_bitmap_bytes = [0]
+
+
+def _counting_bytearray(*args):
+  b = _builtin_bytearray(*args)
+  _bitmap_bytes[0] += len(b)
+  return b
+
+
+# every bytearray() of the widget code (and of _LegacyTextBox below)
+widget_text_box.bytearray = _counting_bytearray
+glyph_cache.bytearray = _counting_bytearray
+bytearray = _counting_bytearray
+
+WIDTH = 128
+HEIGHT = 64
+
+# (name, font, box, align, strings) as on screens/main.py
+WIDGETS = (
+  ("speed", robotobold50, (WIDTH - 55, 0, WIDTH - 1, 36), "right",
+   [str(v) for v in (0, 5, 12, 18, 25, 31, 27, 9)]),
+  ("clock", robotobold18, (WIDTH - 49, HEIGHT - 17, WIDTH - 6, HEIGHT - 2), "right",
+   ["12:{:02}".format(m) for m in range(0, 60, 7)]),
+  ("lights", robotobold12, (1, 37, 7, 46), "left", ["L", ""]),
+  ("brakes", robotobold12, (12, 37, 19, 46), "left", ["B", ""]),
+  ("warning", robotobold12, (WIDTH - 40, 38, WIDTH - 1, 46), "right",
+   ["mo", "c120mV", "vr 70", "", "bms"]),
+)
+
+
+class _LegacyTextBox(WidgetTextBox):
+  """The previous _draw, for comparison"""
+
+  def _draw(self, s):
+    if self._box_coords:
+      bx, by, bw, bh = self._box_from_coords(*self._box_coords)
+    else:
+      base = self.pattern if self.pattern is not None else s
+      bx, by, bw, bh = self._compute_box_from_pattern(base)
+    if bw == 0 or bh == 0:
+      return
+    if self._prev_box:
+      self._clear(self._prev_box)
+    self._clear((bx, by, bw, bh))
+
+    fmt = framebuf.MONO_HMSB if self.font.reverse() else framebuf.MONO_HLSB
+    buf_clip = bytearray(((bw + 7) // 8) * bh)
+    clipfb = framebuf.FrameBuffer(buf_clip, bw, bh, fmt)
+    clipfb.fill(self.bg)
+
+    L = max(0, self.left); R = max(0, self.right); T = max(0, self.top)
+    tw, th = self._text_size(s)
+    if self._text_pos is not None:
+      tx_abs, ty_abs = self._text_pos
+      dest_x = (tx_abs - bx) - L
+      dest_y = (ty_abs - by) - T
+    else:
+      if self.align_inside == "right":
+        dest_x = bw - (tw - R) - L
+      elif self.align_inside == "center":
+        visible_tw = max(0, tw - (L + R))
+        dest_x = (bw - visible_tw) // 2 - L
+      else:
+        dest_x = -L
+      dest_y = -T
+    dest_x += self.content_dx
+    dest_y += self.content_dy
+
+    advance_x = 0
+    for ch in s:
+      glyph, gh, gw = self.font.get_ch(ch)
+      if gw <= 0 or gh <= 0 or glyph is None:
+        continue
+      gx = dest_x + advance_x
+      gy = dest_y
+      if gx >= bw or gy >= bh or gx + gw <= 0 or gy + gh <= 0:
+        advance_x += gw
+        continue
+      gbuf = bytearray(glyph)
+      gf = framebuf.FrameBuffer(gbuf, gw, gh, fmt)
+      clipfb.blit(gf, gx, gy)
+      advance_x += gw
+
+    if self.invert:
+      for i in range(len(buf_clip)):
+        buf_clip[i] ^= 0xFF
+
+    self.fb.blit(clipfb, bx, by)
+    self._prev_box = (bx, by, bw, bh)
+
+
+def _run(cls, rounds, invert_speed):
+  """return: (framebuffer bytes, [(name, bytes per update list, us per update list)])"""
+  buf = bytearray(WIDTH * HEIGHT // 8)
+  fb = framebuf.FrameBuffer(buf, WIDTH, HEIGHT, framebuf.MONO_VLSB)
+  results = []
+  for name, font, box, align, strings in WIDGETS:
+    widget = cls(fb, WIDTH, WIDTH, font=font, align_inside=align)
+    widget.set_box(*box)
+    if name == "speed":
+      widget.set_invert(invert_speed)
+    allocs = []
+    times = []
+    for _ in range(rounds):
+      for text in strings:
+        before = _bitmap_bytes[0]
+        start = time.perf_counter()
+        widget.update(text)
+        times.append((time.perf_counter() - start) * 1e6)
+        allocs.append(_bitmap_bytes[0] - before)
+    results.append((name, allocs, times))
+  return bytes(buf), results
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="WidgetTextBox allocations and time per update")
+  parser.add_argument("--rounds", type=int, default=20)
+  args = parser.parse_args(argv)
+
+  ok = True
+  for invert_speed in (False, True):
+    legacy_frame, legacy = _run(_LegacyTextBox, args.rounds, invert_speed)
+    frame, new = _run(WidgetTextBox, args.rounds, invert_speed)
+    same = frame == legacy_frame
+    ok = ok and same
+    print("speed inverted: {}, frames {}".format(invert_speed, "identical" if same else "DIFFER"))
+    print("  {:8} {:>14} {:>14} {:>12} {:>12}".format(
+      "widget", "legacy B/upd", "new B/upd", "legacy us", "new us"))
+    for (name, l_allocs, l_times), (_name, allocs, times) in zip(legacy, new):
+      # steady state: skip the first round (glyph conversion, clip buffer)
+      first = len(allocs) // args.rounds
+      steady = allocs[first:]
+      print("  {:8} {:14.0f} {:14.0f} {:12.0f} {:12.0f}".format(
+        name,
+        sum(l_allocs[first:]) / len(steady), sum(steady) / len(steady),
+        sum(l_times) / len(l_times), sum(times) / len(times)))
+      if max(steady) > 0:
+        print("  {}: update allocated {} bytes".format(name, max(steady)))
+        ok = False
+  print("ok" if ok else "FAIL")
+  return 0 if ok else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,116 @@
+# espnow_loopback.py — on-device tool (MicroPython, ESP32): ESP-NOW packet
+# loss and round-trip latency between two boards, optionally with the JBD
+# BMS BLE client running on the sender, to measure the radio coexistence cost
+# of BLE (scan / connection interval / poll period settings of JbdBmsClient).
+#
+# Copy to both boards together with common/ (and 01_diy_main_board/bms_jbd.py
+# for --bms), then from the REPL:
+#   echo board:    import espnow_loopback; espnow_loopback.echo()
+#   sender board:  import espnow_loopback
+#                  espnow_loopback.send(b'\x68\xb6\xb3\x01\xf7\xf3', count=2000)
+#                  espnow_loopback.send(PEER, count=2000, bms_name="BMS-BTT_JP")
+#
+# The sender sends one 32 bytes packet every period_ms (same rate as the
+# display messages) and prints the loss and the RTT p50 / p99 / max. Run it
+# without and with bms_name to compare.
+
+import time
+import asyncio
+import struct
+from common.espnow import espnow_init
+
+_CHANNEL = 1
+_PACKET_LEN = 32
+_MAGIC = 0x4C
+
+
+def echo(channel=_CHANNEL):
+  """Send every packet back to where it came from"""
+  sta, esp = espnow_init(channel=channel, local_mac=None)
+  print("echo on", sta.config("mac"))
+  peers = set()
+  while True:
+    host, msg = esp.recv(1000)
+    if not msg or msg[0] != _MAGIC:
+      continue
+    if host not in peers:
+      try:
+        esp.add_peer(host)
+      except OSError:
+        pass
+      peers.add(host)
+    esp.send(host, msg, False)
+
+
+def _percentile(sorted_values, p):
+  if not sorted_values:
+    return 0
+  return sorted_values[min(len(sorted_values) - 1, (len(sorted_values) * p) // 100)]
+
+
+async def _sender(esp, peer, count, period_ms, rtts):
+  packet = bytearray(_PACKET_LEN)
+  lost = 0
+  for seq in range(count):
+    sent_us = time.ticks_us()
+    struct.pack_into("<BII", packet, 0, _MAGIC, seq, sent_us)
+    esp.send(peer, packet, False)
+
+    # wait for the echo of this sequence, at most period_ms
+    deadline_ms = time.ticks_add(time.ticks_ms(), period_ms)
+    got = False
+    while time.ticks_diff(deadline_ms, time.ticks_ms()) > 0:
+      host, msg = esp.recv(0)
+      if msg and msg[0] == _MAGIC:
+        _magic, rx_seq, rx_us = struct.unpack_from("<BII", msg, 0)
+        if rx_seq == seq:
+          rtts.append(time.ticks_diff(time.ticks_us(), rx_us))
+          got = True
+      await asyncio.sleep_ms(1)
+    if not got:
+      lost += 1
+  return lost
+
+
+async def _bms_task(bms):
+  bms.start()
+  while True:
+    bms.tick()
+    await asyncio.sleep_ms(50)
+
+
+async def _run(peer, count, period_ms, bms_name, channel):
+  sta, esp = espnow_init(channel=channel, local_mac=None)
+  try:
+    esp.add_peer(peer)
+  except OSError:
+    pass
+
+  bms = None
+  bms_task = None
+  if bms_name:
+    import bluetooth
+    from bms_jbd import JbdBmsClient
+    bms = JbdBmsClient(ble=bluetooth.BLE(), target_name=bms_name)
+    bms_task = asyncio.create_task(_bms_task(bms))
+
+  rtts = []
+  lost = await _sender(esp, peer, count, period_ms, rtts)
+  if bms_task is not None:
+    bms_task.cancel()
+    bms.stop()
+
+  rtts.sort()
+  print("{} packets, lost {} ({}.{} %)".format(count, lost, (lost * 100) // count, ((lost * 1000) // count) % 10))
+  print("rtt us: p50 {} p99 {} max {}".format(
+    _percentile(rtts, 50), _percentile(rtts, 99), rtts[-1] if rtts else 0))
+  if bms is not None:
+    print("bms: connected {}, scans {}, connects {}".format(bms.is_connected(), bms.scans, bms.connects))
+
+
+def send(peer, count=1000, period_ms=50, bms_name=None, channel=_CHANNEL):
+  """
+  :param bytes peer: MAC of the echo board
+  :param str bms_name: run JbdBmsClient meanwhile (None: ESP-NOW only)
+  """
+  asyncio.run(_run(peer, count, period_ms, bms_name, channel))
@@ -0,0 +1,177 @@
+# fake_can.py — host (CPython) stand-in for the MicroPython `can` module the
+# main board uses (see the driver API at the top of
+# 01_diy_main_board/motor.py), with a simulated bus for fault injection:
+# VESC nodes sending status frames, a node going silent, bus errors raising
+# the TX error counter (warning, passive, bus-off) and restart().
+#
+#   import fake_can
+#   sys.modules["can"] = fake_can
+#   bus = fake_can.bus            # the simulated bus, shared by CAN instances
+#   bus.nodes[101].silent = True
+#   bus.error_every = 1           # every send is a bit error (TEC += 8),
+#                                 # 2: every other one, 0: clean bus
+#   bus.tick(ms)                  # nodes send their 50 Hz status frames
+#
+# Error counters follow ISO 11898-1 as far as needed here: +8 per TX error,
+# -1 per frame sent, bus-off at TEC > 255 until restart().
+
+import struct
+
+# CAN.state() values (pyb.CAN style)
+STOPPED = 0
+ERROR_ACTIVE = 1
+ERROR_WARNING = 2
+ERROR_PASSIVE = 3
+BUS_OFF = 4
+
+_EAGAIN = 11
+_ENOTCONN = 107
+
+# Status frames every 20 ms, as the VESC default CAN status rate (50 Hz)
+STATUS_PERIOD_MS = 20
+QUEUE_LEN = 32
+
+
+class Node(object):
+  """A VESC sending STATUS_1, 4, 5 and 7"""
+
+  def __init__(self, can_id):
+    self.can_id = can_id
+    self.silent = False
+    self.erpm = 1000
+    self.motor_current_x10 = 100
+    self.vesc_temperature_x10 = 400
+    self.motor_temperature_x10 = 500
+    self.battery_current_x10 = 50
+    self.battery_voltage_x10 = 780
+    self.battery_soc_x1000 = 900
+
+  def frames(self):
+    return (
+      ((9 << 8) | self.can_id, struct.pack(">lhh", self.erpm, self.motor_current_x10, 0)),
+      ((16 << 8) | self.can_id, struct.pack(">hhhh", self.vesc_temperature_x10, self.motor_temperature_x10,
+                                            self.battery_current_x10, 0)),
+      ((27 << 8) | self.can_id, struct.pack(">lh", 0, self.battery_voltage_x10)),
+      ((99 << 8) | self.can_id, struct.pack(">hhhh", self.battery_soc_x1000, 0, 0, 0)),
+    )
+
+
+class Bus(object):
+  def __init__(self):
+    self.reset()
+
+  def reset(self):
+    self.nodes = {}
+    self.error_every = 0
+    self.controller = None
+    self._next_status_ms = 0
+
+  def add_node(self, can_id):
+    self.nodes[can_id] = Node(can_id)
+    return self.nodes[can_id]
+
+  def tick(self, now_ms):
+    if now_ms < self._next_status_ms:
+      return
+    self._next_status_ms = now_ms + STATUS_PERIOD_MS
+    can = self.controller
+    if can is None or self.error_every == 1 or can.bus_off:
+      return
+    for node in self.nodes.values():
+      if not node.silent:
+        for msg_id, data in node.frames():
+          can.deliver(msg_id, data)
+
+
+bus = Bus()
+
+
+class CAN(object):
+  STOPPED = STOPPED
+  ERROR_ACTIVE = ERROR_ACTIVE
+  ERROR_WARNING = ERROR_WARNING
+  ERROR_PASSIVE = ERROR_PASSIVE
+  BUS_OFF = BUS_OFF
+
+  instances = 0
+
+  def __init__(self, tx=None, rx=None, baudrate=None, mode=None):
+    CAN.instances += 1
+    self.baudrate = baudrate
+    self.queue = []
+    self.queue_overflows = 0
+    self._tec = 0
+    self._rec = 0
+    self.bus_off = False
+    self.restarts = 0
+    self.sent = 0
+    self.send_count = 0
+    self.deinited = False
+    bus.controller = self
+
+  @property
+  def transmit_error_count(self):
+    return self._tec
+
+  @property
+  def receive_error_count(self):
+    return self._rec
+
+  def state(self):
+    if self.deinited:
+      return STOPPED
+    if self.bus_off:
+      return BUS_OFF
+    errors = max(self._tec, self._rec)
+    if errors >= 128:
+      return ERROR_PASSIVE
+    if errors >= 96:
+      return ERROR_WARNING
+    return ERROR_ACTIVE
+
+  def deliver(self, msg_id, data):
+    if len(self.queue) >= QUEUE_LEN:
+      self.queue_overflows += 1
+      return
+    self.queue.append((msg_id, True, False, bytes(data)))
+
+  def recv(self):
+    if not self.queue:
+      return None
+    return self.queue.pop(0)
+
+  def send(self, buf, msg_id, extframe=True, timeout=0):
+    if self.bus_off or self.deinited:
+      raise OSError(_ENOTCONN)
+    self.send_count += 1
+    if bus.error_every and self.send_count % bus.error_every == 0:
+      self._tec += 8
+      if self._tec > 255:
+        self.bus_off = True
+      raise OSError(_EAGAIN)
+    if self._tec > 0:
+      self._tec -= 1
+    self.sent += 1
+
+  def restart(self):
+    self.restarts += 1
+    self.bus_off = False
+    self._tec = 0
+    self._rec = 0
+    self.queue = []
+
+  def deinit(self):
+    self.deinited = True
+    if bus.controller is self:
+      bus.controller = None
+
+
+class CANNoStatus(CAN):
+  """A driver with neither state(), error counters nor restart(): recovery
+  is deinit() and a new instance"""
+
+  def __getattribute__(self, name):
+    if name in ("state", "transmit_error_count", "receive_error_count", "restart",
+                "STOPPED", "ERROR_ACTIVE", "ERROR_WARNING", "ERROR_PASSIVE", "BUS_OFF"):
+      raise AttributeError(name)
+    return object.__getattribute__(self, name)
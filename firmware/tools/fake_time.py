@@ -0,0 +1,31 @@
+# fake_time.py — host (CPython) stand-in for the MicroPython time functions
+# the firmware imports (ticks_ms, ticks_us, ticks_add, ticks_diff,
+# sleep_ms, sleep_us), added to the CPython time module on a virtual clock
+# the host tool moves:
+#
+#   import fake_time
+#   fake_time.install()           # before importing firmware modules
+#   fake_time.clock.ms += 20
+#
+# ticks_ms() only moves with clock.ms; ticks_us() follows the real time so
+# the firmware's own timings still measure. No wrap: ticks_add and
+# ticks_diff are plain sums.
+
+import time
+
+
+class Clock(object):
+  def __init__(self):
+    self.ms = 0
+
+
+clock = Clock()
+
+
+def install():
+  time.ticks_ms = lambda: clock.ms
+  time.ticks_us = lambda: int(time.perf_counter() * 1000000)
+  time.ticks_add = lambda ticks, delta: ticks + delta
+  time.ticks_diff = lambda end, start: end - start
+  time.sleep_ms = lambda ms: None
+  time.sleep_us = lambda us: None
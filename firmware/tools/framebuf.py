@@ -0,0 +1,136 @@
+# framebuf.py — CPython stand-in for the MicroPython framebuf module, for the
+# host tools that run the display code (02_diy_display) off-device.
+# Monochrome formats only (MONO_VLSB, MONO_HLSB, MONO_HMSB), same pixel
+# layout and clipping as MicroPython, so buffers compare byte for byte.
+#
+# Pure Python: correct, not fast. Host tools put the tools/ folder first on
+# sys.path so "import framebuf" in the display code finds this module.
+
+MONO_VLSB = 0
+MONO_HLSB = 3
+MONO_HMSB = 4
+
+
+class FrameBuffer(object):
+
+  def __init__(self, buffer, width, height, format, stride=None):
+    if format not in (MONO_VLSB, MONO_HLSB, MONO_HMSB):
+      raise ValueError("invalid format")
+    self._buf = buffer
+    self._w = int(width)
+    self._h = int(height)
+    self._format = format
+    self._stride = int(stride) if stride is not None else self._w
+    if format == MONO_VLSB:
+      need = self._stride * ((self._h + 7) // 8)
+    else:
+      need = ((self._stride + 7) // 8) * self._h
+    if len(memoryview(buffer)) < need:
+      raise ValueError("buffer too small")
+
+  # pixel access, no clipping
+
+  def _get(self, x, y):
+    if self._format == MONO_VLSB:
+      return (self._buf[(y >> 3) * self._stride + x] >> (y & 7)) & 1
+    i = (x + y * ((self._stride + 7) & ~7)) >> 3
+    if self._format == MONO_HLSB:
+      return (self._buf[i] >> (7 - (x & 7))) & 1
+    return (self._buf[i] >> (x & 7)) & 1
+
+  def _set(self, x, y, c):
+    if self._format == MONO_VLSB:
+      i = (y >> 3) * self._stride + x
+      bit = 1 << (y & 7)
+    else:
+      i = (x + y * ((self._stride + 7) & ~7)) >> 3
+      bit = (0x80 >> (x & 7)) if self._format == MONO_HLSB else (1 << (x & 7))
+    if c & 1:
+      self._buf[i] |= bit
+    else:
+      self._buf[i] &= ~bit & 0xFF
+
+  # drawing
+
+  def pixel(self, x, y, c=None):
+    if not (0 <= x < self._w and 0 <= y < self._h):
+      return None
+    if c is None:
+      return self._get(x, y)
+    self._set(x, y, c)
+
+  def fill_rect(self, x, y, w, h, c):
+    x0 = max(0, x)
+    y0 = max(0, y)
+    x1 = min(self._w, x + w)
+    y1 = min(self._h, y + h)
+    for yy in range(y0, y1):
+      for xx in range(x0, x1):
+        self._set(xx, yy, c)
+
+  def fill(self, c):
+    self.fill_rect(0, 0, self._w, self._h, c)
+
+  def hline(self, x, y, w, c):
+    self.fill_rect(x, y, w, 1, c)
+
+  def vline(self, x, y, h, c):
+    self.fill_rect(x, y, 1, h, c)
+
+  def rect(self, x, y, w, h, c, f=False):
+    if f:
+      self.fill_rect(x, y, w, h, c)
+      return
+    self.fill_rect(x, y, w, 1, c)
+    self.fill_rect(x, y + h - 1, w, 1, c)
+    self.fill_rect(x, y, 1, h, c)
+    self.fill_rect(x + w - 1, y, 1, h, c)
+
+  def line(self, x1, y1, x2, y2, c):
+    # Bresenham, as in MicroPython's framebuf
+    dx = x2 - x1
+    sx = 1 if dx > 0 else -1
+    dx = abs(dx)
+    dy = y2 - y1
+    sy = 1 if dy > 0 else -1
+    dy = abs(dy)
+    steep = dy > dx
+    if steep:
+      x1, y1 = y1, x1
+      dx, dy = dy, dx
+      sx, sy = sy, sx
+    e = 2 * dy - dx
+    for _ in range(dx):
+      if steep:
+        self.pixel(y1, x1, c)
+      else:
+        self.pixel(x1, y1, c)
+      while e >= 0:
+        y1 += sy
+        e -= 2 * dx
+      x1 += sx
+      e += 2 * dy
+    self.pixel(x2, y2, c)
+
+  def blit(self, fbuf, x, y, key=-1, palette=None):
+    for sy in range(max(0, -y), min(fbuf._h, self._h - y)):
+      for sx in range(max(0, -x), min(fbuf._w, self._w - x)):
+        c = fbuf._get(sx, sy)
+        if palette is not None:
+          c = palette._get(c, 0)
+        if c != key:
+          self._set(x + sx, y + sy, c)
+
+  def scroll(self, xstep, ystep):
+    # like MicroPython: the uncovered area keeps its old content
+    if xstep < 0:
+      xs, xe, dx = 0, self._w + xstep, 1
+    else:
+      xs, xe, dx = self._w - 1, xstep - 1, -1
+    if ystep < 0:
+      ys, ye, dy = 0, self._h + ystep, 1
+    else:
+      ys, ye, dy = self._h - 1, ystep - 1, -1
+    for yy in range(ys, ye, dy):
+      for xx in range(xs, xe, dx):
+        self._set(xx, yy, self._get(xx - xstep, yy - ystep))
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# freeze_config.py — host tool (CPython) that validates one config_*.py and
+# writes a flat frozen_config.py snapshot for common/config_runtime.py.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/freeze_config.py config_escooter_dual_motor_iscooter_i12.py
+#   python3 tools/freeze_config.py config_xxx.py -o build/ --mpy
+#
+# Upload frozen_config.py (or frozen_config.mpy with --mpy, but not both) to
+# the board root next to common/. On boot config_runtime then skips the root
+# directory scan and all the attribute copying, and integer values are emitted
+# as const() so the bytecode compiler folds them.
+#
+# Re-run this tool after every change to the source config, or delete the
+# snapshot from the board to go back to runtime discovery.
+
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+import types
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _install_micropython_shim():
+  # common/model_constants.py uses micropython.const(), not available on CPython.
+  if "micropython" in sys.modules:
+    return
+  try:
+    import micropython  # noqa: F401
+  except ImportError:
+    shim = types.ModuleType("micropython")
+    shim.const = lambda value: value
+    sys.modules["micropython"] = shim
+
+
+def _load_config(path):
+  if FIRMWARE_DIR not in sys.path:
+    sys.path.insert(0, FIRMWARE_DIR)
+  _install_micropython_shim()
+  name = os.path.splitext(os.path.basename(path))[0]
+  spec = importlib.util.spec_from_file_location(name, path)
+  module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(module)
+  return name, module
+
+
+def _is_cfg_object(value):
+  from common.config_main_board_common import Cfg, MotorCfg
+  return isinstance(value, (Cfg, MotorCfg))
+
+
+def _public_values(module):
+  out = {}
+  for name in dir(module):
+    if name.startswith("_"):
+      continue
+    value = getattr(module, name)
+    if isinstance(value, (types.ModuleType, types.FunctionType, type)):
+      continue
+    out[name] = value
+  return out
+
+
+def validate(module):
+  """Return a list of error strings; empty when the config is usable."""
+  from common.model_constants import TYPE_EBIKE, TYPE_ESCOOTER
+  from common.config_main_board_common import Cfg, MotorCfg
+
+  errors = []
+  cfg_type = getattr(module, "type", None)
+  if not isinstance(cfg_type, dict):
+    return ["'type' must be a dict"]
+  vehicle_type = cfg_type.get("ebike_escooter")
+  if vehicle_type not in (TYPE_EBIKE, TYPE_ESCOOTER):
+    errors.append("type['ebike_escooter'] must be TYPE_EBIKE or TYPE_ESCOOTER")
+
+  for name, value in _public_values(module).items():
+    if name.startswith("mac_address_"):
+      if not isinstance(value, (list, tuple, bytes)) or len(value) != 6:
+        errors.append("{} must hold 6 bytes".format(name))
+
+  if vehicle_type != TYPE_ESCOOTER:
+    return errors
+
+  cfg = getattr(module, "cfg", None)
+  if not isinstance(cfg, Cfg):
+    errors.append("'cfg' must be a Cfg()")
+    return errors
+  for name in ("brake_pin", "throttle_1_pin"):
+    if getattr(cfg, name, None) is None:
+      errors.append("cfg.{} is missing".format(name))
+  for n in (1, 2):
+    if n == 2 and getattr(cfg, "throttle_2_pin", None) is None:
+      continue
+    adc_min = getattr(cfg, "throttle_{}_adc_min".format(n))
+    adc_max = getattr(cfg, "throttle_{}_adc_max".format(n))
+    over_max = getattr(cfg, "throttle_{}_adc_over_max_error".format(n))
+    if not (0 <= adc_min < adc_max <= over_max <= 65535):
+      errors.append(
+        "throttle {} needs 0 <= adc_min < adc_max <= adc_over_max_error <= 65535".format(n))
+
+  motor_cfgs = [("rear_motor_cfg", getattr(module, "rear_motor_cfg", None))]
+  if getattr(module, "front_motor_cfg", None) is not None:
+    motor_cfgs.append(("front_motor_cfg", module.front_motor_cfg))
+  # more VESC nodes: motor_3_cfg, motor_4_cfg, ... (as the main board reads them)
+  n = 3
+  while hasattr(module, "motor_{}_cfg".format(n)):
+    name = "motor_{}_cfg".format(n)
+    motor_cfgs.append((name, getattr(module, name)))
+    n += 1
+  can_ids = set()
+  for name, motor_cfg in motor_cfgs:
+    if not isinstance(motor_cfg, MotorCfg):
+      errors.append("'{}' must be a MotorCfg()".format(name))
+      continue
+    if motor_cfg.can_id in can_ids:
+      errors.append("{}.can_id {} is used by another node".format(name, motor_cfg.can_id))
+    can_ids.add(motor_cfg.can_id)
+    if not motor_cfg.drives_wheel:
+      if name == "rear_motor_cfg":
+        errors.append("rear_motor_cfg must drive a wheel")
+      continue
+    if motor_cfg.poles_pair <= 0:
+      errors.append("{}.poles_pair must be > 0".format(name))
+    if motor_cfg.wheel_radius <= 0:
+      errors.append("{}.wheel_radius must be > 0".format(name))
+    limits = motor_cfg.motor_erpm_max_speed_limit
+    if not isinstance(limits, (list, tuple)) or not limits:
+      errors.append("{}.motor_erpm_max_speed_limit must be a non-empty list".format(name))
+  rear = motor_cfgs[0][1]
+  if isinstance(rear, MotorCfg):
+    for field in ("can_tx_pin", "can_rx_pin", "can_baudrate", "can_mode"):
+      if getattr(rear, field) is None:
+        errors.append("rear_motor_cfg.{} is missing".format(field))
+
+  return errors
+
+
+def flatten(module):
+  """Apply the same defaults/merging as config_runtime and return the
+  final (name -> value) mapping it would expose."""
+  from common.config_defaults import OPTIONAL_DEFAULTS
+
+  values = _public_values(module)
+  for name, value in OPTIONAL_DEFAULTS.items():
+    values.setdefault(name, value)
+
+  cfg = values.get("cfg")
+  if _is_cfg_object(cfg):
+    for name, value in list(values.items()):
+      if name.startswith("mac_address_"):
+        setattr(cfg, name, value)
+    for name, value in vars(cfg).items():
+      if not name.startswith("_"):
+        values.setdefault(name, value)
+  return values
+
+
+def _literal(value):
+  if isinstance(value, bool) or value is None:
+    return repr(value)
+  if isinstance(value, int):
+    return "const({})".format(value)
+  if isinstance(value, (float, str)):
+    return repr(value)
+  if isinstance(value, (list, tuple, dict)):
+    return repr(value)
+  raise ValueError("unsupported config value: {!r}".format(value))
+
+
+def _plain_literal(value):
+  # Attribute values on Cfg/MotorCfg objects can't use const()
+  return repr(value)
+
+
+def render(source_name, module):
+  from common.model_constants import TYPE_EBIKE, TYPE_ESCOOTER
+
+  values = flatten(module)
+  vehicle_type = values["type"]["ebike_escooter"]
+  type_name = {TYPE_EBIKE: "ebike", TYPE_ESCOOTER: "escooter"}[vehicle_type]
+
+  lines = [
+    "# frozen_config.py — generated by tools/freeze_config.py from {}.py".format(source_name),
+    "# Do not edit: re-run the tool after changing the source config.",
+    "",
+    "from micropython import const",
+    "from common.config_main_board_common import Cfg, MotorCfg",
+    "",
+    "source_config = {!r}".format(source_name),
+    "vehicle_type = const({})".format(vehicle_type),
+    "type_name = {!r}".format(type_name),
+    "",
+  ]
+
+  objects = [(n, v) for n, v in values.items() if _is_cfg_object(v)]
+  for name, obj in objects:
+    if type(obj).__name__ == "MotorCfg":
+      lines.append("{} = MotorCfg(can_id={!r})".format(name, obj.can_id))
+    else:
+      lines.append("{} = Cfg()".format(name))
+    for field, value in vars(obj).items():
+      if field == "can_id":
+        continue
+      lines.append("{}.{} = {}".format(name, field, _plain_literal(value)))
+    lines.append("")
+
+  for name in sorted(values):
+    value = values[name]
+    if _is_cfg_object(value) or name in ("vehicle_type", "type_name"):
+      continue
+    lines.append("{} = {}".format(name, _literal(value)))
+  lines.append("")
+  return "\n".join(lines)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Validate a config_*.py and write frozen_config.py")
+  parser.add_argument("config", help="path to the config_*.py to freeze")
+  parser.add_argument("-o", "--output-dir", default=".", help="where to write frozen_config.py")
+  parser.add_argument("--mpy", action="store_true", help="also compile to .mpy with mpy-cross")
+  args = parser.parse_args(argv)
+
+  source_name, module = _load_config(args.config)
+  errors = validate(module)
+  if errors:
+    for error in errors:
+      print("error: " + error, file=sys.stderr)
+    return 1
+
+  from common.config_defaults import FROZEN_CONFIG_MODULE
+  os.makedirs(args.output_dir, exist_ok=True)
+  out_py = os.path.join(args.output_dir, FROZEN_CONFIG_MODULE + ".py")
+  with open(out_py, "w") as f:
+    f.write(render(source_name, module))
+  print("wrote " + out_py)
+
+  if args.mpy:
+    out_mpy = out_py[:-3] + ".mpy"
+    subprocess.check_call(["mpy-cross", "-o", out_mpy, out_py])
+    print("wrote " + out_mpy)
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
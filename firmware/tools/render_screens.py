@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# render_screens.py — host tool (CPython): runs the display screens
+# (02_diy_display/screen_manager.py and screens/) off-device on a 128x64
+# MONO_VLSB framebuffer (tools/framebuf.py), driven by a scripted sequence of
+# Vars values, and writes the frames as PBM or PNG.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/render_screens.py -o build/frames
+#       run the built-in ride (boot, main, charging, power off) and write
+#       every frame that changed
+#   python3 tools/render_screens.py --script ride.json --format png --scale 4 -o build/frames
+#   python3 tools/render_screens.py -o build/new --check build/frames
+#       pixel-exact regression check against frames written before
+#   python3 tools/render_screens.py --set main_screen_sparkline=power -o build/frames
+#       override config settings (value as JSON, else a string)
+#
+# Script: a JSON list of steps, run one after the other, one frame every
+# 100 ms (like ui_task):
+#   {"name": "accelerate", "ms": 3000,
+#    "set": {"lights_state": true},                  (at the step start)
+#    "ramp": {"wheel_speed_x10": [0, 250]}}          (linear over the step)
+# buttons_state 256 is a power button click, 512 a long click.
+#
+# Per frame it prints the render time (update + render, pure Python
+# framebuf: relative only), the pixels written to the display framebuffer
+# and the bytes changed in each of the 8 pages since the previous frame.
+# Exit code is 1 when --check finds a different frame.
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+import types
+import zlib
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIRMWARE_DIR = os.path.dirname(TOOLS_DIR)
+DISPLAY_DIR = os.path.join(FIRMWARE_DIR, "02_diy_display")
+for _path in (FIRMWARE_DIR, DISPLAY_DIR, TOOLS_DIR):
+  if _path in sys.path:
+    sys.path.remove(_path)
+  sys.path.insert(0, _path)
+
+import fake_time  # noqa: E402  (tools/fake_time.py)
+import framebuf  # noqa: E402  (tools/framebuf.py)
+from freeze_config import _install_micropython_shim, _load_config, flatten  # noqa: E402
+
+WIDTH = 128
+HEIGHT = 64
+PAGES = HEIGHT // 8
+FRAME_MS = 100
+
+DEFAULT_CONFIG = "config_escooter_dual_motor_iscooter_i12.py"
+
+DEFAULT_SCRIPT = [
+  {"name": "boot", "ms": 500},
+  {"name": "boot soc", "ms": 500, "set": {"battery_soc_x1000": 850, "battery_voltage_x10": 785}},
+  {"name": "click", "ms": 100, "set": {"buttons_state": 256}},
+  {"name": "main", "ms": 1500, "set": {"buttons_state": 0, "time_string": "12:07"}},
+  {"name": "accelerate", "ms": 3000, "ramp": {"wheel_speed_x10": [0, 250], "motor_power_percent": [0, 80]}},
+  {"name": "cruise", "ms": 2000, "set": {"cruise_control_is_active": True, "motor_power_percent": 30}},
+  {"name": "lights, mode", "ms": 3000, "set": {"cruise_control_is_active": False, "lights_state": True, "mode": 1,
+                                              "time_string": "12:08"}},
+  {"name": "hot motor", "ms": 5000, "ramp": {"rear_motor_temperature_x10": [600, 1100]}},
+  {"name": "cell imbalance", "ms": 3000, "set": {"rear_motor_temperature_x10": 400, "bms_cell_imbalance_is_active": True,
+                                                "bms_cell_min_mv": 3620, "bms_cell_max_mv": 3745}},
+  {"name": "brake", "ms": 2000, "set": {"brakes_are_active": True, "motor_power_percent": 0},
+   "ramp": {"wheel_speed_x10": [250, 0], "battery_soc_x1000": [850, 840]}},
+  {"name": "charging", "ms": 11000, "set": {"brakes_are_active": False, "battery_is_charging": True,
+                                           "battery_voltage_x10": 812, "bms_battery_current_x10": 60},
+   "ramp": {"battery_soc_x1000": [840, 850]}},
+  {"name": "unplugged", "ms": 500, "set": {"battery_is_charging": False, "bms_battery_current_x10": 0}},
+  {"name": "click", "ms": 100, "set": {"buttons_state": 256}},
+  {"name": "main", "ms": 1000, "set": {"buttons_state": 0}},
+  {"name": "long click", "ms": 1000, "set": {"buttons_state": 512}},
+]
+
+
+class _HostDisplay(framebuf.FrameBuffer):
+  """The ST7565 framebuffer without the SPI: counts the pixels written"""
+
+  def __init__(self):
+    self.width = WIDTH
+    self.height = HEIGHT
+    self.pages = PAGES
+    self.buf = bytearray(WIDTH * PAGES)
+    super().__init__(self.buf, WIDTH, HEIGHT, framebuf.MONO_VLSB)
+    self.pixels_touched = 0
+    self.shows = 0
+
+  def _set(self, x, y, c):
+    self.pixels_touched += 1
+    framebuf.FrameBuffer._set(self, x, y, c)
+
+  def show(self):
+    self.shows += 1
+
+
+def _install_config(config_path, overrides=None):
+  _install_micropython_shim()
+  source_name, module = _load_config(config_path)
+  cfg = types.ModuleType("common.config_runtime")
+  for name, value in flatten(module).items():
+    setattr(cfg, name, value)
+  for name, value in (overrides or {}).items():
+    setattr(cfg, name, value)
+  from common.model_constants import TYPE_EBIKE, TYPE_ESCOOTER
+  cfg.source_config = source_name
+  cfg.type_name = {TYPE_EBIKE: "ebike", TYPE_ESCOOTER: "escooter"}[cfg.type["ebike_escooter"]]
+  sys.modules["common.config_runtime"] = cfg
+  import common
+  common.config_runtime = cfg
+  return cfg
+
+
+def _rows(buf):
+  """MONO_VLSB buffer to rows of 0/1 pixels"""
+  return [[(buf[(y >> 3) * WIDTH + x] >> (y & 7)) & 1 for x in range(WIDTH)] for y in range(HEIGHT)]
+
+
+def _pack_row(row, ink):
+  # MSB first, ink pixels written as the bit value ink
+  out = bytearray((len(row) + 7) // 8)
+  for x, p in enumerate(row):
+    if p == ink:
+      out[x >> 3] |= 0x80 >> (x & 7)
+  return bytes(out)
+
+
+def write_pbm(path, buf):
+  with open(path, "wb") as f:
+    f.write("P4\n{} {}\n".format(WIDTH, HEIGHT).encode())
+    for row in _rows(buf):
+      f.write(_pack_row(row, 1))
+
+
+def write_png(path, buf, scale=1):
+  rows = _rows(buf)
+  w = WIDTH * scale
+  raw = bytearray()
+  for row in rows:
+    # 1 bit grayscale: 0 is black, so ink is written as 0
+    line = _pack_row([p for p in row for _ in range(scale)], 0)
+    for _ in range(scale):
+      raw += b"\x00" + line
+
+  def chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+  with open(path, "wb") as f:
+    f.write(b"\x89PNG\r\n\x1a\n")
+    f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", w, HEIGHT * scale, 1, 0, 0, 0, 0)))
+    f.write(chunk(b"IDAT", zlib.compress(bytes(raw), 9)))
+    f.write(chunk(b"IEND", b""))
+
+
+def frames(script):
+  """yield (step name, t_ms, {var: value}) for every frame of the script"""
+  t_ms = 0
+  for step in script:
+    n = max(1, int(step.get("ms", FRAME_MS)) // FRAME_MS)
+    ramp = step.get("ramp", {})
+    for i in range(n):
+      values = dict(step.get("set", {})) if i == 0 else {}
+      for name, (start, end) in ramp.items():
+        values[name] = int(start + (end - start) * i / max(1, n - 1))
+      yield step.get("name", ""), t_ms, values
+      t_ms += FRAME_MS
+
+
+def run(script, config_path, out_dir=None, fmt="pbm", scale=1, check_dir=None, quiet=False, overrides=None):
+  # scripted time.ticks_ms() (screens, blinking); ticks_us() stays real so
+  # the widget update timers still measure
+  fake_time.install()
+  clock = fake_time.clock
+  clock.ms = 0
+  _install_config(config_path, overrides)
+
+  from vars import Vars
+  from screen_manager import ScreenManager, ScreenID
+
+  fb = _HostDisplay()
+  vars = Vars()
+  manager = ScreenManager(fb, vars)
+  names = {}
+  for name in dir(ScreenID):
+    if not name.startswith("_"):
+      names[getattr(ScreenID, name)] = name.lower()
+
+  if out_dir:
+    os.makedirs(out_dir, exist_ok=True)
+  previous = bytes(fb.buf)
+  mismatches = 0
+  written = 0
+  slowest = (0, None)
+  if not quiet:
+    print("{:>6} {:10} {:16} {:>8} {:>7}  {}".format("t ms", "screen", "step", "us", "pixels", "bytes changed per page"))
+  for step_name, t_ms, values in frames(script):
+    clock.ms = t_ms
+    for name, value in values.items():
+      if not hasattr(vars, name):
+        raise ValueError("unknown Vars field: " + name)
+      setattr(vars, name, value)
+
+    fb.pixels_touched = 0
+    start = time.perf_counter()
+    manager.update(vars)
+    manager.render(vars)
+    us = int((time.perf_counter() - start) * 1e6)
+    if us > slowest[0]:
+      slowest = (us, "{} ms {}".format(t_ms, step_name))
+
+    frame = bytes(fb.buf)
+    changed = [sum(1 for a, b in zip(frame[p * WIDTH:(p + 1) * WIDTH], previous[p * WIDTH:(p + 1) * WIDTH]) if a != b)
+               for p in range(PAGES)]
+    screen = names.get(manager.get_current_id(), "?")
+    if not quiet:
+      print("{:6} {:10} {:16} {:8} {:7}  {}".format(
+        t_ms, screen, step_name[:16], us, fb.pixels_touched, " ".join("{:3}".format(c) for c in changed)))
+
+    if out_dir and (frame != previous or t_ms == 0):
+      file_name = "frame_{:06}_{}.{}".format(t_ms, screen, fmt)
+      path = os.path.join(out_dir, file_name)
+      if fmt == "png":
+        write_png(path, frame, scale)
+      else:
+        write_pbm(path, frame)
+      written += 1
+      if check_dir:
+        reference = os.path.join(check_dir, file_name)
+        with open(path, "rb") as f:
+          data = f.read()
+        if not os.path.exists(reference):
+          print("check: {} missing in {}".format(file_name, check_dir))
+          mismatches += 1
+        else:
+          with open(reference, "rb") as f:
+            if f.read() != data:
+              print("check: {} differs".format(file_name))
+              mismatches += 1
+    previous = frame
+
+  print("{} frames written, slowest {} us ({})".format(written, slowest[0], slowest[1]))
+  if check_dir:
+    print("check: {}".format("ok" if not mismatches else "{} FAIL".format(mismatches)))
+  return mismatches
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Render the display screens off-device")
+  parser.add_argument("-o", "--output-dir", help="write the changed frames here")
+  parser.add_argument("--script", help="JSON script (default: built-in ride)")
+  parser.add_argument("--config", default=os.path.join(FIRMWARE_DIR, DEFAULT_CONFIG))
+  parser.add_argument("--format", choices=("pbm", "png"), default="pbm")
+  parser.add_argument("--scale", type=int, default=1, help="PNG pixel scale")
+  parser.add_argument("--check", help="compare the frames with the ones in this folder")
+  parser.add_argument("--quiet", action="store_true", help="summary only")
+  parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="override a config setting")
+  args = parser.parse_args(argv)
+
+  if args.check and not args.output_dir:
+    parser.error("--check needs -o")
+  script = DEFAULT_SCRIPT
+  if args.script:
+    with open(args.script) as f:
+      script = json.load(f)
+  overrides = {}
+  for item in args.set:
+    name, sep, value = item.partition("=")
+    if not sep:
+      parser.error("--set needs NAME=VALUE")
+    try:
+      overrides[name] = json.loads(value)
+    except ValueError:
+      overrides[name] = value
+  mismatches = run(script, args.config, args.output_dir, args.format, args.scale, args.check, args.quiet,
+                   overrides)
+  return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# replay_can_trace.py — host tool (CPython) for 01_diy_main_board/trip_computer.py:
+# replays a VESC CAN trace (candump -l log format) through the integer trip
+# computer, called every ~50 ms of trace time like task_motors_refresh_data,
+# and checks distance, Ah and Wh against a float reference that integrates
+# every decoded frame.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/replay_can_trace.py TRACE.log [--can-ids 101,102]
+#       [--poles-pair 15] [--wheel-radius 0.165]
+#   python3 tools/replay_can_trace.py --synth TRACE.log [--minutes 20]
+#       write a synthetic ride (accelerate, cruise, regen braking, stops) in
+#       the same format, then replay it
+#
+# Trace lines: "(1700000000.123456) can0 0000091B#0000123400FA0000"
+# (VESC extended ids: command << 8 | controller id). Exit code is 1 when an
+# integral is off by more than 1 % (plus one unit of resolution).
+
+import argparse
+import os
+import random
+import struct
+import sys
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(FIRMWARE_DIR, "tools")
+MAIN_BOARD_DIR = os.path.join(FIRMWARE_DIR, "01_diy_main_board")
+for _path in (FIRMWARE_DIR, TOOLS_DIR, MAIN_BOARD_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+import fake_time  # noqa: E402  (tools/fake_time.py)
+fake_time.install()
+from trip_computer import TripComputer  # noqa: E402
+
+_CAN_PACKET_STATUS_1 = 9
+_CAN_PACKET_STATUS_4 = 16
+_CAN_PACKET_STATUS_5 = 27
+
+
+class _MotorCfg(object):
+  def __init__(self, can_id, poles_pair, wheel_radius):
+    self.can_id = can_id
+    self.poles_pair = poles_pair
+    self.wheel_radius = wheel_radius
+
+
+class _MotorData(object):
+  # the MotorData fields used by the trip computer
+  def __init__(self, cfg):
+    self.cfg = cfg
+    self.speed_erpm = 0
+    self.motor_current_x10 = 0
+    self.battery_current_x10 = 0
+    self.battery_voltage_x10 = 0
+
+
+def parse_trace(path):
+  """yield (time_ms, can_id, command, data)"""
+  with open(path) as f:
+    for line in f:
+      line = line.strip()
+      if not line.startswith("("):
+        continue
+      try:
+        ts, _iface, frame = line.split()
+        msg_id, data = frame.split("#")
+        t_ms = int(round(float(ts.strip("()")) * 1000))
+        msg_id = int(msg_id, 16)
+        data = bytes.fromhex(data)
+      except ValueError:
+        continue
+      yield t_ms, msg_id & 0xFF, (msg_id >> 8) & 0xFF, data
+
+
+def decode(motor_data, command, data):
+  # same decoders as motor._decode_status
+  if command == _CAN_PACKET_STATUS_1 and len(data) >= 6:
+    motor_data.speed_erpm = struct.unpack_from(">l", data, 0)[0]
+    motor_data.motor_current_x10 = struct.unpack_from(">h", data, 4)[0]
+  elif command == _CAN_PACKET_STATUS_4 and len(data) >= 6:
+    motor_data.battery_current_x10 = struct.unpack_from(">h", data, 4)[0]
+  elif command == _CAN_PACKET_STATUS_5 and len(data) >= 6:
+    motor_data.battery_voltage_x10 = struct.unpack_from(">h", data, 4)[0]
+
+
+class _Reference(object):
+  """Float integration of the decoded values, exact between frames"""
+
+  def __init__(self, motor_cfg):
+    self._mm_s_per_erpm = 6283.18 * motor_cfg.wheel_radius / (60 * max(1, motor_cfg.poles_pair))
+    self.distance_m = 0.0
+    self.mah_consumed = 0.0
+    self.mah_regen = 0.0
+    self.wh_consumed = 0.0
+    self.wh_regen = 0.0
+
+  def integrate(self, motor_datas, dt_ms):
+    speed = abs(motor_datas[0].speed_erpm) * self._mm_s_per_erpm
+    if speed >= 280:
+      self.distance_m += speed * dt_ms / 1e6
+    current = sum(m.battery_current_x10 for m in motor_datas) / 10.0
+    power = current * motor_datas[0].battery_voltage_x10 / 10.0
+    if current > 0:
+      self.mah_consumed += current * dt_ms / 3600.0
+      self.wh_consumed += power * dt_ms / 3.6e6
+    else:
+      self.mah_regen -= current * dt_ms / 3600.0
+      self.wh_regen -= power * dt_ms / 3.6e6
+
+
+def replay(path, motor_cfgs, seed=1):
+  rnd = random.Random(seed)
+  motor_datas = [_MotorData(c) for c in motor_cfgs]
+  by_id = {}
+  for motor_data in motor_datas:
+    by_id[motor_data.cfg.can_id] = motor_data
+
+  trip = TripComputer(motor_cfgs[0])
+  reference = _Reference(motor_cfgs[0])
+  last_ms = None
+  next_update_ms = None
+  frames = 0
+  for t_ms, can_id, command, data in parse_trace(path):
+    if last_ms is None:
+      last_ms = t_ms
+      next_update_ms = t_ms
+    # the task runs (with jitter) on the values held so far
+    while next_update_ms <= t_ms:
+      trip.update(motor_datas, next_update_ms)
+      next_update_ms += rnd.randrange(50, 66)
+    reference.integrate(motor_datas, t_ms - last_ms)
+    last_ms = t_ms
+
+    motor_data = by_id.get(can_id)
+    if motor_data is not None:
+      decode(motor_data, command, data)
+      frames += 1
+  # the reference stopped at the last frame: integrate the trip computer
+  # up to there too
+  if last_ms is not None:
+    trip.update(motor_datas, last_ms)
+  return trip, reference, frames
+
+
+def synth(path, motor_cfgs, minutes, seed=1):
+  rnd = random.Random(seed)
+  k = 6283.18 * motor_cfgs[0].wheel_radius / (60 * max(1, motor_cfgs[0].poles_pair))
+  t_ms = 0
+  speed = 0.0          # mm/s
+  target = 0.0
+  phase_end = 0
+  voltage = 588.0      # x10
+  with open(path, "w") as f:
+    while t_ms < minutes * 60000:
+      if t_ms >= phase_end:
+        phase_end = t_ms + rnd.randrange(5000, 40000)
+        target = rnd.choice((0.0, 0.0, 4000.0, 6000.0, 7500.0, 8300.0))
+      accel = max(-3000.0, min(2000.0, (target - speed) * 2))
+      speed = max(0.0, speed + accel * 0.02)
+      # battery current: drag + acceleration, negative while braking (regen)
+      current_x10 = int((speed * 0.0012 + accel * 0.004) * 10 * (1 if accel > -500 else 1.5))
+      if speed < 300 and current_x10 < 0:
+        current_x10 = 0
+      voltage = max(480.0, voltage - 0.0002 * max(0, current_x10)) - 0.3 * current_x10 / 100
+      erpm = int(speed / k)
+
+      for i, cfg in enumerate(motor_cfgs):
+        ts = (t_ms + rnd.randrange(0, 3) + i) / 1000.0
+        share = current_x10 // len(motor_cfgs)
+        f.write("({:.6f}) can0 {:08X}#{}\n".format(
+          ts, (_CAN_PACKET_STATUS_1 << 8) | cfg.can_id,
+          struct.pack(">lhh", erpm + rnd.randrange(-3, 4), share * 2, 0).hex().upper()))
+        if (t_ms // 20) % 5 == i:
+          f.write("({:.6f}) can0 {:08X}#{}\n".format(
+            ts, (_CAN_PACKET_STATUS_4 << 8) | cfg.can_id,
+            struct.pack(">hhhh", 350, 400, share, 0).hex().upper()))
+          f.write("({:.6f}) can0 {:08X}#{}\n".format(
+            ts, (_CAN_PACKET_STATUS_5 << 8) | cfg.can_id,
+            struct.pack(">lhh", 0, int(voltage), 0).hex().upper()))
+      t_ms += 20
+
+
+def _check(name, got, expected, resolution):
+  ok = abs(got - expected) <= abs(expected) * 0.01 + resolution
+  print("{:16} {:12.1f} (reference {:12.1f}) {}".format(name, got, expected, "ok" if ok else "FAIL"))
+  return ok
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Replay a VESC CAN trace through the trip computer")
+  parser.add_argument("trace")
+  parser.add_argument("--synth", action="store_true", help="write a synthetic trace first")
+  parser.add_argument("--minutes", type=int, default=20)
+  parser.add_argument("--can-ids", default="101,102", help="rear first")
+  parser.add_argument("--poles-pair", type=int, default=15)
+  parser.add_argument("--wheel-radius", type=float, default=0.165)
+  parser.add_argument("--seed", type=int, default=1)
+  args = parser.parse_args(argv)
+
+  motor_cfgs = [_MotorCfg(int(c), args.poles_pair, args.wheel_radius) for c in args.can_ids.split(",")]
+  if args.synth:
+    synth(args.trace, motor_cfgs, args.minutes, args.seed)
+
+  trip, reference, frames = replay(args.trace, motor_cfgs, args.seed)
+  print("{} frames, moving {} s, avg speed {:.1f} km/h, {:.1f} Wh/km".format(
+    frames, trip.moving_s, trip.avg_speed_x10 / 10, trip.wh_per_km_x10 / 10))
+  ok = _check("distance m", trip.distance_m, reference.distance_m, 1)
+  ok = _check("consumed mAh", trip.mah_consumed, reference.mah_consumed, 1) and ok
+  ok = _check("regen mAh", trip.mah_regen, reference.mah_regen, 1) and ok
+  ok = _check("consumed Wh x10", trip.wh_consumed_x10, reference.wh_consumed * 10, 1) and ok
+  ok = _check("regen Wh x10", trip.wh_regen_x10, reference.wh_regen * 10, 1) and ok
+  return 0 if ok else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# replay_soc.py — host tool (CPython) for 01_diy_main_board/soc_estimator.py:
+# replays a VESC CAN trace (candump -l log format, see replay_can_trace.py)
+# through the trip computer (every ~50 ms) and the SoC estimator (every
+# second), as the escooter main board runs them.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/replay_soc.py TRACE.log [--cells 20] [--capacity-ah 15]
+#   python3 tools/replay_soc.py --synth TRACE.log [--minutes 60]
+#       [--capacity-error 10] [--start-soc 90]
+#       write a synthetic ride from a battery model (OCV curve, internal
+#       resistance, polarization relaxing during stops) first; the true SoC
+#       goes in the trace as "# soc_x1000 <ms> <value>" lines
+#
+# With true SoC lines in the trace, reports the published SoC error and
+# exits with 1 when it goes over --max-error (percent) after the first
+# minute. A trace without them (a logged ride) just prints the timeline.
+
+import argparse
+import math
+import os
+import random
+import struct
+import sys
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIRMWARE_DIR = os.path.dirname(TOOLS_DIR)
+MAIN_BOARD_DIR = os.path.join(FIRMWARE_DIR, "01_diy_main_board")
+for _path in (TOOLS_DIR, FIRMWARE_DIR, MAIN_BOARD_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+import fake_time  # noqa: E402  (tools/fake_time.py)
+fake_time.install()
+from trip_computer import TripComputer  # noqa: E402
+from soc_estimator import SocEstimator, OCV_CURVE_NMC  # noqa: E402
+from replay_can_trace import (  # noqa: E402
+  _MotorCfg,
+  _MotorData,
+  parse_trace,
+  decode,
+  _CAN_PACKET_STATUS_1,
+  _CAN_PACKET_STATUS_4,
+  _CAN_PACKET_STATUS_5,
+)
+
+
+class _Cfg(object):
+  # the Cfg fields used by the SoC estimator
+  def __init__(self, cells, capacity_ah):
+    self.battery_cells_series = cells
+    self.battery_capacity_ah = capacity_ah
+    self.battery_cell_ocv_curve = None
+    self.battery_internal_resistance_mohm = 100
+    self.range_wh_per_km_default = 15.0
+
+
+def parse_truth(path):
+  truth = []
+  with open(path) as f:
+    for line in f:
+      if line.startswith("# soc_x1000 "):
+        _tag, _name, t_ms, value = line.split()
+        truth.append((int(t_ms), int(value)))
+  return truth
+
+
+def _cell_ocv_mv(soc):
+  # "real" cell: the NMC curve, smoothed and shifted a little, so the
+  # estimator's table is not an exact match
+  soc_x1000 = soc * 1000
+  for i in range(1, len(OCV_CURVE_NMC)):
+    mv1, s1 = OCV_CURVE_NMC[i]
+    if soc_x1000 <= s1:
+      mv0, s0 = OCV_CURVE_NMC[i - 1]
+      mv = mv0 + (mv1 - mv0) * (soc_x1000 - s0) / (s1 - s0)
+      return mv + 8 * math.sin(soc * 6.0)
+  return OCV_CURVE_NMC[-1][0]
+
+
+def synth(path, motor_cfgs, cells, capacity_ah, minutes, start_soc, seed=1):
+  rnd = random.Random(seed)
+  k = 6283.18 * motor_cfgs[0].wheel_radius / (60 * max(1, motor_cfgs[0].poles_pair))
+  r0 = 0.120        # ohm
+  r1 = 0.060        # polarization
+  tau1 = 60.0       # s
+  v1 = 0.0
+  soc = start_soc / 100.0
+  speed = 0.0
+  target = 0.0
+  phase_end = 0
+  t_ms = 0
+  with open(path, "w") as f:
+    while t_ms < minutes * 60000:
+      if t_ms >= phase_end:
+        stop = rnd.random() < 0.3
+        phase_end = t_ms + (rnd.randrange(40000, 120000) if stop else rnd.randrange(10000, 60000))
+        target = 0.0 if stop else rnd.choice((4000.0, 6000.0, 7500.0, 8300.0))
+      accel = max(-3000.0, min(2000.0, (target - speed) * 2))
+      speed = max(0.0, speed + accel * 0.02)
+      current = speed * 0.0015 + accel * 0.005
+      if speed < 300:
+        current = max(0.0, current)
+      current += 0.15  # controller idle draw
+
+      soc -= current * 0.02 / 3600.0 / capacity_ah
+      v1 += (current * r1 - v1) * 0.02 / tau1
+      voltage = cells * _cell_ocv_mv(soc) / 1000.0 - current * r0 - v1
+
+      erpm = int(speed / k)
+      current_x10 = int(round(current * 10))
+      for i, cfg in enumerate(motor_cfgs):
+        ts = (t_ms + i) / 1000.0
+        share = current_x10 // len(motor_cfgs) + (current_x10 % len(motor_cfgs) if i == 0 else 0)
+        f.write("({:.6f}) can0 {:08X}#{}\n".format(
+          ts, (_CAN_PACKET_STATUS_1 << 8) | cfg.can_id,
+          struct.pack(">lhh", erpm, share * 2, 0).hex().upper()))
+        if (t_ms // 20) % 5 == 0:
+          f.write("({:.6f}) can0 {:08X}#{}\n".format(
+            ts, (_CAN_PACKET_STATUS_4 << 8) | cfg.can_id,
+            struct.pack(">hhhh", 350, 400, share, 0).hex().upper()))
+          f.write("({:.6f}) can0 {:08X}#{}\n".format(
+            ts, (_CAN_PACKET_STATUS_5 << 8) | cfg.can_id,
+            struct.pack(">lhh", 0, int(voltage * 10 + rnd.uniform(-0.5, 0.5)), 0).hex().upper()))
+      if t_ms % 1000 == 0:
+        f.write("# soc_x1000 {} {}\n".format(t_ms, int(soc * 1000)))
+      t_ms += 20
+
+
+def replay(path, motor_cfgs, cells, capacity_ah, seed=1):
+  """return [(t_ms, published soc_x1000, range_m, internal_resistance_mohm)]"""
+  rnd = random.Random(seed)
+  motor_datas = [_MotorData(c) for c in motor_cfgs]
+  by_id = {}
+  for motor_data in motor_datas:
+    by_id[motor_data.cfg.can_id] = motor_data
+
+  trip = TripComputer(motor_cfgs[0])
+  soc = SocEstimator(_Cfg(cells, capacity_ah))
+  timeline = []
+  next_trip_ms = None
+  next_soc_ms = None
+  for t_ms, can_id, command, data in parse_trace(path):
+    if next_trip_ms is None:
+      next_trip_ms = t_ms
+      # first estimate once the first voltage arrived
+      next_soc_ms = t_ms + 200
+    while next_trip_ms <= t_ms:
+      trip.update(motor_datas, next_trip_ms)
+      next_trip_ms += rnd.randrange(50, 66)
+    while next_soc_ms <= t_ms:
+      soc.update(motor_datas, trip, now_ms=next_soc_ms)
+      timeline.append((next_soc_ms, soc.soc_x1000, soc.range_m, soc.internal_resistance_mohm))
+      next_soc_ms += 1000
+
+    motor_data = by_id.get(can_id)
+    if motor_data is not None:
+      decode(motor_data, command, data)
+  return timeline, trip
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Replay a VESC CAN trace through the SoC estimator")
+  parser.add_argument("trace")
+  parser.add_argument("--synth", action="store_true", help="write a synthetic ride first")
+  parser.add_argument("--minutes", type=int, default=60)
+  parser.add_argument("--start-soc", type=float, default=90.0, help="synthetic ride start SoC, percent")
+  parser.add_argument("--capacity-error", type=float, default=0.0,
+                      help="configured capacity off by this percent (synthetic ride)")
+  parser.add_argument("--cells", type=int, default=20)
+  parser.add_argument("--capacity-ah", type=float, default=15.0)
+  parser.add_argument("--can-ids", default="101,102", help="rear first")
+  parser.add_argument("--poles-pair", type=int, default=15)
+  parser.add_argument("--wheel-radius", type=float, default=0.165)
+  parser.add_argument("--max-error", type=float, default=5.0, help="percent")
+  parser.add_argument("--seed", type=int, default=1)
+  args = parser.parse_args(argv)
+
+  motor_cfgs = [_MotorCfg(int(c), args.poles_pair, args.wheel_radius) for c in args.can_ids.split(",")]
+  capacity_ah = args.capacity_ah
+  if args.synth:
+    synth(args.trace, motor_cfgs, args.cells, capacity_ah, args.minutes, args.start_soc, args.seed)
+    capacity_ah *= 1 + args.capacity_error / 100.0
+
+  timeline, trip = replay(args.trace, motor_cfgs, args.cells, capacity_ah, args.seed)
+  truth = dict(parse_truth(args.trace))
+  print("{:.1f} km, {:.1f} Wh/km, internal resistance {} mohm".format(
+    trip.distance_m / 1000, trip.wh_per_km_x10 / 10, timeline[-1][3] if timeline else 0))
+
+  t0 = timeline[0][0] if timeline else 0
+  max_error = 0
+  for t_ms, soc_x1000, range_m, _r in timeline:
+    true_soc = truth.get(t_ms - t0)
+    if true_soc is not None and t_ms - t0 >= 60000:
+      max_error = max(max_error, abs(soc_x1000 - true_soc))
+    if (t_ms - t0) % 300000 < 1000:
+      line = "{:5.1f} min  soc {:5.1f} %  range {:5.1f} km".format(
+        (t_ms - t0) / 60000, soc_x1000 / 10, range_m / 1000)
+      if true_soc is not None:
+        line += "  (true {:5.1f} %)".format(true_soc / 10)
+      print(line)
+
+  if not truth:
+    return 0
+  ok = max_error <= args.max_error * 10
+  print("max SoC error after 1 min: {:.1f} % {}".format(max_error / 10, "ok" if ok else "FAIL"))
+  return 0 if ok else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# replay_torque_capture.py — host tool (CPython) that feeds a recorded torque
+# sensor capture through the ebike AssistEngine (01_diy_main_board/ebike/assist.py)
+# and prints the motor current target of each control period as CSV.
+#
+# Accepted captures:
+#   - console output of ebike/testing_firmwares/testing_CANBUS_torque_sensor.py
+#     ("CAN messages available: N", "Torque raw value: N", "Cadence: N");
+#     that firmware prints one batch per second, the frames of a batch are
+#     spread evenly over that second
+#   - CSV lines "ms,torque_raw,cadence"
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/replay_torque_capture.py capture.txt --assist-level 5
+#
+# The engine defaults match the OPTIONS in ebike/main.py; change them with the
+# command line options to try other settings on the same capture.
+
+import argparse
+import os
+import sys
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_BOARD_DIR = os.path.join(FIRMWARE_DIR, "01_diy_main_board")
+
+# Same as ebike/main.py assist_level_factor_table
+ASSIST_LEVEL_FACTORS = [
+  0, 0.13, 0.16, 0.20, 0.24, 0.31, 0.38, 0.48, 0.60, 0.75, 0.93,
+  1.16, 1.46, 1.82, 2.27, 2.84, 3.55, 4.44, 5.55, 6.94, 8.67,
+]
+
+
+def _parse_console(lines):
+  frames = []
+  batch = []
+  second = 0
+
+  def flush():
+    n = len(batch)
+    for i, (torque, cadence) in enumerate(batch):
+      frames.append((second * 1000 + (i * 1000) // n, torque, cadence))
+
+  torque = None
+  for line in lines:
+    line = line.strip()
+    if line.startswith("CAN messages available:"):
+      if batch:
+        flush()
+        batch = []
+      second += 1
+    elif line.startswith("Torque raw value:"):
+      torque = int(line.split(":")[1])
+    elif line.startswith("Cadence:") and torque is not None:
+      batch.append((torque, int(line.split(":")[1])))
+      torque = None
+  if batch:
+    flush()
+  return frames
+
+
+def _parse_csv(lines):
+  frames = []
+  for line in lines:
+    line = line.strip()
+    if not line or line.startswith("#"):
+      continue
+    parts = line.split(",")
+    try:
+      frames.append((int(parts[0]), int(parts[1]), int(parts[2])))
+    except (ValueError, IndexError):
+      continue  # header or broken line
+  return frames
+
+
+def load_capture(path):
+  with open(path) as f:
+    lines = f.readlines()
+  if any("Torque raw value:" in line for line in lines):
+    return _parse_console(lines)
+  return _parse_csv(lines)
+
+
+def replay(frames, args, out=sys.stdout):
+  if MAIN_BOARD_DIR not in sys.path:
+    sys.path.insert(0, MAIN_BOARD_DIR)
+  from ebike.assist import AssistEngine, PedalSamples
+
+  samples = PedalSamples(int(args.cadence_timeout * 1000))
+  engine = AssistEngine(
+    samples,
+    ASSIST_LEVEL_FACTORS,
+    args.torque_min_x10,
+    args.torque_max_x10,
+    args.current_max,
+    args.current_min_start,
+    args.ramp_up_time,
+    args.ramp_down_time,
+    args.crank_length_mm,
+    period_ms=args.period_ms)
+
+  out.write("ms,torque_x10,cadence,human_power_x10,motor_current_target_ma\n")
+  if not frames:
+    return
+  end_ms = frames[-1][0] + args.period_ms
+  i = 0
+  now_ms = frames[0][0]
+  while now_ms <= end_ms:
+    # frames received since the previous control period
+    while i < len(frames) and frames[i][0] <= now_ms:
+      samples.push(frames[i][1], frames[i][2], frames[i][0])
+      i += 1
+    target_ma = engine.tick(now_ms, args.assist_level)
+    out.write("{},{},{},{},{}\n".format(
+      now_ms, engine.torque_x10, engine.cadence, engine.human_power_x10, target_ma))
+    now_ms += args.period_ms
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Replay a torque sensor capture through the ebike assist engine")
+  parser.add_argument("capture", help="console output of testing_CANBUS_torque_sensor.py or ms,torque_raw,cadence CSV")
+  parser.add_argument("--assist-level", type=int, default=5)
+  parser.add_argument("--period-ms", type=int, default=20)
+  parser.add_argument("--torque-min-x10", type=int, default=40)
+  parser.add_argument("--torque-max-x10", type=int, default=400)
+  parser.add_argument("--current-max", type=float, default=15.0)
+  parser.add_argument("--current-min-start", type=float, default=1.5)
+  parser.add_argument("--ramp-up-time", type=float, default=0.1)
+  parser.add_argument("--ramp-down-time", type=float, default=0.05)
+  parser.add_argument("--crank-length-mm", type=int, default=170)
+  parser.add_argument("--cadence-timeout", type=float, default=1.0)
+  args = parser.parse_args(argv)
+
+  replay(load_capture(args.capture), args)
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# sim_alerts.py — host tool (CPython) for 02_diy_display/alerts.py: runs the
+# AlertEngine against scripted Vars values on an explicit clock and checks
+# priority order, dedup of repeated alerts, rotation between conditions,
+# one-shot events, the overheat hysteresis and the display durations.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/sim_alerts.py [-v]
+#
+# Exit code is 1 when a check fails.
+
+import argparse
+import os
+import sys
+import types
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(FIRMWARE_DIR, "tools")
+DISPLAY_DIR = os.path.join(FIRMWARE_DIR, "02_diy_display")
+for _path in (FIRMWARE_DIR, TOOLS_DIR, DISPLAY_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+import fake_time  # noqa: E402  (tools/fake_time.py)
+fake_time.install()
+import alerts  # noqa: E402
+from alerts import AlertEngine  # noqa: E402
+from common.config_defaults import OPTIONAL_DEFAULTS  # noqa: E402
+
+FRAME_MS = 100
+
+
+def _motor_cfg():
+  return types.SimpleNamespace(
+    vesc_min_temperature_x10=850, vesc_max_temperature_x10=1000,
+    min_temperature_x10=700, max_temperature_x10=1100)
+
+
+def _vars():
+  # the Vars fields the engine reads (vars.py needs the MicroPython ticks)
+  return types.SimpleNamespace(
+    mode=0,
+    rear_vesc_temperature_x10=0, front_vesc_temperature_x10=0,
+    rear_motor_temperature_x10=0, front_motor_temperature_x10=0,
+    bms_protection_is_active=False, bms_cell_imbalance_is_active=False,
+    bms_cell_min_mv=0, bms_cell_max_mv=0)
+
+
+def _cfg(**durations):
+  # the alert_*_display_ms defaults, as config_runtime fills them in
+  cfg = types.SimpleNamespace(rear_motor_cfg=_motor_cfg(), front_motor_cfg=_motor_cfg())
+  for name, value in OPTIONAL_DEFAULTS.items():
+    setattr(cfg, name, value)
+  for name, value in durations.items():
+    setattr(cfg, name, value)
+  return cfg
+
+
+class _Sim(object):
+  """Engine + Vars + clock; records (t_ms, shown) at every change"""
+
+  def __init__(self, cfg=None, verbose=False):
+    self.engine = AlertEngine(cfg if cfg is not None else _cfg())
+    self.vars = _vars()
+    self.t_ms = 0
+    self.shown = []
+    self.verbose = verbose
+
+  def _now_shown(self):
+    e = self.engine
+    if e.current < 0:
+      return None
+    if e.current_is_bar:
+      return "{} {}%".format(e.current_label, e.current_percent)
+    return e.current_text
+
+  def run(self, ms, **values):
+    for name, value in values.items():
+      setattr(self.vars, name, value)
+    for _ in range(max(1, ms // FRAME_MS)):
+      if self.engine.update(self.vars, self.t_ms):
+        shown = self._now_shown()
+        self.shown.append((self.t_ms, shown))
+        if self.verbose:
+          print("    {:6} {}".format(self.t_ms, shown))
+      self.t_ms += FRAME_MS
+    return self
+
+  def labels(self):
+    return [s for _, s in self.shown]
+
+
+def check_priority(verbose):
+  # all raised in the same frame: overheat, BMS, cells, mode in slot order
+  sim = _Sim(verbose=verbose)
+  sim.run(FRAME_MS)
+  sim.engine.raise_info("hi")
+  sim.run(FRAME_MS, mode=1, rear_vesc_temperature_x10=900, bms_protection_is_active=True,
+          bms_cell_imbalance_is_active=True, bms_cell_min_mv=3600, bms_cell_max_mv=3720)
+  first = [s.split(" ")[0] for s in sim.run(10000).labels() if s][:6]
+  return first == ["vr", "bms", "c120mV", "mode", "hi", "vr"], first
+
+
+def check_dedup(verbose):
+  # the same info raised every frame is one pending alert
+  sim = _Sim(verbose=verbose)
+  for _ in range(10):
+    sim.engine.raise_info("hi")
+    sim.run(FRAME_MS)
+  sim.run(5000)
+  return sim.labels() == ["hi", None], sim.labels()
+
+
+def check_rotation(verbose):
+  # two conditions take turns, 2 s each, while they last
+  sim = _Sim(verbose=verbose)
+  sim.run(FRAME_MS, bms_protection_is_active=True, front_motor_temperature_x10=900)
+  sim.run(8000)
+  turns = [(t, s.split(" ")[0]) for t, s in sim.shown]
+  expected = [(0, "mf"), (2000, "bms"), (4000, "mf"), (6000, "bms"), (8000, "mf")]
+  return turns == expected, turns
+
+
+def check_condition_end(verbose):
+  # a condition that ends is taken off at once; a lone one stays on
+  sim = _Sim(verbose=verbose)
+  sim.run(5000, bms_protection_is_active=True)
+  stayed = sim.labels() == ["bms"]
+  sim.run(FRAME_MS, bms_protection_is_active=False)
+  return stayed and sim.shown[-1] == (5000, None), sim.shown
+
+
+def check_events(verbose):
+  # mode change: not the first value, shown once for its duration
+  sim = _Sim(verbose=verbose)
+  sim.run(1000, mode=2)
+  sim.run(5000, mode=0)
+  return sim.shown == [(1000, "mode 0"), (3000, None)], sim.shown
+
+
+def check_hysteresis(verbose):
+  # motor bar on above 70.0 C, off below 68.0 C, 1% inside the band
+  sim = _Sim(verbose=verbose)
+  sim.run(FRAME_MS, rear_motor_temperature_x10=710)
+  on = sim.engine.current == alerts.ALERT_MOTOR_REAR and sim.engine.current_percent == 2
+  sim.run(FRAME_MS, rear_motor_temperature_x10=690)
+  band = sim.engine.current == alerts.ALERT_MOTOR_REAR and sim.engine.current_percent == 1
+  sim.run(FRAME_MS, rear_motor_temperature_x10=900)
+  follows = sim.engine.current_percent == 50 and sim.engine.percent_changed
+  sim.run(FRAME_MS, rear_motor_temperature_x10=679)
+  off = sim.engine.current == -1
+  return on and band and follows and off, (on, band, follows, off)
+
+
+def check_durations(verbose):
+  sim = _Sim(_cfg(alert_mode_display_ms=500, alert_info_display_ms=3000), verbose=verbose)
+  sim.run(FRAME_MS)
+  sim.run(1000, mode=1)
+  sim.engine.raise_info("hi")
+  sim.run(5000)
+  expected = [(100, "mode 1"), (600, None), (1100, "hi"), (4100, None)]
+  return sim.shown == expected, sim.shown
+
+
+CHECKS = (
+  ("priority", check_priority),
+  ("dedup", check_dedup),
+  ("rotation", check_rotation),
+  ("condition end", check_condition_end),
+  ("events", check_events),
+  ("hysteresis", check_hysteresis),
+  ("durations", check_durations),
+)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="AlertEngine simulation checks")
+  parser.add_argument("-v", "--verbose", action="store_true", help="print what is shown")
+  args = parser.parse_args(argv)
+
+  failed = 0
+  for name, check in CHECKS:
+    if args.verbose:
+      print(name)
+    ok, got = check(args.verbose)
+    print("{:14} {}".format(name, "ok" if ok else "FAIL {}".format(got)))
+    failed += not ok
+  return 1 if failed else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
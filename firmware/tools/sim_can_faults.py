@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# sim_can_faults.py — host tool (CPython) for the main board CAN supervisor
+# (01_diy_main_board/can_supervisor.py): runs Motor and CanSupervisor on
+# the simulated bus of tools/fake_can.py, with the control loop (decode and
+# 3 commands per motor every 20 ms) and the supervisor task (every 50 ms),
+# and injects faults: a VESC going silent, bus errors escalating to
+# bus-off, a bus-off that lasts (restart backoff), a driver without state
+# or error counters, and checks the time to the safe state, the recovery,
+# the counters and the bus load.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/sim_can_faults.py [-v]
+#
+# Time is virtual (tools/fake_time.py). Exit code is 1 when a check
+# fails.
+
+import argparse
+import os
+import sys
+import types
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(FIRMWARE_DIR, "tools")
+MAIN_BOARD_DIR = os.path.join(FIRMWARE_DIR, "01_diy_main_board")
+for _path in (FIRMWARE_DIR, TOOLS_DIR, MAIN_BOARD_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+import fake_time  # noqa: E402  (tools/fake_time.py)
+from fake_time import clock  # noqa: E402
+
+CAN_ID_REAR = 101
+CAN_ID_FRONT = 102
+BAUDRATE = 500000
+CONTROL_MS = 20
+SUPERVISOR_MS = 50
+
+
+def _install_shims():
+  fake_time.install()
+
+  import fake_can
+  sys.modules["can"] = fake_can
+
+
+def _cfg():
+  return types.SimpleNamespace(can_node_timeout_ms=300, can_restart_backoff_min_ms=100,
+                               can_restart_backoff_max_ms=5000, can_telemetry_print_ms=0)
+
+
+def _motor_cfg(can_id):
+  return types.SimpleNamespace(can_id=can_id, can_tx_pin=4, can_rx_pin=5, can_baudrate=BAUDRATE, can_mode=0)
+
+
+class _Sim(object):
+  """Both VESCs on the bus, the control loop and the supervisor task"""
+
+  def __init__(self, driver=None):
+    import fake_can
+    import motor
+    from can_supervisor import CanSupervisor
+    fake_can.bus.reset()
+    fake_can.CAN.instances = 0
+    motor.CAN = driver or fake_can.CAN
+    motor.MotorData.nodes = None
+    motor.Motor._can = None
+    motor.Motor._rx = None
+    motor.Motor._rx_irq = False
+    self.bus = fake_can.bus
+    self.rear_node = self.bus.add_node(CAN_ID_REAR)
+    self.front_node = self.bus.add_node(CAN_ID_FRONT)
+    self.motors = [motor.Motor(motor.MotorData(_motor_cfg(CAN_ID_REAR))),
+                   motor.Motor(motor.MotorData(_motor_cfg(CAN_ID_FRONT)))]
+    self.Motor = motor.Motor
+    self.supervisor = CanSupervisor(self.motors, _cfg())
+    self.fault = True
+    self.levels = set()
+    self.restart_ms = []
+
+  def run(self, ms, until=None):
+    """return: the time until(self) became True, None if it did not"""
+    for _ in range(ms):
+      clock.ms += 1
+      self.bus.tick(clock.ms)
+      if clock.ms % CONTROL_MS == 0:
+        self.Motor.update_motor_data()
+        for m in self.motors:
+          m.set_motor_current_limits_ma(-10000, 20000)
+          m.set_battery_current_limits_ma(-5000, 15000)
+          m.set_motor_speed_erpm(1000)
+      if clock.ms % SUPERVISOR_MS == 0:
+        restarts = self.supervisor.restarts
+        self.fault = self.supervisor.update()
+        self.levels.add(self.supervisor.level)
+        if self.supervisor.restarts != restarts:
+          self.restart_ms.append(clock.ms)
+      if until is not None and until(self):
+        return clock.ms
+    return None
+
+
+def _started():
+  # VESCs heard: no fault once both are alive
+  sim = _Sim()
+  ok = sim.run(200, until=lambda s: not s.fault) is not None
+  return sim, ok
+
+
+def check_node_lost(verbose):
+  # the rear VESC stops sending: safe state within timeout + one period,
+  # cleared when it is back
+  sim, ok = _started()
+  sim.run(500)
+  sim.rear_node.silent = True
+  silent_ms = clock.ms
+  fault_ms = sim.run(1000, until=lambda s: s.fault)
+  delay = None if fault_ms is None else fault_ms - silent_ms
+  ok = ok and delay is not None and delay <= 300 + CONTROL_MS + SUPERVISOR_MS
+  sim.rear_node.silent = False
+  ok = ok and sim.run(200, until=lambda s: not s.fault) is not None
+  sup = sim.supervisor
+  ok = ok and list(sup.node_timeouts[:2]) == [1, 0] and sup.faults == 1 and sup.restarts == 0
+  return ok, ("safe state after", delay, "ms", sup.telemetry_text())
+
+
+def check_stale_status(verbose):
+  # only the STATUS_4 (temperatures) of the front VESC stops: no fault,
+  # reported as stale
+  sim, ok = _started()
+  frames = sim.front_node.frames
+  sim.front_node.frames = lambda: tuple(f for f in frames() if f[0] >> 8 != 16)
+  sim.run(2000)
+  sup = sim.supervisor
+  ok = ok and not sim.fault and sup.stale_masks[1] == 1 << 1 and sup.stale_masks[0] == 0
+  return ok, sup.telemetry_text()
+
+
+def check_escalation(verbose):
+  # every other frame sent is a bit error: TX error counter through warning
+  # and passive to bus-off; restarted and running once the bus is clean
+  sim, ok = _started()
+  sim.run(500)
+  sim.bus.error_every = 2
+  bus_off_ms = sim.run(1000, until=lambda s: s.fault)
+  ok = ok and bus_off_ms is not None and sim.supervisor.level == 3
+  sim.bus.error_every = 0
+  ok = ok and sim.run(1000, until=lambda s: not s.fault) is not None
+  sup = sim.supervisor
+  ok = ok and {1, 2, 3} <= sim.levels and sup.bus_off_count >= 1 and sup.restarts == sup.bus_off_count
+  return ok, ("levels", sorted(sim.levels), sup.telemetry_text())
+
+
+def check_backoff(verbose):
+  # a bus-off that lasts 12 s: restarts at least 100, 200, 400 ... 5000 ms
+  # apart (plus the time to get bus-off again), then one more once the bus
+  # is clean; backoff back to the minimum
+  sim, ok = _started()
+  sim.bus.error_every = 1
+  sim.run(12000)
+  gaps = [b - a for a, b in zip(sim.restart_ms, sim.restart_ms[1:])]
+  expected = [100, 200, 400, 800, 1600, 3200, 5000]
+  # bus-off again within 3 supervisor periods after a restart
+  ok = ok and len(gaps) == len(expected) and \
+    all(e <= g <= e + 3 * SUPERVISOR_MS for g, e in zip(gaps, expected))
+  sim.bus.error_every = 0
+  ok = ok and sim.run(6000, until=lambda s: not s.fault) is not None
+  sup = sim.supervisor
+  ok = ok and sup._backoff_ms == 100 and sup.bus_off_count == sup.restarts
+  return ok, ("restart gaps", gaps, sup.telemetry_text())
+
+
+def check_no_status_driver(verbose):
+  # a driver exposing no state nor counters: bus-off found from the TX drops
+  # with no VESC heard, recovered with deinit() and a new CAN instance
+  import fake_can
+  sim = _Sim(driver=fake_can.CANNoStatus)
+  ok = sim.run(200, until=lambda s: not s.fault) is not None
+  sim.bus.error_every = 1
+  ok = ok and sim.run(2000, until=lambda s: s.supervisor.level == 3) is not None
+  sim.bus.error_every = 0
+  ok = ok and sim.run(2000, until=lambda s: not s.fault) is not None
+  sup = sim.supervisor
+  ok = ok and fake_can.CAN.instances >= 2 and sup.restarts >= 1 and sup.rx_errors == -1
+  return ok, ("CAN instances", fake_can.CAN.instances, sup.telemetry_text())
+
+
+def check_bus_load(verbose):
+  # 2 VESCs x 4 frames at 50 Hz received, 2 x 3 commands every 20 ms sent:
+  # 700 frames/s of ~140 bits at 500 kbit/s, 19.6 %
+  sim, ok = _started()
+  sim.run(3000)
+  load = sim.supervisor.bus_load_permille
+  ok = ok and abs(load - 196) <= 4
+  return ok, ("bus load permille", load)
+
+
+CHECKS = (
+  ("node lost", check_node_lost),
+  ("stale status", check_stale_status),
+  ("error escalation", check_escalation),
+  ("restart backoff", check_backoff),
+  ("no status driver", check_no_status_driver),
+  ("bus load", check_bus_load),
+)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="CAN supervisor checks with a fake CAN driver and bus")
+  parser.add_argument("-v", "--verbose", action="store_true", help="print the supervisor output")
+  args = parser.parse_args(argv)
+
+  _install_shims()
+  failed = 0
+  for name, check in CHECKS:
+    if args.verbose:
+      ok, info = check(args.verbose)
+    else:
+      # the supervisor prints on every state change
+      stdout = sys.stdout
+      sys.stdout = open(os.devnull, "w")
+      try:
+        ok, info = check(args.verbose)
+      finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    if ok and not args.verbose:
+      print("{:18} ok".format(name))
+    else:
+      print("{:18} {} {}".format(name, "ok" if ok else "FAIL", info))
+    failed += not ok
+  return 1 if failed else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# sim_can_rx.py — host tool (CPython) for the main board CAN RX path
+# (01_diy_main_board/can_rx_ring.py and Motor.update_motor_data): a fake CAN
+# driver with a TWAI-like bounded RX queue injects bursts of VESC status
+# frames from two controllers, with and without the driver RX callback, and
+# checks the decoded MotorData, the ring counters (overruns, high water
+# mark, frame age at decode) and the driver queue overflows.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/sim_can_rx.py [-v]
+#
+# Time is virtual (tools/fake_time.py); micropython.schedule()
+# callbacks run when the simulated task code yields, like on the device
+# where they run between bytecodes. Exit code is 1 when a check fails.
+
+import argparse
+import os
+import struct
+import sys
+import types
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(FIRMWARE_DIR, "tools")
+MAIN_BOARD_DIR = os.path.join(FIRMWARE_DIR, "01_diy_main_board")
+for _path in (FIRMWARE_DIR, TOOLS_DIR, MAIN_BOARD_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+import fake_time  # noqa: E402  (tools/fake_time.py)
+from fake_time import clock  # noqa: E402
+
+# TWAI driver RX queue length (ESP-IDF default config: 5, usermods 32)
+DRIVER_QUEUE_LEN = 32
+CAN_ID_REAR = 101
+CAN_ID_FRONT = 102
+
+
+_scheduled = []
+
+
+def _install_shims():
+  fake_time.install()
+
+  def schedule(fun, arg):
+    # MicroPython's schedule queue holds 8 callbacks
+    if len(_scheduled) >= 8:
+      raise RuntimeError("schedule queue full")
+    _scheduled.append((fun, arg))
+
+  sys.modules["micropython"] = types.SimpleNamespace(schedule=schedule)
+  sys.modules["can"] = types.SimpleNamespace(CAN=FakeCan)
+
+
+def run_scheduled():
+  """The task code yields: the pending schedule() callbacks run"""
+  while _scheduled:
+    fun, arg = _scheduled.pop(0)
+    fun(arg)
+
+
+class FakeCan(object):
+  """recv() from a bounded queue; irq_recv() only when with_callback"""
+  with_callback = True
+
+  def __init__(self, tx=None, rx=None, baudrate=None, mode=None):
+    self.queue = []
+    self.queue_overflows = 0
+    self._callback = None
+    if FakeCan.with_callback:
+      self.irq_recv = self._irq_recv
+
+  def _irq_recv(self, callback):
+    self._callback = callback
+
+  def inject(self, msg_id, data):
+    if len(self.queue) >= DRIVER_QUEUE_LEN:
+      self.queue_overflows += 1
+      return
+    self.queue.append((msg_id, True, False, bytes(data)))
+    if self._callback is not None:
+      self._callback(self)
+
+  def recv(self):
+    if not self.queue:
+      return None
+    return self.queue.pop(0)
+
+  def send(self, buf, msg_id, extframe=True, timeout=0):
+    pass
+
+
+def _motor_cfg(can_id):
+  return types.SimpleNamespace(can_id=can_id, can_tx_pin=4, can_rx_pin=5, can_baudrate=125000, can_mode=0)
+
+
+def _status_frames(can_id, i):
+  """the 4 VESC status frames of a controller, values depending on i"""
+  erpm = 1000 + i
+  return [
+    ((9 << 8) | can_id, struct.pack(">lhh", erpm, 100 + i % 50, 0)),
+    ((16 << 8) | can_id, struct.pack(">hhhh", 400 + i % 10, 500 + i % 10, 50 + i % 20, 0)),
+    ((27 << 8) | can_id, struct.pack(">lh", 0, 780 - i % 5)),
+    ((99 << 8) | can_id, struct.pack(">hhhh", 900 - i % 100, 0, 0, 0)),
+  ]
+
+
+def _expected(i):
+  return {"speed_erpm": 1000 + i, "motor_current_x10": 100 + i % 50,
+          "vesc_temperature_x10": 400 + i % 10, "motor_temperature_x10": 500 + i % 10,
+          "battery_current_x10": 50 + i % 20, "battery_voltage_x10": 780 - i % 5,
+          "battery_soc_x1000": 900 - i % 100}
+
+
+def _setup(with_callback):
+  import motor
+  motor.MotorData.nodes = None
+  motor.Motor._can = None
+  motor.Motor._rx = None
+  motor.Motor._rx_irq = False
+  motor.Motor._rx_schedule_fails = 0
+  FakeCan.with_callback = with_callback
+  rear = motor.Motor(motor.MotorData(_motor_cfg(CAN_ID_REAR)))
+  front = motor.Motor(motor.MotorData(_motor_cfg(CAN_ID_FRONT)))
+  del _scheduled[:]
+  return motor.Motor, rear, front
+
+
+def _matches(motor_data, i):
+  return all(getattr(motor_data, k) == v for k, v in _expected(i).items())
+
+
+def check_decode(verbose):
+  # a 50 Hz round of both controllers, decoded by the consumer
+  Motor, rear, front = _setup(with_callback=False)
+  for i in range(5):
+    for msg_id, data in _status_frames(CAN_ID_REAR, i) + _status_frames(CAN_ID_FRONT, i + 7):
+      Motor._can.inject(msg_id, data)
+    clock.ms += 20
+    Motor.update_motor_data()
+  ok = _matches(rear.data, 4) and _matches(front.data, 11)
+  return ok, Motor.rx_counters()
+
+
+def _burst_while_busy(with_callback, frames, busy_ms, yield_every_ms):
+  """frames arrive evenly over busy_ms while other tasks run; the task
+  code yields every yield_every_ms; then the consumer decodes"""
+  Motor, rear, front = _setup(with_callback)
+  sent = 0
+  i = 0
+  for t in range(busy_ms):
+    clock.ms += 1
+    while sent < frames * (t + 1) // busy_ms:
+      msg_id, data = _status_frames(CAN_ID_REAR if sent % 8 < 4 else CAN_ID_FRONT, i)[sent % 4]
+      Motor._can.inject(msg_id, data)
+      sent += 1
+      if sent % 8 == 0:
+        i += 1
+    if t % yield_every_ms == 0:
+      run_scheduled()
+  run_scheduled()
+  Motor.update_motor_data()
+  return Motor, rear, front, i - 1
+
+
+def check_burst_callback(verbose):
+  # 56 frames in 40 ms (1400 frames/s, 500 kbit/s) while another
+  # task runs: drained into the ring as they come
+  Motor, rear, front, last = _burst_while_busy(True, 56, 40, 2)
+  ok = Motor._can.queue_overflows == 0 and Motor._rx.overruns == 0 and _matches(rear.data, last)
+  return ok, ("driver overflows", Motor._can.queue_overflows, "counters", Motor.rx_counters())
+
+
+def check_burst_polled(verbose):
+  # the same burst without RX callback: the driver queue overflows (this is
+  # what the ring and callback avoid), the frames kept are still decoded
+  Motor, rear, front, last = _burst_while_busy(False, 56, 40, 2)
+  ok = Motor._can.queue_overflows > 0 and Motor._rx.high_water <= DRIVER_QUEUE_LEN
+  return ok, ("driver overflows", Motor._can.queue_overflows, "counters", Motor.rx_counters())
+
+
+def check_ring_overrun(verbose):
+  # 100 frames drained with no decode: 63 kept, 37 counted as overruns
+  Motor, rear, front = _setup(with_callback=True)
+  for n in range(100):
+    msg_id, data = _status_frames(CAN_ID_REAR, n)[0]
+    Motor._can.inject(msg_id, data)
+    run_scheduled()
+  rx = Motor._rx
+  ok = rx.overruns == 37 and rx.high_water == 63 and len(rx) == 63
+  Motor.update_motor_data()
+  # the oldest 63 are kept: the last one decoded is frame 62
+  ok = ok and rear.data.speed_erpm == 1000 + 62 and len(rx) == 0
+  return ok, Motor.rx_counters()
+
+
+def check_age(verbose):
+  # drained at t, decoded 15 ms later
+  Motor, rear, front = _setup(with_callback=True)
+  Motor._can.inject(*_status_frames(CAN_ID_REAR, 0)[0])
+  run_scheduled()
+  clock.ms += 15
+  Motor.update_motor_data()
+  return Motor._rx.age_ms_last == 15 and Motor._rx.age_ms_max == 15, Motor.rx_counters()
+
+
+def check_preempted_drain(verbose):
+  # a scheduled drain that preempts a drain in progress reads nothing; the
+  # drain in progress reads the frame
+  Motor, rear, front = _setup(with_callback=True)
+  can = Motor._can
+  recv = can.recv
+  preempted = []
+
+  def recv_then_irq():
+    frame = recv()
+    if frame is not None and not preempted:
+      can.queue.append((_status_frames(CAN_ID_REAR, 3)[0][0], True, False, _status_frames(CAN_ID_REAR, 3)[0][1]))
+      preempted.append(Motor._rx.drain(can))
+    return frame
+
+  can.recv = recv_then_irq
+  can.queue.append((_status_frames(CAN_ID_REAR, 2)[0][0], True, False, _status_frames(CAN_ID_REAR, 2)[0][1]))
+  Motor.update_motor_data()
+  ok = preempted == [0] and Motor._rx.frames == 2 and rear.data.speed_erpm == 1003
+  return ok, (preempted, Motor.rx_counters())
+
+
+def check_schedule_full(verbose):
+  # more callbacks than the schedule queue holds: counted, frames stay in
+  # the driver queue for the next update_motor_data()
+  Motor, rear, front = _setup(with_callback=True)
+  for n in range(12):
+    Motor._can.inject(*_status_frames(CAN_ID_REAR, n)[0])
+  fails = Motor._rx_schedule_fails
+  run_scheduled()
+  Motor.update_motor_data()
+  ok = fails == 4 and rear.data.speed_erpm == 1011
+  return ok, Motor.rx_counters()
+
+
+CHECKS = (
+  ("decode", check_decode),
+  ("burst, callback", check_burst_callback),
+  ("burst, polled", check_burst_polled),
+  ("ring overrun", check_ring_overrun),
+  ("frame age", check_age),
+  ("preempted drain", check_preempted_drain),
+  ("schedule full", check_schedule_full),
+)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="CAN RX ring checks with a fake CAN driver")
+  parser.add_argument("-v", "--verbose", action="store_true", help="print the counters")
+  args = parser.parse_args(argv)
+
+  _install_shims()
+  failed = 0
+  print("counters: (frames, overruns, high_water, age_ms_max, schedule_fails)")
+  for name, check in CHECKS:
+    ok, info = check(args.verbose)
+    if ok and not args.verbose:
+      print("{:16} ok".format(name))
+    else:
+      print("{:16} {} {}".format(name, "ok" if ok else "FAIL", info))
+    failed += not ok
+  return 1 if failed else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
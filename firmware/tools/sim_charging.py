@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# sim_charging.py — host tool (CPython) for 02_diy_display/charge_estimator.py:
+# runs a simulated CC/CV charge (constant current up to a SoC, then an
+# exponential current taper down to the end current) through the
+# ChargeEstimator at the display frame rate and prints its figures against
+# the simulated ones: Ah and Wh added, CV detection and the time to full.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/sim_charging.py [--capacity-ah 20] [--current-a 6] [--cv-soc 80] [--tau-min 25]
+#
+# Exit code is 1 when Ah or Wh are off by more than 1 %, the taper is not
+# detected before the current is 10 % down, or in CV the time to full is
+# off by more than 25 % (and 3 minutes): checked from 10 minutes after the
+# taper is detected (until then the estimate is the CC one) while the
+# current is more than one 0.1 A step above the end current.
+
+import argparse
+import math
+import os
+import sys
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(FIRMWARE_DIR, "tools")
+DISPLAY_DIR = os.path.join(FIRMWARE_DIR, "02_diy_display")
+for _path in (FIRMWARE_DIR, TOOLS_DIR, DISPLAY_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+import fake_time  # noqa: E402  (tools/fake_time.py)
+fake_time.install()
+from charge_estimator import ChargeEstimator  # noqa: E402
+
+FRAME_MS = 100
+REPORT_MS = 5 * 60000
+
+
+class _Battery(object):
+  """CC at current_a up to cv_soc, then I = I_cc * exp(-t / tau) to end_a"""
+
+  def __init__(self, capacity_ah, current_a, cv_soc, tau_min, end_a, cells=20):
+    self.capacity_ah = capacity_ah
+    self.current_a = current_a
+    self.cv_soc = cv_soc / 100.0
+    self.tau_s = tau_min * 60.0
+    self.end_a = end_a
+    self.cells = cells
+    self.soc = 0.2
+    self.cv_t_s = None
+    self.ah = 0.0
+    self.wh = 0.0
+
+  def current(self):
+    if self.cv_t_s is None:
+      return self.current_a
+    return self.current_a * math.exp(-self.cv_t_s / self.tau_s)
+
+  def voltage(self):
+    # 3.5 V to 4.2 V per cell over the CC part, 4.2 V in CV
+    if self.cv_t_s is not None:
+      return 4.2 * self.cells
+    return (3.5 + 0.7 * min(1.0, self.soc / self.cv_soc)) * self.cells
+
+  def step(self, dt_s):
+    i = self.current()
+    v = self.voltage()
+    self.ah += i * dt_s / 3600.0
+    self.wh += v * i * dt_s / 3600.0
+    self.soc = min(1.0, self.soc + i * dt_s / 3600.0 / self.capacity_ah)
+    if self.cv_t_s is None:
+      if self.soc >= self.cv_soc:
+        self.cv_t_s = 0.0
+    else:
+      self.cv_t_s += dt_s
+
+  def time_to_full_min(self):
+    if self.cv_t_s is None:
+      cc_s = (self.cv_soc - self.soc) * self.capacity_ah * 3600.0 / self.current_a
+      return (cc_s + self.tau_s * math.log(self.current_a / self.end_a)) / 60.0
+    i = self.current()
+    if i <= self.end_a:
+      return 0.0
+    return self.tau_s * math.log(i / self.end_a) / 60.0
+
+
+def run(capacity_ah, current_a, cv_soc, tau_min, end_a):
+  battery = _Battery(capacity_ah, current_a, cv_soc, tau_min, end_a)
+  estimator = ChargeEstimator(int(end_a * 10))
+  now = 0
+  estimator.reset(now)
+  ok = True
+  cv_start_ms = None
+  cv_detected_ms = None
+  print("{:>6} {:>5} {:>6} {:>8} {:>8} {:>8} {:>8} {:>10} {:>10}".format(
+    "min", "phase", "soc %", "Ah", "est Ah", "Wh", "est Wh", "full min", "est min"))
+  while battery.current() > end_a:
+    battery.step(FRAME_MS / 1000.0)
+    now += FRAME_MS
+    # as sent by the main board: 0.1 V, 0.1 A (rounded), 0.1 %
+    estimator.update(int(battery.voltage() * 10), int(round(battery.current() * 10)), int(battery.soc * 1000), now)
+    if battery.cv_t_s is not None and cv_start_ms is None:
+      cv_start_ms = now
+    if estimator.is_tapering and cv_detected_ms is None:
+      cv_detected_ms = now
+
+    if now % REPORT_MS == 0:
+      expected = battery.time_to_full_min()
+      est = estimator.time_to_full_min
+      phase = "CV" if estimator.is_tapering else "CC"
+      print("{:6} {:>5} {:6.1f} {:8.2f} {:8.2f} {:8.1f} {:8.1f} {:10.1f} {:>10}".format(
+        now // 60000, phase, battery.soc * 100, battery.ah, estimator.ah_x100 / 100.0,
+        battery.wh, estimator.wh_x10 / 10.0, expected, est))
+      resolved = cv_detected_ms is not None and now - cv_detected_ms >= 10 * 60000 and \
+        battery.current() > end_a + 0.1
+      if resolved and abs(est - expected) > max(3.0, expected * 0.25):
+        print("       time to full off by {:.1f} min".format(est - expected))
+        ok = False
+
+  ah_error = abs(estimator.ah_x100 / 100.0 - battery.ah) / battery.ah
+  wh_error = abs(estimator.wh_x10 / 10.0 - battery.wh) / battery.wh
+  print("Ah error {:.2f} %, Wh error {:.2f} %".format(ah_error * 100, wh_error * 100))
+  if ah_error > 0.01 or wh_error > 0.01:
+    ok = False
+  if cv_detected_ms is None:
+    print("taper not detected")
+    ok = False
+  else:
+    delay_s = (cv_detected_ms - cv_start_ms) / 1000.0
+    print("taper detected {:.1f} s after the CV start".format(delay_s))
+    ok = ok and delay_s <= battery.tau_s * math.log(1 / 0.9)
+  print("ok" if ok else "FAIL")
+  return ok
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="ChargeEstimator on a simulated CC/CV charge")
+  parser.add_argument("--capacity-ah", type=float, default=20.0)
+  parser.add_argument("--current-a", type=float, default=6.0)
+  parser.add_argument("--cv-soc", type=float, default=80.0, help="SoC %% where CV starts")
+  parser.add_argument("--tau-min", type=float, default=25.0, help="CV current time constant")
+  parser.add_argument("--end-a", type=float, default=0.5, help="charge end current")
+  args = parser.parse_args(argv)
+  ok = run(args.capacity_ah, args.current_a, args.cv_soc, args.tau_min, args.end_a)
+  return 0 if ok else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
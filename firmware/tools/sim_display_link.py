@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# sim_display_link.py — host tool (CPython) for the main board to display
+# ESP-NOW link: common/espnow.py ESPNowComms on a fake ESPNow queue, the
+# main board sends on its task_display_send_data schedule (every 250 ms the
+# main message, the VESC nodes frame every 1 s and the trip message every
+# 2 s right before it) and the BMS
+# cells frame from 01_diy_main_board/cell_monitor.py as bms_read_task does
+# (1 s reads, the frame once per change), the display polls every 50 ms
+# and applies each message with 02_diy_display/motor_board_link.py, as its
+# motor_rx_task does. Checks:
+# - every main message sent is applied
+# - every trip message is applied, though the main one follows it within
+#   the same poll period
+# - every cells frame is applied, sent once per change
+# - every VESC nodes frame is applied, all nodes and fields (slip_events)
+# - the same with display polls late (stalls of up to 12 poll periods)
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/sim_display_link.py [-v]
+#
+# Time is virtual (tools/fake_time.py). Exit code is 1 when a check fails.
+
+import argparse
+import io
+import os
+import sys
+import types
+from contextlib import redirect_stdout
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(FIRMWARE_DIR, "tools")
+DISPLAY_DIR = os.path.join(FIRMWARE_DIR, "02_diy_display")
+MAIN_BOARD_DIR = os.path.join(FIRMWARE_DIR, "01_diy_main_board")
+for _path in (FIRMWARE_DIR, TOOLS_DIR, DISPLAY_DIR, MAIN_BOARD_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+import fake_time  # noqa: E402  (tools/fake_time.py)
+from fake_time import clock  # noqa: E402
+
+SEND_MS = 250
+BMS_READ_MS = 1000
+POLL_MS = 50
+# display poll phase against the main board sends, and the radio latency
+POLL_PHASE_MS = 17
+LATENCY_MS = 3
+
+MAIN_BOARD_MAC = b"\x02\x00\x00\x00\x00\x01"
+DISPLAY_MAC = b"\x02\x00\x00\x00\x00\x02"
+
+
+class _ESPNow(object):
+  """One board's ESPNow: send() lands in the peer receive queue after
+  LATENCY_MS, recv(0) returns the oldest arrived message or (None, None)"""
+
+  def __init__(self, mac):
+    self.mac = mac
+    self.peers = {}
+    self.queue = []
+    self.queue_max = 0
+
+  def active(self, state):
+    pass
+
+  def add_peer(self, peer):
+    pass
+
+  def send(self, peer, payload):
+    # the senders reuse their buffers: copy, as the radio does
+    self.peers[bytes(peer)].queue.append((clock.ms + LATENCY_MS, self.mac, bytes(payload)))
+    return True
+
+  def recv(self, timeout_ms=None):
+    if self.queue and self.queue[0][0] <= clock.ms:
+      arrived = sum(1 for t, _, _ in self.queue if t <= clock.ms)
+      self.queue_max = max(self.queue_max, arrived)
+      _, host, msg = self.queue.pop(0)
+      return host, msg
+    return None, None
+
+
+def _install_shims():
+  sys.modules["network"] = types.ModuleType("network")
+  sys.modules["espnow"] = types.ModuleType("espnow")
+  fake_time.install()
+
+
+class _Bms(object):
+  """13 cells, one of them sagging 12 mV every 3 s (above the 10 mV
+  change threshold), a protection bit for a while"""
+
+  def __init__(self):
+    self.cells = [3900] * 13
+
+  def get_cells_x1000(self):
+    step = clock.ms // 3000
+    self.cells[4] = 3900 - 12 * step
+    return self.cells
+
+  def get_protection_bits(self):
+    return 0x0004 if 9000 <= clock.ms < 13000 else 0
+
+  def get_balance_mask(self):
+    return 0
+
+
+def _display_vars():
+  # the Vars fields motor_board_link sets (vars.py needs the MicroPython ticks)
+  return types.SimpleNamespace(
+    battery_voltage_x10=0, battery_current_x10=0, bms_battery_current_x10=0, battery_soc_x1000=0,
+    motor_current_x10=0, wheel_speed_x10=0, brakes_are_active=False,
+    regen_braking_is_active=False, battery_is_charging=False, mode=0,
+    cruise_control_is_active=False, traction_control_is_active=False,
+    rear_vesc_temperature_x10=0, front_vesc_temperature_x10=0,
+    rear_motor_temperature_x10=0, front_motor_temperature_x10=0,
+    odometer_m=0, trip_m=0, trip_wh_consumed_x10=0, trip_wh_regen_x10=0,
+    trip_wh_per_km_x10=0, trip_avg_speed_x10=0, battery_range_m=-1,
+    bms_cell_count=0, bms_weakest_cell=0, bms_cell_min_mv=0, bms_cell_max_mv=0,
+    bms_cell_delta_max_mv=0, bms_cell_imbalance_is_active=False,
+    bms_cells_balancing=False, bms_protection_is_active=False,
+    bms_protection_bits=0, bms_protection_events=0, motor_nodes=())
+
+
+class _MainBoard(object):
+  """The display messages of 01_diy_main_board/escooter/main.py, with
+  values that change at every send so each one can be told apart"""
+
+  def __init__(self, esp):
+    from common.espnow import ESPNowComms
+    from common.espnow_commands import COMMAND_ID_DISPLAY_1, COMMAND_ID_DISPLAY_TRIP_1
+
+    def encode_display_message(speed_x10):
+      return "{} 540 -12 815 30 {} 8 250 -300 310 -300 85".format(
+        COMMAND_ID_DISPLAY_1, speed_x10).encode("ascii")
+
+    def encode_display_trip_message(trip_m):
+      return "{} {} {} 1520 130 {} 186 -1".format(
+        COMMAND_ID_DISPLAY_TRIP_1, 120000 + trip_m, trip_m, trip_m // 100).encode("ascii")
+
+    from cell_monitor import CellMonitor
+    from common import bms_cells_frame
+    from common import motor_nodes_frame
+
+    # rear and front motor, then a node driving no wheel
+    self._nodes_frame = nodes_frame = bytearray(motor_nodes_frame.frame_len(3))
+    flags = bytes((motor_nodes_frame.FLAG_ALIVE | motor_nodes_frame.FLAG_DRIVES_WHEEL,
+                   motor_nodes_frame.FLAG_ALIVE | motor_nodes_frame.FLAG_DRIVES_WHEEL,
+                   motor_nodes_frame.FLAG_ALIVE))
+
+    def encode_display_nodes_message(slip_events):
+      return motor_nodes_frame.pack_into(
+        nodes_frame, 3, (101, 102, 110), flags, (412, 398, 305), (550, 521, -2550),
+        (215, 198, 0), (160, 150, 3), slip_events)
+
+    self.display_comms = ESPNowComms(esp, DISPLAY_MAC, encoder=encode_display_message)
+    self.display_trip_comms = ESPNowComms(esp, DISPLAY_MAC, encoder=encode_display_trip_message)
+    self.display_cells_comms = ESPNowComms(esp, DISPLAY_MAC, encoder=lambda frame: frame)
+    self.display_nodes_comms = ESPNowComms(esp, DISPLAY_MAC, encoder=encode_display_nodes_message)
+    self._nodes_unpack = motor_nodes_frame.unpack
+    self.cycles = 0
+    self.speed_x10 = 0
+    self.trip_m = 0
+    self.bms = _Bms()
+    self.cell_monitor = CellMonitor()
+    self._cells_unpack = bms_cells_frame.unpack
+    self.slip_events = [0, 0, 0]
+    self.sent = {"main": [], "trip": [], "cells": [], "nodes": []}
+
+  def send(self):
+    # task_display_send_data, one 250 ms cycle
+    self.cycles += 1
+    if self.cycles % 4 == 0:
+      # a new slip onset on the rear and the front motor in turn
+      self.slip_events[len(self.sent["nodes"]) % 2] += 1
+      self.display_nodes_comms.send_data(self.slip_events)
+      self.sent["nodes"].append(self._nodes_unpack(self._nodes_frame)[1])
+    if self.cycles >= 8:
+      self.cycles = 0
+      self.trip_m += 37
+      self.display_trip_comms.send_data(self.trip_m)
+      self.sent["trip"].append(self.trip_m)
+
+    self.speed_x10 = (self.speed_x10 + 7) % 400
+    self.display_comms.send_data(self.speed_x10)
+    self.sent["main"].append(self.speed_x10)
+
+  def bms_read(self):
+    # bms_read_task, one 1 s read
+    self.cell_monitor.update(self.bms)
+    frame = self.cell_monitor.frame()
+    if frame is not None:
+      self.display_cells_comms.send_data(frame)
+      fields = self._cells_unpack(frame)
+      self.sent["cells"].append((fields[4], fields[7]))
+
+
+class _Display(object):
+  """motor_rx_task: every queued message decoded and applied (latest_only:
+  the former get_data() receive, only the last queued message)"""
+
+  def __init__(self, esp, latest_only=False):
+    from common.espnow import ESPNowComms
+    from motor_board_link import decode_motor_board_message, apply_motor_board_message
+    self.vars = _display_vars()
+    self.comms = ESPNowComms(esp, MAIN_BOARD_MAC, decoder=decode_motor_board_message)
+    self.seen = {"main": [], "trip": [], "cells": [], "nodes": []}
+    self._apply = apply_motor_board_message
+    self._latest_only = latest_only
+
+  def _on_message(self, msg):
+    self._apply(self.vars, msg)
+    # what the screens would show right after this message
+    if len(msg) == 12:
+      self.seen["main"].append(self.vars.wheel_speed_x10)
+    elif len(msg) == 8:
+      self.seen["trip"].append(self.vars.trip_m)
+    elif len(msg) == 2:
+      self.seen["nodes"].append(self.vars.motor_nodes)
+    else:
+      self.seen["cells"].append((self.vars.bms_cell_min_mv, self.vars.bms_protection_bits))
+
+  def poll(self):
+    if self._latest_only:
+      msg = self.comms.get_data()
+      if msg is not None:
+        self._on_message(msg)
+      return
+    self.comms.get_all_data(self._on_message)
+
+
+def _run(duration_ms, stall=None, latest_only=False):
+  """stall(poll_index): extra delay in ms of that display poll"""
+  main_esp = _ESPNow(MAIN_BOARD_MAC)
+  display_esp = _ESPNow(DISPLAY_MAC)
+  main_esp.peers[DISPLAY_MAC] = display_esp
+  display_esp.peers[MAIN_BOARD_MAC] = main_esp
+  board = _MainBoard(main_esp)
+  display = _Display(display_esp, latest_only)
+
+  clock.ms = 0
+  next_poll = POLL_PHASE_MS
+  polls = 0
+  # without the "ESP-NOW tx ok" lines
+  with redirect_stdout(io.StringIO()):
+    for ms in range(duration_ms):
+      clock.ms = ms
+      # the BMS read right before the main message: the worst case
+      if ms % BMS_READ_MS == 0:
+        board.bms_read()
+      if ms % SEND_MS == 0:
+        board.send()
+      if ms >= next_poll:
+        display.poll()
+        polls += 1
+        next_poll += POLL_MS + (stall(polls) if stall else 0)
+    # the last messages still on the air
+    clock.ms = duration_ms + LATENCY_MS
+    display.poll()
+  return board, display, display_esp
+
+
+def _compare(board, display, kinds):
+  out = []
+  ok = True
+  for kind in kinds:
+    sent = board.sent[kind]
+    seen = display.seen[kind]
+    ok = ok and len(sent) > 0 and seen == sent
+    out.append("{} {}/{}".format(kind, len(seen), len(sent)))
+  return ok, out
+
+
+def check_main(verbose):
+  board, display, _ = _run(20000)
+  ok, out = _compare(board, display, ("main",))
+  # the VESC battery current and the BMS current each in their own field
+  v = display.vars
+  ok = ok and v.wheel_speed_x10 == board.speed_x10 and \
+    v.battery_current_x10 == -12 and v.bms_battery_current_x10 == 85
+  return ok, out
+
+
+def check_trip(verbose):
+  board, display, _ = _run(20000)
+  ok, out = _compare(board, display, ("trip", "main"))
+  # the former latest-only receive, for reference
+  _, latest, _ = _run(20000, latest_only=True)
+  out.append("get_data() trip {}/{}".format(len(latest.seen["trip"]), len(board.sent["trip"])))
+  v = display.vars
+  ok = ok and v.trip_m == board.trip_m and v.odometer_m == 120000 + board.trip_m and \
+    v.trip_wh_per_km_x10 == board.trip_m // 100 and v.battery_range_m == -1
+  return ok, out
+
+
+def check_stalls(verbose):
+  # every 7th poll 150 ms late (a long UI flush, GC), every 31st 600 ms:
+  # several sends queue up
+  board, display, esp = _run(20000, lambda i: 600 if i % 31 == 0 else 150 if i % 7 == 0 else 0)
+  ok, out = _compare(board, display, ("trip", "nodes", "cells", "main"))
+  return ok, out + ["queued max {}".format(esp.queue_max)]
+
+
+def check_cells(verbose):
+  board, display, _ = _run(40000)
+  ok, out = _compare(board, display, ("cells",))
+  v = display.vars
+  monitor = board.cell_monitor
+  # one frame per change: 13 sags, the protection bit on and off, the
+  # keepalive and the first frame
+  ok = ok and len(board.sent["cells"]) <= 13 + 2 + 2 and \
+    v.bms_cell_min_mv == monitor.min_mv and v.bms_weakest_cell == 5 and \
+    v.bms_cell_count == 13 and v.bms_protection_events == 1 and v.bms_protection_bits == 0
+  return ok, out + ["last min mV {}".format(v.bms_cell_min_mv)]
+
+
+def check_nodes(verbose):
+  board, display, _ = _run(20000)
+  ok, out = _compare(board, display, ("nodes",))
+  nodes = display.vars.motor_nodes
+  ok = ok and len(nodes) == 3 and nodes[0][0] == 101 and nodes[2][3] == -2550 and \
+    [n[6] for n in nodes] == board.slip_events
+  _, latest, _ = _run(20000, latest_only=True)
+  out.append("get_data() nodes {}/{}".format(len(latest.seen["nodes"]), len(board.sent["nodes"])))
+  return ok, out + ["slip_events {}".format([n[6] for n in nodes])]
+
+
+CHECKS = (
+  ("main", check_main),
+  ("trip", check_trip),
+  ("cells", check_cells),
+  ("nodes", check_nodes),
+  ("late polls", check_stalls),
+)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Main board to display ESP-NOW link checks")
+  parser.add_argument("-v", "--verbose", action="store_true", help="print the details")
+  args = parser.parse_args(argv)
+
+  _install_shims()
+  failed = 0
+  for name, check in CHECKS:
+    ok, info = check(args.verbose)
+    if ok and not args.verbose:
+      print("{:12} ok".format(name))
+    else:
+      print("{:12} {} {}".format(name, "ok" if ok else "FAIL", info))
+    failed += not ok
+  return 1 if failed else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# sim_motor_nodes.py — host tool (CPython) for the main board N VESC node
+# support (01_diy_main_board/motor_nodes.py, Motor.update_motor_data,
+# can_supervisor.py, common/motor_nodes_frame.py): four virtual VESCs on the
+# fake bus of tools/fake_can.py (three driving a wheel and an accessory one
+# in the "accessory" check), each with its own telemetry, and checks:
+# - every MotorData reads its own node, frames of unknown nodes are ignored
+# - the decode time per frame does not grow with the number of nodes
+# - a lost accessory node is reported, not a fault; a lost motor is one
+# - traction control limits the one wheel of four that spins up
+# - the per node display frame round trip
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/sim_motor_nodes.py [-v]
+#
+# Time is virtual (tools/fake_time.py) but for the decode time,
+# measured with time.perf_counter(). Exit code is 1 when a check fails.
+
+import argparse
+import os
+import sys
+import time
+import types
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(FIRMWARE_DIR, "tools")
+MAIN_BOARD_DIR = os.path.join(FIRMWARE_DIR, "01_diy_main_board")
+for _path in (FIRMWARE_DIR, TOOLS_DIR, MAIN_BOARD_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+import fake_time  # noqa: E402  (tools/fake_time.py)
+from fake_time import clock  # noqa: E402
+
+CAN_IDS = (101, 102, 103, 104)
+CONTROL_MS = 20
+SUPERVISOR_MS = 50
+# decode time per frame with 8 nodes against 1 node
+DECODE_TIME_RATIO_MAX = 1.5
+
+
+def _install_shims():
+  fake_time.install()
+
+  import fake_can
+  sys.modules["can"] = fake_can
+
+
+def _cfg():
+  return types.SimpleNamespace(
+    can_node_timeout_ms=300, can_restart_backoff_min_ms=100,
+    can_restart_backoff_max_ms=5000, can_telemetry_print_ms=0,
+    traction_control_enabled=True, traction_slip_percent=20, traction_slip_min_mm_s=1000,
+    traction_max_accel_mm_s2=15000, traction_limit_min_percent=30)
+
+
+def _motor_cfg(can_id, drives_wheel=True):
+  return types.SimpleNamespace(can_id=can_id, can_tx_pin=4, can_rx_pin=5, can_baudrate=500000,
+                               can_mode=0, drives_wheel=drives_wheel, poles_pair=15, wheel_radius=0.165)
+
+
+class _Sim(object):
+  """The nodes on the bus, set up like escooter/main.py: MotorData for each
+  node, Motor for the ones driving a wheel"""
+
+  def __init__(self, can_ids=CAN_IDS, accessory_ids=()):
+    import fake_can
+    import motor
+    from can_supervisor import CanSupervisor
+    fake_can.bus.reset()
+    motor.MotorData.nodes = None
+    motor.Motor._can = None
+    motor.Motor._rx = None
+    motor.Motor._rx_irq = False
+    self.bus = fake_can.bus
+    self.Motor = motor.Motor
+    self.bus_nodes = []
+    self.node_data = []
+    for i, can_id in enumerate(can_ids):
+      node = self.bus.add_node(can_id)
+      # distinct telemetry per node
+      node.erpm = 1000 + i
+      node.motor_current_x10 = 100 + i
+      node.vesc_temperature_x10 = 400 + i
+      node.motor_temperature_x10 = 500 + i
+      node.battery_current_x10 = 50 + i
+      node.battery_voltage_x10 = 780
+      node.battery_soc_x1000 = 900 - i
+      self.bus_nodes.append(node)
+      self.node_data.append(motor.MotorData(_motor_cfg(can_id, can_id not in accessory_ids)))
+    self.nodes = motor.MotorData.nodes
+    self.motor_data = [d for d in self.node_data if d.cfg.drives_wheel]
+    self.motors = [motor.Motor(d) for d in self.motor_data]
+    self.supervisor = CanSupervisor(self.motors, _cfg())
+    self.fault = True
+
+  def run(self, ms, until=None):
+    """return: the time until(self) became True, None if it did not"""
+    for _ in range(ms):
+      clock.ms += 1
+      self.bus.tick(clock.ms)
+      if clock.ms % CONTROL_MS == 0:
+        self.Motor.update_motor_data()
+        for m in self.motors:
+          m.set_motor_speed_erpm(1000)
+      if clock.ms % SUPERVISOR_MS == 0:
+        self.fault = self.supervisor.update()
+      if until is not None and until(self):
+        return clock.ms
+    return None
+
+
+def check_decode(verbose):
+  # each MotorData reads its node; a fifth VESC not in the config is ignored
+  sim = _Sim()
+  stranger = sim.bus.add_node(120)
+  stranger.erpm = -1
+  sim.run(200)
+  ok = all(
+    d.slot == i and d.speed_erpm == 1000 + i and d.motor_current_x10 == 100 + i and
+    d.vesc_temperature_x10 == 400 + i and d.motor_temperature_x10 == 500 + i and
+    d.battery_current_x10 == 50 + i and d.battery_soc_x1000 == 900 - i
+    for i, d in enumerate(sim.node_data))
+  ok = ok and sim.nodes.count == 4 and sim.nodes.slot_of_can_id[120] == 0xFF and \
+    -1 not in sim.nodes.speed_erpm
+  return ok, list(sim.nodes.speed_erpm[:sim.nodes.count])
+
+
+def _decode_time_per_frame(node_count, frames):
+  import motor
+  sim = _Sim(can_ids=tuple(range(101, 101 + node_count)))
+  rx = motor.Motor._rx
+  statuses = [f for node in sim.bus_nodes for f in node.frames()]
+  elapsed = 0.0
+  done = 0
+  while done < frames:
+    # a ring load of frames from every node, then one decode
+    for n in range(rx._mask):
+      msg_id, data = statuses[(done + n) % len(statuses)]
+      rx.put(msg_id, data, clock.ms)
+    t0 = time.perf_counter()
+    motor.Motor.update_motor_data()
+    elapsed += time.perf_counter() - t0
+    done += rx._mask
+  return elapsed / done
+
+
+def check_decode_time(verbose):
+  # table lookup by CAN id: the same time per frame with 1, 4 or 8 nodes
+  per_frame = {1: 1.0, 4: 1.0, 8: 1.0}
+  for _ in range(5):
+    # best of 5 interleaved runs, less noise
+    for n in per_frame:
+      per_frame[n] = min(per_frame[n], _decode_time_per_frame(n, 5000))
+  ratio = per_frame[8] / per_frame[1]
+  info = ["{} nodes {:.2f} us".format(n, t * 1e6) for n, t in sorted(per_frame.items())]
+  return ratio <= DECODE_TIME_RATIO_MAX, info + ["ratio {:.2f}".format(ratio)]
+
+
+def check_accessory_lost(verbose):
+  # node 104 drives no wheel: its loss is reported (alive bit, timeout
+  # count), the motors keep running; the loss of motor 102 is a fault
+  sim = _Sim(accessory_ids=(104,))
+  ok = sim.run(200, until=lambda s: not s.fault) is not None
+  ok = ok and len(sim.motors) == 3 and sim.supervisor.alive_mask == 0b1111
+  sim.bus_nodes[3].silent = True
+  sim.run(1000)
+  sup = sim.supervisor
+  ok = ok and not sim.fault and sup.alive_mask == 0b0111 and sup.node_timeouts[3] == 1
+  sim.bus_nodes[1].silent = True
+  ok = ok and sim.run(1000, until=lambda s: s.fault) is not None and sup.alive_mask == 0b0101
+  return ok, sup.telemetry_text()
+
+
+def check_traction_four(verbose):
+  # four wheel motors at the same speed, then wheel 2 spins up
+  from traction_control import TractionControl
+  sim = _Sim()
+  tc = TractionControl([d.cfg for d in sim.motor_data], _cfg())
+  for node in sim.bus_nodes:
+    node.erpm = 3000
+  sim.run(200)
+  tc.update(sim.motor_data)
+  sim.run(20)
+  tc.update(sim.motor_data)
+  ok = tc.active_mask == 0
+  sim.bus_nodes[2].erpm = 6000
+  sim.run(20)
+  tc.update(sim.motor_data)
+  ok = ok and tc.active_mask == 1 << 2 and list(tc.slip_events) == [0, 0, 1, 0]
+  return ok, ("active mask", bin(tc.active_mask), "slip events", list(tc.slip_events))
+
+
+def check_display_frame(verbose):
+  # per node frame as escooter/main.py builds it, read back as the display does
+  from common import motor_nodes_frame
+  sim = _Sim(accessory_ids=(104,))
+  sim.run(200)
+  nodes = sim.nodes
+  flags = bytearray(nodes.count)
+  for slot in range(nodes.count):
+    flags[slot] = motor_nodes_frame.FLAG_ALIVE if sim.supervisor.alive_mask & (1 << slot) else 0
+    if sim.node_data[slot].cfg.drives_wheel:
+      flags[slot] |= motor_nodes_frame.FLAG_DRIVES_WHEEL
+  slip_events = (0, 3, 1000, 0)
+  buf = bytearray(motor_nodes_frame.frame_len(nodes.count))
+  motor_nodes_frame.pack_into(
+    buf, nodes.count, nodes.can_ids, flags,
+    nodes.vesc_temperature_x10, nodes.motor_temperature_x10,
+    nodes.motor_current_x10, nodes.battery_current_x10, slip_events)
+  msg = bytes(buf)
+  ok = motor_nodes_frame.is_nodes_frame(msg) and len(msg) == 50
+  frame_id, decoded = motor_nodes_frame.unpack(msg)
+  expected = tuple(
+    (CAN_IDS[i], 3 if i < 3 else 1, 400 + i, 500 + i, 100 + i, 50 + i, slip_events[i])
+    for i in range(4))
+  ok = ok and frame_id == motor_nodes_frame.FRAME_ID and decoded == expected
+  return ok, ("{} bytes".format(len(msg)), decoded)
+
+
+CHECKS = (
+  ("decode", check_decode),
+  ("decode time", check_decode_time),
+  ("accessory lost", check_accessory_lost),
+  ("traction, four", check_traction_four),
+  ("display frame", check_display_frame),
+)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Four virtual VESCs on a fake CAN bus")
+  parser.add_argument("-v", "--verbose", action="store_true", help="print the details")
+  args = parser.parse_args(argv)
+
+  _install_shims()
+  failed = 0
+  for name, check in CHECKS:
+    # Motor and the supervisor print on setup and state changes
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+      ok, info = check(args.verbose)
+    finally:
+      sys.stdout.close()
+      sys.stdout = stdout
+    if ok and not args.verbose:
+      print("{:16} ok".format(name))
+    else:
+      print("{:16} {} {}".format(name, "ok" if ok else "FAIL", info))
+    failed += not ok
+  return 1 if failed else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# sim_settings_store.py — host tool (CPython) for common/settings_store.py:
+# replays a simulated ride (mode / assist level button presses, odometer and
+# Wh counters updated every second) against a fake NVS that counts commits,
+# and compares with the previous behaviour of one NVS commit per change.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/sim_settings_store.py [--minutes 60] [--seed 1]
+#       [--quiet-ms 5000] [--max-delay-ms 60000]
+#
+# Also checks that the last committed record reloads with the final values,
+# through a raw nvm backend too (slot rotation and sequence wrap), and that
+# the mode saved by older versions (own NVS i32 key) is carried over. Exit
+# code is 1 when a check fails.
+
+import argparse
+import os
+import random
+import sys
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(FIRMWARE_DIR, "tools")
+for _path in (FIRMWARE_DIR, TOOLS_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+import fake_time  # noqa: E402  (tools/fake_time.py)
+fake_time.install()
+from fake_time import clock  # noqa: E402
+import common.settings_store as settings_store  # noqa: E402
+from common.settings_store import SettingsStore, MemoryBackend, NvmBackend, record_len  # noqa: E402
+
+
+def ride(minutes, seed, quiet_ms, max_delay_ms, backend):
+  rnd = random.Random(seed)
+  clock.ms = 0
+
+  store = SettingsStore(backend, quiet_ms=quiet_ms, max_delay_ms=max_delay_ms)
+  changes = 0
+  assist_level = 0
+  mode = 0
+  for second in range(minutes * 60):
+    # button presses come in bursts (stepping through several levels)
+    if rnd.random() < 0.02:
+      for _ in range(rnd.randrange(1, 5)):
+        assist_level = max(0, min(20, assist_level + rnd.choice((-1, 1))))
+        store.set("assist_level", assist_level)
+        changes += 1
+    if rnd.random() < 0.002:
+      mode ^= 1
+      store.set("mode", mode)
+      changes += 1
+
+    # trip counters, updated each second while riding
+    store.add("odometer_m", rnd.randrange(0, 9))
+    store.add("wh_consumed_x10", rnd.randrange(0, 3))
+
+    # background task runs every 500 ms
+    for _ in range(2):
+      clock.ms += 500
+      store.tick()
+
+  # shutdown path
+  store.flush()
+  return store, changes
+
+
+def check_reload(store, backend):
+  reloaded = SettingsStore(backend)
+  ok = reloaded.loaded
+  for key in settings_store.KEYS:
+    ok = ok and reloaded.get(key) == store.get(key)
+  return ok
+
+
+def check_nvm_rotation():
+  nvm = bytearray(16 + 8 * record_len())
+  store = SettingsStore(NvmBackend(nvm, 16, 8 * record_len()), quiet_ms=0)
+  used = set()
+  for i in range(70000):
+    # past the 16 bit sequence wrap
+    store.set("odometer_m", i + 1)
+    store.flush()
+    used.add(store._slot)
+  reloaded = SettingsStore(NvmBackend(nvm, 16, 8 * record_len()))
+
+  # a torn write (broken checksum) on the newest slot falls back to the previous
+  nvm[16 + reloaded._slot * record_len() + 5] ^= 0xFF
+  fallback = SettingsStore(NvmBackend(nvm, 16, 8 * record_len()))
+  return len(used) == 8 and reloaded.get("odometer_m") == 70000 and fallback.get("odometer_m") == 69999
+
+
+class _FakeNvs(object):
+  """esp32.NVS: int32 keys and blobs of one namespace"""
+
+  def __init__(self, namespace):
+    self.values = {}
+
+  def get_i32(self, key):
+    if not isinstance(self.values.get(key), int):
+      raise OSError(-0x1102)  # ESP_ERR_NVS_NOT_FOUND
+    return self.values[key]
+
+  def get_blob(self, key, buf):
+    blob = self.values.get(key)
+    if not isinstance(blob, bytes):
+      raise OSError(-0x1102)
+    buf[:len(blob)] = blob
+    return len(blob)
+
+  def set_blob(self, key, data):
+    self.values[key] = bytes(data)
+
+  def commit(self):
+    pass
+
+
+def check_legacy_mode():
+  # NVS of an older version: the mode in its own i32 key, no settings blob.
+  # Carried over, read by Mode, written to the blob by the next commit;
+  # after that the blob wins over the old key.
+  import types
+  main_board_dir = os.path.join(FIRMWARE_DIR, "01_diy_main_board")
+  if main_board_dir not in sys.path:
+    sys.path.insert(0, main_board_dir)
+  from mode import Mode
+  nvs = _FakeNvs("diy_main_board")
+  sys.modules["esp32"] = types.SimpleNamespace(NVS=lambda namespace: nvs)
+  nvs.values["mode"] = 1
+
+  store = SettingsStore(settings_store.EspNvsBackend("diy_main_board"))
+  settings_store.carry_over_i32(store, store._backend, ("mode",))
+  vars = types.SimpleNamespace(mode=0)
+  Mode(None, (), vars, settings=store)
+  ok = not store.loaded and vars.mode == 1 and store.flush()
+
+  nvs.values["mode"] = 0
+  store = SettingsStore(settings_store.EspNvsBackend("diy_main_board"))
+  settings_store.carry_over_i32(store, store._backend, ("mode",))
+  vars = types.SimpleNamespace(mode=0)
+  Mode(None, (), vars, settings=store)
+  return ok and store.loaded and not store.dirty and vars.mode == 1
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Simulate settings store commits against a fake NVS")
+  parser.add_argument("--minutes", type=int, default=60)
+  parser.add_argument("--seed", type=int, default=1)
+  parser.add_argument("--quiet-ms", type=int, default=5000)
+  parser.add_argument("--max-delay-ms", type=int, default=60000)
+  args = parser.parse_args(argv)
+
+  backend = MemoryBackend()
+  store, changes = ride(args.minutes, args.seed, args.quiet_ms, args.max_delay_ms, backend)
+  print("{} min ride: {} button changes, {} counter updates".format(args.minutes, changes, args.minutes * 60))
+  print("old: {} NVS commits (one per mode change, counters not saved)".format(changes))
+  print("new: {} NVS commits (all keys, quiet {} ms / max delay {} ms + shutdown)".format(
+    backend.commits, args.quiet_ms, args.max_delay_ms))
+
+  ok = check_reload(store, backend)
+  print("reload last record: {}".format("ok" if ok else "FAIL"))
+  rotation_ok = check_nvm_rotation()
+  print("nvm slot rotation / sequence wrap / torn write: {}".format("ok" if rotation_ok else "FAIL"))
+  legacy_ok = check_legacy_mode()
+  print("mode from the older NVS i32 key: {}".format("ok" if legacy_ok else "FAIL"))
+  return 0 if ok and rotation_ok and legacy_ok else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# sim_throttle.py — host tool (CPython) for the main board throttle
+# (01_diy_main_board/throttle.py) on a fake ADC (machine.ADC is replaced),
+# with checks:
+# - Throttle.sample() returns the median of its 3 ADC reads
+# - the response table output at both ends of the travel (ADC min/max,
+#   one count inside them) and its quantization against the float
+#   map_range() the old Throttle.value used
+# - a response curve (dead band and progressive) maps the travel as set
+# - the ADC reads per 20 ms control cycle: 3 per throttle, none more for
+#   the Mode gestures (escooter/main.py samples, Mode.tick reads the cache)
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/sim_throttle.py [-v]
+#
+# Exit code is 1 when a check fails.
+
+import argparse
+import os
+import sys
+import types
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_BOARD_DIR = os.path.join(FIRMWARE_DIR, "01_diy_main_board")
+for _path in (FIRMWARE_DIR, MAIN_BOARD_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+# the escooter config throttle range
+ADC_MIN = 17000
+ADC_MAX = 50000
+
+
+class _Pin(object):
+  IN = 0
+  PULL_UP = 1
+
+  def __init__(self, pin, mode=None, pull=None):
+    self.pin = pin
+    self.level = 1
+
+  def value(self):
+    return self.level
+
+
+class _ADC(object):
+  """read_u16() returns the queued samples, then the last one again"""
+
+  def __init__(self, pin):
+    self.samples = []
+    self.last = 0
+    self.reads = 0
+
+  def read_u16(self):
+    self.reads += 1
+    if self.samples:
+      self.last = self.samples.pop(0)
+    return self.last
+
+
+def _install_shims():
+  machine = types.ModuleType("machine")
+  machine.Pin = _Pin
+  machine.ADC = _ADC
+  sys.modules["machine"] = machine
+
+
+def _throttle(curves=None):
+  from throttle import Throttle
+  return Throttle(0, min_val=ADC_MIN, max_val=ADC_MAX, response_curves=curves)
+
+
+def _sample(throttle, raw, mode=0):
+  throttle._adc.samples = [raw] * 3
+  return throttle.sample(mode)
+
+
+def check_median(verbose):
+  # a spike on any of the 3 reads is dropped
+  throttle = _throttle()
+  cases = (
+    ((30000, 30000, 30000), 30000),
+    ((65535, 30000, 30100), 30100),
+    ((30000, 0, 30100), 30000),
+    ((30100, 30000, 65535), 30100),
+    ((20000, 40000, 30000), 30000),
+    ((40000, 30000, 20000), 30000),
+  )
+  got = []
+  for reads, expected in cases:
+    throttle._adc.samples = list(reads)
+    throttle.sample()
+    got.append(throttle.raw)
+  return got == [e for _, e in cases], got
+
+
+def check_ends(verbose):
+  # rest and full travel exact, one ADC count inside them one table step at most
+  throttle = _throttle()
+  step = 1000 / 255
+  out = [(raw, _sample(throttle, raw), throttle.linear)
+         for raw in (0, ADC_MIN - 1, ADC_MIN, ADC_MIN + 1, ADC_MAX - 1, ADC_MAX, ADC_MAX + 1, 65535)]
+  values = {raw: (value, linear) for raw, value, linear in out}
+  ok = all(values[r] == (0, 0) for r in (0, ADC_MIN - 1, ADC_MIN))
+  ok = ok and all(values[r] == (1000, 1000) for r in (ADC_MAX, ADC_MAX + 1, 65535))
+  ok = ok and values[ADC_MIN + 1][0] <= step and values[ADC_MAX - 1][0] >= 1000 - step
+  return ok, out
+
+
+def check_quantization(verbose):
+  # linear table against the old float map_range, over the whole ADC range
+  from common.utils import map_range
+  throttle = _throttle()
+  step = 1000 / 255
+  worst = 0
+  worst_linear = 0
+  previous = 0
+  monotonic = True
+  for raw in range(0, 65536, 7):
+    value = _sample(throttle, raw)
+    reference = map_range(raw, ADC_MIN, ADC_MAX, 0, 1000, clamp=True)
+    worst = max(worst, abs(value - reference))
+    worst_linear = max(worst_linear, abs(throttle.linear - reference))
+    monotonic = monotonic and value >= previous
+    previous = value
+  ok = monotonic and worst <= step and worst_linear <= 1
+  return ok, ("table max error {:.2f}, linear {:.2f}, monotonic {}".format(worst, worst_linear, monotonic))
+
+
+def check_curves(verbose):
+  # mode 0 linear, mode 1 10 % dead band then progressive
+  curve = ((0, 0), (10, 0), (60, 30), (100, 100))
+  throttle = _throttle([None, curve])
+  span = ADC_MAX - ADC_MIN
+
+  def at(percent, mode):
+    return _sample(throttle, ADC_MIN + span * percent // 100, mode)
+
+  ok = at(10, 1) == 0 and at(0, 1) == 0 and at(100, 1) == 1000
+  ok = ok and abs(at(60, 1) - 300) <= 8 and abs(at(60, 0) - 600) <= 4
+  # the linear value, used by the Mode gestures, ignores the curve
+  at(60, 1)
+  ok = ok and abs(throttle.linear - 600) <= 1
+  # a mode without its own curve falls back to the first one
+  ok = ok and at(60, 5) == at(60, 0)
+  return ok, [(p, at(p, 0), at(p, 1)) for p in (0, 5, 10, 20, 40, 60, 80, 100)]
+
+
+def check_reads_per_cycle(verbose):
+  # 2 throttles, 50 control cycles with a mode change gesture (brake held,
+  # throttle released then full): 3 reads per throttle per cycle
+  from mode import Mode
+  from brake import Brake
+  throttles = (_throttle(), _throttle())
+  brake = Brake(0)
+  vars = types.SimpleNamespace(mode=0)
+  mode = Mode(brake, throttles, vars)
+  cycles = 50
+  for cycle in range(cycles):
+    brake._brake.level = 0 if 10 <= cycle < 30 else 1
+    raw = ADC_MAX if 20 <= cycle < 25 else ADC_MIN
+    for throttle in throttles:
+      _sample(throttle, raw, vars.mode)
+    mode.tick()
+  reads = [t._adc.reads for t in throttles]
+  counters = [t.adc_reads for t in throttles]
+  ok = reads == [3 * cycles] * 2 and counters == reads and vars.mode == 1
+  return ok, ("ADC reads", reads, "counters", counters, "mode", vars.mode)
+
+
+CHECKS = (
+  ("median of 3", check_median),
+  ("travel ends", check_ends),
+  ("quantization", check_quantization),
+  ("response curves", check_curves),
+  ("reads per cycle", check_reads_per_cycle),
+)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Throttle checks with a fake ADC")
+  parser.add_argument("-v", "--verbose", action="store_true", help="print the details")
+  args = parser.parse_args(argv)
+
+  _install_shims()
+  failed = 0
+  for name, check in CHECKS:
+    ok, info = check(args.verbose)
+    if ok and not args.verbose:
+      print("{:16} ok".format(name))
+    else:
+      print("{:16} {} {}".format(name, "ok" if ok else "FAIL", info))
+    failed += not ok
+  return 1 if failed else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# sim_traction_control.py — host tool (CPython) for the main board traction
+# control (01_diy_main_board/traction_control.py) on a two wheel slip
+# model: vehicle mass, per wheel grip (linear tyre slip, saturated at
+# mu * load) and motor force from the current limit TractionControl lets
+# through, ERPM sampled at the 50 Hz VESC status rate. Checks:
+# - full throttle on grip: no slip event, never limited
+# - the rear wheel on a low grip patch: slip found and limited, less wheel
+#   spin than without traction control, limits given back after the patch
+# - regen braking with the front wheel on the patch: wheel lock found
+# - slip onsets are counted, and log() prints them once
+# - a single motor build keeps traction control off
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/sim_traction_control.py [-v]
+#
+# Time is virtual (tools/fake_time.py). Exit code is 1 when a check
+# fails.
+
+import argparse
+import io
+import os
+import sys
+import types
+from contextlib import redirect_stdout
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(FIRMWARE_DIR, "tools")
+MAIN_BOARD_DIR = os.path.join(FIRMWARE_DIR, "01_diy_main_board")
+for _path in (FIRMWARE_DIR, TOOLS_DIR, MAIN_BOARD_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+import fake_time  # noqa: E402  (tools/fake_time.py)
+from fake_time import clock  # noqa: E402
+
+CONTROL_MS = 20
+# model steps per ms, for the stiff tyre slip force
+SUBSTEPS = 4
+
+MASS_KG = 100.0
+WHEEL_MASS_KG = 2.0        # wheel and rotor inertia, at the tyre radius
+LOAD_N = 490.0             # per wheel
+MU_GRIP = 0.8
+MU_PATCH = 0.2
+SLIP_STIFFNESS = 500.0     # N per m/s of tyre slip
+FORCE_PER_A = 8.0          # N at the tyre per A of motor current
+CURRENT_LIMIT_MA = 40000
+REGEN_LIMIT_MA = -40000
+
+
+def _cfg(enabled=True):
+  return types.SimpleNamespace(
+    traction_control_enabled=enabled, traction_slip_percent=20, traction_slip_min_mm_s=1000,
+    traction_max_accel_mm_s2=15000, traction_limit_min_percent=30)
+
+
+def _motor_cfg():
+  return types.SimpleNamespace(poles_pair=15, wheel_radius=0.165)
+
+
+class _Sim(object):
+  """Two wheels (0 rear, 1 front) on one vehicle"""
+
+  def __init__(self, enabled=True, speed_m_s=0.0):
+    from traction_control import TractionControl
+    self.motor_cfgs = [_motor_cfg(), _motor_cfg()]
+    self.tc = TractionControl(self.motor_cfgs, _cfg(enabled))
+    # surface m/s per ERPM
+    self.k = 2 * 3.14159265 * 0.165 / 60 / 15
+    self.motor_data = [types.SimpleNamespace(speed_erpm=0) for _ in self.motor_cfgs]
+    self.speed = speed_m_s
+    self.wheel = [speed_m_s, speed_m_s]
+    self.mu = [MU_GRIP, MU_GRIP]
+    self.limit_ma = CURRENT_LIMIT_MA
+    self.spin_max = 0.0
+    self.limited_ms = 0
+    self.first_limited_ms = None
+
+  def run(self, ms):
+    tc = self.tc
+    for _ in range(ms):
+      clock.ms += 1
+      if clock.ms % CONTROL_MS == 0:
+        # VESC status at 50 Hz, then the control loop
+        for i, d in enumerate(self.motor_data):
+          d.speed_erpm = int(self.wheel[i] / self.k)
+        tc.update(self.motor_data)
+        if tc.active_mask and self.first_limited_ms is None:
+          self.first_limited_ms = clock.ms
+      if tc.active_mask:
+        self.limited_ms += 1
+      dt = 0.001 / SUBSTEPS
+      for _ in range(SUBSTEPS):
+        total = 0.0
+        for i in range(2):
+          current_ma = tc.scale_ma(i, self.limit_ma) if tc.active_mask & (1 << i) else self.limit_ma
+          drive = FORCE_PER_A * current_ma / 1000
+          grip = self.mu[i] * LOAD_N
+          road = max(-grip, min(grip, SLIP_STIFFNESS * (self.wheel[i] - self.speed)))
+          self.wheel[i] += (drive - road) / WHEEL_MASS_KG * dt
+          total += road
+        self.speed += total / MASS_KG * dt
+        if self.speed < 0:
+          self.speed = 0.0
+      spin = max(abs(w - self.speed) for w in self.wheel)
+      self.spin_max = max(self.spin_max, spin)
+
+
+def check_grip(verbose):
+  # full throttle from standstill for 4 s, both wheels on grip
+  sim = _Sim()
+  sim.run(4000)
+  ok = sim.limited_ms == 0 and list(sim.tc.slip_events) == [0, 0] and sim.speed > 10
+  return ok, ("speed m/s {:.1f}".format(sim.speed), "events", list(sim.tc.slip_events))
+
+
+def _patch(enabled):
+  # 1 s to speed on grip, the rear wheel 0.5 s on the patch, 1.5 s on grip
+  sim = _Sim(enabled)
+  sim.run(1000)
+  sim.spin_max = 0.0
+  sim.mu[0] = MU_PATCH
+  patch_ms = clock.ms
+  sim.run(500)
+  sim.mu[0] = MU_GRIP
+  sim.run(1500)
+  return sim, patch_ms
+
+
+def check_spin(verbose):
+  sim, patch_ms = _patch(True)
+  reference, _ = _patch(False)
+  tc = sim.tc
+  delay = None if sim.first_limited_ms is None else sim.first_limited_ms - patch_ms
+  ok = delay is not None and delay <= 3 * CONTROL_MS
+  ok = ok and tc.slip_events[0] >= 1 and tc.slip_events[1] == 0
+  ok = ok and sim.spin_max < reference.spin_max / 2
+  # limits back to 100 % once the wheel grips again
+  ok = ok and tc.active_mask == 0
+  return ok, ("limited after {} ms".format(delay), "events", list(tc.slip_events),
+              "peak spin m/s {:.2f}, {:.2f} without".format(sim.spin_max, reference.spin_max))
+
+
+def check_lock(verbose):
+  # regen braking from 8 m/s, the front wheel on the patch
+  sim = _Sim(speed_m_s=8.0)
+  sim.limit_ma = REGEN_LIMIT_MA
+  sim.run(200)
+  sim.mu[1] = MU_PATCH
+  sim.run(500)
+  tc = sim.tc
+  ok = tc.slip_events[1] >= 1 and tc.slip_events[0] == 0
+  return ok, ("events", list(tc.slip_events), "peak slip m/s {:.2f}".format(sim.spin_max))
+
+
+def check_log(verbose):
+  # one line per motor with new slip onsets, nothing on the next call
+  sim, _ = _patch(True)
+  first = io.StringIO()
+  with redirect_stdout(first):
+    sim.tc.log()
+  second = io.StringIO()
+  with redirect_stdout(second):
+    sim.tc.log()
+  lines = first.getvalue().splitlines()
+  ok = len(lines) == 1 and lines[0].startswith("traction: motor 0 spin") and second.getvalue() == ""
+  return ok, lines
+
+
+def check_single_motor(verbose):
+  from traction_control import TractionControl
+  tc = TractionControl([_motor_cfg()], _cfg())
+  tc.update([types.SimpleNamespace(speed_erpm=5000)])
+  ok = not tc.enabled and tc.scale_ma(0, CURRENT_LIMIT_MA) == CURRENT_LIMIT_MA
+  return ok, ("enabled", tc.enabled)
+
+
+CHECKS = (
+  ("grip", check_grip),
+  ("spin", check_spin),
+  ("lock", check_lock),
+  ("log", check_log),
+  ("single motor", check_single_motor),
+)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Traction control on a two wheel slip model")
+  parser.add_argument("-v", "--verbose", action="store_true", help="print the details")
+  args = parser.parse_args(argv)
+
+  fake_time.install()
+  failed = 0
+  for name, check in CHECKS:
+    ok, info = check(args.verbose)
+    if ok and not args.verbose:
+      print("{:14} ok".format(name))
+    else:
+      print("{:14} {} {}".format(name, "ok" if ok else "FAIL", info))
+    failed += not ok
+  return 1 if failed else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# sim_wheel_speed.py — host tool (CPython) for the ebike wheel speed logic
+# (01_diy_main_board/ebike/wheel_speed.py), fed with synthetic pulse trains
+# as WheelSpeedSensor feeds it on the board (pulse timestamps, update()
+# from the 20 ms control task). Checks:
+# - steady speeds read back within 1 %, from the second pulse on
+# - reed switch bounce rejected, the speed unchanged
+# - one late or early pulse ignored by the median of 3 periods
+# - slowing down after the last pulse, then 0 at the timeout
+# - several magnets per revolution
+# - supervisor.ticks_ms() wrapping at 2**29
+# - an acceleration ramp followed within 3 periods
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/sim_wheel_speed.py [-v]
+#
+# Exit code is 1 when a check fails.
+
+import argparse
+import os
+import sys
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EBIKE_DIR = os.path.join(FIRMWARE_DIR, "01_diy_main_board", "ebike")
+for _path in (FIRMWARE_DIR, EBIKE_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+from wheel_speed import WheelSpeed, _TICKS_MASK  # noqa: E402
+
+# the ebike/main.py wheel
+CIRCUMFERENCE_MM = 2200
+CONTROL_MS = 20
+TIMEOUT_MS = 3000
+
+
+def _period_ms(speed_kmh, magnets=1):
+  return CIRCUMFERENCE_MM * 3.6 / speed_kmh / magnets
+
+
+def _run(ws, pulses, start_ms, end_ms, trace=None):
+  """Feed the pulse timestamps (sorted, float ms) with update() every
+  control period, as the board does; trace gets (ms, speed_x10)"""
+  pulses = list(pulses)
+  i = 0
+  for ms in range(start_ms, end_ms):
+    while i < len(pulses) and pulses[i] <= ms:
+      ws.add_pulse(int(pulses[i]) & _TICKS_MASK)
+      i += 1
+    if ms % CONTROL_MS == 0:
+      ws.update(ms & _TICKS_MASK)
+      if trace is not None:
+        trace.append((ms, ws.speed_x10))
+  return ws.speed_x10
+
+
+def _train(speed_kmh, start_ms, end_ms, magnets=1):
+  period = _period_ms(speed_kmh, magnets)
+  t = float(start_ms)
+  while t < end_ms:
+    yield t
+    t += period
+
+
+def check_steady(verbose):
+  out = []
+  ok = True
+  for kmh in (3, 10, 25, 45, 80):
+    ws = WheelSpeed(CIRCUMFERENCE_MM)
+    got = _run(ws, _train(kmh, 100, 5000), 0, 5000)
+    good = abs(got - kmh * 10) <= kmh * 10 // 100 + 1
+    ok = ok and good
+    out.append((kmh, got))
+  # one pulse is no speed, the second one gives it
+  ws = WheelSpeed(CIRCUMFERENCE_MM)
+  period = int(_period_ms(20))
+  ws.add_pulse(1000)
+  ok = ok and ws.update(1001) == 0
+  ws.add_pulse(1000 + period)
+  ok = ok and abs(ws.update(1000 + period) - 200) <= 2
+  return ok, out
+
+
+def check_bounce(verbose):
+  # every pulse bounces twice, 2 and 5 ms after
+  ws = WheelSpeed(CIRCUMFERENCE_MM)
+  pulses = sorted(t + d for t in _train(25, 100, 5000) for d in (0, 2, 5))
+  got = _run(ws, pulses, 0, 5000)
+  ok = abs(got - 250) <= 3 and ws.pulses_rejected == 2 * ws.pulses_total
+  return ok, ("speed_x10", got, "pulses", ws.pulses_total, "rejected", ws.pulses_rejected)
+
+
+def check_outlier(verbose):
+  # one pulse 40 % late, one 40 % early: the median keeps the speed. Only
+  # while waiting for the late pulse (and the one after the early pulse)
+  # the reading follows the time since the last pulse, as for slowing down
+  period = _period_ms(25)
+  pulses = list(_train(25, 100, 5000))
+  pulses[8] += 0.4 * period
+  pulses[14] -= 0.4 * period
+  ws = WheelSpeed(CIRCUMFERENCE_MM)
+  trace = []
+  _run(ws, pulses, 0, 5000, trace)
+  gaps = ((pulses[7] + period, pulses[8]), (pulses[14] + period, pulses[15]))
+  steady = [s for ms, s in trace
+            if ms > pulses[4] and not any(a < ms <= b + 1 for a, b in gaps)]
+  waiting = [s for ms, s in trace if any(a < ms <= b for a, b in gaps)]
+  ok = all(abs(s - 250) <= 3 for s in steady) and min(waiting) >= 250 / 1.4 - 3
+  return ok, ("min", min(steady), "max", max(steady), "waiting min", min(waiting))
+
+
+def check_stop(verbose):
+  # pulses stop at 20 km/h: speed falls with the time since the last pulse,
+  # then 0 once timeout_ms passed
+  ws = WheelSpeed(CIRCUMFERENCE_MM, timeout_ms=TIMEOUT_MS)
+  pulses = list(_train(20, 100, 3000))
+  trace = []
+  _run(ws, pulses, 0, 8000, trace)
+  last = int(pulses[-1])
+  after = [s for ms, s in trace if ms > last]
+  falling = all(b <= a for a, b in zip(after, after[1:]))
+  zero_ms = next((ms for ms, s in trace if ms > last and s == 0), None)
+  ok = falling and after[0] >= 195 and zero_ms is not None and \
+    zero_ms - last <= TIMEOUT_MS + CONTROL_MS
+  # and starts again from nothing
+  _run(ws, _train(10, 9000, 12000), 8000, 12000)
+  ok = ok and abs(ws.speed_x10 - 100) <= 2
+  return ok, ("0 after", None if zero_ms is None else zero_ms - last, "ms")
+
+
+def check_magnets(verbose):
+  out = []
+  ok = True
+  for magnets in (1, 2, 6):
+    ws = WheelSpeed(CIRCUMFERENCE_MM, magnets=magnets)
+    got = _run(ws, _train(30, 100, 4000, magnets), 0, 4000)
+    ok = ok and abs(got - 300) <= 4
+    out.append((magnets, got))
+  return ok, out
+
+
+def check_wrap(verbose):
+  # 25 km/h across the supervisor.ticks_ms() wrap
+  start = _TICKS_MASK - 1500
+  ws = WheelSpeed(CIRCUMFERENCE_MM)
+  trace = []
+  _run(ws, _train(25, start, start + 4000), start - 100, start + 4000, trace)
+  steady = [s for ms, s in trace if ms > start + 1500]
+  ok = all(abs(s - 250) <= 3 for s in steady)
+  return ok, ("min", min(steady), "max", max(steady))
+
+
+def check_ramp(verbose):
+  # 5 to 40 km/h in 6 s: the median of 3 periods plus the time since the
+  # last pulse make the reading lag up to 3 periods behind the true speed
+  def kmh_at(ms):
+    return 5 + 35 * max(0, ms - 100) / 6000
+
+  pulses = []
+  t = 100.0
+  while t < 6100:
+    pulses.append(t)
+    t += _period_ms(kmh_at(t))
+  ws = WheelSpeed(CIRCUMFERENCE_MM)
+  trace = []
+  _run(ws, pulses, 0, 6100, trace)
+  out = 0
+  for ms, s in trace:
+    lag_ms = ms
+    for _ in range(4):
+      lag_ms = ms - 3 * _period_ms(kmh_at(lag_ms))
+    if lag_ms < pulses[0]:
+      continue
+    if not kmh_at(lag_ms) * 10 - 3 <= s <= kmh_at(ms) * 10 + 3:
+      out += 1
+  return out == 0, ("readings out of range", out)
+
+
+CHECKS = (
+  ("steady", check_steady),
+  ("bounce", check_bounce),
+  ("outlier", check_outlier),
+  ("stop", check_stop),
+  ("magnets", check_magnets),
+  ("ticks wrap", check_wrap),
+  ("ramp", check_ramp),
+)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Wheel speed checks with synthetic pulse trains")
+  parser.add_argument("-v", "--verbose", action="store_true", help="print the details")
+  args = parser.parse_args(argv)
+
+  failed = 0
+  for name, check in CHECKS:
+    ok, info = check(args.verbose)
+    if ok and not args.verbose:
+      print("{:12} ok".format(name))
+    else:
+      print("{:12} {} {}".format(name, "ok" if ok else "FAIL", info))
+    failed += not ok
+  return 1 if failed else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# vesc_stand_in.py — host tool (CPython): a stand-in VESC that speaks the VESC
+# UART protocol (01_diy_main_board/ebike/vesc_protocol.py), to exercise the
+# ebike Vesc client without a motor controller.
+#
+# Usage (from the firmware/ folder):
+#   python3 tools/vesc_stand_in.py --pty
+#       serve on a new pseudo terminal and print its path, e.g. to bridge a
+#       USB-UART adapter or another host client to it
+#   python3 tools/vesc_stand_in.py --self-test [--noise] [--requests 500]
+#       run a pipelined client against the stand-in over a socket pair,
+#       with the replies delivered in random sized chunks, and print the
+#       round-trip latency stats and framer counters
+#
+# The stand-in answers COMM_GET_VALUES with a 74 bytes payload (79 bytes on
+# the wire, same as a VESC 6), where motor current and ERPM follow the last
+# COMM_SET_CURRENT / COMM_SET_RPM. Other commands have no reply.
+
+import argparse
+import os
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_BOARD_DIR = os.path.join(FIRMWARE_DIR, "01_diy_main_board")
+for _path in (FIRMWARE_DIR, MAIN_BOARD_DIR):
+  if _path not in sys.path:
+    sys.path.insert(0, _path)
+
+from ebike.vesc_protocol import (  # noqa: E402
+  TxPacket,
+  RxFramer,
+  COMM_GET_VALUES,
+  COMM_SET_CURRENT,
+  COMM_SET_CURRENT_BRAKE,
+  COMM_SET_RPM,
+  COMM_ALIVE,
+)
+
+GET_VALUES_PAYLOAD_LEN = 74
+
+
+class StandInVesc(object):
+  def __init__(self):
+    self.framer = RxFramer()
+    self.reply = TxPacket(COMM_GET_VALUES, GET_VALUES_PAYLOAD_LEN)
+    self.motor_current_ma = 0
+    self.erpm = 0
+    self.battery_voltage_x10 = 480
+    self.fet_temperature_x10 = 300 + 110  # the ebike client removes 11 degrees
+    self.alive = 0
+    self.commands = 0
+
+  def _values_packet(self):
+    buf = self.reply.buf
+    # payload starts at buf[2], offsets below are relative to the payload
+    struct.pack_into('>h', buf, 2 + 1, self.fet_temperature_x10)
+    struct.pack_into('>l', buf, 2 + 5, self.motor_current_ma // 10)       # x100
+    struct.pack_into('>l', buf, 2 + 9, (self.motor_current_ma * 8) // 100) # x100, ~80% duty
+    struct.pack_into('>l', buf, 2 + 23, self.erpm)
+    struct.pack_into('>h', buf, 2 + 27, self.battery_voltage_x10)
+    buf[2 + 53] = 0  # fault code
+    self.reply.update_crc()
+    return bytes(buf)
+
+  def handle(self, data):
+    """Feed received bytes, return the bytes to send back"""
+    out = bytearray()
+    self.framer.feed(data)
+    while True:
+      payload = self.framer.next_frame()
+      if payload is None:
+        break
+      self.commands += 1
+      command = payload[0]
+      if command == COMM_GET_VALUES:
+        out += self._values_packet()
+      elif command == COMM_SET_CURRENT:
+        self.motor_current_ma = struct.unpack_from('>l', payload, 1)[0]
+        self.erpm = self.motor_current_ma // 2
+      elif command == COMM_SET_CURRENT_BRAKE:
+        self.motor_current_ma = 0
+      elif command == COMM_SET_RPM:
+        self.erpm = struct.unpack_from('>l', payload, 1)[0]
+      elif command == COMM_ALIVE:
+        self.alive += 1
+    return bytes(out)
+
+
+def serve_pty():
+  import pty
+  import tty
+  master, slave = pty.openpty()
+  tty.setraw(slave)
+  print("stand-in VESC on " + os.ttyname(slave))
+  vesc = StandInVesc()
+  while True:
+    data = os.read(master, 256)
+    if not data:
+      break
+    reply = vesc.handle(data)
+    if reply:
+      os.write(master, reply)
+
+
+def _serve_socket(sock, noise, stop):
+  vesc = StandInVesc()
+  rnd = random.Random(1)
+  sock.settimeout(0.05)
+  while not stop.is_set():
+    try:
+      data = sock.recv(256)
+    except socket.timeout:
+      continue
+    if not data:
+      break
+    reply = vesc.handle(data)
+    if noise and rnd.random() < 0.2:
+      reply = bytes(rnd.randrange(256) for _ in range(rnd.randrange(1, 8))) + reply
+    # deliver in random sized chunks to exercise partial reads
+    while reply:
+      n = rnd.randrange(1, 24)
+      sock.sendall(reply[:n])
+      reply = reply[n:]
+      time.sleep(0.0002)
+
+
+def self_test(requests, noise):
+  client, server = socket.socketpair()
+  stop = threading.Event()
+  thread = threading.Thread(target=_serve_socket, args=(server, noise, stop))
+  thread.start()
+
+  client.setblocking(False)
+  framer = RxFramer()
+  get_values = TxPacket(COMM_GET_VALUES)
+  alive = TxPacket(COMM_ALIVE)
+  set_current = TxPacket(COMM_SET_CURRENT, 5)
+
+  rtts = []
+  pending_ms = None
+  sent = 0
+  timeouts = 0
+  values = None
+  deadline = time.monotonic() + 10.0
+  while len(rtts) < requests and time.monotonic() < deadline:
+    now_ms = time.monotonic() * 1000.0
+    if pending_ms is None or now_ms - pending_ms > 200:
+      if pending_ms is not None:
+        timeouts += 1
+      # pipelined: heartbeat, set current and get values back to back
+      set_current.set_int32(1000 + (sent % 10) * 1000)
+      client.sendall(bytes(alive.buf) + bytes(set_current.buf) + bytes(get_values.buf))
+      pending_ms = now_ms
+      sent += 1
+    try:
+      data = client.recv(64)
+    except BlockingIOError:
+      data = b""
+    if data:
+      framer.feed(data)
+      while True:
+        payload = framer.next_frame()
+        if payload is None:
+          break
+        if payload[0] == COMM_GET_VALUES and pending_ms is not None:
+          rtts.append(time.monotonic() * 1000.0 - pending_ms)
+          pending_ms = None
+          values = (
+            struct.unpack_from('>h', payload, 1)[0] - 110,
+            struct.unpack_from('>l', payload, 5)[0],
+            struct.unpack_from('>l', payload, 23)[0],
+            struct.unpack_from('>h', payload, 27)[0],
+          )
+    else:
+      time.sleep(0.0001)
+
+  stop.set()
+  client.close()
+  thread.join()
+
+  if not rtts:
+    print("no replies")
+    return 1
+  rtts.sort()
+  print("requests sent {}, replies {}, timeouts {}".format(sent, len(rtts), timeouts))
+  print("rtt ms: avg {:.3f} median {:.3f} max {:.3f}".format(
+    sum(rtts) / len(rtts), rtts[len(rtts) // 2], rtts[-1]))
+  print("framer: frames {} crc_errors {} resyncs {} overflows {}".format(
+    framer.frames, framer.crc_errors, framer.resyncs, framer.overflows))
+  print("last values: temperature_x10 {} motor_current_x100 {} erpm {} voltage_x10 {}".format(*values))
+  return 0
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Stand-in VESC speaking the VESC UART protocol")
+  group = parser.add_mutually_exclusive_group(required=True)
+  group.add_argument("--pty", action="store_true", help="serve on a new pseudo terminal")
+  group.add_argument("--self-test", action="store_true", help="run a pipelined client over a socket pair")
+  parser.add_argument("--requests", type=int, default=500, help="self-test GET_VALUES round trips")
+  parser.add_argument("--noise", action="store_true", help="self-test: inject garbage bytes before replies")
+  args = parser.parse_args(argv)
+
+  if args.pty:
+    serve_pty()
+    return 0
+  return self_test(args.requests, args.noise)
+
+
+if __name__ == "__main__":
+  sys.exit(main())